@@ -11,12 +11,12 @@ import torch
 
 from mmhuman3d.apis import (
     feature_extract,
-    inference_image_based_model,
+    inference_image_based_model_batch,
     inference_video_based_model,
     init_model,
 )
 from mmhuman3d.core.visualization.visualize_smpl import visualize_smpl_hmr
-from mmhuman3d.data.data_structures.human_data import HumanData
+from mmhuman3d.data.data_structures.human_data_writer import HumanDataWriter
 from mmhuman3d.utils.demo_utils import (
     extract_feature_sequence,
     get_speed_up_interval,
@@ -122,6 +122,35 @@ def get_detection_result(args, frames_iter, mesh_model, extractor):
     return frame_id_list, result_list
 
 
+def get_image_mesh_results(args, frames_iter, mesh_model, frame_id_list,
+                           result_list):
+    """Estimate meshes of all the frames with an image based model, person
+    crops of several frames are fed into the model in one batch.
+
+    Returns:
+        dict: Mesh results keyed by the index in frame_id_list. Frames
+            skipped by speed up are not included.
+    """
+    frame_num = len(frame_id_list)
+    infer_ids = list(range(frame_num))
+    if args.speed_up_type:
+        speed_up_interval = get_speed_up_interval(args.speed_up_type)
+        speed_up_frames = (frame_num -
+                           1) // speed_up_interval * speed_up_interval
+        infer_ids = [
+            i for i in infer_ids
+            if i % speed_up_interval == 0 or i > speed_up_frames
+        ]
+    mesh_results_list = inference_image_based_model_batch(
+        mesh_model, [frames_iter[frame_id_list[i]] for i in infer_ids],
+        [result_list[i] for i in infer_ids],
+        bbox_thr=args.bbox_thr,
+        format='xyxy',
+        batch_size=args.batch_size,
+        num_workers=args.num_workers)
+    return dict(zip(infer_ids, mesh_results_list))
+
+
 def single_person_with_mmdet(args, frames_iter):
     """Estimate smpl parameters from single-person
         images with mmdetection
@@ -141,6 +170,10 @@ def single_person_with_mmdet(args, frames_iter):
 
     frame_id_list, result_list = \
         get_detection_result(args, frames_iter, mesh_model, extractor)
+    if mesh_model.cfg.model.type == 'ImageBodyModelEstimator':
+        image_mesh_results = get_image_mesh_results(args, frames_iter,
+                                                    mesh_model, frame_id_list,
+                                                    result_list)
 
     frame_num = len(frame_id_list)
     # speed up
@@ -150,7 +183,6 @@ def single_person_with_mmdet(args, frames_iter):
                            1) // speed_up_interval * speed_up_interval
 
     for i, result in enumerate(mmcv.track_iter_progress(result_list)):
-        frame_id = frame_id_list[i]
         if mesh_model.cfg.model.type == 'VideoBodyModelEstimator':
             if args.speed_up_type:
                 warnings.warn(
@@ -175,12 +207,7 @@ def single_person_with_mmdet(args, frames_iter):
                     'keypoints_3d': np.zeros((17, 3)),
                 }]
             else:
-                mesh_results = inference_image_based_model(
-                    mesh_model,
-                    frames_iter[frame_id],
-                    result,
-                    bbox_thr=args.bbox_thr,
-                    format='xyxy')
+                mesh_results = image_mesh_results[i]
         else:
             raise Exception(
                 f'{mesh_model.cfg.model.type} is not supported yet')
@@ -232,38 +259,28 @@ def single_person_with_mmdet(args, frames_iter):
         raise Exception(f'Wrong shape of `smpl_pose`: {smpl_pose.shape}')
 
     if args.output is not None:
-        body_pose_, global_orient_, smpl_betas_, verts_, pred_cams_, \
-            bboxes_xyxy_, image_path_, person_id_, frame_id_ = \
-            [], [], [], [], [], [], [], [], []
-        human_data = HumanData()
         frames_folder = osp.join(args.output, 'images')
         os.makedirs(frames_folder, exist_ok=True)
         array_to_images(
-            np.array(frames_iter)[frame_id_list], output_folder=frames_folder)
-
-        for i, img_i in enumerate(sorted(os.listdir(frames_folder))):
-            body_pose_.append(smpl_poses[i][1:])
-            global_orient_.append(smpl_poses[i][:1])
-            smpl_betas_.append(smpl_betas[i])
-            verts_.append(verts[i])
-            pred_cams_.append(pred_cams[i])
-            bboxes_xyxy_.append(bboxes_xyxy[i])
-            image_path_.append(os.path.join('images', img_i))
-            person_id_.append(0)
-            frame_id_.append(frame_id_list[i])
-
-        smpl = {}
-        smpl['body_pose'] = np.array(body_pose_).reshape((-1, 23, 3))
-        smpl['global_orient'] = np.array(global_orient_).reshape((-1, 3))
-        smpl['betas'] = np.array(smpl_betas_).reshape((-1, 10))
-        human_data['smpl'] = smpl
-        human_data['verts'] = verts_
-        human_data['pred_cams'] = pred_cams_
-        human_data['bboxes_xyxy'] = bboxes_xyxy_
-        human_data['image_path'] = image_path_
-        human_data['person_id'] = person_id_
-        human_data['frame_id'] = frame_id_
-        human_data.dump(osp.join(args.output, 'inference_result.npz'))
+            frames_iter[frame_id_list], output_folder=frames_folder)
+
+        # results are streamed to the file frame by frame
+        with HumanDataWriter(osp.join(args.output,
+                                      'inference_result.npz')) as writer:
+            for i, img_i in enumerate(sorted(os.listdir(frames_folder))):
+                smpl = dict(
+                    body_pose=smpl_poses[i][1:].reshape(23, 3),
+                    global_orient=smpl_poses[i][:1].reshape(3),
+                    betas=smpl_betas[i].reshape(10))
+                writer.append_frame(
+                    dict(
+                        smpl=smpl,
+                        verts=verts[i],
+                        pred_cams=pred_cams[i],
+                        bboxes_xyxy=bboxes_xyxy[i],
+                        image_path=os.path.join('images', img_i),
+                        person_id=0,
+                        frame_id=frame_id_list[i]))
 
     if args.show_path is not None:
         if args.output is not None:
@@ -272,8 +289,7 @@ def single_person_with_mmdet(args, frames_iter):
             frames_folder = osp.join(Path(args.show_path).parent, 'images')
             os.makedirs(frames_folder, exist_ok=True)
             array_to_images(
-                np.array(frames_iter)[frame_id_list],
-                output_folder=frames_folder)
+                frames_iter[frame_id_list], output_folder=frames_folder)
 
         body_model_config = dict(model_path=args.body_model_dir, type='smpl')
         visualize_smpl_hmr(
@@ -306,6 +322,10 @@ def multi_person_with_mmtracking(args, frames_iter):
 
     max_track_id, max_instance, frame_id_list, result_list = \
         get_tracking_result(args, frames_iter, mesh_model, extractor)
+    if mesh_model.cfg.model.type == 'ImageBodyModelEstimator':
+        image_mesh_results = get_image_mesh_results(args, frames_iter,
+                                                    mesh_model, frame_id_list,
+                                                    result_list)
 
     frame_num = len(frame_id_list)
     verts = np.zeros([frame_num, max_track_id + 1, 6890, 3])
@@ -313,6 +333,7 @@ def multi_person_with_mmtracking(args, frames_iter):
     bboxes_xyxy = np.zeros([frame_num, max_track_id + 1, 5])
     smpl_poses = np.zeros([frame_num, max_track_id + 1, 24, 3, 3])
     smpl_betas = np.zeros([frame_num, max_track_id + 1, 10])
+    visible = np.zeros([frame_num, max_track_id + 1], dtype=bool)
 
     # speed up
     if args.speed_up_type:
@@ -322,7 +343,6 @@ def multi_person_with_mmtracking(args, frames_iter):
 
     track_ids_lists = []
     for i, result in enumerate(mmcv.track_iter_progress(result_list)):
-        frame_id = frame_id_list[i]
         if mesh_model.cfg.model.type == 'VideoBodyModelEstimator':
             if args.speed_up_type:
                 warnings.warn(
@@ -351,12 +371,7 @@ def multi_person_with_mmtracking(args, frames_iter):
                     mesh_results.append(mesh_result)
 
             else:
-                mesh_results = inference_image_based_model(
-                    mesh_model,
-                    frames_iter[frame_id],
-                    result,
-                    bbox_thr=args.bbox_thr,
-                    format='xyxy')
+                mesh_results = image_mesh_results[i]
         else:
             raise Exception(
                 f'{mesh_model.cfg.model.type} is not supported yet')
@@ -371,6 +386,7 @@ def multi_person_with_mmtracking(args, frames_iter):
             smpl_poses[i, instance_id] = mesh_result['smpl_pose']
             track_ids.append(instance_id)
         track_ids_lists.append(track_ids)
+        visible[i, track_ids] = True
 
     # release GPU memory
     del mesh_model
@@ -392,8 +408,10 @@ def multi_person_with_mmtracking(args, frames_iter):
     if args.smooth_type is not None:
         smpl_poses = smooth_process(
             smpl_poses.reshape(frame_num, -1, 24, 9),
-            smooth_type=args.smooth_type).reshape(frame_num, -1, 24, 3, 3)
-        verts = smooth_process(verts, smooth_type=args.smooth_type)
+            smooth_type=args.smooth_type,
+            mask=visible).reshape(frame_num, -1, 24, 3, 3)
+        verts = smooth_process(
+            verts, smooth_type=args.smooth_type, mask=visible)
         pred_cams = smooth_process(
             pred_cams[:, np.newaxis],
             smooth_type=args.smooth_type).reshape(frame_num, -1, 3)
@@ -406,39 +424,30 @@ def multi_person_with_mmtracking(args, frames_iter):
         raise Exception(f'Wrong shape of `smpl_pose`: {smpl_poses.shape}')
 
     if args.output is not None:
-        body_pose_, global_orient_, smpl_betas_, verts_, pred_cams_, \
-            bboxes_xyxy_, image_path_, frame_id_, person_id_ = \
-            [], [], [], [], [], [], [], [], []
-        human_data = HumanData()
         frames_folder = osp.join(args.output, 'images')
         os.makedirs(frames_folder, exist_ok=True)
         array_to_images(
-            np.array(frames_iter)[frame_id_list], output_folder=frames_folder)
-
-        for i, img_i in enumerate(sorted(os.listdir(frames_folder))):
-            for person_i in track_ids_lists[i]:
-                body_pose_.append(smpl_poses[i][person_i][1:])
-                global_orient_.append(smpl_poses[i][person_i][:1])
-                smpl_betas_.append(smpl_betas[i][person_i])
-                verts_.append(verts[i][person_i])
-                pred_cams_.append(pred_cams[i][person_i])
-                bboxes_xyxy_.append(bboxes_xyxy[i][person_i])
-                image_path_.append(os.path.join('images', img_i))
-                person_id_.append(person_i)
-                frame_id_.append(frame_id_list[i])
-
-        smpl = {}
-        smpl['body_pose'] = np.array(body_pose_).reshape((-1, 23, 3))
-        smpl['global_orient'] = np.array(global_orient_).reshape((-1, 3))
-        smpl['betas'] = np.array(smpl_betas_).reshape((-1, 10))
-        human_data['smpl'] = smpl
-        human_data['verts'] = verts_
-        human_data['pred_cams'] = pred_cams_
-        human_data['bboxes_xyxy'] = bboxes_xyxy_
-        human_data['image_path'] = image_path_
-        human_data['person_id'] = person_id_
-        human_data['frame_id'] = frame_id_
-        human_data.dump(osp.join(args.output, 'inference_result.npz'))
+            frames_iter[frame_id_list], output_folder=frames_folder)
+
+        # results are streamed to the file frame by frame
+        with HumanDataWriter(osp.join(args.output,
+                                      'inference_result.npz')) as writer:
+            for i, img_i in enumerate(sorted(os.listdir(frames_folder))):
+                for person_i in track_ids_lists[i]:
+                    smpl_pose = smpl_poses[i][person_i]
+                    smpl = dict(
+                        body_pose=smpl_pose[1:].reshape(23, 3),
+                        global_orient=smpl_pose[:1].reshape(3),
+                        betas=smpl_betas[i][person_i].reshape(10))
+                    writer.append_frame(
+                        dict(
+                            smpl=smpl,
+                            verts=verts[i][person_i],
+                            pred_cams=pred_cams[i][person_i],
+                            bboxes_xyxy=bboxes_xyxy[i][person_i],
+                            image_path=os.path.join('images', img_i),
+                            person_id=person_i,
+                            frame_id=frame_id_list[i]))
 
     # To compress vertices array
     compressed_verts = np.zeros([frame_num, max_instance, 6890, 3])
@@ -464,8 +473,7 @@ def multi_person_with_mmtracking(args, frames_iter):
             frames_folder = osp.join(Path(args.show_path).parent, 'images')
             os.makedirs(frames_folder, exist_ok=True)
             array_to_images(
-                np.array(frames_iter)[frame_id_list],
-                output_folder=frames_folder)
+                frames_iter[frame_id_list], output_folder=frames_folder)
         body_model_config = dict(model_path=args.body_model_dir, type='smpl')
         visualize_smpl_hmr(
             poses=compressed_poses.reshape(-1, max_instance, 24 * 3),
@@ -572,6 +580,17 @@ if __name__ == '__main__':
         default=None,
         help='Speed up data processing through the specified type.'
         'Select in [deciwatch].')
+    parser.add_argument(
+        '--batch_size',
+        type=int,
+        default=32,
+        help='Number of person crops in one forward of image based models')
+    parser.add_argument(
+        '--num_workers',
+        type=int,
+        default=0,
+        help='Number of threads to preprocess the following batches while '
+        'the model runs on the current one')
     parser.add_argument(
         '--focal_length', type=float, default=5000., help='Focal lenght')
     parser.add_argument(
@@ -212,7 +212,7 @@ def single_person_with_mmdet(args, frames_iter):
         frames_folder = osp.join(args.show_path, 'images')
         os.makedirs(frames_folder, exist_ok=True)
         array_to_images(
-            np.array(frames_iter)[frame_id_list], output_folder=frames_folder)
+            frames_iter[frame_id_list], output_folder=frames_folder)
         # create body model
         body_model_config = dict(
             type='smplx',
@@ -357,7 +357,7 @@ def multi_person_with_mmtracking(args, frames_iter):
         frames_folder = osp.join(args.show_path, 'images')
         os.makedirs(frames_folder, exist_ok=True)
         array_to_images(
-            np.array(frames_iter)[frame_id_list], output_folder=frames_folder)
+            frames_iter[frame_id_list], output_folder=frames_folder)
         # create body model
         body_model_config = dict(
             type='smplx',
@@ -272,7 +272,7 @@ def single_person_with_mmdet(args, frames_iter):
         frames_folder = osp.join(args.output, 'images')
         os.makedirs(frames_folder, exist_ok=True)
         array_to_images(
-            np.array(frames_iter)[frame_id_list], output_folder=frames_folder)
+            frames_iter[frame_id_list], output_folder=frames_folder)
 
         for i, img_i in enumerate(sorted(os.listdir(frames_folder))):
             body_pose_.append(smpl_poses[i][1:])
@@ -305,8 +305,7 @@ def single_person_with_mmdet(args, frames_iter):
             frames_folder = osp.join(Path(args.show_path).parent, 'images')
             os.makedirs(frames_folder, exist_ok=True)
             array_to_images(
-                np.array(frames_iter)[frame_id_list],
-                output_folder=frames_folder)
+                frames_iter[frame_id_list], output_folder=frames_folder)
 
         body_model_config = dict(model_path='data/body_models', type='star')
         visualize_smpl_hmr(
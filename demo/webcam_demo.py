@@ -16,6 +16,7 @@ from mmhuman3d.core.renderer.mpr_renderer.smpl_realrender import \
 from mmhuman3d.models.body_models.builder import build_body_model
 from mmhuman3d.utils.demo_utils import (
     StopWatch,
+    build_online_smoother,
     convert_verts_to_cam_coord,
     process_mmdet_results,
 )
@@ -118,6 +119,12 @@ def parse_args():
         default=True,
         help='If True, the video I/O and inference will be temporally '
         'aligned. Note that this will reduce the display FPS.')
+    parser.add_argument(
+        '--smooth_type',
+        type=str,
+        default=None,
+        help='Smooth the meshes frame by frame through the specified type. '
+        'Select in [oneeuro,gaus1d,savgol,smoothnet].')
 
     return parser.parse_args()
 
@@ -199,6 +206,12 @@ def inference_mesh():
                 det_results,
                 bbox_thr=args.bbox_thr,
                 format='xyxy')
+            if smoother is not None:
+                # detections are not tracked, identify them by their order
+                for idx, mesh_result in enumerate(mesh_results):
+                    mesh_result['vertices'] = smoother.push(
+                        mesh_result['vertices'],
+                        track_id=mesh_result.get('track_id', idx))
         t_info += stop_watch.report_strings()
         with mesh_result_queue_mutex:
             mesh_result_queue.append((ts_input, t_info, mesh_results))
@@ -331,7 +344,7 @@ def main():
     global mesh_result_queue, mesh_result_queue_mutex
     global det_model, mesh_model, extractor
     global event_exit, event_inference_done
-    global renderer
+    global renderer, smoother
     args = parse_args()
     assert has_mmdet, 'Please install mmdet to run the demo.'
     assert args.det_config is not None
@@ -369,6 +382,12 @@ def main():
         args.mesh_reg_checkpoint,
         device=args.device.lower())
 
+    # smooth the meshes as they are estimated, without waiting for
+    # following frames
+    smoother = None
+    if args.smooth_type is not None:
+        smoother = build_online_smoother(args.smooth_type, lookahead=0)
+
     # frame buffer
     if args.buffer_size > 0:
         buffer_size = args.buffer_size
@@ -1,3 +1,7 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
 from typing import Dict, Tuple, Union
 
 import cv2
@@ -125,88 +129,141 @@ def inference_image_based_model(
             containing the bbox: (left, top, right, bottom, [score]),
             SMPL parameters, vertices, kp3d, and camera.
     """
-    # only two kinds of bbox format is supported.
-    assert format in ['xyxy', 'xywh']
-    mesh_results = []
-    if len(det_results) == 0:
-        return []
+    return inference_image_based_model_batch(
+        model, [img_or_path], [det_results],
+        bbox_thr=bbox_thr,
+        format=format,
+        batch_size=None)[0]
 
-    # Change for-loop preprocess each bbox to preprocess all bboxes at once.
-    bboxes = np.array([box['bbox'] for box in det_results])
 
-    # Select bboxes by score threshold
-    if bbox_thr is not None:
-        assert bboxes.shape[1] == 5
-        valid_idx = np.where(bboxes[:, 4] > bbox_thr)[0]
-        bboxes = bboxes[valid_idx]
-        det_results = [det_results[i] for i in valid_idx]
+def inference_image_based_model_batch(
+    model,
+    imgs_or_paths,
+    det_results_list,
+    bbox_thr=None,
+    format='xywh',
+    batch_size=32,
+    num_workers=0,
+    prefetch_batches=2,
+):
+    """Inference multiple images, each with a list of person bounding boxes.
 
-    if format == 'xyxy':
-        bboxes_xyxy = bboxes
-        bboxes_xywh = xyxy2xywh(bboxes)
-    else:
-        # format is already 'xywh'
-        bboxes_xywh = bboxes
-        bboxes_xyxy = xywh2xyxy(bboxes)
+    Person crops of all the images are gathered and fed into the model in
+    batches of ``batch_size``, so that a video is processed with one
+    forward per batch instead of one forward per frame. With
+    ``num_workers`` > 0, the following batches are preprocessed by a thread
+    pool while the model runs on the current one.
+
+    Args:
+        model (nn.Module): The loaded pose model.
+        imgs_or_paths (List[Union[str, np.ndarray]]): Image filenames or
+            loaded images.
+        det_results_list (List[List(dict)]): Detection results of each
+            image, in the same format as ``det_results`` of
+            ``inference_image_based_model``.
+        bbox_thr (float, optional): Threshold for bounding boxes.
+            Only bboxes with higher scores will be fed into the pose detector.
+            If bbox_thr is None, ignore it. Defaults to None.
+        format (str, optional): bbox format ('xyxy' | 'xywh'). Default: 'xywh'.
+            'xyxy' means (left, top, right, bottom),
+            'xywh' means (left, top, width, height).
+        batch_size (int, optional): Max number of person crops in a forward.
+            If batch_size is None, all crops are fed at once.
+            Defaults to 32.
+        num_workers (int, optional): Number of threads to load and crop
+            images, overlapped with the model forward. If num_workers is 0,
+            batches are prepared in the calling thread. Defaults to 0.
+        prefetch_batches (int, optional): Max number of batches prepared
+            ahead of the model forward when num_workers > 0. Defaults to 2.
+
+    Returns:
+        list[list[dict]]: Results of each image, in the same format as the
+            returns of ``inference_image_based_model``.
+    """
+    # only two kinds of bbox format is supported.
+    assert format in ['xyxy', 'xywh']
+    assert len(imgs_or_paths) == len(det_results_list)
+
+    # (image index, index in the image, bbox xywh, bbox xyxy, det result)
+    # of each person crop
+    crops = []
+    for img_idx, det_results in enumerate(det_results_list):
+        if len(det_results) == 0:
+            continue
+        bboxes = np.array([box['bbox'] for box in det_results])
+        assert len(bboxes[0]) in [4, 5]
+
+        # Select bboxes by score threshold
+        if bbox_thr is not None:
+            assert bboxes.shape[1] == 5
+            valid_idx = np.where(bboxes[:, 4] > bbox_thr)[0]
+            bboxes = bboxes[valid_idx]
+            det_results = [det_results[i] for i in valid_idx]
+
+        if format == 'xyxy':
+            bboxes_xyxy = bboxes
+            bboxes_xywh = xyxy2xywh(bboxes)
+        else:
+            # format is already 'xywh'
+            bboxes_xywh = bboxes
+            bboxes_xyxy = xywh2xyxy(bboxes)
+
+        for i, det_result in enumerate(det_results):
+            crops.append(
+                (img_idx, i, bboxes_xywh[i], bboxes_xyxy[i], det_result))
 
+    mesh_results_list = [[] for _ in imgs_or_paths]
     # if bbox_thr remove all bounding box
-    if len(bboxes_xywh) == 0:
-        return []
+    if len(crops) == 0:
+        return mesh_results_list
 
     cfg = model.cfg
     device = next(model.parameters()).device
+    inference_pipeline = _get_pipeline(model, 'inference_pipeline')
 
-    # build the data pipeline
-    inference_pipeline = [LoadImage()] + cfg.inference_pipeline
-    inference_pipeline = Compose(inference_pipeline)
-
-    assert len(bboxes[0]) in [4, 5]
-
-    batch_data = []
     input_size = cfg['img_res']
     aspect_ratio = 1 if isinstance(input_size,
                                    int) else input_size[0] / input_size[1]
+    if batch_size is None:
+        batch_size = len(crops)
 
-    for i, bbox in enumerate(bboxes_xywh):
-        center, scale = box2cs(bbox, aspect_ratio, bbox_scale_factor=1.25)
-        # prepare data
-        data = {
-            'image_path': img_or_path,
-            'center': center,
-            'scale': scale,
-            'rotation': 0,
-            'bbox_score': bbox[4] if len(bbox) == 5 else 1,
-            'sample_idx': i,
-        }
-        data = inference_pipeline(data)
-        batch_data.append(data)
-
-    batch_data = collate(batch_data, samples_per_gpu=1)
-
-    if next(model.parameters()).is_cuda:
-        # scatter not work so just move image to cuda device
-        batch_data['img'] = batch_data['img'].to(device)
-
-    # get all img_metas of each bounding box
-    batch_data['img_metas'] = [
-        img_metas[0] for img_metas in batch_data['img_metas'].data
+    batches = [
+        crops[batch_start:batch_start + batch_size]
+        for batch_start in range(0, len(crops), batch_size)
     ]
+    prepare_batch = partial(
+        _prepare_image_batch,
+        imgs_or_paths=imgs_or_paths,
+        pipeline=inference_pipeline,
+        aspect_ratio=aspect_ratio)
+    for batch_crops, batch_data in zip(
+            batches,
+            _prefetch(prepare_batch, batches, num_workers, prefetch_batches)):
+        if next(model.parameters()).is_cuda:
+            # scatter not work so just move image to cuda device
+            batch_data['img'] = batch_data['img'].to(device)
+
+        # get all img_metas of each bounding box
+        batch_data['img_metas'] = [
+            img_metas[0] for img_metas in batch_data['img_metas'].data
+        ]
 
-    # forward the model
-    with torch.no_grad():
-        results = model(
-            img=batch_data['img'],
-            img_metas=batch_data['img_metas'],
-            sample_idx=batch_data['sample_idx'],
-        )
+        # forward the model
+        with torch.no_grad():
+            results = model(
+                img=batch_data['img'],
+                img_metas=batch_data['img_metas'],
+                sample_idx=batch_data['sample_idx'],
+            )
 
-    for idx in range(len(det_results)):
-        mesh_result = det_results[idx].copy()
-        mesh_result['bbox'] = bboxes_xyxy[idx]
-        for key, value in results.items():
-            mesh_result[key] = _indexing_sequence(value, index=idx)
-        mesh_results.append(mesh_result)
-    return mesh_results
+        for idx, (img_idx, _, _, bbox_xyxy,
+                  det_result) in enumerate(batch_crops):
+            mesh_result = det_result.copy()
+            mesh_result['bbox'] = bbox_xyxy
+            for key, value in results.items():
+                mesh_result[key] = _indexing_sequence(value, index=idx)
+            mesh_results_list[img_idx].append(mesh_result)
+    return mesh_results_list
 
 
 def inference_video_based_model(model,
@@ -244,8 +301,7 @@ def inference_video_based_model(model,
     device = next(model.parameters()).device
     seq_len = cfg.data.test.seq_len
     mesh_results = []
-    # build the data pipeline
-    inference_pipeline = Compose(cfg.inference_pipeline)
+    inference_pipeline = _get_pipeline(model, 'inference_pipeline')
     target_idx = 0 if causal else len(extracted_results) // 2
 
     input_features = _gather_input_features(extracted_results)
@@ -362,9 +418,8 @@ def feature_extract(
         bboxes_xywh = bboxes
         bboxes_xyxy = xywh2xyxy(bboxes)
 
-    # build the data pipeline
-    extractor_pipeline = [LoadImage()] + cfg.extractor_pipeline
-    extractor_pipeline = Compose(extractor_pipeline)
+    extractor_pipeline = _get_pipeline(model, 'extractor_pipeline')
+    loaded = LoadImage()({'image_path': img_or_path})
     batch_data = []
     input_size = cfg['img_res']
     aspect_ratio = 1 if isinstance(input_size,
@@ -373,14 +428,14 @@ def feature_extract(
     for i, bbox in enumerate(bboxes_xywh):
         center, scale = box2cs(bbox, aspect_ratio, bbox_scale_factor=1.25)
         # prepare data
-        data = {
-            'image_path': img_or_path,
+        data = dict(loaded)
+        data.update({
             'center': center,
             'scale': scale,
             'rotation': 0,
             'bbox_score': bbox[4] if len(bbox) == 5 else 1,
             'sample_idx': i,
-        }
+        })
         data = extractor_pipeline(data)
         batch_data.append(data)
 
@@ -411,6 +466,101 @@ def feature_extract(
     return feature_results
 
 
+def _prepare_image_batch(batch_crops, imgs_or_paths, pipeline, aspect_ratio):
+    """Load, crop and collate the person crops of a batch.
+
+    Args:
+        batch_crops (list): (image index, index in the image, bbox xywh,
+            bbox xyxy, det result) of each person crop.
+        imgs_or_paths (List[Union[str, np.ndarray]]): Image filenames or
+            loaded images.
+        pipeline (Compose): The inference pipeline without loading.
+        aspect_ratio (float): Aspect ratio of the model input.
+
+    Returns:
+        dict: The collated batch.
+    """
+    load_image = LoadImage()
+    loaded = {}
+    batch_data = []
+    for img_idx, sample_idx, bbox, _, _ in batch_crops:
+        # load each image once for all its bboxes
+        if img_idx not in loaded:
+            loaded.clear()
+            loaded[img_idx] = load_image(
+                {'image_path': imgs_or_paths[img_idx]})
+        center, scale = box2cs(bbox, aspect_ratio, bbox_scale_factor=1.25)
+        # prepare data
+        data = dict(loaded[img_idx])
+        data.update({
+            'center': center,
+            'scale': scale,
+            'rotation': 0,
+            'bbox_score': bbox[4] if len(bbox) == 5 else 1,
+            'sample_idx': sample_idx,
+        })
+        data = pipeline(data)
+        batch_data.append(data)
+    return collate(batch_data, samples_per_gpu=1)
+
+
+def _prefetch(func, inputs, num_workers=0, queue_size=2):
+    """Yield ``func(x)`` for x in inputs in order, computing the following
+    ones in a thread pool while the current one is consumed.
+
+    Args:
+        func (callable): The function to apply.
+        inputs (list): The inputs.
+        num_workers (int, optional): Number of threads. If num_workers is 0,
+            func is called in the calling thread. Defaults to 0.
+        queue_size (int, optional): Max number of results computed ahead.
+            Defaults to 2.
+
+    Yields:
+        The results of func in the order of inputs.
+    """
+    if num_workers <= 0:
+        for x in inputs:
+            yield func(x)
+        return
+    inputs = iter(inputs)
+    futures = deque()
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        try:
+            for x in islice(inputs, max(queue_size, 1)):
+                futures.append(executor.submit(func, x))
+            while futures:
+                result = futures.popleft().result()
+                for x in islice(inputs, 1):
+                    futures.append(executor.submit(func, x))
+                yield result
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def _get_pipeline(model, pipeline_key):
+    """Get the data pipeline built from ``model.cfg[pipeline_key]``.
+
+    The pipeline is built once and cached in the model, instead of being
+    rebuilt for every inference call.
+
+    Args:
+        model (nn.Module): The loaded model with ``cfg``.
+        pipeline_key (str): Key of the pipeline config, e.g.
+            'inference_pipeline' or 'extractor_pipeline'.
+
+    Returns:
+        Compose: The data pipeline.
+    """
+    cfg = model.cfg
+    cache = model.__dict__.setdefault('_pipeline_cache', {})
+    # rebuild if the config is replaced
+    if pipeline_key not in cache or cache[pipeline_key][0] is not cfg:
+        cache[pipeline_key] = (cfg, Compose(cfg[pipeline_key]))
+    return cache[pipeline_key][1]
+
+
 def _indexing_sequence(input: Union[Sequence, Dict[str, Sequence]],
                        index: Union[int, Tuple[int, ...]]):
     """Get item of the specified index from input.
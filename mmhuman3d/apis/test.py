@@ -3,8 +3,10 @@ import pickle
 import shutil
 import tempfile
 import time
+from collections import OrderedDict
 
 import mmcv
+import numpy as np
 import torch
 import torch.distributed as dist
 from mmcv.runner import get_dist_info
@@ -167,3 +169,90 @@ def collect_results_gpu(result_part, size):
         # the dataloader may pad some samples
         ordered_results = ordered_results[:size]
         return ordered_results
+
+
+def streaming_test(model,
+                   data_loader,
+                   metric='pa-mpjpe',
+                   dump_dir=None,
+                   batch_size=1024,
+                   device=None,
+                   **kwargs):
+    """Test model and evaluate the results batch by batch.
+
+    Unlike :func:`multi_gpu_test`, the results are not collected. Each rank
+    updates metric accumulators of the dataset with its batches, and only
+    the sufficient statistics of the metrics are reduced across ranks. The
+    samples padded by the distributed sampler are skipped.
+
+    Args:
+        model (nn.Module): Model to be tested.
+        data_loader (nn.Dataloader): Pytorch data loader, whose dataset
+            provides ``get_metric_accumulators`` and
+            ``update_metric_accumulators``.
+        metric (str | list[str]): Metrics to evaluate. Default: 'pa-mpjpe'.
+        dump_dir (str, optional): If set, each rank saves its predictions,
+            without the vertices, to ``part_{rank}.npz`` in the directory,
+            which can be merged by ``image_idx``. Default: None.
+        batch_size (int): Max number of samples in one forward of the body
+            model in the evaluation. Default: 1024.
+        device (str, optional): Device of the evaluation, e.g. 'cuda'.
+            Default: None, on CPU.
+        kwargs (dict): Ignored, for the arguments of :func:`multi_gpu_test`,
+            e.g. ``tmpdir`` and ``gpu_collect``.
+
+    Returns:
+        dict: The metrics, on all the ranks.
+    """
+    model.eval()
+    dataset = data_loader.dataset
+    rank, world_size = get_dist_info()
+    accumulators = dataset.get_metric_accumulators(
+        metric, batch_size=batch_size, device=device)
+    dump_keys = ('image_idx', 'keypoints_3d', 'smpl_pose', 'smpl_beta')
+    dumped = {key: [] for key in dump_keys}
+    if rank == 0:
+        prog_bar = mmcv.ProgressBar(len(dataset))
+    # position of the next sample of this rank in the sampler
+    num_seen = 0
+    for data in data_loader:
+        with torch.no_grad():
+            result = model(return_loss=False, **data)
+        batch_results = result if isinstance(result, list) else [result]
+        for batch_result in batch_results:
+            num_samples = len(batch_result['image_idx'])
+            positions = rank + world_size * (num_seen + np.arange(num_samples))
+            valid = positions < len(dataset)
+            num_seen += num_samples
+            batch_result = {
+                key: _to_numpy(batch_result[key])[valid]
+                for key in dump_keys
+            }
+            dataset.update_metric_accumulators(accumulators, batch_result)
+            if dump_dir is not None:
+                for key in dump_keys:
+                    dumped[key].append(batch_result[key])
+            if rank == 0:
+                for _ in range(num_samples * world_size):
+                    prog_bar.update()
+
+    if dump_dir is not None:
+        mmcv.mkdir_or_exist(dump_dir)
+        np.savez(
+            osp.join(dump_dir, f'part_{rank}.npz'), **{
+                key: np.concatenate(value)
+                for key, value in dumped.items()
+            })
+
+    results = OrderedDict()
+    for name, accumulator in accumulators.items():
+        accumulator.reduce()
+        results[name] = accumulator.compute()
+    return results
+
+
+def _to_numpy(value):
+    """Convert a batch of results to np.ndarray."""
+    if isinstance(value, torch.Tensor):
+        return value.detach().cpu().numpy()
+    return np.asarray(value)
@@ -59,7 +59,8 @@ def train_model(model,
             num_gpus=len(cfg.gpu_ids),
             dist=distributed,
             round_up=True,
-            seed=cfg.seed) for ds in dataset
+            seed=cfg.seed,
+            sampler_cfg=cfg.data.get('sampler', None)) for ds in dataset
     ]
 
     # determine whether use adversarial training precess or not
@@ -139,7 +140,7 @@ def train_model(model,
         cfg.log_config,
         cfg.get('momentum_config', None),
         custom_hooks_config=cfg.get('custom_hooks', None))
-    if distributed:
+    if distributed or cfg.data.get('sampler', None) is not None:
         runner.register_hook(DistSamplerSeedHook())
 
     # register eval hooks
@@ -1,4 +1,3 @@
-from collections import defaultdict
 from typing import List, Tuple, Union
 
 import numpy as np
@@ -80,7 +79,215 @@ KEYPOINTS_FACTORY = {
     'mediapipe_body': mediapipe.MP_BODY_KEYPOINTS,
 }
 
-__KEYPOINTS_MAPPING_CACHE__ = defaultdict(dict)
+__KEYPOINTS_MAPPING_CACHE__ = {}
+__CONVERSION_PLAN_CACHE__ = {}
+
+
+class ConversionPlan:
+    """Precompiled conversion of keypoints from src to dst convention.
+
+    The mapping is looked up once, the index tensors are cached per device,
+    and the keypoints are converted by a single gather when every dst
+    keypoint has a source. Plans are shared by :func:`get_conversion_plan`.
+
+    Args:
+        src (str): source data type from keypoints_factory.
+        dst (str): destination data type from keypoints_factory.
+        approximate (bool): control whether approximate mapping is allowed.
+        keypoints_factory (dict, optional): A class to store the attributes.
+            Defaults to keypoints_factory.
+    """
+
+    def __init__(self,
+                 src: str,
+                 dst: str,
+                 approximate: bool = False,
+                 keypoints_factory: dict = KEYPOINTS_FACTORY):
+        self.src = src
+        self.dst = dst
+        self.approximate = approximate
+        self.num_src = len(keypoints_factory[src.lower()])
+        self.num_dst = len(keypoints_factory[dst.lower()])
+        dst_idxs, src_idxs, _ = \
+            get_mapping(src, dst, approximate, keypoints_factory)
+        self.dst_idxs = np.array(dst_idxs, dtype=np.int64)
+        self.src_idxs = np.array(src_idxs, dtype=np.int64)
+        # dst_idxs are in ascending order, if all the dst keypoints are
+        # mapped, src_idxs gathers the output directly
+        self.complete = len(dst_idxs) == self.num_dst
+        self.mask = np.zeros(self.num_dst, dtype=np.uint8)
+        self.mask[self.dst_idxs] = 1
+        self._tensors = {}
+
+    def get_tensors(self, device: Union[str, torch.device] = 'cpu') -> dict:
+        """Get the index tensors and the default mask on a device.
+
+        Args:
+            device (Union[str, torch.device], optional):
+                Device of the tensors. Defaults to 'cpu'.
+
+        Returns:
+            dict: dst_idxs, src_idxs and mask in torch.Tensor.
+        """
+        device = torch.device(device)
+        if device not in self._tensors:
+            self._tensors[device] = dict(
+                dst_idxs=torch.from_numpy(self.dst_idxs).to(device),
+                src_idxs=torch.from_numpy(self.src_idxs).to(device),
+                mask=torch.from_numpy(self.mask).to(device))
+        return self._tensors[device]
+
+    def convert(
+        self,
+        keypoints: Union[np.ndarray, torch.Tensor],
+        mask: Union[np.ndarray, torch.Tensor] = None,
+        return_mask: bool = True,
+        out: Union[np.ndarray, torch.Tensor] = None
+    ) -> Tuple[Union[np.ndarray, torch.Tensor], Union[np.ndarray,
+                                                      torch.Tensor]]:
+        """Convert keypoints, see :func:`convert_kps`.
+
+        Args:
+            keypoints (Union[np.ndarray, torch.Tensor]): input keypoints
+                array, could be (f * n * J * 3/2) or (f * J * 3/2).
+            mask (Union[np.ndarray, torch.Tensor], optional):
+                The original mask to mark the existence of the keypoints.
+                None represents all ones mask. Defaults to None.
+            return_mask (bool, optional): whether to return a mask as part
+                of the output. Defaults to True.
+            out (Union[np.ndarray, torch.Tensor], optional): Pre-allocated
+                output of the converted keypoints, float64 for np.ndarray
+                and the default dtype for torch.Tensor. Defaults to None.
+
+        Returns:
+            Tuple[Union[np.ndarray, torch.Tensor],
+                Union[np.ndarray, torch.Tensor]]:
+                tuple of (out_keypoints, mask).
+        """
+        assert keypoints.shape[-2] == self.num_src, \
+            f'The number of keypoints should be {self.num_src}'
+        out_shape = keypoints.shape[:-2] + (self.num_dst, keypoints.shape[-1])
+        if isinstance(keypoints, torch.Tensor):
+            tensors = self.get_tensors(keypoints.device)
+            dtype = torch.get_default_dtype()
+            if self.complete:
+                converted = keypoints.index_select(-2, tensors['src_idxs'])
+                if out is None:
+                    out = converted.to(dtype)
+                else:
+                    out.copy_(converted)
+            else:
+                if out is None:
+                    out = keypoints.new_zeros(out_shape, dtype=dtype)
+                else:
+                    out.zero_()
+                out.index_copy_(
+                    -2, tensors['dst_idxs'],
+                    keypoints.index_select(-2,
+                                           tensors['src_idxs']).to(out.dtype))
+            if not return_mask:
+                return out
+            if mask is None:
+                out_mask = tensors['mask'].clone()
+            else:
+                out_mask = torch.zeros(
+                    self.num_dst, dtype=torch.uint8, device=keypoints.device)
+                out_mask[tensors['dst_idxs']] = self._get_src_mask(mask).to(
+                    dtype=torch.uint8)
+        elif isinstance(keypoints, np.ndarray):
+            if out is None:
+                if self.complete:
+                    out = keypoints[..., self.src_idxs, :].astype(
+                        np.float64, copy=False)
+                else:
+                    out = np.zeros(out_shape)
+                    out[..., self.dst_idxs, :] = \
+                        keypoints[..., self.src_idxs, :]
+            else:
+                if not self.complete:
+                    out.fill(0)
+                out[..., self.dst_idxs, :] = keypoints[..., self.src_idxs, :]
+            if not return_mask:
+                return out
+            if mask is None:
+                out_mask = self.mask.copy()
+            else:
+                out_mask = np.zeros(self.num_dst, dtype=np.uint8)
+                out_mask[self.dst_idxs] = self._get_src_mask(mask).astype(
+                    np.uint8)
+        else:
+            raise TypeError('Type of keypoints is neither' +
+                            ' torch.Tensor nor np.ndarray.\n' +
+                            f'Type of keypoints: {type(keypoints)}')
+        return out, out_mask
+
+    def _get_src_mask(self, mask):
+        """Select the mapped values of the original mask."""
+        mask = mask.reshape(-1)
+        assert mask.shape[0] == self.num_src, \
+            f'The length of mask should be {self.num_src}'
+        if isinstance(mask, torch.Tensor):
+            return mask[self.get_tensors(mask.device)['src_idxs']]
+        return mask[self.src_idxs]
+
+
+def get_conversion_plan(
+        src: str,
+        dst: str,
+        approximate: bool = False,
+        keypoints_factory: dict = KEYPOINTS_FACTORY) -> ConversionPlan:
+    """Get the cached conversion plan from src to dst.
+
+    Plans are cached per keypoints_factory, which should not be modified
+    after converting keypoints with it.
+
+    Args:
+        src (str): source data type from keypoints_factory.
+        dst (str): destination data type from keypoints_factory.
+        approximate (bool): control whether approximate mapping is allowed.
+        keypoints_factory (dict, optional): A class to store the attributes.
+            Defaults to keypoints_factory.
+
+    Returns:
+        ConversionPlan: the plan.
+    """
+    key = (src, dst, approximate, id(keypoints_factory))
+    plan = __CONVERSION_PLAN_CACHE__.get(key)
+    if plan is None:
+        plan = ConversionPlan(src, dst, approximate, keypoints_factory)
+        # keep the factory alive, so that its id is not reused
+        plan.keypoints_factory = keypoints_factory
+        __CONVERSION_PLAN_CACHE__[key] = plan
+    return plan
+
+
+def prewarm_conversion_plans(
+        conventions: List[str] = None,
+        approximate: bool = False,
+        devices: List[Union[str, torch.device]] = (),
+        keypoints_factory: dict = KEYPOINTS_FACTORY) -> None:
+    """Build the conversion plans between all pairs of conventions, e.g.
+    before forking data loader workers or timing a model.
+
+    Args:
+        conventions (List[str], optional): conventions to convert between.
+            Defaults to None, all the conventions in keypoints_factory.
+        approximate (bool): control whether approximate mapping is allowed.
+        devices (List[Union[str, torch.device]], optional): devices to put
+            the index tensors on, e.g. ['cuda']. Defaults to ().
+        keypoints_factory (dict, optional): A class to store the attributes.
+            Defaults to keypoints_factory.
+    """
+    if conventions is None:
+        conventions = list(keypoints_factory.keys())
+    for src in conventions:
+        for dst in conventions:
+            if src == dst:
+                continue
+            plan = get_conversion_plan(src, dst, approximate,
+                                       keypoints_factory)
+            for device in devices:
+                plan.get_tensors(device)
 
 
 def convert_kps(
@@ -95,6 +302,7 @@ def convert_kps(
     """Convert keypoints following the mapping correspondence between src and
     dst keypoints definition. Supported conventions by now: agora, coco, smplx,
     smpl, mpi_inf_3dhp, mpi_inf_3dhp_test, h36m, h36m_mmpose, pw3d, mpii, lsp.
+    The conversion is done by a cached :class:`ConversionPlan`.
     Args:
         keypoints [Union[np.ndarray, torch.Tensor]]: input keypoints array,
             could be (f * n * J * 3/2) or (f * J * 3/2).
@@ -119,97 +327,28 @@ def convert_kps(
             the same type.
     """
     assert keypoints.ndim in {3, 4}
-    if isinstance(keypoints, torch.Tensor):
-
-        def new_array_func(shape, value, device_data, if_uint8):
-            if if_uint8:
-                dtype = torch.uint8
-            else:
-                dtype = None
-            if value == 1:
-                return torch.ones(
-                    size=shape, dtype=dtype, device=device_data.device)
-            elif value == 0:
-                return torch.zeros(
-                    size=shape, dtype=dtype, device=device_data.device)
-            else:
-                raise ValueError
-
-        def to_type_uint8_func(data):
-            return data.to(dtype=torch.uint8)
-
-    elif isinstance(keypoints, np.ndarray):
-
-        def new_array_func(shape, value, device_data, if_uint8):
-            if if_uint8:
-                dtype = np.uint8
-            else:
-                dtype = None
-            if value == 1:
-                return np.ones(shape=shape)
-            elif value == 0:
-                return np.zeros(shape=shape, dtype=dtype)
-            else:
-                raise ValueError
-
-        def to_type_uint8_func(data):
-            return data.astype(np.uint8)
-
-    else:
+    if not isinstance(keypoints, (torch.Tensor, np.ndarray)):
         raise TypeError('Type of keypoints is neither' +
                         ' torch.Tensor nor np.ndarray.\n' +
                         f'Type of keypoints: {type(keypoints)}')
-
     if mask is not None:
         assert type(mask) == type(keypoints)
-    else:
-        mask = new_array_func(
-            shape=(keypoints.shape[-2], ),
-            value=1,
-            device_data=keypoints,
-            if_uint8=True)
 
     if src == dst:
-        if return_mask:
-            return keypoints, mask
-        else:
+        if not return_mask:
             return keypoints
+        if mask is None:
+            if isinstance(keypoints, torch.Tensor):
+                mask = torch.ones(
+                    keypoints.shape[-2],
+                    dtype=torch.uint8,
+                    device=keypoints.device)
+            else:
+                mask = np.ones(shape=(keypoints.shape[-2], ))
+        return keypoints, mask
 
-    src_names = keypoints_factory[src.lower()]
-    dst_names = keypoints_factory[dst.lower()]
-    extra_dims = keypoints.shape[:-2]
-    keypoints = keypoints.reshape(-1, len(src_names), keypoints.shape[-1])
-
-    out_keypoints = new_array_func(
-        shape=(keypoints.shape[0], len(dst_names), keypoints.shape[-1]),
-        value=0,
-        device_data=keypoints,
-        if_uint8=False)
-
-    original_mask = mask
-    if original_mask is not None:
-        original_mask = original_mask.reshape(-1)
-        assert original_mask.shape[0] == len(
-            src_names), f'The length of mask should be {len(src_names)}'
-
-    mask = new_array_func(
-        shape=(len(dst_names), ),
-        value=0,
-        device_data=keypoints,
-        if_uint8=True)
-
-    dst_idxs, src_idxs, _ = \
-        get_mapping(src, dst, approximate, keypoints_factory)
-    out_keypoints[:, dst_idxs] = keypoints[:, src_idxs]
-    out_shape = extra_dims + (len(dst_names), keypoints.shape[-1])
-    out_keypoints = out_keypoints.reshape(out_shape)
-    mask[dst_idxs] = to_type_uint8_func(original_mask[src_idxs]) \
-        if original_mask is not None else 1.0
-
-    if return_mask:
-        return out_keypoints, mask
-    else:
-        return out_keypoints
+    plan = get_conversion_plan(src, dst, approximate, keypoints_factory)
+    return plan.convert(keypoints, mask=mask, return_mask=return_mask)
 
 
 def compress_converted_kps(
@@ -252,59 +391,46 @@ def get_mapping(src: str,
             [src_to_intersection_idx, dst_to_intersection_index,
              intersection_names]
     """
-    if src in __KEYPOINTS_MAPPING_CACHE__ and \
-        dst in __KEYPOINTS_MAPPING_CACHE__[src] and \
-            __KEYPOINTS_MAPPING_CACHE__[src][dst][3] == approximate:
-        return __KEYPOINTS_MAPPING_CACHE__[src][dst][:3]
-    else:
-        src_names = keypoints_factory[src.lower()]
-        dst_names = keypoints_factory[dst.lower()]
-
-        dst_idxs, src_idxs, intersection = [], [], []
-        unmapped_names, approximate_names = [], []
-        for dst_idx, dst_name in enumerate(dst_names):
-            matched = False
-            try:
-                src_idx = src_names.index(dst_name)
-            except ValueError:
-                src_idx = -1
-            if src_idx >= 0:
-                matched = True
-                dst_idxs.append(dst_idx)
-                src_idxs.append(src_idx)
-                intersection.append(dst_name)
-            # approximate mapping
-            if approximate and not matched:
-
-                try:
-                    part_list = human_data.APPROXIMATE_MAP[dst_name]
-                except KeyError:
-                    continue
-                for approximate_name in part_list:
-                    try:
-                        src_idx = src_names.index(approximate_name)
-                    except ValueError:
-                        src_idx = -1
-                    if src_idx >= 0:
-                        dst_idxs.append(dst_idx)
-                        src_idxs.append(src_idx)
-                        intersection.append(dst_name)
-                        unmapped_names.append(src_names[src_idx])
-                        approximate_names.append(dst_name)
-                        break
-
-        if unmapped_names:
-            warn_message = \
-                f'Approximate mapping {unmapped_names}' +\
-                f' to {approximate_names}'
-            print_log(msg=warn_message)
-
-        mapping_list = [dst_idxs, src_idxs, intersection, approximate]
-
-        if src not in __KEYPOINTS_MAPPING_CACHE__:
-            __KEYPOINTS_MAPPING_CACHE__[src] = {}
-        __KEYPOINTS_MAPPING_CACHE__[src][dst] = mapping_list
-        return mapping_list[:3]
+    key = (src, dst, approximate, id(keypoints_factory))
+    if key in __KEYPOINTS_MAPPING_CACHE__:
+        return __KEYPOINTS_MAPPING_CACHE__[key][:3]
+    src_names = keypoints_factory[src.lower()]
+    dst_names = keypoints_factory[dst.lower()]
+    # index of the first occurrence of each name, as list.index
+    src_name_to_idx = {}
+    for src_idx, src_name in enumerate(src_names):
+        src_name_to_idx.setdefault(src_name, src_idx)
+
+    dst_idxs, src_idxs, intersection = [], [], []
+    unmapped_names, approximate_names = [], []
+    for dst_idx, dst_name in enumerate(dst_names):
+        src_idx = src_name_to_idx.get(dst_name, -1)
+        if src_idx >= 0:
+            dst_idxs.append(dst_idx)
+            src_idxs.append(src_idx)
+            intersection.append(dst_name)
+        # approximate mapping
+        elif approximate:
+            for approximate_name in human_data.APPROXIMATE_MAP.get(
+                    dst_name, []):
+                src_idx = src_name_to_idx.get(approximate_name, -1)
+                if src_idx >= 0:
+                    dst_idxs.append(dst_idx)
+                    src_idxs.append(src_idx)
+                    intersection.append(dst_name)
+                    unmapped_names.append(src_names[src_idx])
+                    approximate_names.append(dst_name)
+                    break
+
+    if unmapped_names:
+        warn_message = \
+            f'Approximate mapping {unmapped_names}' +\
+            f' to {approximate_names}'
+        print_log(msg=warn_message)
+
+    mapping_list = [dst_idxs, src_idxs, intersection, keypoints_factory]
+    __KEYPOINTS_MAPPING_CACHE__[key] = mapping_list
+    return mapping_list[:3]
 
 
 def get_flip_pairs(convention: str = 'smplx',
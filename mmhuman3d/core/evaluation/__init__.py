@@ -1,17 +1,36 @@
 from mmhuman3d.core.evaluation import mesh_eval
 from mmhuman3d.core.evaluation.eval_hooks import DistEvalHook, EvalHook
 from mmhuman3d.core.evaluation.eval_utils import (
+    align_points,
     fg_vertices_to_mesh_distance,
+    ihmr_binned_error,
     keypoint_3d_auc,
     keypoint_3d_pck,
     keypoint_accel_error,
     keypoint_mpjpe,
     vertice_pve,
 )
-from mmhuman3d.core.evaluation.mesh_eval import compute_similarity_transform
+from mmhuman3d.core.evaluation.mesh_eval import (
+    batch_compute_similarity_transform,
+    batch_compute_similarity_transform_torch,
+    compute_similarity_transform,
+)
+from mmhuman3d.core.evaluation.metric_accumulators import (
+    AccelErrorAccumulator,
+    AUCAccumulator,
+    MetricAccumulator,
+    MPJPEAccumulator,
+    PCKAccumulator,
+    PVEAccumulator,
+    build_metric_accumulator,
+)
 
 __all__ = [
     'compute_similarity_transform', 'keypoint_mpjpe', 'mesh_eval',
     'DistEvalHook', 'EvalHook', 'vertice_pve', 'keypoint_3d_pck',
-    'keypoint_3d_auc', 'keypoint_accel_error', 'fg_vertices_to_mesh_distance'
+    'keypoint_3d_auc', 'keypoint_accel_error', 'fg_vertices_to_mesh_distance',
+    'align_points', 'batch_compute_similarity_transform',
+    'batch_compute_similarity_transform_torch', 'MetricAccumulator',
+    'MPJPEAccumulator', 'PVEAccumulator', 'PCKAccumulator', 'AUCAccumulator',
+    'AccelErrorAccumulator', 'build_metric_accumulator', 'ihmr_binned_error'
 ]
@@ -1,6 +1,7 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 import tempfile
 import warnings
+from functools import partial
 
 from mmcv.runner import DistEvalHook as BaseDistEvalHook
 from mmcv.runner import EvalHook as BaseEvalHook
@@ -21,10 +22,16 @@ class EvalHook(BaseEvalHook):
                  test_fn=None,
                  greater_keys=MMHUMAN3D_GREATER_KEYS,
                  less_keys=MMHUMAN3D_LESS_KEYS,
+                 streaming=False,
                  **eval_kwargs):
+        self.streaming = streaming
         if test_fn is None:
-            from mmhuman3d.apis import single_gpu_test
-            test_fn = single_gpu_test
+            if streaming:
+                from mmhuman3d.apis import streaming_test
+                test_fn = partial(streaming_test, **eval_kwargs)
+            else:
+                from mmhuman3d.apis import single_gpu_test
+                test_fn = single_gpu_test
 
         # remove "gpu_collect" from eval_kwargs
         if 'gpu_collect' in eval_kwargs:
@@ -52,12 +59,16 @@ class EvalHook(BaseEvalHook):
 
     def evaluate(self, runner, results):
 
-        with tempfile.TemporaryDirectory() as tmp_dir:
-            eval_res = self.dataloader.dataset.evaluate(
-                results,
-                res_folder=tmp_dir,
-                logger=runner.logger,
-                **self.eval_kwargs)
+        if self.streaming:
+            # metrics already computed by streaming_test
+            eval_res = results
+        else:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                eval_res = self.dataloader.dataset.evaluate(
+                    results,
+                    res_folder=tmp_dir,
+                    logger=runner.logger,
+                    **self.eval_kwargs)
 
         for name, val in eval_res.items():
             runner.log_buffer.output[name] = val
@@ -87,11 +98,17 @@ class DistEvalHook(BaseDistEvalHook):
                  broadcast_bn_buffer=True,
                  tmpdir=None,
                  gpu_collect=False,
+                 streaming=False,
                  **eval_kwargs):
 
+        self.streaming = streaming
         if test_fn is None:
-            from mmhuman3d.apis import multi_gpu_test
-            test_fn = multi_gpu_test
+            if streaming:
+                from mmhuman3d.apis import streaming_test
+                test_fn = partial(streaming_test, **eval_kwargs)
+            else:
+                from mmhuman3d.apis import multi_gpu_test
+                test_fn = multi_gpu_test
 
         # update "save_best" according to "key_indicator" and remove the
         # latter from eval_kwargs
@@ -117,14 +134,19 @@ class DistEvalHook(BaseDistEvalHook):
 
         Args:
             runner (:obj:`mmcv.Runner`): The underlined training runner.
-            results (list): Output results.
+            results (list | dict): Output results, or the metrics when
+                ``streaming`` is True.
         """
-        with tempfile.TemporaryDirectory() as tmp_dir:
-            eval_res = self.dataloader.dataset.evaluate(
-                results,
-                res_folder=tmp_dir,
-                logger=runner.logger,
-                **self.eval_kwargs)
+        if self.streaming:
+            # metrics already computed by streaming_test
+            eval_res = results
+        else:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                eval_res = self.dataloader.dataset.evaluate(
+                    results,
+                    res_folder=tmp_dir,
+                    logger=runner.logger,
+                    **self.eval_kwargs)
 
         for name, val in eval_res.items():
             runner.log_buffer.output[name] = val
@@ -1,12 +1,59 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 import numpy as np
+import torch
 import trimesh
 from trimesh.proximity import closest_point
 
-from .mesh_eval import compute_similarity_transform
+from .mesh_eval import (
+    batch_compute_similarity_transform,
+    batch_compute_similarity_transform_torch,
+    compute_similarity_transform,
+)
 
 
-def keypoint_mpjpe(pred, gt, mask, alignment='none'):
+def align_points(pred, gt, alignment='none', device=None):
+    """Align the predicted points with the groundtruth, all the samples at
+    once. The aligned points can be passed to several metrics with
+    ``alignment='none'`` to solve the alignment only once.
+
+    batch_size: N
+    num_points: K
+    Args:
+        pred (np.ndarray[N, K, 3]): Predicted points.
+        gt (np.ndarray[N, K, 3]): Groundtruth points.
+        alignment (str, optional): method to align the prediction with the
+            groundtruth. Supported options are:
+            - ``'none'``: no alignment will be applied
+            - ``'scale'``: align in the least-square sense in scale
+            - ``'procrustes'``: align in the least-square sense in scale,
+                rotation and translation.
+        device (str | torch.device, optional): Device to solve the
+            procrustes alignment by torch, e.g. 'cuda'. Defaults to None,
+            solved by numpy.
+    Returns:
+        np.ndarray[N, K, 3]: The aligned prediction.
+    """
+    if alignment == 'none':
+        pass
+    elif alignment == 'procrustes':
+        if device is None:
+            pred = batch_compute_similarity_transform(pred, gt)
+        else:
+            pred = torch.tensor(pred, dtype=torch.float64, device=device)
+            gt = torch.tensor(gt, dtype=torch.float64, device=device)
+            pred = batch_compute_similarity_transform_torch(pred, gt)
+            pred = pred.cpu().numpy()
+    elif alignment == 'scale':
+        pred_dot_pred = np.einsum('nkc,nkc->n', pred, pred)
+        pred_dot_gt = np.einsum('nkc,nkc->n', pred, gt)
+        scale_factor = pred_dot_gt / pred_dot_pred
+        pred = pred * scale_factor[:, None, None]
+    else:
+        raise ValueError(f'Invalid value for alignment: {alignment}')
+    return pred
+
+
+def keypoint_mpjpe(pred, gt, mask, alignment='none', device=None):
     """Calculate the mean per-joint position error (MPJPE) and the error after
     rigid alignment with the ground truth (PA-MPJPE).
     batch_size: N
@@ -24,6 +71,9 @@ def keypoint_mpjpe(pred, gt, mask, alignment='none'):
             - ``'scale'``: align in the least-square sense in scale
             - ``'procrustes'``: align in the least-square sense in scale,
                 rotation and translation.
+        device (str | torch.device, optional): Device to solve the
+            procrustes alignment by torch, e.g. 'cuda'. Defaults to None,
+            solved by numpy.
     Returns:
         tuple: A tuple containing joint position errors
         - mpjpe (float|np.ndarray[N]): mean per-joint position error.
@@ -32,20 +82,7 @@ def keypoint_mpjpe(pred, gt, mask, alignment='none'):
     """
     assert mask.any()
 
-    if alignment == 'none':
-        pass
-    elif alignment == 'procrustes':
-        pred = np.stack([
-            compute_similarity_transform(pred_i, gt_i)
-            for pred_i, gt_i in zip(pred, gt)
-        ])
-    elif alignment == 'scale':
-        pred_dot_pred = np.einsum('nkc,nkc->n', pred, pred)
-        pred_dot_gt = np.einsum('nkc,nkc->n', pred, gt)
-        scale_factor = pred_dot_gt / pred_dot_pred
-        pred = pred * scale_factor[:, None, None]
-    else:
-        raise ValueError(f'Invalid value for alignment: {alignment}')
+    pred = align_points(pred, gt, alignment, device)
 
     error = np.linalg.norm(pred - gt, ord=2, axis=-1)[mask].mean()
 
@@ -82,7 +119,7 @@ def keypoint_accel_error(gt, pred, mask=None):
     return np.mean(normed[new_vis], axis=1)
 
 
-def vertice_pve(pred_verts, target_verts, alignment='none'):
+def vertice_pve(pred_verts, target_verts, alignment='none', device=None):
     """Computes per vertex error (PVE).
 
     Args:
@@ -94,29 +131,24 @@ def vertice_pve(pred_verts, target_verts, alignment='none'):
             - ``'scale'``: align in the least-square sense in scale
             - ``'procrustes'``: align in the least-square sense in scale,
                 rotation and translation.
+        device (str | torch.device, optional): Device to solve the
+            procrustes alignment by torch, e.g. 'cuda'. Defaults to None,
+            solved by numpy.
     Returns:
         error_verts.
     """
     assert len(pred_verts) == len(target_verts)
-    if alignment == 'none':
-        pass
-    elif alignment == 'procrustes':
-        pred_verts = np.stack([
-            compute_similarity_transform(pred_i, gt_i)
-            for pred_i, gt_i in zip(pred_verts, target_verts)
-        ])
-    elif alignment == 'scale':
-        pred_dot_pred = np.einsum('nkc,nkc->n', pred_verts, pred_verts)
-        pred_dot_gt = np.einsum('nkc,nkc->n', pred_verts, target_verts)
-        scale_factor = pred_dot_gt / pred_dot_pred
-        pred_verts = pred_verts * scale_factor[:, None, None]
-    else:
-        raise ValueError(f'Invalid value for alignment: {alignment}')
+    pred_verts = align_points(pred_verts, target_verts, alignment, device)
     error = np.linalg.norm(pred_verts - target_verts, ord=2, axis=-1).mean()
     return error
 
 
-def keypoint_3d_pck(pred, gt, mask, alignment='none', threshold=150.):
+def keypoint_3d_pck(pred,
+                    gt,
+                    mask,
+                    alignment='none',
+                    threshold=150.,
+                    device=None):
     """Calculate the Percentage of Correct Keypoints (3DPCK) w. or w/o rigid
     alignment.
     Paper ref: `Monocular 3D Human Pose Estimation In The Wild Using Improved
@@ -140,25 +172,15 @@ def keypoint_3d_pck(pred, gt, mask, alignment='none', threshold=150.):
         threshold:  If L2 distance between the prediction and the groundtruth
             is less then threshold, the predicted result is considered as
             correct. Default: 150 (mm).
+        device (str | torch.device, optional): Device to solve the
+            procrustes alignment by torch, e.g. 'cuda'. Defaults to None,
+            solved by numpy.
     Returns:
         pck: percentage of correct keypoints.
     """
     assert mask.any()
 
-    if alignment == 'none':
-        pass
-    elif alignment == 'procrustes':
-        pred = np.stack([
-            compute_similarity_transform(pred_i, gt_i)
-            for pred_i, gt_i in zip(pred, gt)
-        ])
-    elif alignment == 'scale':
-        pred_dot_pred = np.einsum('nkc,nkc->n', pred, pred)
-        pred_dot_gt = np.einsum('nkc,nkc->n', pred, gt)
-        scale_factor = pred_dot_gt / pred_dot_pred
-        pred = pred * scale_factor[:, None, None]
-    else:
-        raise ValueError(f'Invalid value for alignment: {alignment}')
+    pred = align_points(pred, gt, alignment, device)
 
     error = np.linalg.norm(pred - gt, ord=2, axis=-1)
     pck = (error < threshold).astype(np.float32)[mask].mean() * 100
@@ -166,7 +188,7 @@ def keypoint_3d_pck(pred, gt, mask, alignment='none', threshold=150.):
     return pck
 
 
-def keypoint_3d_auc(pred, gt, mask, alignment='none'):
+def keypoint_3d_auc(pred, gt, mask, alignment='none', device=None):
     """Calculate the Area Under the Curve (3DAUC) computed for a range of 3DPCK
     thresholds.
     Paper ref: `Monocular 3D Human Pose Estimation In The Wild Using Improved
@@ -189,25 +211,15 @@ def keypoint_3d_auc(pred, gt, mask, alignment='none'):
             - ``'scale'``: align in the least-square sense in scale
             - ``'procrustes'``: align in the least-square sense in scale,
                 rotation and translation.
+        device (str | torch.device, optional): Device to solve the
+            procrustes alignment by torch, e.g. 'cuda'. Defaults to None,
+            solved by numpy.
     Returns:
         auc: AUC computed for a range of 3DPCK thresholds.
     """
     assert mask.any()
 
-    if alignment == 'none':
-        pass
-    elif alignment == 'procrustes':
-        pred = np.stack([
-            compute_similarity_transform(pred_i, gt_i)
-            for pred_i, gt_i in zip(pred, gt)
-        ])
-    elif alignment == 'scale':
-        pred_dot_pred = np.einsum('nkc,nkc->n', pred, pred)
-        pred_dot_gt = np.einsum('nkc,nkc->n', pred, gt)
-        scale_factor = pred_dot_gt / pred_dot_pred
-        pred = pred * scale_factor[:, None, None]
-    else:
-        raise ValueError(f'Invalid value for alignment: {alignment}')
+    pred = align_points(pred, gt, alignment, device)
 
     error = np.linalg.norm(pred - gt, ord=2, axis=-1)
 
@@ -221,6 +233,59 @@ def keypoint_3d_auc(pred, gt, mask, alignment='none'):
     return auc
 
 
+def ihmr_binned_error(errors,
+                      distances,
+                      num_bins=100,
+                      tail_percentages=(10, 5)):
+    """Summarize per-sample errors by the distances of the samples to the
+    mean pose, as in the IHMR metric.
+    Paper ref: `Out-of-Domain Human Mesh Reconstruction via Dynamic
+    Bilevel Online Adaptation' <https://arxiv.org/abs/2203.16427>`__ .
+    The range of the distances is split into ``num_bins`` equal bins, and
+    the binned error is the mean of the per-bin mean errors over the
+    non-empty bins. The tail error of a percentage is the mean error of
+    that percentage of samples with the largest distances.
+    Note:
+        batch_size: N
+        num_errors: C
+    Args:
+        errors (np.ndarray[N] | np.ndarray[N, C]): Per-sample errors, e.g.
+            MPJPE and PVE of each sample.
+        distances (np.ndarray[N]): Distances of the samples to the mean
+            pose.
+        num_bins (int, optional): Number of bins. Defaults to 100.
+        tail_percentages (tuple, optional): Percentages of the tails.
+            Defaults to (10, 5).
+    Returns:
+        tuple: A tuple containing
+        - binned_error (float|np.ndarray[C]): mean error over the bins.
+        - tail_errors (dict): mean error of each tail, keyed by the
+            percentage.
+    """
+    errors = np.asarray(errors, dtype=np.float64)
+    distances = np.asarray(distances)
+    num_data = len(distances)
+    flat_errors = errors.reshape(num_data, -1)
+
+    edges = np.linspace(distances.min(), distances.max(), num_bins + 1)[1:-1]
+    bin_idx = np.digitize(distances, edges)
+    num_per_bin = np.bincount(bin_idx, minlength=num_bins)
+    valid = num_per_bin > 0
+    bin_means = np.stack([
+        np.bincount(bin_idx, weights=error, minlength=num_bins)[valid] /
+        num_per_bin[valid] for error in flat_errors.T
+    ], -1)
+    binned_error = bin_means.mean(axis=0).reshape(errors.shape[1:])
+
+    # from the most remote one to the nearest one
+    idx_order = np.argsort(distances)[::-1]
+    tail_errors = {}
+    for percentage in tail_percentages:
+        num_tail = int(num_data * percentage / 100.0)
+        tail_errors[percentage] = errors[idx_order[:num_tail]].mean(axis=0)
+    return binned_error, tail_errors
+
+
 def fg_vertices_to_mesh_distance(groundtruth_vertices,
                                  grundtruth_landmark_points,
                                  predicted_mesh_vertices, predicted_mesh_faces,
@@ -4,6 +4,7 @@
 # ------------------------------------------------------------------------------
 
 import numpy as np
+import torch
 
 
 def compute_similarity_transform(source_points,
@@ -75,3 +76,122 @@ def compute_similarity_transform(source_points,
         }
 
     return source_points_hat
+
+
+def batch_compute_similarity_transform(source_points,
+                                       target_points,
+                                       return_tform=False):
+    """Batched version of :func:`compute_similarity_transform`, which solves
+    the similarity transforms of all the point sets by a batched SVD.
+
+    Notes:
+        Batch size: B
+        Points number: N
+    Args:
+        source_points (np.ndarray([B, N, 3])): Source point sets.
+        target_points (np.ndarray([B, N, 3])): Target point sets.
+        return_tform (bool) : Whether return transform
+    Returns:
+        source_points_hat (np.ndarray([B, N, 3])): Transformed source point
+            sets.
+        transform (dict): Returns if return_tform is True.
+            Returns 'rotation': r in shape (B, 3, 3), 'scale': s in shape
+            (B, ), 'translation': t in shape (B, 3, 1).
+    """
+    assert target_points.shape == source_points.shape
+    assert source_points.ndim == 3 and source_points.shape[2] == 3
+
+    # 1. Remove mean.
+    mu1 = source_points.mean(axis=1, keepdims=True)
+    mu2 = target_points.mean(axis=1, keepdims=True)
+    X1 = source_points - mu1
+    X2 = target_points - mu2
+
+    # 2. Compute variance of X1 used for scale.
+    var1 = np.sum(X1**2, axis=(1, 2))
+
+    # 3. The outer product of X1 and X2.
+    K = np.einsum('bni,bnj->bij', X1, X2)
+
+    # 4. Solution that Maximizes trace(R'K) is R=U*V', where U, V are
+    # singular vectors of K.
+    U, _, Vh = np.linalg.svd(K)
+    V = Vh.transpose(0, 2, 1)
+    # Construct Z that fixes the orientation of R to get det(R)=1.
+    Z = np.tile(np.eye(3), (len(K), 1, 1))
+    Z[:, -1, -1] *= np.sign(np.linalg.det(U @ Vh))
+    # Construct R.
+    R = V @ Z @ U.transpose(0, 2, 1)
+
+    # 5. Recover scale.
+    scale = np.trace(R @ K, axis1=1, axis2=2) / var1
+
+    # 6. Recover translation.
+    t = mu2.transpose(0, 2, 1) - \
+        scale[:, None, None] * (R @ mu1.transpose(0, 2, 1))
+
+    # 7. Transform the source points:
+    source_points_hat = scale[:, None, None] * \
+        source_points @ R.transpose(0, 2, 1) + t.transpose(0, 2, 1)
+
+    if return_tform:
+        return source_points_hat, {
+            'rotation': R,
+            'scale': scale,
+            'translation': t
+        }
+
+    return source_points_hat
+
+
+def batch_compute_similarity_transform_torch(source_points,
+                                             target_points,
+                                             return_tform=False):
+    """Torch version of :func:`batch_compute_similarity_transform`, which
+    solves the transforms on the device of the inputs, e.g. on GPU during
+    validation.
+
+    Args:
+        source_points (torch.Tensor([B, N, 3])): Source point sets.
+        target_points (torch.Tensor([B, N, 3])): Target point sets.
+        return_tform (bool) : Whether return transform
+    Returns:
+        source_points_hat (torch.Tensor([B, N, 3])): Transformed source point
+            sets.
+        transform (dict): Returns if return_tform is True.
+            Returns 'rotation': r in shape (B, 3, 3), 'scale': s in shape
+            (B, ), 'translation': t in shape (B, 3, 1).
+    """
+    assert target_points.shape == source_points.shape
+    assert source_points.ndim == 3 and source_points.shape[2] == 3
+
+    mu1 = source_points.mean(dim=1, keepdim=True)
+    mu2 = target_points.mean(dim=1, keepdim=True)
+    X1 = source_points - mu1
+    X2 = target_points - mu2
+
+    var1 = torch.sum(X1**2, dim=(1, 2))
+
+    K = torch.einsum('bni,bnj->bij', X1, X2)
+
+    U, _, Vh = torch.linalg.svd(K)
+    V = Vh.transpose(1, 2)
+    Z = torch.eye(3, dtype=K.dtype, device=K.device).repeat(len(K), 1, 1)
+    Z[:, -1, -1] *= torch.sign(torch.det(U @ Vh))
+    R = V @ Z @ U.transpose(1, 2)
+
+    scale = torch.einsum('bii->b', R @ K) / var1
+
+    t = mu2.transpose(1, 2) - scale[:, None, None] * (R @ mu1.transpose(1, 2))
+
+    source_points_hat = scale[:, None, None] * \
+        source_points @ R.transpose(1, 2) + t.transpose(1, 2)
+
+    if return_tform:
+        return source_points_hat, {
+            'rotation': R,
+            'scale': scale,
+            'translation': t
+        }
+
+    return source_points_hat
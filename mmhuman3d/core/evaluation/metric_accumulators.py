@@ -0,0 +1,177 @@
+import numpy as np
+import torch
+import torch.distributed as dist
+
+from .eval_utils import align_points
+
+
+class MetricAccumulator:
+    """Base class of the metrics accumulated batch by batch.
+
+    Only the sufficient statistics of a metric, e.g. the sum of the errors
+    and the number of keypoints, are kept in ``self.stats``. They are
+    summed across ranks by ``reduce()``, so that the predictions do not
+    have to be gathered.
+
+    Args:
+        alignment (str, optional): method to align the prediction with the
+            groundtruth, see :func:`align_points`. Defaults to 'none'.
+        device (str | torch.device, optional): Device to solve the
+            procrustes alignment by torch. Defaults to None, solved by
+            numpy.
+    """
+    # the parsed results used by the metric, 'keypoint' or 'vertice'
+    mode = 'keypoint'
+    num_stats = 2
+
+    def __init__(self, alignment='none', device=None):
+        self.alignment = alignment
+        self.device = device
+        self.reset()
+
+    def reset(self):
+        """Clear the statistics."""
+        self.stats = np.zeros(self.num_stats, dtype=np.float64)
+
+    def update(self, pred, gt, mask=None):
+        """Accumulate a batch.
+
+        Args:
+            pred (np.ndarray[N, K, C]): Predicted points.
+            gt (np.ndarray[N, K, C]): Groundtruth points.
+            mask (np.ndarray[N, K], optional): Visibility of the target.
+                Defaults to None, all the points are visible.
+        """
+        if len(pred) == 0:
+            return
+        if mask is None:
+            mask = np.ones(gt.shape[:2], dtype=bool)
+        pred = align_points(pred, gt, self.alignment, self.device)
+        error = np.linalg.norm(pred - gt, ord=2, axis=-1)
+        self.stats += self._batch_stats(error, np.asarray(mask, dtype=bool))
+
+    def _batch_stats(self, error, mask):
+        """Statistics of a batch from the point errors in shape [N, K]."""
+        raise NotImplementedError
+
+    def reduce(self):
+        """Sum the statistics of all the ranks."""
+        if dist.is_available() and dist.is_initialized():
+            device = 'cuda' if dist.get_backend() == 'nccl' else 'cpu'
+            stats = torch.tensor(self.stats, device=device)
+            dist.all_reduce(stats)
+            self.stats = stats.cpu().numpy()
+
+    def compute(self):
+        """Get the metric from the statistics."""
+        raise NotImplementedError
+
+
+class MPJPEAccumulator(MetricAccumulator):
+    """Mean per-joint position error, see :func:`keypoint_mpjpe`."""
+
+    def _batch_stats(self, error, mask):
+        return np.array([error[mask].sum(), mask.sum()])
+
+    def compute(self):
+        return self.stats[0] / self.stats[1]
+
+
+class PVEAccumulator(MPJPEAccumulator):
+    """Per vertex error, see :func:`vertice_pve`."""
+    mode = 'vertice'
+
+    def _batch_stats(self, error, mask):
+        return np.array([error.sum(), error.size])
+
+
+class PCKAccumulator(MetricAccumulator):
+    """Percentage of correct keypoints, see :func:`keypoint_3d_pck`.
+
+    Args:
+        threshold (float, optional): Max error of the correct keypoints.
+            Defaults to 150 (mm).
+    """
+
+    def __init__(self, alignment='none', device=None, threshold=150.):
+        self.threshold = threshold
+        super().__init__(alignment, device)
+
+    def _batch_stats(self, error, mask):
+        return np.array([(error < self.threshold)[mask].sum(), mask.sum()])
+
+    def compute(self):
+        return self.stats[0] / self.stats[1] * 100
+
+
+class AUCAccumulator(MetricAccumulator):
+    """Area under the curve of 3DPCK, see :func:`keypoint_3d_auc`."""
+    thresholds = np.linspace(0., 150, 31)
+    num_stats = len(thresholds) + 1
+
+    def _batch_stats(self, error, mask):
+        error = error[mask]
+        correct = (error[None] < self.thresholds[:, None]).sum(axis=1)
+        return np.append(correct, len(error))
+
+    def compute(self):
+        return (self.stats[:-1] / self.stats[-1]).mean() * 100
+
+
+class AccelErrorAccumulator(MetricAccumulator):
+    """Acceleration error, see :func:`keypoint_accel_error`.
+
+    Each update takes consecutive frames of a sequence, the accelerations
+    across updates are not computed.
+    """
+
+    def update(self, pred, gt, mask=None):
+        """Accumulate the frames of a sequence.
+
+        Args:
+            pred (np.ndarray[N, K, C]): Predicted keypoints of N frames.
+            gt (np.ndarray[N, K, C]): Groundtruth keypoints of N frames.
+            mask (np.ndarray[N], optional): Visibility of the frames.
+                Defaults to None, all the frames are visible.
+        """
+        if len(pred) < 3:
+            return
+        accel_gt = gt[:-2] - 2 * gt[1:-1] + gt[2:]
+        accel_pred = pred[:-2] - 2 * pred[1:-1] + pred[2:]
+        error = np.linalg.norm(accel_pred - accel_gt, axis=2).mean(axis=1)
+        if mask is not None:
+            invis = np.logical_not(mask)
+            error = error[~(invis[:-2] | invis[1:-1] | invis[2:])]
+        self.stats += np.array([error.sum(), len(error)])
+
+    def compute(self):
+        return self.stats[0] / self.stats[1]
+
+
+def build_metric_accumulator(metric, device=None):
+    """Build the accumulator of a metric.
+
+    Args:
+        metric (str): one of 'mpjpe', 'pa-mpjpe', 'pve', 'pa-pve', '3dpck',
+            'pa-3dpck', '3dauc', 'pa-3dauc' and 'accel'.
+        device (str | torch.device, optional): Device to solve the
+            procrustes alignment by torch. Defaults to None.
+
+    Returns:
+        MetricAccumulator: the accumulator.
+    """
+    alignment = 'none'
+    name = metric
+    if metric.startswith('pa-'):
+        alignment = 'procrustes'
+        name = metric[len('pa-'):]
+    accumulators = {
+        'mpjpe': MPJPEAccumulator,
+        'pve': PVEAccumulator,
+        '3dpck': PCKAccumulator,
+        '3dauc': AUCAccumulator,
+        'accel': AccelErrorAccumulator,
+    }
+    if name not in accumulators or (name == 'accel' and alignment != 'none'):
+        raise ValueError(f'Invalid metric: {metric}')
+    return accumulators[name](alignment=alignment, device=device)
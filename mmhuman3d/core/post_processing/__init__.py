@@ -1,6 +1,7 @@
 from .builder import build_post_processing
 from .smooth.gaus1d_filter import Gaus1dFilter
 from .smooth.oneeuro_filter import OneEuroFilter
+from .smooth.online_filter import OnlineFilter
 from .smooth.savgol_filter import SGFilter
 from .smooth.smoothnet import SmoothNetFilter
 from .speed_up.deciwatch import DeciWatchPostProcessing
@@ -8,6 +9,7 @@ from .speed_up.deciwatch import DeciWatchPostProcessing
 __all__ = [
     'build_post_processing',
     'OneEuroFilter',
+    'OnlineFilter',
     'SGFilter',
     'Gaus1dFilter',
     'SmoothNetFilter',
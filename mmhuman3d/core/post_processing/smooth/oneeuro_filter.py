@@ -61,6 +61,9 @@ class OneEuroFilter:
     """Oneeuro filter, source code: https://github.com/mkocabas/VIBE/blob/c0
     c3f77d587351c806e901221a9dc05d1ffade4b/lib/utils/smooth_pose.py.
 
+    All the persons, keypoints and channels are filtered at once in each
+    time step.
+
     Args:
         min_cutoff (float, optional):
         Decreasing the minimum cutoff frequency decreases slow speed jitter
@@ -71,41 +74,53 @@ class OneEuroFilter:
         np.ndarray: smoothed poses
     """
 
-    def __init__(self, min_cutoff=0.004, beta=0.7):
+    def __init__(self, min_cutoff=0.004, beta=0.7, d_cutoff=1.0):
         super(OneEuroFilter, self).__init__()
 
         self.min_cutoff = min_cutoff
         self.beta = beta
-
-    def __call__(self, x=None):
-        # x (np.ndarray): input poses.
-        if len(x.shape) != 3:
+        self.d_cutoff = d_cutoff
+
+    def __call__(self, x=None, mask=None):
+        """Smooth poses.
+
+        Args:
+            x (np.ndarray or torch.Tensor): input poses in shape [T, K, C],
+                or [T, M, K, C] for M persons.
+            mask (np.ndarray or torch.Tensor, optional): whether each frame
+                of each person is valid, in shape [T] or [T, M]. Invalid
+                frames are returned as they are and skipped by the filter,
+                the filter of a person starts from its first valid frame.
+                Defaults to None, all frames are valid.
+
+        Returns:
+            np.ndarray or torch.Tensor: smoothed poses in the shape of x.
+        """
+        if len(x.shape) not in (3, 4):
             warnings.warn('x should be a tensor or numpy of [T*M,K,C]')
-        assert len(x.shape) == 3
+        assert len(x.shape) in (3, 4)
         x_type = x
         if isinstance(x, torch.Tensor):
             if x.is_cuda:
                 x = x.cpu().numpy()
             else:
                 x = x.numpy()
-
-        one_euro_filter = OneEuro(
-            np.zeros_like(x[0]),
-            x[0],
-            min_cutoff=self.min_cutoff,
-            beta=self.beta,
-        )
-
-        pred_pose_hat = np.zeros_like(x)
-
-        # initialize
-        pred_pose_hat[0] = x[0]
-
-        for idx, pose in enumerate(x[1:]):
-            idx += 1
-            t = np.ones_like(pose) * idx
-            pose = one_euro_filter(t, pose)
-            pred_pose_hat[idx] = pose
+        if isinstance(mask, torch.Tensor):
+            mask = mask.cpu().numpy()
+
+        T = x.shape[0]
+        # filter every person, keypoint and channel in one array
+        num_person = x.shape[1] if x.ndim == 4 else 1
+        x_flat = x.reshape(T, num_person, -1)
+        pred_pose_hat = x.copy().reshape(T, num_person, -1)
+        if mask is None:
+            pred_pose_hat[1:] = self._filter_all_valid(x_flat)
+        else:
+            mask = np.asarray(mask, dtype=bool).reshape(T, -1)
+            assert mask.shape[1] == num_person, \
+                f'mask should be in shape [T, M], got {mask.shape}'
+            self._filter_masked(x_flat, mask, pred_pose_hat)
+        pred_pose_hat = pred_pose_hat.reshape(x.shape)
 
         if isinstance(x_type, torch.Tensor):
             # we also return tensor by default
@@ -114,3 +129,74 @@ class OneEuroFilter:
             else:
                 pred_pose_hat = torch.from_numpy(pred_pose_hat)
         return pred_pose_hat
+
+    def _filter_all_valid(self, x):
+        """Filter x in shape [T, M, D] from x[0], return the filtered x[1:]."""
+        # t_e is always 1 between neighboring frames
+        a_d = smoothing_factor(1.0, self.d_cutoff)
+        r = 2 * math.pi
+        x_prev = x[0].astype(np.float64)
+        dx_prev = np.zeros_like(x_prev)
+        x_hat = np.empty((len(x) - 1, *x_prev.shape))
+        for idx in range(1, len(x)):
+            dx = x[idx] - x_prev
+            dx_prev = exponential_smoothing(a_d, dx, dx_prev)
+            cutoff = r * (self.min_cutoff + self.beta * np.abs(dx_prev))
+            a = cutoff / (cutoff + 1)
+            x_prev = exponential_smoothing(a, x[idx], x_prev)
+            x_hat[idx - 1] = x_prev
+        return x_hat
+
+    def _filter_masked(self, x, mask, out):
+        """Filter the valid frames of x in shape [T, M, D] into out."""
+        T, M, D = x.shape
+        x_prev = np.zeros((M, D))
+        dx_prev = np.zeros((M, D))
+        t_prev = np.zeros((M, 1))
+        started = np.zeros(M, dtype=bool)
+        for idx in range(T):
+            valid = mask[idx]
+            update = np.flatnonzero(valid & started)
+            if len(update) > 0:
+                t_e = idx - t_prev[update]
+                a_d = smoothing_factor(t_e, self.d_cutoff)
+                dx = (x[idx, update] - x_prev[update]) / t_e
+                dx_hat = exponential_smoothing(a_d, dx, dx_prev[update])
+                cutoff = self.min_cutoff + self.beta * np.abs(dx_hat)
+                a = smoothing_factor(t_e, cutoff)
+                x_hat = exponential_smoothing(a, x[idx, update],
+                                              x_prev[update])
+                x_prev[update] = x_hat
+                dx_prev[update] = dx_hat
+                t_prev[update] = idx
+                out[idx, update] = x_hat
+            # the first valid frame of a person starts its filter
+            start = np.flatnonzero(valid & ~started)
+            x_prev[start] = x[idx, start]
+            t_prev[start] = idx
+            started[start] = True
+
+    def online_step(self, state, x):
+        """Smooth the next frame of a stream, gives the same results as
+        smoothing the whole sequence at once.
+
+        Args:
+            state (dict, optional): state returned with the last frame of
+                the stream, None for the first frame.
+            x (np.ndarray): input pose of a frame, in shape [K, C].
+
+        Returns:
+            tuple: the smoothed pose and the state of the stream.
+        """
+        if state is None:
+            one_euro_filter = OneEuro(
+                np.zeros_like(x),
+                x,
+                min_cutoff=self.min_cutoff,
+                beta=self.beta,
+                d_cutoff=self.d_cutoff,
+            )
+            return x.copy(), dict(filter=one_euro_filter, t=0)
+        state['t'] += 1
+        t = np.ones_like(x) * state['t']
+        return state['filter'](t, x), state
@@ -0,0 +1,120 @@
+from collections import deque
+
+import numpy as np
+import torch
+
+from ..builder import POST_PROCESSING, build_post_processing
+
+
+@POST_PROCESSING.register_module(name=['OnlineFilter', 'online'])
+class OnlineFilter:
+    """Smooth streams frame by frame, e.g. poses of each person from a
+    webcam, keeping a state for each track instead of the whole sequence.
+
+    Filters with an ``online_step`` method, e.g. OneEuroFilter, update
+    their state recursively and return each frame without latency. Other
+    filters, e.g. Gaus1dFilter, SGFilter and SmoothNetFilter, are applied
+    to a sliding window of the latest ``window_size`` frames, and a frame
+    is returned after ``lookahead`` following frames are pushed. Frames
+    pushed before a window is full are returned without smoothing.
+
+    Args:
+        filter_cfg (dict): Config of the filter to apply, e.g.
+            dict(type='savgol', window_size=11, polyorder=2).
+        window_size (int, optional): Number of frames kept for each track.
+            If None, ``window_size`` of the filter is used. Ignored for
+            filters with ``online_step``. Defaults to None.
+        lookahead (int, optional): Number of following frames to wait for
+            before returning a frame, in [0, window_size). Ignored for
+            filters with ``online_step``. Defaults to 0.
+    """
+
+    def __init__(self, filter_cfg, window_size=None, lookahead=0):
+        super(OnlineFilter, self).__init__()
+        self.smooth_func = build_post_processing(dict(filter_cfg))
+        self.recursive = hasattr(self.smooth_func, 'online_step')
+        if window_size is None:
+            window_size = getattr(self.smooth_func, 'window_size', None)
+        if not self.recursive:
+            assert window_size is not None and window_size > 0, \
+                'window_size is required for window based filters.'
+            assert 0 <= lookahead < window_size, \
+                f'lookahead should be in [0, {window_size}), got {lookahead}.'
+        self.window_size = window_size
+        self.lookahead = lookahead if not self.recursive else 0
+        self.states = {}
+
+    def push(self, x, track_id=0):
+        """Push a frame of a track.
+
+        Args:
+            x (np.ndarray or torch.Tensor): input pose of a frame, in shape
+                [K, C].
+            track_id (int, optional): unique id of the track.
+                Defaults to 0.
+
+        Returns:
+            np.ndarray or torch.Tensor: the smoothed pose of the frame
+                pushed ``lookahead`` frames ago, None if there is no such
+                frame yet.
+        """
+        x_type = x
+        if isinstance(x, torch.Tensor):
+            x = x.detach().cpu().numpy()
+
+        if self.recursive:
+            smoothed, self.states[track_id] = self.smooth_func.online_step(
+                self.states.get(track_id), x)
+        else:
+            state = self.states.setdefault(
+                track_id,
+                dict(frames=deque(maxlen=self.window_size), num_pushed=0))
+            state['frames'].append(x)
+            state['num_pushed'] += 1
+            if state['num_pushed'] <= self.lookahead:
+                return None
+            smoothed = self._smooth_window(state['frames'])
+            smoothed = smoothed[len(smoothed) - 1 - self.lookahead]
+        return self._to_input_type(smoothed, x_type)
+
+    def flush(self, track_id=0):
+        """End a track and get the frames waiting for lookahead.
+
+        Args:
+            track_id (int, optional): unique id of the track.
+                Defaults to 0.
+
+        Returns:
+            list: the smoothed poses of the last frames not returned by
+                ``push`` yet, in temporal order.
+        """
+        state = self.states.pop(track_id, None)
+        if state is None or self.recursive:
+            return []
+        num_left = min(self.lookahead, state['num_pushed'])
+        if num_left == 0:
+            return []
+        smoothed = self._smooth_window(state['frames'])[-num_left:]
+        return list(smoothed)
+
+    def reset(self, track_id=None):
+        """Drop the state of a track, or of all the tracks if track_id is
+        None."""
+        if track_id is None:
+            self.states.clear()
+        else:
+            self.states.pop(track_id, None)
+
+    def _smooth_window(self, frames):
+        """Smooth a full window, or return the frames as they are."""
+        window = np.stack(frames)
+        if len(window) < self.window_size:
+            return window
+        return self.smooth_func(window)
+
+    @staticmethod
+    def _to_input_type(x, x_type):
+        if isinstance(x_type, torch.Tensor):
+            # we also return tensor by default
+            return torch.from_numpy(np.asarray(x)).to(x_type.device)
+        return x
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Any, Optional
 
 import numpy as np
 import torch
@@ -107,8 +107,26 @@ class SmoothNet(nn.Module):
         # Build decoder layers
         self.decoder = nn.Linear(hidden_size, output_size)
 
-    def forward(self, x: Tensor) -> Tensor:
-        """Forward function."""
+    def forward(self,
+                x: Tensor,
+                num_frames: Optional[Tensor] = None,
+                chunk_size: Optional[int] = None) -> Tensor:
+        """Forward function.
+
+        Args:
+            x (Tensor): The pose sequences in shape (N, C, T).
+            num_frames (Tensor, optional): The valid length of each sequence
+                in shape (N, ), which should be no less than the window
+                size. Only the windows inside the valid length are used and
+                the frames after it are zeros. Defaults to None, all the
+                sequences are valid in T frames.
+            chunk_size (int, optional): The max number of windows forwarded
+                at once, which bounds the memory on long sequences.
+                Defaults to None, all the windows at once.
+
+        Returns:
+            Tensor: The smoothed sequences in shape (N, C, T).
+        """
         N, C, T = x.shape
         num_windows = T - self.window_size + 1
 
@@ -119,21 +137,42 @@ class SmoothNet(nn.Module):
         # Unfold x to obtain input sliding windows
         # [N, C, num_windows, window_size]
         x = x.unfold(2, self.window_size, 1)
+        if num_frames is None:
+            valid = x.new_ones(N, num_windows)
+        else:
+            valid = (
+                torch.arange(num_windows, device=x.device)[None] +
+                self.window_size <= num_frames.to(x.device)[:, None])
+            valid = valid.to(x.dtype)
 
-        # Forward layers
-        x = self.encoder(x)
-        x = self.res_blocks(x)
-        x = self.decoder(x)  # [N, C, num_windows, output_size]
-
-        # Accumulate output ensembles
         out = x.new_zeros(N, C, T)
-        count = x.new_zeros(T)
-
-        for t in range(num_windows):
-            out[..., t:t + self.output_size] += x[:, :, t]
-            count[t:t + self.output_size] += 1.0
-
-        return out.div(count)
+        count = x.new_zeros(N, T)
+        chunk_size = chunk_size or num_windows
+        for start in range(0, num_windows, chunk_size):
+            chunk = x[:, :, start:start + chunk_size]
+            chunk_valid = valid[:, start:start + chunk_size]
+
+            # Forward layers
+            y = self.encoder(chunk)
+            y = self.res_blocks(y)
+            y = self.decoder(y)  # [N, C, chunk_size, output_size]
+
+            # Accumulate output ensembles
+            y = y * chunk_valid[:, None, :, None]
+            index = (torch.arange(start, start + y.shape[2])[:, None] +
+                     torch.arange(self.output_size)[None]).reshape(-1).to(
+                         x.device)
+            out.index_add_(2, index, y.reshape(N, C, -1))
+            count.index_add_(
+                1, index,
+                chunk_valid[:, :,
+                            None].expand(-1, -1,
+                                         self.output_size).reshape(N, -1))
+
+        if num_frames is not None:
+            # frames after the valid length are not in any window
+            count = count.clamp(min=1)
+        return out.div(count[:, None])
 
 
 @POST_PROCESSING.register_module(name=['SmoothNetFilter', 'smoothnet'])
@@ -156,6 +195,9 @@ class SmoothNetFilter:
         num_blocks (int): SmoothNet argument. See :class:`SmoothNet` for
             details. Default: 3
         device (str): Device for model inference. Default: 'cpu'
+        chunk_size (int, optional): The max number of sliding windows
+            forwarded at once, which bounds the memory on long sequences.
+            Default: None, all the windows at once.
         root_index (int, optional): If not None, relative keypoint coordinates
             will be calculated as the SmoothNet input, by centering the
             keypoints around the root point. The model output will be
@@ -171,10 +213,12 @@ class SmoothNetFilter:
         res_hidden_size: int = 512,
         num_blocks: int = 5,
         device: str = 'cpu',
+        chunk_size: Optional[int] = None,
     ):
         super(SmoothNetFilter, self).__init__()
         self.window_size = window_size
         self.device = device
+        self.chunk_size = chunk_size
         self.smoothnet = SmoothNet(window_size, output_size, hidden_size,
                                    res_hidden_size, num_blocks)
         self.smoothnet.to(device)
@@ -187,54 +231,105 @@ class SmoothNetFilter:
             p.requires_grad_(False)
 
     def __call__(self, x: np.ndarray):
+        """Smooth a sequence.
+
+        Args:
+            x (np.ndarray or Tensor): The sequence in shape [T, K, C], where
+                C is 3 for axis angles, 6 for rotation 6d or 9 for rotation
+                matrices. A sequence shorter than the window size is
+                padded by its last frame.
+
+        Returns:
+            np.ndarray or Tensor: The smoothed sequence in shape [T, K, C].
+        """
+        assert x.ndim == 3, ('Input should be an array with shape [T, K, C]'
+                             f', but got invalid shape {x.shape}')
+        return self.smooth_batch(x[None])[0]
+
+    def smooth_batch(self, x: np.ndarray, lengths: Optional[Any] = None):
+        """Smooth a batch of sequences, e.g. the tracks of all persons in a
+        video, in the same forwards.
+
+        Args:
+            x (np.ndarray or Tensor): The padded sequences in shape
+                [N, T, K, C], C is the same as in ``__call__``.
+            lengths (Sequence[int], optional): The valid length of each
+                sequence. The frames after it are returned as they are.
+                Sequences shorter than the window size are padded by their
+                last valid frame. Defaults to None, all the sequences are
+                valid in T frames.
+
+        Returns:
+            np.ndarray or Tensor: The smoothed sequences in shape
+                [N, T, K, C].
+        """
         x_type = 'tensor'
         if not isinstance(x, torch.Tensor):
             x_type = 'array'
 
-        assert x.ndim == 3, ('Input should be an array with shape [T, K, C]'
-                             f', but got invalid shape {x.shape}')
+        assert x.ndim == 4, ('Input should be an array with shape '
+                             f'[N, T, K, C], but got invalid shape {x.shape}')
 
-        T, K, C = x.shape
+        N, T, K, C = x.shape
 
         assert C == 3 or C == 6 or C == 9
 
-        if T < self.window_size:
-            # Skip smoothing if the input length is less than the window size
-            smoothed = x
+        if x_type == 'array':
+            dtype = x.dtype
+            x = torch.tensor(x, dtype=torch.float32, device=self.device)
+        else:
+            x = x.to(device=self.device, dtype=torch.float32)
+        if lengths is None:
+            lengths = torch.full((N, ), T, dtype=torch.long)
         else:
-            if x_type == 'array':
-                dtype = x.dtype
-
-            # Convert to tensor and forward the model
-            with torch.no_grad():
-                if x_type == 'array':
-                    x = torch.tensor(
-                        x, dtype=torch.float32, device=self.device)
-                if C == 9:
-                    input_type = 'matrix'
-                    x = rotmat_to_rot6d(x.reshape(-1, 3, 3)).reshape(T, K, -1)
-                elif C == 3:
-                    input_type = 'axis_angles'
-                    x = rotmat_to_rot6d(aa_to_rotmat(x.reshape(-1,
-                                                               3))).reshape(
-                                                                   T, K, -1)
-                else:
-                    input_type = 'rotation_6d'
-                x = x.view(1, T, -1).permute(0, 2, 1)  # to [1, KC, T]
-                smoothed = self.smoothnet(x)  # in shape [1, KC, T]
-
-            # Convert model output back to input shape and format
-            smoothed = smoothed.permute(0, 2, 1).view(T, K, -1)  # to [T, K, C]
-
-            if input_type == 'matrix':
-                smoothed = rot6d_to_rotmat(smoothed.reshape(-1, 6)).reshape(
-                    T, K, C)
-            elif input_type == 'axis_angles':
-                smoothed = rotmat_to_aa(
-                    rot6d_to_rotmat(smoothed.reshape(-1, 6))).reshape(T, K, C)
-
-            if x_type == 'array':
-                smoothed = smoothed.cpu().numpy().astype(
-                    dtype)  # to numpy.ndarray
+            lengths = torch.as_tensor(lengths, dtype=torch.long).clamp(0, T)
+        lengths = lengths.to(self.device)
+
+        # Convert to tensor and forward the model
+        with torch.no_grad():
+            if C == 9:
+                input_type = 'matrix'
+                x_6d = rotmat_to_rot6d(x.reshape(-1, 3, 3))
+            elif C == 3:
+                input_type = 'axis_angles'
+                x_6d = rotmat_to_rot6d(aa_to_rotmat(x.reshape(-1, 3)))
+            else:
+                input_type = 'rotation_6d'
+                x_6d = x
+            x_6d = x_6d.reshape(N, T, -1)
+
+            # Pad every sequence by its last valid frame, at least to the
+            # window size
+            padded_len = max(T, self.window_size)
+            frame_index = torch.min(
+                torch.arange(padded_len, device=self.device)[None],
+                (lengths - 1).clamp(min=0)[:, None])
+            x_6d = torch.gather(
+                x_6d, 1, frame_index[..., None].expand(-1, -1, x_6d.shape[-1]))
+            num_frames = torch.where(lengths > 0,
+                                     lengths.clamp(min=self.window_size),
+                                     lengths)
+
+            x_6d = x_6d.permute(0, 2, 1)  # to [N, KC, T]
+            smoothed = self.smoothnet(
+                x_6d, num_frames=num_frames,
+                chunk_size=self.chunk_size)  # in shape [N, KC, T]
+
+        # Convert model output back to input shape and format
+        smoothed = smoothed[..., :T].permute(0, 2, 1).reshape(N, T, K, -1)
+
+        if input_type == 'matrix':
+            smoothed = rot6d_to_rotmat(smoothed.reshape(-1, 6)).reshape(
+                N, T, K, C)
+        elif input_type == 'axis_angles':
+            smoothed = rotmat_to_aa(rot6d_to_rotmat(smoothed.reshape(
+                -1, 6))).reshape(N, T, K, C)
+
+        # Keep the frames after the valid lengths
+        valid = torch.arange(T, device=self.device)[None] < lengths[:, None]
+        smoothed = torch.where(valid[..., None, None], smoothed, x)
+
+        if x_type == 'array':
+            smoothed = smoothed.cpu().numpy().astype(dtype)  # to numpy.ndarray
 
         return smoothed
@@ -28,17 +28,26 @@ class DeciWatchPostProcessing:
         device (Union[torch.device, str], optional):
                 You can pass a str or torch.device for cpu or gpu render.
                 Defaults to 'cpu'.
+        batch_size (int, optional): Max number of slide windows in one
+                forward, which bounds the memory on long sequences.
+                None for all the windows in one forward. Defaults to 64.
 
     Returns:
         smoothed poses (np.ndarray, torch.tensor)
     """
 
-    def __init__(self, interval, slide_window_q, checkpoint, device=None):
+    def __init__(self,
+                 interval,
+                 slide_window_q,
+                 checkpoint,
+                 device=None,
+                 batch_size=64):
         super(DeciWatchPostProcessing, self).__init__()
         self.interval = interval
         self.slide_window_q = slide_window_q
         self.slide_window_size = self.slide_window_q * self.interval + 1
         self.device = device
+        self.batch_size = batch_size
 
         self.input_dimension = 24 * 6
 
@@ -49,73 +58,93 @@ class DeciWatchPostProcessing:
         print(f'load checkpoint from local path: {self.checkpoint_path}')
         load_checkpoint(
             self.model, self.checkpoint_path, map_location=self.device)
+        self.model.eval()
 
     def __call__(self, x=None):
-        # x.shape: [t,24,3]
+        """Recover poses from the visible frames.
+
+        Args:
+            x (np.ndarray or torch.Tensor): poses in shape [T, 24, 3, 3],
+                [T, 24, 3] or [T, 144], or with a person dimension after T,
+                e.g. [T, M, 24, 3, 3]. All the persons are recovered in the
+                same forwards.
+
+        Returns:
+            torch.Tensor: recovered poses in the shape of x.
+        """
+        pose_shapes = [(24, 3, 3), (24, 3), (self.input_dimension, )]
         seq_len = x.shape[0]
         assert seq_len > self.slide_window_size
-        assert x.shape[1:] == (24, 3, 3) or x.shape[1:] == (
-            self.input_dimension) or x.shape[1:] == (24, 3)
-
-        if x.shape[1:] == (24, 3, 3):
+        if tuple(x.shape[1:]) in pose_shapes:
+            num_person = None
+            pose_shape = tuple(x.shape[1:])
+        else:
+            assert tuple(x.shape[2:]) in pose_shapes
+            num_person = x.shape[1]
+            pose_shape = tuple(x.shape[2:])
+
+        x = torch.tensor(x).to(self.device)
+        if num_person is not None:
+            # persons are the batch dimension of the windows
+            x = x.transpose(0, 1)
+        x = x.reshape(-1, *pose_shape)
+        if pose_shape == (24, 3, 3):
             input_type = 'matrix'
-            x = torch.tensor(x).to(self.device)
-            x = rotmat_to_rot6d(x).reshape(-1, self.input_dimension)
-        elif x.shape[1:] == (24, 3):
+            x = rotmat_to_rot6d(x)
+        elif pose_shape == (24, 3):
             input_type = 'axis_angles'
-            x = torch.tensor(x).to(self.device)
-            x = rotmat_to_rot6d(aa_to_rotmat(x.reshape(-1, 3))).reshape(
-                -1, self.input_dimension)
+            x = rotmat_to_rot6d(aa_to_rotmat(x.reshape(-1, 3)))
         else:
-            x = torch.tensor(x).to(self.device)
-            x = x.reshape(-1, self.input_dimension)
             input_type = 'rotation_6d'
+        x = x.reshape(-1, seq_len, self.input_dimension)
+        batch = x.shape[0]
 
-        input = x.clone()
+        num_windows = (seq_len - self.slide_window_size) // self.interval + 1
+        smoothed_len = (num_windows - 1) * self.interval + \
+            self.slide_window_size
 
-        slide_window_x = torch.as_strided(
-            input, ((seq_len - self.slide_window_size) // (self.interval) + 1,
-                    self.slide_window_size, self.input_dimension),
-            (self.interval * self.input_dimension, self.input_dimension, 1),
-            storage_offset=0).reshape(-1, self.slide_window_size,
+        # windows of all the persons, [batch * num_windows, window_size, C]
+        slide_window_x = x.unfold(1, self.slide_window_size,
+                                  self.interval).transpose(2, 3).reshape(
+                                      -1, self.slide_window_size,
                                       self.input_dimension)
-
-        smoothed_len = (
-            seq_len - self.slide_window_size
-        ) // self.interval * self.interval + self.slide_window_size
-
+        batch_size = self.batch_size or len(slide_window_x)
+        smooth_poses = []
         with torch.no_grad():
-            smooth_poses, _ = self.model(slide_window_x, self.device)
-
-        output_poses = [[] for i in range(smoothed_len)]
-
-        for i in range(smooth_poses.shape[0]):
-            for j in range(self.slide_window_size):
-                output_poses[i * self.interval + j].append(smooth_poses[i,
-                                                                        j, :])
-
-        smooth_poses = torch.cat(
-            (smooth_poses[:, :self.slide_window_size - 1, :].reshape(
-                -1, self.input_dimension), smooth_poses[-1, -1, :].reshape(
-                    -1, self.input_dimension)),
-            dim=0)
-
-        for i in range(smoothed_len):
-            output_poses[i] = torch.stack(output_poses[i]).mean(0)
-
-        output_poses = torch.stack(output_poses)
+            for start in range(0, len(slide_window_x), batch_size):
+                smooth_pose, _ = self.model(
+                    slide_window_x[start:start + batch_size], self.device)
+                smooth_poses.append(smooth_pose)
+        smooth_poses = torch.cat(smooth_poses).reshape(batch, -1,
+                                                       self.input_dimension)
+
+        # average the overlapped frames of the windows
+        frame_index = (
+            torch.arange(num_windows)[:, None] * self.interval +
+            torch.arange(self.slide_window_size)[None]).reshape(-1).to(
+                smooth_poses.device)
+        output_poses = smooth_poses.new_zeros(batch, smoothed_len,
+                                              self.input_dimension)
+        output_poses.index_add_(1, frame_index, smooth_poses)
+        count = smooth_poses.new_zeros(smoothed_len).index_add_(
+            0, frame_index, smooth_poses.new_ones(len(frame_index)))
+        output_poses = output_poses / count[:, None]
 
         if smoothed_len < seq_len:
-            output_poses = torch.cat((output_poses, x[smoothed_len:, :]),
-                                     dim=0)
+            output_poses = torch.cat(
+                (output_poses, x[:, smoothed_len:].to(output_poses.dtype)),
+                dim=1)
 
         if input_type == 'matrix':
-            output_poses = rot6d_to_rotmat(output_poses.reshape(
-                -1, 6)).reshape(-1, 24, 3, 3)
+            output_poses = rot6d_to_rotmat(output_poses.reshape(-1, 6))
         elif input_type == 'axis_angles':
             output_poses = rotmat_to_aa(
-                rot6d_to_rotmat(output_poses.reshape(-1,
-                                                     6))).reshape(-1, 24, 3)
+                rot6d_to_rotmat(output_poses.reshape(-1, 6)))
+        output_poses = output_poses.reshape(batch, seq_len, *pose_shape)
+        if num_person is None:
+            output_poses = output_poses[0]
+        else:
+            output_poses = output_poses.transpose(0, 1)
 
         return output_poses
 
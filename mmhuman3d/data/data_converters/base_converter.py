@@ -1,7 +1,17 @@
+import multiprocessing
+import os
+import tempfile
 from abc import ABCMeta, abstractmethod
-from typing import List
+from collections import defaultdict
+from typing import Any, List
 
 import numpy as np
+import torch
+from tqdm import tqdm
+
+from mmhuman3d.data.data_structures.human_data import HumanData
+from mmhuman3d.data.data_structures.human_data_writer import HumanDataWriter
+from mmhuman3d.data.data_structures.multi_human_data import MultiHumanData
 
 
 class BaseConverter(metaclass=ABCMeta):
@@ -99,3 +109,289 @@ class BaseModeConverter(BaseConverter):
     @abstractmethod
     def convert_by_mode(self):
         pass
+
+
+_shard_converter = None
+
+
+def _init_shard_worker(converter: 'BaseShardedConverter') -> None:
+    """Keep the converter of a worker process in a global variable, so that
+    it is passed to the process only once."""
+    global _shard_converter
+    _shard_converter = converter
+
+
+def _convert_shard_in_worker(args: tuple) -> dict:
+    """Convert one shard with the converter of this worker process."""
+    return _shard_converter.dump_shard(*args)
+
+
+class BaseShardedConverter(BaseModeConverter):
+    """Convert datasets by mode, shard by shard.
+
+    A subclass splits a mode into independent shards, e.g. subjects or
+    sequences, in ``get_shards()`` and converts one of them in
+    ``convert_shard()``. Shards are converted concurrently by a pool of
+    processes and dumped to temporary files, which are streamed into one
+    HumanData per output file in the order of the shards.
+
+    Args:
+        modes (list): the modes of data for converter
+        num_workers (int): the number of processes to convert shards.
+            0 converts them in the main process. Default: 0.
+    """
+
+    def __init__(self, modes=[], num_workers=0):
+        super(BaseShardedConverter, self).__init__(modes)
+        self.num_workers = num_workers
+
+    @abstractmethod
+    def get_shards(self, dataset_path: str, mode: str) -> list:
+        """Get picklable descriptions of the shards of a mode."""
+        pass
+
+    @abstractmethod
+    def convert_shard(self, dataset_path: str, mode: str, shard: Any,
+                      **kwargs) -> dict:
+        """Convert one shard.
+
+        Returns:
+            dict:
+                Output file names as keys and HumanData of this shard as
+                values. A file name can be absent if the shard has no data
+                for it.
+        """
+        pass
+
+    def dump_shard(self, dataset_path: str, mode: str, shard_index: int,
+                   shard: Any, tmp_dir: str, kwargs: dict) -> dict:
+        """Convert one shard and dump the results into tmp_dir.
+
+        Returns:
+            dict:
+                Output file names as keys and tuples of HumanData class and
+                the temporary file path as values.
+        """
+        results = self.convert_shard(dataset_path, mode, shard, **kwargs)
+        shard_files = {}
+        for file_name, human_data in results.items():
+            shard_path = os.path.join(tmp_dir,
+                                      f'{shard_index:06d}_{file_name}')
+            if not shard_path.endswith('.npz'):
+                shard_path += '.npz'
+            human_data.dump(shard_path)
+            shard_files[file_name] = (type(human_data), shard_path)
+        return shard_files
+
+    def convert_by_mode(self, dataset_path: str, out_path: str, mode: str,
+                        **kwargs) -> None:
+        """Convert all shards of a mode and merge them.
+
+        Args:
+            dataset_path (str): Path to directory where raw images and
+            annotations are stored.
+            out_path (str): Path to directory to save preprocessed npz file
+            mode (str): Mode in accepted modes
+            kwargs (dict): Passed to ``convert_shard()``.
+        """
+        shards = self.get_shards(dataset_path, mode)
+        os.makedirs(out_path, exist_ok=True)
+        merge_files = defaultdict(list)
+        with tempfile.TemporaryDirectory(dir=out_path) as tmp_dir:
+            tasks = [(dataset_path, mode, shard_index, shard, tmp_dir, kwargs)
+                     for shard_index, shard in enumerate(shards)]
+            if self.num_workers > 0:
+                # CUDA cannot be re-initialized in forked processes
+                if torch.cuda.is_initialized():
+                    context = multiprocessing.get_context('spawn')
+                else:
+                    context = multiprocessing.get_context()
+                with context.Pool(
+                        self.num_workers,
+                        initializer=_init_shard_worker,
+                        initargs=(self, )) as pool:
+                    results = list(
+                        tqdm(
+                            pool.imap(_convert_shard_in_worker, tasks),
+                            total=len(tasks),
+                            desc=mode))
+            else:
+                results = [self.dump_shard(*task) for task in tqdm(tasks)]
+            for shard_files in results:
+                for file_name, shard_file in shard_files.items():
+                    merge_files[file_name].append(shard_file)
+            for file_name, shard_files in merge_files.items():
+                human_data_cls = shard_files[0][0]
+                shard_paths = [shard_path for _, shard_path in shard_files]
+                out_file = os.path.join(out_path, file_name)
+                if issubclass(human_data_cls, MultiHumanData):
+                    human_data = self.merge_human_data([
+                        human_data_cls.fromfile(shard_path)
+                        for shard_path in shard_paths
+                    ])
+                    human_data.dump(out_file)
+                else:
+                    self.write_shards(shard_paths, out_file)
+
+    @staticmethod
+    def write_shards(shard_paths: List[str], out_file: str) -> None:
+        """Stream HumanData of shards into one file, holding only one shard
+        in memory.
+
+        Values are split by the first shard as ``merge_human_data()``
+        does.
+
+        Args:
+            shard_paths (List[str]):
+                Paths to HumanData files of the shards, all with the same
+                keys.
+            out_file (str):
+                Path to the merged file.
+        """
+        first = HumanData.fromfile(shard_paths[0])
+        dims = first.__get_slice_dim__()
+        mask_keys = [
+            key for key in first.keys()
+            if key.startswith('keypoints') and key.endswith('_mask')
+        ]
+        with HumanDataWriter(
+                out_file,
+                key_strict=first.get_key_strict(),
+                compress_keypoints=first.check_keypoints_compressed()
+        ) as writer:
+            for key, dim in dims.items():
+                if key in mask_keys:
+                    mask = np.asarray(first[key])
+                    for shard_path in shard_paths[1:]:
+                        with np.load(shard_path, allow_pickle=True) as npz:
+                            mask = mask * npz[key]
+                    writer.set_value(key, mask)
+                elif dim is None:
+                    writer.set_value(key, first[key])
+                elif isinstance(dim, dict):
+                    non_sliced = {
+                        sub_key: sub_value
+                        for sub_key, sub_value in first[key].items()
+                        if dim[sub_key] is None
+                    }
+                    if len(non_sliced) > 0:
+                        writer.set_value(key, non_sliced)
+            del first
+            for shard_path in shard_paths:
+                human_data = HumanData.fromfile(shard_path)
+                chunk = {}
+                for key, dim in dims.items():
+                    if isinstance(dim, dict):
+                        chunk[key] = {
+                            sub_key: human_data[key][sub_key]
+                            for sub_key, sub_dim in dim.items()
+                            if sub_dim is not None
+                        }
+                    elif dim is not None and key not in mask_keys:
+                        # keypoints are padded and compressed by the
+                        # merged masks
+                        chunk[key] = human_data[key]
+                writer.append(chunk)
+
+    @staticmethod
+    def merge_human_data(human_data_list: List[HumanData]) -> HumanData:
+        """Concatenate HumanData of shards along the temporal dimension in
+        one pass.
+
+        Values that cannot be sliced, like config, are taken from the first
+        shard. Keypoints stay compressed if all the shards share the same
+        masks, otherwise masks are multiplied as in
+        ``HumanData.concatenate()``.
+
+        Args:
+            human_data_list (List[HumanData]):
+                HumanData or MultiHumanData of the shards, all with the same
+                keys.
+
+        Raises:
+            ValueError:
+                Shards have different keys.
+
+        Returns:
+            HumanData:
+                The merged HumanData, of the same class as the first shard.
+        """
+        first = human_data_list[0]
+        keys = list(first.keys())
+        for human_data in human_data_list[1:]:
+            if set(human_data.keys()) != set(keys):
+                raise ValueError('Shards to merge have different keys: '
+                                 f'{sorted(keys)} and '
+                                 f'{sorted(human_data.keys())}.')
+        compressed = first.check_keypoints_compressed()
+        mask_keys = [
+            key for key in keys
+            if key.startswith('keypoints') and key.endswith('_mask')
+        ]
+        same_masks = all(
+            human_data.check_keypoints_compressed() == compressed and all(
+                np.array_equal(
+                    human_data.get_raw_value(key), first.get_raw_value(key))
+                for key in mask_keys) for human_data in human_data_list)
+        if not same_masks:
+            for human_data in human_data_list:
+                if human_data.check_keypoints_compressed():
+                    human_data.decompress_keypoints()
+        dims = [
+            human_data.__get_slice_dim__() for human_data in human_data_list
+        ]
+        instance_nums = [
+            getattr(human_data, '__instance_num__', human_data.data_len)
+            for human_data in human_data_list
+        ]
+        instance_offsets = np.cumsum([0] + instance_nums[:-1])
+
+        def concat(values, value_dims):
+            if any(dim is None for dim in value_dims) or \
+                    len(set(value_dims)) > 1:
+                return values[0]
+            if isinstance(values[0], (list, tuple)):
+                return [item for value in values for item in value]
+            elif isinstance(values[0], np.ndarray):
+                return np.concatenate(values, axis=value_dims[0])
+            return values[0]
+
+        merged = {}
+        for key in keys:
+            values = [
+                human_data.get_raw_value(key) for human_data in human_data_list
+            ]
+            value_dims = [dim[key] for dim in dims]
+            if key in mask_keys:
+                mask = np.asarray(values[0])
+                for value in values[1:]:
+                    mask = mask * np.asarray(value)
+                merged[key] = mask
+            elif key == 'frame_range':
+                merged[key] = np.concatenate([
+                    value + offset
+                    for value, offset in zip(values, instance_offsets)
+                ])
+            elif isinstance(values[0], dict) and \
+                    isinstance(value_dims[0], dict):
+                merged[key] = {
+                    sub_key:
+                    concat([value[sub_key] for value in values],
+                           [dim.get(sub_key) for dim in value_dims])
+                    for sub_key in values[0]
+                }
+            else:
+                merged[key] = concat(values, value_dims)
+
+        ret_human_data = first.__class__()
+        ret_human_data.update(merged)
+        ret_human_data.set_key_strict(first.get_key_strict())
+        ret_human_data.__data_len__ = sum(human_data.data_len
+                                          for human_data in human_data_list)
+        if hasattr(first, '__instance_num__'):
+            ret_human_data.__instance_num__ = sum(instance_nums)
+        if same_masks:
+            ret_human_data.__keypoints_compressed__ = compressed
+        elif compressed:
+            ret_human_data.compress_keypoints_by_mask()
+        return ret_human_data
@@ -8,13 +8,12 @@ import cdflib
 import cv2
 import h5py
 import numpy as np
-from tqdm import tqdm
 
 from mmhuman3d.core.cameras.camera_parameters import CameraParameter
 from mmhuman3d.core.conventions.keypoints_mapping import convert_kps
 from mmhuman3d.data.data_structures.human_data import HumanData
 from mmhuman3d.data.data_structures.multi_human_data import MultiHumanData
-from .base_converter import BaseModeConverter
+from .base_converter import BaseShardedConverter
 from .builder import DATA_CONVERTERS
 
 
@@ -155,7 +154,7 @@ class H36mCamera():
 
 
 @DATA_CONVERTERS.register_module()
-class H36mConverter(BaseModeConverter):
+class H36mConverter(BaseShardedConverter):
     """Human3.6M dataset
     `Human3.6M: Large Scale Datasets and Predictive Methods for 3D Human
     Sensing in Natural Environments' TPAMI`2014
@@ -168,6 +167,8 @@ class H36mConverter(BaseModeConverter):
         extract_img (bool): Store True to extract images into a separate
         folder. Default: False.
         mosh_dir (str, optional): Path to directory containing mosh files.
+        num_workers (int): the number of processes to convert subjects.
+        0 converts them in the main process. Default: 0.
     """
     ACCEPTED_MODES = ['valid', 'train']
 
@@ -175,8 +176,9 @@ class H36mConverter(BaseModeConverter):
                  modes: List = [],
                  protocol: int = 1,
                  extract_img: bool = False,
-                 mosh_dir=None) -> None:
-        super(H36mConverter, self).__init__(modes)
+                 mosh_dir=None,
+                 num_workers: int = 0) -> None:
+        super(H36mConverter, self).__init__(modes, num_workers)
         accepted_protocol = [1, 2]
         if protocol not in accepted_protocol:
             raise ValueError('Input protocol not in accepted protocol. \
@@ -194,17 +196,56 @@ class H36mConverter(BaseModeConverter):
             '60457274': 3,
         }
 
-    def convert_by_mode(self,
-                        dataset_path: str,
-                        out_path: str,
-                        mode: str,
-                        enable_multi_human_data: bool = False) -> dict:
+    def get_shards(self, dataset_path: str, mode: str) -> list:
+        """Get the sequences of a mode, each converted as a shard.
+
+        Args:
+            dataset_path (str): Path to directory where raw images and
+            annotations are stored.
+            mode (str): Mode in accepted modes
+
+        Returns:
+            list: Tuples of subject id, path to the 3D pose file and the
+            camera parameters, parsed once from metadata.xml for all the
+            sequences.
+        """
+        # choose users ids for different set
+        if mode == 'train':
+            user_list = [1, 5, 6, 7, 8]
+        elif mode == 'valid':
+            user_list = [9, 11]
+
+        metadata_path = os.path.join(dataset_path, 'metadata.xml')
+        cam_param = H36mCamera(metadata_path).generate_cameras_dict()
+
+        shards = []
+        for user_i in user_list:
+            # path with GT 3D pose
+            pose_path = os.path.join(dataset_path, f'S{user_i}',
+                                     'MyPoseFeatures', 'D3_Positions_mono')
+            # go over all the sequences of each user
+            seq_list = glob.glob(os.path.join(pose_path, '*.cdf'))
+            seq_list.sort()
+            for seq_i in seq_list:
+                action = os.path.basename(seq_i).split('.')[0]
+                # irrelevant sequences
+                if action.replace(' ', '_') == '_ALL':
+                    continue
+                shards.append((user_i, seq_i, cam_param))
+        return shards
+
+    def convert_shard(self,
+                      dataset_path: str,
+                      mode: str,
+                      shard: tuple,
+                      enable_multi_human_data: bool = False) -> dict:
         """
         Args:
             dataset_path (str): Path to directory where raw images and
             annotations are stored.
-            out_path (str): Path to directory to save preprocessed npz file
             mode (str): Mode in accepted modes
+            shard (tuple): Subject id, path to the 3D pose file of a
+            sequence and the camera parameters.
             enable_multi_human_data (bool):
                 Whether to generate a multi-human data. If set to True,
                 stored in MultiHumanData() format.
@@ -212,9 +253,10 @@ class H36mConverter(BaseModeConverter):
 
         Returns:
             dict:
-                A dict containing keys image_path, bbox_xywh, keypoints2d,
-                keypoints2d_mask, keypoints3d, keypoints3d_mask, cam_param
-                stored in HumanData() format
+                The output file name as key, and a HumanData containing keys
+                image_path, bbox_xywh, keypoints2d, keypoints2d_mask,
+                keypoints3d, keypoints3d_mask, cam_param of the sequence as
+                value. An empty dict if the mosh file is missing.
         """
         if enable_multi_human_data:
             # use MultiHumanData to store all data
@@ -236,147 +278,123 @@ class H36mConverter(BaseModeConverter):
         smpl['global_orient'] = []
         smpl['betas'] = []
 
-        # choose users ids for different set
-        if mode == 'train':
-            user_list = [1, 5, 6, 7, 8]
-        elif mode == 'valid':
-            user_list = [9, 11]
-
-        # go over each user
-        for user_i in tqdm(user_list, desc='user id'):
-            user_name = f'S{user_i}'
-            # path with GT bounding boxes
-            bbox_path = os.path.join(dataset_path, user_name, 'MySegmentsMat',
-                                     'ground_truth_bs')
-            # path with GT 2D pose
-            pose2d_path = os.path.join(dataset_path, user_name,
-                                       'MyPoseFeatures', 'D2_Positions')
-            # path with GT 3D pose
-            pose_path = os.path.join(dataset_path, user_name, 'MyPoseFeatures',
-                                     'D3_Positions_mono')
-            # path with videos
-            vid_path = os.path.join(dataset_path, user_name, 'Videos')
-
-            # go over all the sequences of each user
-            seq_list = glob.glob(os.path.join(pose_path, '*.cdf'))
-            seq_list.sort()
-
-            # mosh path
-            if self.get_mosh:
-                mosh_path = os.path.join(self.mosh_dir, user_name)
-
-            for seq_i in tqdm(seq_list, desc='sequence id'):
+        user_i, seq_i, cam_param = shard
+        user_name = f'S{user_i}'
+        # path with GT bounding boxes
+        bbox_path = os.path.join(dataset_path, user_name, 'MySegmentsMat',
+                                 'ground_truth_bs')
+        # path with GT 2D pose
+        pose2d_path = os.path.join(dataset_path, user_name, 'MyPoseFeatures',
+                                   'D2_Positions')
+        # path with videos
+        vid_path = os.path.join(dataset_path, user_name, 'Videos')
+
+        # mosh path
+        if self.get_mosh:
+            mosh_path = os.path.join(self.mosh_dir, user_name)
 
-                # sequence info
-                seq_name = seq_i.split('/')[-1]
-                action, camera, _ = seq_name.split('.')
-                action_raw = action
-                action = action.replace(' ', '_')
-                # irrelevant sequences
-                if action == '_ALL':
-                    continue
+        # sequence info
+        seq_name = seq_i.split('/')[-1]
+        action, camera, _ = seq_name.split('.')
+        action_raw = action
+        action = action.replace(' ', '_')
 
-                # 2D pose file
-                pose2d_file = os.path.join(pose2d_path, seq_name)
-                poses_2d = cdflib.CDF(pose2d_file)['Pose'][0]
+        # 2D pose file
+        pose2d_file = os.path.join(pose2d_path, seq_name)
+        poses_2d = cdflib.CDF(pose2d_file)['Pose'][0]
 
-                # 3D pose file
-                poses_3d = cdflib.CDF(seq_i)['Pose'][0]
+        # 3D pose file
+        poses_3d = cdflib.CDF(seq_i)['Pose'][0]
 
-                # 3D mosh file
-                if self.get_mosh:
-                    mosh_name = '%s_cam%s_aligned.pkl' % (
-                        action_raw, self.camera_name_to_idx[camera])
-                    mosh_file = os.path.join(mosh_path, mosh_name)
-                    if os.path.exists(mosh_file):
-                        with open(mosh_file, 'rb') as file:
-                            mosh_data = pickle.load(file, encoding='latin1')
-                    else:
-                        print(f'mosh file {mosh_name} is missing')
-                        continue
-                    thetas = mosh_data['new_poses']
-                    betas = mosh_data['betas']
-
-                # bbox file
-                bbox_file = os.path.join(bbox_path,
-                                         seq_name.replace('cdf', 'mat'))
-                bbox_h5py = h5py.File(bbox_file)
-
-                # video file
+        # 3D mosh file
+        if self.get_mosh:
+            mosh_name = '%s_cam%s_aligned.pkl' % (
+                action_raw, self.camera_name_to_idx[camera])
+            mosh_file = os.path.join(mosh_path, mosh_name)
+            if os.path.exists(mosh_file):
+                with open(mosh_file, 'rb') as file:
+                    mosh_data = pickle.load(file, encoding='latin1')
+            else:
+                print(f'mosh file {mosh_name} is missing')
+                return {}
+            thetas = mosh_data['new_poses']
+            betas = mosh_data['betas']
+
+        # bbox file
+        bbox_file = os.path.join(bbox_path, seq_name.replace('cdf', 'mat'))
+        bbox_h5py = h5py.File(bbox_file)
+
+        # video file
+        if self.extract_img:
+            vid_file = os.path.join(vid_path, seq_name.replace('cdf', 'mp4'))
+            vidcap = cv2.VideoCapture(vid_file)
+
+        # go over each frame of the sequence
+        for frame_i in range(poses_3d.shape[0]):
+            # read video frame
+            if self.extract_img:
+                success, image = vidcap.read()
+                if not success:
+                    break
+
+            # check if you can keep this frame
+            if frame_i % 5 == 0 and (self.protocol == 1
+                                     or camera == '60457274'):
+                # image name
+                seq_id = f'{user_name}_{action}'
+                image_name = f'{seq_id}.{camera}_{frame_i + 1:06d}.jpg'
+                img_folder_name = f'{user_name}_{action}.{camera}'
+                image_path = os.path.join(user_name, 'images', img_folder_name,
+                                          image_name)
+                image_abs_path = os.path.join(dataset_path, image_path)
+                # save image
                 if self.extract_img:
-                    vid_file = os.path.join(vid_path,
-                                            seq_name.replace('cdf', 'mp4'))
-                    vidcap = cv2.VideoCapture(vid_file)
-
-                # go over each frame of the sequence
-                for frame_i in tqdm(range(poses_3d.shape[0]), desc='frame id'):
-                    # read video frame
-                    if self.extract_img:
-                        success, image = vidcap.read()
-                        if not success:
-                            break
-
-                    # check if you can keep this frame
-                    if frame_i % 5 == 0 and (self.protocol == 1
-                                             or camera == '60457274'):
-                        # image name
-                        seq_id = f'{user_name}_{action}'
-                        image_name = f'{seq_id}.{camera}_{frame_i + 1:06d}.jpg'
-                        img_folder_name = f'{user_name}_{action}.{camera}'
-                        image_path = os.path.join(user_name, 'images',
-                                                  img_folder_name, image_name)
-                        image_abs_path = os.path.join(dataset_path, image_path)
-                        # save image
-                        if self.extract_img:
-                            folder = os.path.dirname(image_abs_path)
-                            if not os.path.exists(folder):
-                                os.makedirs(folder, exist_ok=True)
-                            cv2.imwrite(image_abs_path, image)
-
-                        # get bbox from mask
-                        mask = bbox_h5py[bbox_h5py['Masks'][frame_i, 0]][:].T
-                        ys, xs = np.where(mask == 1)
-                        bbox_xyxy = np.array([
-                            np.min(xs),
-                            np.min(ys),
-                            np.max(xs) + 1,
-                            np.max(ys) + 1
-                        ])
-                        bbox_xyxy = self._bbox_expand(
-                            bbox_xyxy, scale_factor=0.9)
-                        bbox_xywh = self._xyxy2xywh(bbox_xyxy)
-
-                        # read GT 2D pose
-                        keypoints2dall = np.reshape(poses_2d[frame_i, :],
-                                                    [-1, 2])
-                        keypoints2d17 = keypoints2dall[h36m_idx]
-                        keypoints2d17 = np.concatenate(
-                            [keypoints2d17, np.ones((17, 1))], axis=1)
-
-                        # read GT 3D pose
-                        keypoints3dall = np.reshape(poses_3d[frame_i, :],
-                                                    [-1, 3]) / 1000.
-                        keypoints3d17 = keypoints3dall[h36m_idx]
-                        keypoints3d17 -= keypoints3d17[0]  # root-centered
-                        keypoints3d17 = np.concatenate(
-                            [keypoints3d17, np.ones((17, 1))], axis=1)
-
-                        # store data
-                        image_path_.append(image_path)
-                        bbox_xywh_.append(bbox_xywh)
-                        keypoints2d_.append(keypoints2d17)
-                        keypoints3d_.append(keypoints3d17)
-
-                        # get mosh data
-                        if self.get_mosh:
-                            pose = thetas[frame_i // 5, :]
-                            R_mod = cv2.Rodrigues(np.array([np.pi, 0, 0]))[0]
-                            R_root = cv2.Rodrigues(pose[:3])[0]
-                            new_root = R_root.dot(R_mod)
-                            pose[:3] = cv2.Rodrigues(new_root)[0].reshape(3)
-                            smpl['body_pose'].append(pose[3:].reshape((23, 3)))
-                            smpl['global_orient'].append(pose[:3])
-                            smpl['betas'].append(betas)
+                    folder = os.path.dirname(image_abs_path)
+                    if not os.path.exists(folder):
+                        os.makedirs(folder, exist_ok=True)
+                    cv2.imwrite(image_abs_path, image)
+
+                # get bbox from mask
+                mask = bbox_h5py[bbox_h5py['Masks'][frame_i, 0]][:].T
+                ys, xs = np.where(mask == 1)
+                bbox_xyxy = np.array(
+                    [np.min(xs),
+                     np.min(ys),
+                     np.max(xs) + 1,
+                     np.max(ys) + 1])
+                bbox_xyxy = self._bbox_expand(bbox_xyxy, scale_factor=0.9)
+                bbox_xywh = self._xyxy2xywh(bbox_xyxy)
+
+                # read GT 2D pose
+                keypoints2dall = np.reshape(poses_2d[frame_i, :], [-1, 2])
+                keypoints2d17 = keypoints2dall[h36m_idx]
+                keypoints2d17 = np.concatenate(
+                    [keypoints2d17, np.ones((17, 1))], axis=1)
+
+                # read GT 3D pose
+                keypoints3dall = np.reshape(poses_3d[frame_i, :],
+                                            [-1, 3]) / 1000.
+                keypoints3d17 = keypoints3dall[h36m_idx]
+                keypoints3d17 -= keypoints3d17[0]  # root-centered
+                keypoints3d17 = np.concatenate(
+                    [keypoints3d17, np.ones((17, 1))], axis=1)
+
+                # store data
+                image_path_.append(image_path)
+                bbox_xywh_.append(bbox_xywh)
+                keypoints2d_.append(keypoints2d17)
+                keypoints3d_.append(keypoints3d17)
+
+                # get mosh data
+                if self.get_mosh:
+                    pose = thetas[frame_i // 5, :]
+                    R_mod = cv2.Rodrigues(np.array([np.pi, 0, 0]))[0]
+                    R_root = cv2.Rodrigues(pose[:3])[0]
+                    new_root = R_root.dot(R_mod)
+                    pose[:3] = cv2.Rodrigues(new_root)[0].reshape(3)
+                    smpl['body_pose'].append(pose[3:].reshape((23, 3)))
+                    smpl['global_orient'].append(pose[:3])
+                    smpl['betas'].append(betas)
 
         if self.get_mosh:
             smpl['body_pose'] = np.array(smpl['body_pose']).reshape(
@@ -391,10 +409,6 @@ class H36mConverter(BaseModeConverter):
                                     for i in range(len(image_path_))])
             human_data['frame_range'] = frame_range
 
-        metadata_path = os.path.join(dataset_path, 'metadata.xml')
-        if isinstance(metadata_path, str):
-            camera = H36mCamera(metadata_path)
-            cam_param = camera.generate_cameras_dict()
         bbox_xywh_ = np.array(bbox_xywh_).reshape((-1, 4))
         bbox_xywh_ = np.hstack([bbox_xywh_, np.ones([bbox_xywh_.shape[0], 1])])
         keypoints2d_ = np.array(keypoints2d_).reshape((-1, 17, 3))
@@ -412,16 +426,11 @@ class H36mConverter(BaseModeConverter):
         human_data['config'] = 'h36m'
         human_data.compress_keypoints_by_mask()
 
-        # store the data struct
-        if not os.path.isdir(out_path):
-            os.makedirs(out_path)
-
         if mode == 'train':
             if self.get_mosh:
-                out_file = os.path.join(out_path, 'h36m_mosh_train.npz')
+                out_file = 'h36m_mosh_train.npz'
             else:
-                out_file = os.path.join(out_path, 'h36m_train.npz')
+                out_file = 'h36m_train.npz'
         elif mode == 'valid':
-            out_file = os.path.join(out_path,
-                                    f'h36m_valid_protocol{self.protocol}.npz')
-        human_data.dump(out_file)
+            out_file = f'h36m_valid_protocol{self.protocol}.npz'
+        return {out_file: human_data}
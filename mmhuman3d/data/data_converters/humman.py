@@ -3,7 +3,6 @@ import os
 
 import numpy as np
 import torch
-from tqdm import tqdm
 
 from mmhuman3d.core.cameras import build_cameras
 from mmhuman3d.core.conventions.keypoints_mapping import (
@@ -14,12 +13,12 @@ from mmhuman3d.core.conventions.keypoints_mapping import (
 from mmhuman3d.data.data_structures.human_data import HumanData
 from mmhuman3d.data.data_structures.smc_reader import SMCReader
 from mmhuman3d.models.body_models.builder import build_body_model
-from .base_converter import BaseModeConverter
+from .base_converter import BaseShardedConverter
 from .builder import DATA_CONVERTERS
 
 
 @DATA_CONVERTERS.register_module()
-class HuMManConverter(BaseModeConverter):
+class HuMManConverter(BaseShardedConverter):
     """A mysterious dataset that will be announced soon."""
 
     ACCEPTED_MODES = ['test', 'train']
@@ -215,21 +214,42 @@ class HuMManConverter(BaseModeConverter):
 
         return human_data
 
-    def convert_by_mode(self, dataset_path: str, out_path: str,
-                        mode: str) -> dict:
+    def get_shards(self, dataset_path: str, mode: str) -> list:
+        """Get the annotation files of a mode, each converted as a shard.
+
+        Args:
+            dataset_path (str): Path to directory where raw images and
+            annotations are stored.
+            mode (str): Mode in accepted modes
+
+        Returns:
+            list: Paths to the smc files in the split.
+        """
+        ann_paths = sorted(glob.glob(os.path.join(dataset_path, '*.smc')))
+
+        with open(os.path.join(dataset_path, f'{mode}.txt'), 'r') as f:
+            split = set(f.read().splitlines())
+
+        return [
+            ann_path for ann_path in ann_paths
+            if os.path.basename(ann_path) in split
+        ]
+
+    def convert_shard(self, dataset_path: str, mode: str, ann_path: str,
+                      **kwargs) -> dict:
         """
         Args:
             dataset_path (str): Path to directory where raw images and
             annotations are stored.
-            out_path (str): Path to directory to save preprocessed npz file
             mode (str): Mode in accepted modes
+            ann_path (str): Path to the smc file of a sequence.
 
         Returns:
             dict:
-                A dict containing keys image_path, bbox_xywh, keypoints2d,
-                keypoints2d_mask stored in HumanData() format
+                Output file names of Kinect and iPhone data as keys, and
+                HumanData with keys image_path, bbox_xywh, keypoints2d,
+                keypoints2d_mask of this sequence as values.
         """
-
         kinect_smpl = {}
         kinect_smpl['body_pose'] = []
         kinect_smpl['global_orient'] = []
@@ -252,177 +272,163 @@ class HuMManConverter(BaseModeConverter):
             iphone_keypoints2d_humman_, iphone_keypoints3d_humman_ = \
             [], [], [], [], [], [], []
 
-        ann_paths = sorted(glob.glob(os.path.join(dataset_path, '*.smc')))
-
-        with open(os.path.join(dataset_path, f'{mode}.txt'), 'r') as f:
-            split = set(f.read().splitlines())
-
-        for ann_path in tqdm(ann_paths):
-
-            if os.path.basename(ann_path) not in split:
-                continue
-
-            try:
-                smc_reader = SMCReader(ann_path, body_model=self.smpl_smc)
-            except OSError:
-                print(f'Unable to load {ann_path}.')
-                continue
-
-            if self.skip_no_keypoints3d and not smc_reader.keypoint_exists:
-                continue
-            if self.skip_no_iphone and not smc_reader.iphone_exists:
-                continue
-
-            num_kinect = smc_reader.get_num_kinect()
-            num_iphone = smc_reader.get_num_iphone()
-            num_frames = smc_reader.get_kinect_num_frames()
-
-            device_list = [('Kinect', i) for i in range(num_kinect)] + \
-                [('iPhone', i) for i in range(num_iphone)]
-            assert len(device_list) == num_kinect + num_iphone
-
-            for device, device_id in device_list:
-                assert device in {
-                    'Kinect', 'iPhone'
-                }, f'Undefined device: {device}, ' \
-                   f'should be "Kinect" or "iPhone"'
-
-                if device == 'Kinect':
-                    image_id_ = kinect_image_id_
-                    image_path_ = kinect_image_path_
-                    bbox_xywh_ = kinect_bbox_xywh_
-                    keypoints2d_humman_ = kinect_keypoints2d_humman_
-                    keypoints3d_humman_ = kinect_keypoints3d_humman_
-                    keypoints2d_smpl_ = kinect_keypoints2d_smpl_
-                    keypoints3d_smpl_ = kinect_keypoints3d_smpl_
-                    smpl_ = kinect_smpl
-                    width, height = \
-                        smc_reader.get_kinect_color_resolution(device_id)
-                    intrinsics = smc_reader.get_kinect_color_intrinsics(
-                        device_id)
-                    fx, fy = intrinsics[0, 0], intrinsics[1, 1]
-                    cx, cy = intrinsics[0, 2], intrinsics[1, 2]
-                    focal_length = (fx, fy)
-                    camera_center = (cx, cy)  # xy
-                    image_size = (height, width)  # (height, width)
-
-                else:
-                    image_id_ = iphone_image_id_
-                    image_path_ = iphone_image_path_
-                    bbox_xywh_ = iphone_bbox_xywh_
-                    keypoints2d_humman_ = iphone_keypoints2d_humman_
-                    keypoints3d_humman_ = iphone_keypoints3d_humman_
-                    keypoints2d_smpl_ = iphone_keypoints2d_smpl_
-                    keypoints3d_smpl_ = iphone_keypoints3d_smpl_
-                    smpl_ = iphone_smpl
-                    width, height = smc_reader.get_iphone_color_resolution()
-                    intrinsics = smc_reader.get_iphone_intrinsics()
-                    fx, fy = intrinsics[0, 0], intrinsics[1, 1]
-                    cx, cy = intrinsics[0, 2], intrinsics[1, 2]
-                    focal_length = (fx, fy)
-                    camera_center = (cx, cy)  # xy
-                    image_size = (height, width)  # (height, width)
-
-                assert device_id >= 0, f'Negative device id: {device_id}'
-
-                keypoint_convention_humman = \
-                    smc_reader.get_keypoints_convention()
-                assert self.keypoint_convention_humman == \
-                       keypoint_convention_humman
-
-                # get keypoints2d (all frames)
-                keypoints2d_humman, keypoints2d_humman_mask = \
-                    smc_reader.get_keypoints2d(device, device_id)
-
-                if self.keypoints2d_humman_mask is None:
-                    self.keypoints2d_humman_mask = keypoints2d_humman_mask
-                assert np.allclose(self.keypoints2d_humman_mask,
-                                   keypoints2d_humman_mask)
-
-                keypoints2d_humman_.append(keypoints2d_humman)
-
-                # get keypoints3d (all frames)
-                keypoints3d_humman, keypoints3d_humman_mask = \
-                    smc_reader.get_keypoints3d(device, device_id)
-
-                if self.keypoints3d_humman_mask is None:
-                    self.keypoints3d_humman_mask = keypoints3d_humman_mask
-                assert np.allclose(self.keypoints3d_humman_mask,
-                                   keypoints3d_humman_mask)
-
-                # root-align keypoints3d
-                left_hip_keypoints = \
-                    keypoints3d_humman[:, [self.left_hip_idx_humman], :3]
-                right_hip_keypoints = \
-                    keypoints3d_humman[:, [self.right_hip_idx_humman], :3]
-                root_keypoints = \
-                    (left_hip_keypoints + right_hip_keypoints) / 2.0
-                keypoints3d_humman[..., :3] = \
-                    keypoints3d_humman[..., :3] - root_keypoints
-                keypoints3d_humman_.append(keypoints3d_humman)
-
-                # get smpl (all frames)
-                smpl_dict = smc_reader.get_smpl(device, device_id)
-                smpl_['body_pose'].append(smpl_dict['body_pose'])
-                smpl_['global_orient'].append(smpl_dict['global_orient'])
-                smpl_['transl'].append(smpl_dict['transl'])
-
-                # expand betas
-                betas_expanded = np.tile(smpl_dict['betas'],
-                                         num_frames).reshape(-1, 10)
-                smpl_['betas'].append(betas_expanded)
-
-                # get keypoints derived from SMPL and use them as supervision
-                smpl_keypoints = self._derive_keypoints(
-                    **smpl_dict,
-                    focal_length=focal_length,
-                    image_size=image_size,
-                    camera_center=camera_center)
-                keypoints2d_smpl = smpl_keypoints['keypoints2d']
-                keypoints3d_smpl = smpl_keypoints['keypoints3d']
-                keypoints2d_smpl_.append(keypoints2d_smpl)
-                keypoints3d_smpl_.append(keypoints3d_smpl)
-
-                # compute bbox from keypoints2d
-                for kp2d in keypoints2d_smpl:
-                    assert kp2d.shape == (self.num_keypoints_smpl, 2)
-                    xs, ys = kp2d[:, 0], kp2d[:, 1]
-                    xmin = max(np.min(xs), 0)
-                    xmax = min(np.max(xs), width - 1)
-                    ymin = max(np.min(ys), 0)
-                    ymax = min(np.max(ys), height - 1)
-                    bbox_xyxy = [xmin, ymin, xmax, ymax]
-                    bbox_xyxy = self._bbox_expand(bbox_xyxy, scale_factor=1.2)
-                    bbox_xywh = self._xyxy2xywh(bbox_xyxy)
-                    bbox_xywh_.append(bbox_xywh)
-
-                # get image paths (smc paths)
-                image_path = os.path.basename(ann_path)
-                for frame_id in range(num_frames):
-                    image_id = (device, device_id, frame_id)
-                    image_id_.append(image_id)
-                    image_path_.append(image_path)
-
-        os.makedirs(out_path, exist_ok=True)
-
-        # make kinect human data
-        kinect_human_data = self._make_human_data(
-            kinect_smpl, kinect_image_path_, kinect_image_id_,
-            kinect_bbox_xywh_, kinect_keypoints2d_smpl_,
-            kinect_keypoints3d_smpl_, kinect_keypoints2d_humman_,
-            kinect_keypoints3d_humman_)
-
-        file_name = f'humman_{mode}_kinect_ds{self.downsample_ratio}_smpl.npz'
-        out_file = os.path.join(out_path, file_name)
-        kinect_human_data.dump(out_file)
-
-        # make iphone human data
-        iphone_human_data = self._make_human_data(
-            iphone_smpl, iphone_image_path_, iphone_image_id_,
-            iphone_bbox_xywh_, iphone_keypoints2d_smpl_,
-            iphone_keypoints3d_smpl_, iphone_keypoints2d_humman_,
-            iphone_keypoints3d_humman_)
-
-        file_name = f'humman_{mode}_iphone_ds{self.downsample_ratio}_smpl.npz'
-        out_file = os.path.join(out_path, file_name)
-        iphone_human_data.dump(out_file)
+        try:
+            smc_reader = SMCReader(ann_path, body_model=self.smpl_smc)
+        except OSError:
+            print(f'Unable to load {ann_path}.')
+            return {}
+
+        if self.skip_no_keypoints3d and not smc_reader.keypoint_exists:
+            return {}
+        if self.skip_no_iphone and not smc_reader.iphone_exists:
+            return {}
+
+        num_kinect = smc_reader.get_num_kinect()
+        num_iphone = smc_reader.get_num_iphone()
+        num_frames = smc_reader.get_kinect_num_frames()
+
+        device_list = [('Kinect', i) for i in range(num_kinect)] + \
+            [('iPhone', i) for i in range(num_iphone)]
+        assert len(device_list) == num_kinect + num_iphone
+
+        for device, device_id in device_list:
+            assert device in {
+                'Kinect', 'iPhone'
+            }, f'Undefined device: {device}, ' \
+               f'should be "Kinect" or "iPhone"'
+
+            if device == 'Kinect':
+                image_id_ = kinect_image_id_
+                image_path_ = kinect_image_path_
+                bbox_xywh_ = kinect_bbox_xywh_
+                keypoints2d_humman_ = kinect_keypoints2d_humman_
+                keypoints3d_humman_ = kinect_keypoints3d_humman_
+                keypoints2d_smpl_ = kinect_keypoints2d_smpl_
+                keypoints3d_smpl_ = kinect_keypoints3d_smpl_
+                smpl_ = kinect_smpl
+                width, height = \
+                    smc_reader.get_kinect_color_resolution(device_id)
+                intrinsics = smc_reader.get_kinect_color_intrinsics(device_id)
+                fx, fy = intrinsics[0, 0], intrinsics[1, 1]
+                cx, cy = intrinsics[0, 2], intrinsics[1, 2]
+                focal_length = (fx, fy)
+                camera_center = (cx, cy)  # xy
+                image_size = (height, width)  # (height, width)
+
+            else:
+                image_id_ = iphone_image_id_
+                image_path_ = iphone_image_path_
+                bbox_xywh_ = iphone_bbox_xywh_
+                keypoints2d_humman_ = iphone_keypoints2d_humman_
+                keypoints3d_humman_ = iphone_keypoints3d_humman_
+                keypoints2d_smpl_ = iphone_keypoints2d_smpl_
+                keypoints3d_smpl_ = iphone_keypoints3d_smpl_
+                smpl_ = iphone_smpl
+                width, height = smc_reader.get_iphone_color_resolution()
+                intrinsics = smc_reader.get_iphone_intrinsics()
+                fx, fy = intrinsics[0, 0], intrinsics[1, 1]
+                cx, cy = intrinsics[0, 2], intrinsics[1, 2]
+                focal_length = (fx, fy)
+                camera_center = (cx, cy)  # xy
+                image_size = (height, width)  # (height, width)
+
+            assert device_id >= 0, f'Negative device id: {device_id}'
+
+            keypoint_convention_humman = \
+                smc_reader.get_keypoints_convention()
+            assert self.keypoint_convention_humman == \
+                   keypoint_convention_humman
+
+            # get keypoints2d (all frames)
+            keypoints2d_humman, keypoints2d_humman_mask = \
+                smc_reader.get_keypoints2d(device, device_id)
+
+            if self.keypoints2d_humman_mask is None:
+                self.keypoints2d_humman_mask = keypoints2d_humman_mask
+            assert np.allclose(self.keypoints2d_humman_mask,
+                               keypoints2d_humman_mask)
+
+            keypoints2d_humman_.append(keypoints2d_humman)
+
+            # get keypoints3d (all frames)
+            keypoints3d_humman, keypoints3d_humman_mask = \
+                smc_reader.get_keypoints3d(device, device_id)
+
+            if self.keypoints3d_humman_mask is None:
+                self.keypoints3d_humman_mask = keypoints3d_humman_mask
+            assert np.allclose(self.keypoints3d_humman_mask,
+                               keypoints3d_humman_mask)
+
+            # root-align keypoints3d
+            left_hip_keypoints = \
+                keypoints3d_humman[:, [self.left_hip_idx_humman], :3]
+            right_hip_keypoints = \
+                keypoints3d_humman[:, [self.right_hip_idx_humman], :3]
+            root_keypoints = \
+                (left_hip_keypoints + right_hip_keypoints) / 2.0
+            keypoints3d_humman[..., :3] = \
+                keypoints3d_humman[..., :3] - root_keypoints
+            keypoints3d_humman_.append(keypoints3d_humman)
+
+            # get smpl (all frames)
+            smpl_dict = smc_reader.get_smpl(device, device_id)
+            smpl_['body_pose'].append(smpl_dict['body_pose'])
+            smpl_['global_orient'].append(smpl_dict['global_orient'])
+            smpl_['transl'].append(smpl_dict['transl'])
+
+            # expand betas
+            betas_expanded = np.tile(smpl_dict['betas'],
+                                     num_frames).reshape(-1, 10)
+            smpl_['betas'].append(betas_expanded)
+
+            # get keypoints derived from SMPL and use them as supervision
+            smpl_keypoints = self._derive_keypoints(
+                **smpl_dict,
+                focal_length=focal_length,
+                image_size=image_size,
+                camera_center=camera_center)
+            keypoints2d_smpl = smpl_keypoints['keypoints2d']
+            keypoints3d_smpl = smpl_keypoints['keypoints3d']
+            keypoints2d_smpl_.append(keypoints2d_smpl)
+            keypoints3d_smpl_.append(keypoints3d_smpl)
+
+            # compute bbox from keypoints2d
+            for kp2d in keypoints2d_smpl:
+                assert kp2d.shape == (self.num_keypoints_smpl, 2)
+                xs, ys = kp2d[:, 0], kp2d[:, 1]
+                xmin = max(np.min(xs), 0)
+                xmax = min(np.max(xs), width - 1)
+                ymin = max(np.min(ys), 0)
+                ymax = min(np.max(ys), height - 1)
+                bbox_xyxy = [xmin, ymin, xmax, ymax]
+                bbox_xyxy = self._bbox_expand(bbox_xyxy, scale_factor=1.2)
+                bbox_xywh = self._xyxy2xywh(bbox_xyxy)
+                bbox_xywh_.append(bbox_xywh)
+
+            # get image paths (smc paths)
+            image_path = os.path.basename(ann_path)
+            for frame_id in range(num_frames):
+                image_id = (device, device_id, frame_id)
+                image_id_.append(image_id)
+                image_path_.append(image_path)
+
+        results = {}
+        if len(kinect_image_path_) > 0:
+            # make kinect human data
+            file_name = \
+                f'humman_{mode}_kinect_ds{self.downsample_ratio}_smpl.npz'
+            results[file_name] = self._make_human_data(
+                kinect_smpl, kinect_image_path_, kinect_image_id_,
+                kinect_bbox_xywh_, kinect_keypoints2d_smpl_,
+                kinect_keypoints3d_smpl_, kinect_keypoints2d_humman_,
+                kinect_keypoints3d_humman_)
+        if len(iphone_image_path_) > 0:
+            # make iphone human data
+            file_name = \
+                f'humman_{mode}_iphone_ds{self.downsample_ratio}_smpl.npz'
+            results[file_name] = self._make_human_data(
+                iphone_smpl, iphone_image_path_, iphone_image_id_,
+                iphone_bbox_xywh_, iphone_keypoints2d_smpl_,
+                iphone_keypoints3d_smpl_, iphone_keypoints2d_humman_,
+                iphone_keypoints3d_humman_)
+        return results
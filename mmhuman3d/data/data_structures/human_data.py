@@ -1,8 +1,19 @@
+import json
 import logging
+import os
 import pickle
 from enum import Enum
 from math import ceil
-from typing import Any, List, Optional, TypeVar, Union, overload
+from typing import (
+    Any,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+    overload,
+)
 
 import numpy as np
 import torch
@@ -101,6 +112,184 @@ class _KeyCheck(Enum):
     ERROR = 2
 
 
+_MMAP_MANIFEST_NAME = 'manifest.json'
+_MMAP_OBJECTS_NAME = 'objects.pkl'
+_MMAP_FORMAT_VERSION = 1
+
+
+def _is_mmap_dir(path: str) -> bool:
+    """Whether path is a directory dumped by HumanData.dump_by_mmap()."""
+    return os.path.isdir(path) and \
+        os.path.isfile(os.path.join(path, _MMAP_MANIFEST_NAME))
+
+
+def _dump_mmap_value(name: str, value: Any, dir_path: str,
+                     objects: dict) -> dict:
+    """Write one value into a mmap directory.
+
+    Numerical arrays and lists of str are saved as raw .npy files, which
+    can be memory-mapped when loading. Other values are collected into
+    objects and pickled together.
+
+    Args:
+        name (str):
+            Name of the value, also the stem of its .npy file.
+        value (Any):
+            Value to write.
+        dir_path (str):
+            Path to the mmap directory.
+        objects (dict):
+            Values which cannot be memory-mapped, keyed by name.
+
+    Returns:
+        dict:
+            Manifest entry of this value.
+    """
+    if isinstance(value, list) and \
+            all(isinstance(element, str) for element in value):
+        array, value_type = np.asarray(value, dtype=str), 'list'
+    elif isinstance(value, np.ndarray):
+        array, value_type = value, 'ndarray'
+    else:
+        array, value_type = None, 'object'
+    # object arrays need pickle, empty and 0-d arrays cannot be mapped
+    if array is None or array.dtype.hasobject or \
+            array.ndim == 0 or array.size == 0:
+        objects[name] = value
+        return {'type': 'object'}
+    file_name = f'{name}.npy'
+    tmp_path = os.path.join(dir_path, f'.{file_name}.tmp')
+    with open(tmp_path, 'wb') as f_writeb:
+        np.save(f_writeb, np.ascontiguousarray(array), allow_pickle=False)
+    # replace instead of truncating, arrays mapped from the old file
+    # stay valid
+    os.replace(tmp_path, os.path.join(dir_path, file_name))
+    return {'type': value_type, 'file': file_name}
+
+
+def _load_mmap_value(name: str, entry: dict, dir_path: str, objects: dict,
+                     mmap_mode: Optional[str]) -> Any:
+    """Read one value written by _dump_mmap_value().
+
+    Args:
+        name (str):
+            Name of the value.
+        entry (dict):
+            Manifest entry of this value.
+        dir_path (str):
+            Path to the mmap directory.
+        objects (dict):
+            Pickled values keyed by name.
+        mmap_mode (Optional[str]):
+            mmap_mode for numpy.load(). None for reading into memory.
+
+    Returns:
+        Any:
+            The value.
+    """
+    if entry['type'] == 'object':
+        return objects[name]
+    array = np.load(
+        os.path.join(dir_path, entry['file']),
+        mmap_mode=mmap_mode,
+        allow_pickle=False)
+    if entry['type'] == 'list':
+        return array.tolist()
+    # a plain ndarray view passes the type check of HumanData
+    return np.asarray(array)
+
+
+def _dump_items_by_mmap(items: Iterable[Tuple[str, Any]],
+                        dir_path: str) -> None:
+    """Dump items into a directory of raw .npy files and a manifest.
+
+    Args:
+        items (Iterable[Tuple[str, Any]]):
+            Pairs of key and value, a value can be a dict of arrays.
+            Items are written one by one, a generator keeps only one value
+            in memory.
+        dir_path (str):
+            Path to the mmap directory.
+    """
+    manifest = {'version': _MMAP_FORMAT_VERSION, 'keys': {}}
+    objects = {}
+    for key, value in items:
+        if isinstance(value, dict):
+            sub_entries = {}
+            for sub_key, sub_value in value.items():
+                sub_entries[sub_key] = _dump_mmap_value(
+                    f'{key}.{sub_key}', sub_value, dir_path, objects)
+            manifest['keys'][key] = {'type': 'dict', 'items': sub_entries}
+        else:
+            manifest['keys'][key] = _dump_mmap_value(key, value, dir_path,
+                                                     objects)
+    with open(os.path.join(dir_path, _MMAP_OBJECTS_NAME), 'wb') as f_writeb:
+        pickle.dump(objects, f_writeb, protocol=pickle.HIGHEST_PROTOCOL)
+    # manifest is written at last, an interrupted dump cannot be loaded
+    with open(os.path.join(dir_path, _MMAP_MANIFEST_NAME), 'w') as f_write:
+        json.dump(manifest, f_write)
+
+
+def _load_dict_by_mmap(dir_path: str, mmap_mode: Optional[str]) -> dict:
+    """Load a dict dumped by _dump_items_by_mmap(). Arrays are memory-mapped,
+    their data will be read only when accessed.
+
+    Args:
+        dir_path (str):
+            Path to the mmap directory.
+        mmap_mode (Optional[str]):
+            mmap_mode for numpy.load(). None for reading into memory.
+
+    Returns:
+        dict:
+            The loaded dict.
+    """
+    with open(os.path.join(dir_path, _MMAP_MANIFEST_NAME), 'r') as f_read:
+        manifest = json.load(f_read)
+    if manifest['version'] > _MMAP_FORMAT_VERSION:
+        raise ValueError('Unsupported mmap HumanData version: ' +
+                         f'{manifest["version"]}.')
+    with open(os.path.join(dir_path, _MMAP_OBJECTS_NAME), 'rb') as f_readb:
+        objects = pickle.load(f_readb)
+    ret_dict = {}
+    for key, entry in manifest['keys'].items():
+        if entry['type'] == 'dict':
+            ret_dict[key] = {
+                sub_key:
+                _load_mmap_value(f'{key}.{sub_key}', sub_entry, dir_path,
+                                 objects, mmap_mode)
+                for sub_key, sub_entry in entry['items'].items()
+            }
+        else:
+            ret_dict[key] = _load_mmap_value(key, entry, dir_path, objects,
+                                             mmap_mode)
+    return ret_dict
+
+
+def _prepare_mmap_dir(dir_path: str, overwrite: bool) -> None:
+    """Check and create the directory for HumanData.dump_by_mmap().
+
+    Args:
+        dir_path (str):
+            Path to the mmap directory.
+        overwrite (bool):
+            Whether to overwrite if there is already a dumped directory.
+
+    Raises:
+        ValueError:
+            dir_path is an existing file.
+        FileExistsError:
+            When overwrite is False and the directory is not empty.
+    """
+    if os.path.isfile(dir_path):
+        raise ValueError('Not a directory.')
+    if not overwrite:
+        if check_path_existence(dir_path, 'dir') == \
+                Existence.DirectoryExistNotEmpty:
+            raise FileExistsError
+    os.makedirs(dir_path, exist_ok=True)
+
+
 class HumanData(dict):
     logger = None
     SUPPORTED_KEYS = _HumanData_SUPPORTED_KEYS
@@ -135,18 +324,22 @@ class HumanData(dict):
 
     @classmethod
     def fromfile(cls, npz_path: str) -> _HumanData:
-        """Construct a HumanData instance from an npz file.
+        """Construct a HumanData instance from an npz file, or from a
+        directory dumped by dump_by_mmap().
 
         Args:
             npz_path (str):
-                Path to a dumped npz file.
+                Path to a dumped npz file or mmap directory.
 
         Returns:
             HumanData:
                 A HumanData instance load from file.
         """
         ret_human_data = cls()
-        ret_human_data.load(npz_path)
+        if _is_mmap_dir(npz_path):
+            ret_human_data.load_by_mmap(npz_path)
+        else:
+            ret_human_data.load(npz_path)
         return ret_human_data
 
     @classmethod
@@ -1114,6 +1307,112 @@ class HumanData(dict):
             self.update(tmp_data_dict)
             self.__set_default_values__()
 
+    def dump_by_mmap(self, dir_path: str, overwrite: bool = True) -> None:
+        """Dump keys and items to a directory of uncompressed .npy files,
+        which can be memory-mapped by load_by_mmap(). Values that cannot be
+        mapped are pickled together in the same directory.
+
+        Args:
+            dir_path (str):
+                Path to the dumped directory.
+            overwrite (bool, optional):
+                Whether to overwrite if there is already a dumped directory.
+                Defaults to True.
+
+        Raises:
+            ValueError:
+                dir_path is an existing file.
+            FileExistsError:
+                When overwrite is False and the directory is not empty.
+        """
+        _prepare_mmap_dir(dir_path, overwrite)
+        dict_to_dump = {
+            '__key_strict__': self.__key_strict__,
+            '__data_len__': self.__data_len__,
+            '__keypoints_compressed__': self.__keypoints_compressed__,
+        }
+        dict_to_dump.update(self)
+        _dump_items_by_mmap(dict_to_dump.items(), dir_path)
+
+    def load_by_mmap(self, dir_path: str, mmap_mode: str = 'c') -> None:
+        """Load data from dir_path and update them to self. Arrays are
+        memory-mapped, only the pages accessed are read from disk and they
+        are shared among processes, e.g., dataloader workers.
+
+        When a HumanData Instance was dumped by
+        self.dump_by_mmap() or converted by convert_npz_to_mmap(),
+        use this to load.
+        Args:
+            dir_path (str):
+                Path to a dumped directory.
+            mmap_mode (str, optional):
+                mmap_mode for numpy.load(). 'c' for copy-on-write,
+                in-place edits are kept in memory and never written to
+                disk. 'r' for read-only. None for reading into memory.
+                Defaults to 'c'.
+        """
+        tmp_data_dict = _load_dict_by_mmap(dir_path, mmap_mode)
+        supported_keys = self.__class__.SUPPORTED_KEYS
+        for key, value in list(tmp_data_dict.items()):
+            if key in supported_keys and value is not None and\
+                    type(value) != supported_keys[key]['type']:
+                value = supported_keys[key]['type'](value)
+            if value is None:
+                tmp_data_dict.pop(key)
+            elif key.startswith('__') and key.endswith('__'):
+                self.__setattr__(key, value)
+                # pop the attributes to keep dict clean
+                tmp_data_dict.pop(key)
+            elif key == 'bbox_xywh' and value.shape[1] == 4:
+                value = np.hstack([value, np.ones([value.shape[0], 1])])
+                tmp_data_dict[key] = value
+            else:
+                tmp_data_dict[key] = value
+        self.update(tmp_data_dict)
+        self.__set_default_values__()
+
+    @classmethod
+    def convert_npz_to_mmap(cls,
+                            npz_path: str,
+                            dir_path: str,
+                            overwrite: bool = True) -> None:
+        """Convert a file dumped by dump() into a directory for
+        load_by_mmap(). Keys are decompressed and written one by one, only
+        one key is held in memory at a time.
+
+        Args:
+            npz_path (str):
+                Path to a dumped npz file.
+            dir_path (str):
+                Path to the converted directory.
+            overwrite (bool, optional):
+                Whether to overwrite if there is already a dumped directory.
+                Defaults to True.
+
+        Raises:
+            ValueError:
+                dir_path is an existing file.
+            FileExistsError:
+                When overwrite is False and the directory is not empty.
+        """
+        _prepare_mmap_dir(dir_path, overwrite)
+        supported_keys = cls.SUPPORTED_KEYS
+
+        def _iter_npz_items(npz_file):
+            for key in npz_file.files:
+                value = npz_file[key]
+                if len(value.shape) == 0:
+                    # value is not an ndarray before dump
+                    value = value.item()
+                elif key in supported_keys and\
+                        supported_keys[key]['type'] == list:
+                    # lists are saved as arrays by np.savez_compressed
+                    value = value.tolist()
+                yield key, value
+
+        with np.load(npz_path, allow_pickle=True) as npz_file:
+            _dump_items_by_mmap(_iter_npz_items(npz_file), dir_path)
+
     def __set_default_values__(self) -> None:
         """For older versions of HumanData, call this method to apply missing
         values (also attributes)."""
@@ -1,4 +1,5 @@
-from typing import List
+from collections import OrderedDict
+from typing import Any, List
 
 import numpy as np
 
@@ -7,29 +8,79 @@ from mmhuman3d.utils.path_utils import (
     check_path_existence,
     check_path_suffix,
 )
-from .human_data import HumanData
+from .human_data import (
+    HumanData,
+    _dump_items_by_mmap,
+    _is_mmap_dir,
+    _load_dict_by_mmap,
+    _prepare_mmap_dir,
+)
 
 
 class HumanDataCacheReader():
 
-    def __init__(self, npz_path: str):
+    def __init__(self, npz_path: str, max_cached_slices: int = 8):
+        """Read HumanData slices from a cache written by
+        HumanDataCacheWriter. Both the compressed npz file and the
+        uncompressed directory written by dump_by_mmap() are supported.
+
+        Args:
+            npz_path (str):
+                Path to a cache npz file or mmap directory.
+            max_cached_slices (int, optional):
+                How many decoded slices are kept in the LRU of each
+                process. 0 for no cache. Defaults to 8.
+        """
         self.npz_path = npz_path
-        npz_file = np.load(npz_path, allow_pickle=True)
-        self.slice_size = npz_file['slice_size'].item()
-        self.data_len = npz_file['data_len'].item()
-        self.keypoints_info = npz_file['keypoints_info'].item()
-        self.non_sliced_data = None
+        self.max_cached_slices = max_cached_slices
+        self.cached_slices = OrderedDict()
         self.npz_file = None
+        self.non_sliced_data = None
+        if _is_mmap_dir(npz_path):
+            # arrays are mapped, rows are read when a slice is decoded
+            mmap_dict = _load_dict_by_mmap(npz_path, mmap_mode='r')
+            self.slice_size = mmap_dict.pop('__slice_size__')
+            self.data_len = mmap_dict.pop('__data_len__')
+            self.keypoints_info = mmap_dict.pop('__keypoints_info__')
+            self.non_sliced_data = mmap_dict.pop('__non_sliced_data__')
+            self.list_keys = set(mmap_dict.pop('__list_keys__'))
+            mmap_dict.pop('__key_strict__')
+            self.sliced_values = mmap_dict
+        else:
+            with np.load(npz_path, allow_pickle=True) as npz_file:
+                self.slice_size = npz_file['slice_size'].item()
+                self.data_len = npz_file['data_len'].item()
+                self.keypoints_info = npz_file['keypoints_info'].item()
+            self.list_keys = None
+            self.sliced_values = None
 
     def __del__(self):
-        if self.npz_file is not None:
+        if getattr(self, 'npz_file', None) is not None:
             self.npz_file.close()
 
     def get_item(self, index, required_keys: List[str] = []):
-        if self.npz_file is None:
-            self.npz_file = np.load(self.npz_path, allow_pickle=True)
-        cache_key = str(int(index / self.slice_size))
-        base_data = self.npz_file[cache_key].item()
+        """Get the slice which contains the index-th frame. Decoded slices
+        are cached, the returned HumanData is shared between calls and
+        shall be treated as read-only.
+
+        Args:
+            index (int):
+                Index of the frame.
+            required_keys (List[str], optional):
+                Non-sliced keys to be added to the returned slice.
+                Defaults to [].
+
+        Returns:
+            HumanData:
+                A compressed HumanData of the slice,
+                index % slice_size is the index of the frame in it.
+        """
+        slice_index = int(index / self.slice_size)
+        lru_key = (slice_index, tuple(required_keys))
+        if lru_key in self.cached_slices:
+            self.cached_slices.move_to_end(lru_key)
+            return self.cached_slices[lru_key]
+        base_data = self.__decode_slice__(slice_index)
         base_data.update(self.keypoints_info)
         for key in required_keys:
             non_sliced_value = self.get_non_sliced_data(key)
@@ -39,22 +90,71 @@ class HumanDataCacheReader():
                 base_data[key].update(non_sliced_value)
             else:
                 base_data[key] = non_sliced_value
+        # dict constructor bypasses the value check of HumanData
         ret_human_data = HumanData.new(source_dict=base_data)
         # data in cache is compressed
         ret_human_data.__keypoints_compressed__ = True
         # set missing values and attributes by default method
         ret_human_data.__set_default_values__()
+        if self.max_cached_slices > 0:
+            self.cached_slices[lru_key] = ret_human_data
+            if len(self.cached_slices) > self.max_cached_slices:
+                self.cached_slices.popitem(last=False)
         return ret_human_data
 
     def get_non_sliced_data(self, key: str):
         if self.non_sliced_data is None:
             if self.npz_file is None:
-                npz_file = np.load(self.npz_path, allow_pickle=True)
-                self.non_sliced_data = npz_file['non_sliced_data'].item()
+                with np.load(self.npz_path, allow_pickle=True) as npz_file:
+                    self.non_sliced_data = \
+                        npz_file['non_sliced_data'].item()
             else:
                 self.non_sliced_data = self.npz_file['non_sliced_data'].item()
         return self.non_sliced_data[key]
 
+    def __decode_slice__(self, slice_index: int) -> dict:
+        """Decode a slice into a new dict of values.
+
+        Args:
+            slice_index (int):
+                Index of the slice.
+
+        Returns:
+            dict:
+                Sliced values, which do not share memory with the cache.
+        """
+        if self.sliced_values is None:
+            # open in the process which reads, e.g. a dataloader worker
+            if self.npz_file is None:
+                self.npz_file = np.load(self.npz_path, allow_pickle=True)
+            return self.npz_file[str(slice_index)].item()
+        slice_start = slice_index * self.slice_size
+        slice_end = min(slice_start + self.slice_size, self.data_len)
+        slice_range = slice(slice_start, slice_end)
+        ret_dict = {}
+        for key, value in self.sliced_values.items():
+            if isinstance(value, dict):
+                ret_dict[key] = {
+                    sub_key:
+                    self.__get_rows__(f'{key}.{sub_key}', sub_value,
+                                      slice_range)
+                    for sub_key, sub_value in value.items()
+                }
+            else:
+                ret_dict[key] = self.__get_rows__(key, value, slice_range)
+        return ret_dict
+
+    def __get_rows__(self, name: str, value: Any, slice_range: slice) -> Any:
+        """Read a range of rows from a mapped value."""
+        rows = value[slice_range]
+        if name in self.list_keys:
+            return rows.tolist() if isinstance(rows, np.ndarray) \
+                else list(rows)
+        elif isinstance(rows, np.ndarray):
+            return np.array(rows)
+        else:
+            return rows
+
 
 class HumanDataCacheWriter():
 
@@ -104,3 +204,62 @@ class HumanDataCacheWriter():
         }
         dict_to_dump.update(self.sliced_data)
         np.savez_compressed(npz_path, **dict_to_dump)
+
+    def dump_by_mmap(self, dir_path: str, overwrite: bool = True) -> None:
+        """Dump keys and items to a directory of uncompressed .npy files.
+        Slices of a key are concatenated into one array, so every slice
+        lies at a fixed offset and can be read by HumanDataCacheReader
+        without decompression.
+
+        Args:
+            dir_path (str):
+                Path to the dumped directory.
+            overwrite (bool, optional):
+                Whether to overwrite if there is already a dumped directory.
+                Defaults to True.
+
+        Raises:
+            ValueError:
+                dir_path is an existing file.
+            FileExistsError:
+                When overwrite is False and the directory is not empty.
+        """
+        _prepare_mmap_dir(dir_path, overwrite)
+        slice_list = [
+            self.sliced_data[slice_key]
+            for slice_key in sorted(self.sliced_data.keys(), key=int)
+        ]
+        list_keys = []
+
+        def _concat_slices(name, values):
+            if isinstance(values[0], np.ndarray):
+                return np.concatenate(values, axis=0)
+            concat_list = [element for value in values for element in value]
+            list_keys.append(name)
+            if all(isinstance(element, str) for element in concat_list):
+                # a str array can be mapped, while a list is pickled
+                return np.asarray(concat_list, dtype=str)
+            return concat_list
+
+        def _iter_items():
+            first_slice = slice_list[0] if len(slice_list) > 0 else {}
+            for key, value in first_slice.items():
+                if isinstance(value, dict):
+                    yield key, {
+                        sub_key:
+                        _concat_slices(
+                            f'{key}.{sub_key}',
+                            [sliced[key][sub_key] for sliced in slice_list])
+                        for sub_key in value.keys()
+                    }
+                else:
+                    yield key, _concat_slices(
+                        key, [sliced[key] for sliced in slice_list])
+            yield '__slice_size__', self.slice_size
+            yield '__data_len__', self.data_len
+            yield '__keypoints_info__', self.keypoints_info
+            yield '__non_sliced_data__', self.non_sliced_data
+            yield '__key_strict__', self.key_strict
+            yield '__list_keys__', list_keys
+
+        _dump_items_by_mmap(_iter_items(), dir_path)
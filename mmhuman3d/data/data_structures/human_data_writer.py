@@ -0,0 +1,312 @@
+import itertools
+import os
+import pickle
+import shutil
+import tempfile
+from typing import Any, Iterator, Tuple
+
+import numpy as np
+
+from .human_data import HumanData, _dump_items_by_mmap, _prepare_mmap_dir
+
+
+class HumanDataWriter():
+
+    def __init__(self,
+                 out_path: str,
+                 key_strict: bool = False,
+                 compress_keypoints: bool = False,
+                 overwrite: bool = True):
+        """Write a HumanData file frame by frame or chunk by chunk, without
+        holding the whole HumanData in memory.
+
+        Sliced values, e.g. keypoints2d or smpl, are appended to raw
+        buffer files next to out_path, lists like image_path to pickle
+        buffer files, and written into a file loadable by
+        HumanData.fromfile() in finalize(). Values not aligned with frames,
+        e.g. config or keypoints masks, are set by set_value(). Keys and
+        values of the first appended chunk are checked against
+        HumanData.SUPPORTED_KEYS, following chunks are only checked for
+        the same keys and shapes.
+
+        Args:
+            out_path (str):
+                Path to the output. A path ending with '.npz' is written
+                like HumanData.dump(), any other path is a directory
+                written like HumanData.dump_by_mmap().
+            key_strict (bool, optional):
+                Whether to raise error when appending unsupported keys.
+                Defaults to False.
+            compress_keypoints (bool, optional):
+                Whether to remove invalid keypoints by their masks when
+                appending, as HumanData.compress_keypoints_by_mask() does.
+                Masks have to be set before the first append.
+                Defaults to False.
+            overwrite (bool, optional):
+                Whether to overwrite if out_path exists.
+                Defaults to True.
+
+        Raises:
+            FileExistsError:
+                When overwrite is False and out_path exists.
+        """
+        if not overwrite and os.path.exists(out_path):
+            raise FileExistsError
+        self.out_path = out_path
+        self.key_strict = key_strict
+        self.compress_keypoints = compress_keypoints
+        self.overwrite = overwrite
+        self.data_len = 0
+        self.non_sliced_data = {}
+        # key to None, or to sub keys if the value is a dict
+        self.layout = None
+        # buffer files of arrays and lists, keyed by 'key' or 'key.sub_key'
+        self.buffers = {}
+        self.lists = {}
+        self.keypoints_index = {}
+        out_dir = os.path.dirname(os.path.abspath(out_path))
+        os.makedirs(out_dir, exist_ok=True)
+        self.buffer_dir = tempfile.mkdtemp(
+            prefix='.human_data_writer_', dir=out_dir)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.finalize()
+        else:
+            self.close()
+
+    def set_value(self, key: Any, value: Any) -> None:
+        """Set a value that is not aligned with frames.
+
+        Args:
+            key (Any):
+                Key in HumanData.
+            value (Any):
+                Value to the key. A dict is merged with the sliced values
+                appended to the same key.
+
+        Raises:
+            ValueError:
+                A keypoints mask is set after keypoints are appended in
+                compress_keypoints mode.
+        """
+        if not isinstance(value, dict):
+            # check key and value by HumanData
+            HumanData.new(key_strict=self.key_strict)[key] = value
+        if self.compress_keypoints and self.layout is not None and \
+                key.endswith('_mask') and key[:-len('_mask')] in self.layout:
+            raise ValueError(f'{key} has to be set before appending '
+                             'keypoints in compress_keypoints mode.')
+        self.non_sliced_data[key] = value
+
+    def append_frame(self, frame: dict) -> None:
+        """Append values of a single frame.
+
+        Args:
+            frame (dict):
+                Values of one frame without the temporal dimension, e.g.
+                keypoints2d in shape (K, 3) and image_path in str.
+        """
+        self.append(self.__class__.__add_temporal_dim__(frame))
+
+    def append(self, chunk: dict) -> None:
+        """Append values of several frames.
+
+        Args:
+            chunk (dict):
+                Values with the same temporal length, e.g. keypoints2d in
+                shape (N, K, 3) and image_path in a list of N str. The keys
+                must be the same for all chunks.
+
+        Raises:
+            ValueError:
+                Keys, shapes or temporal lengths do not match.
+        """
+        if self.layout is None:
+            self.__init_layout__(chunk)
+        if set(chunk.keys()) != set(self.layout.keys()):
+            raise ValueError(f'Keys {sorted(chunk.keys())} do not match '
+                             f'the first chunk {sorted(self.layout.keys())}.')
+        leaves = []
+        for key, sub_keys in self.layout.items():
+            value = chunk[key]
+            if sub_keys is None:
+                leaves.append((key, value))
+                continue
+            if not isinstance(value, dict) or \
+                    set(value.keys()) != set(sub_keys):
+                raise ValueError(f'Sub keys of {key} do not match '
+                                 f'the first chunk {sub_keys}.')
+            for sub_key in sub_keys:
+                leaves.append((f'{key}.{sub_key}', value[sub_key]))
+        # check all the values before writing any of them
+        arrays = []
+        chunk_lens = set()
+        for name, value in leaves:
+            if name in self.lists:
+                arrays.append(value)
+                chunk_lens.add(len(value))
+                continue
+            buffer = self.buffers[name]
+            array = np.asarray(value, dtype=buffer['dtype'])
+            if name in self.keypoints_index:
+                array = array[:, self.keypoints_index[name]]
+            if array.ndim == 0 or array.shape[1:] != buffer['shape']:
+                raise ValueError(
+                    f'Shape of {name} {array.shape} does not match '
+                    f'the first chunk (-1, *{buffer["shape"]}).')
+            arrays.append(array)
+            chunk_lens.add(len(array))
+        if len(chunk_lens) > 1:
+            raise ValueError('Values in a chunk have different temporal '
+                             f'lengths {sorted(chunk_lens)}.')
+        for (name, _), array in zip(leaves, arrays):
+            if name in self.lists:
+                pickle.dump(
+                    list(array),
+                    self.lists[name]['file'],
+                    protocol=pickle.HIGHEST_PROTOCOL)
+            else:
+                np.ascontiguousarray(array).tofile(self.buffers[name]['file'])
+        self.data_len += chunk_lens.pop() if chunk_lens else 0
+
+    def finalize(self) -> None:
+        """Write all the values into out_path and remove the buffers."""
+        self.__close_buffers__()
+        dict_to_dump = {
+            '__key_strict__': self.key_strict,
+            '__data_len__': self.data_len if self.layout is not None else -1,
+            '__keypoints_compressed__': self.compress_keypoints,
+        }
+        dict_to_dump.update(self.non_sliced_data)
+        if self.out_path.endswith('.npz'):
+            for key, value in self.__iter_sliced_items__():
+                # values in dicts are pickled, read them into memory first
+                if isinstance(value, dict):
+                    value = {
+                        sub_key:
+                        np.array(sub_value) if isinstance(
+                            sub_value, np.memmap) else sub_value
+                        for sub_key, sub_value in value.items()
+                    }
+                dict_to_dump[key] = value
+            np.savez_compressed(self.out_path, **dict_to_dump)
+        else:
+            # sliced values are read one by one while being dumped
+            items = (
+                item for item in dict_to_dump.items()
+                if item[0] not in (self.layout or {}))
+            _prepare_mmap_dir(self.out_path, self.overwrite)
+            _dump_items_by_mmap(
+                itertools.chain(items, self.__iter_sliced_items__()),
+                self.out_path)
+        self.close()
+
+    def close(self) -> None:
+        """Remove the buffers without writing out_path."""
+        self.__close_buffers__()
+        if os.path.isdir(self.buffer_dir):
+            shutil.rmtree(self.buffer_dir)
+
+    def __init_layout__(self, chunk: dict) -> None:
+        """Check the first chunk by HumanData and create buffers for its
+        values."""
+        human_data = HumanData.new(key_strict=self.key_strict)
+        supported_keys = HumanData.SUPPORTED_KEYS
+        layout = {}
+        for key, value in chunk.items():
+            if key in supported_keys and \
+                    'dim' in supported_keys[key] and \
+                    supported_keys[key]['dim'] is None:
+                raise ValueError(f'{key} is not sliced by frames, '
+                                 'set it by set_value().')
+            human_data[key] = value
+            if isinstance(value, dict):
+                layout[key] = list(value.keys())
+                for sub_key, sub_value in value.items():
+                    self.__init_buffer__(f'{key}.{sub_key}', sub_value)
+            else:
+                layout[key] = None
+                self.__init_buffer__(key, value)
+        self.layout = layout
+
+    def __iter_sliced_items__(self) -> Iterator[Tuple[str, Any]]:
+        """Yield the keys and the buffered values of the sliced values."""
+        for key, sub_keys in (self.layout or {}).items():
+            if sub_keys is None:
+                yield key, self.__get_sliced_value__(key)
+            else:
+                value = dict(self.non_sliced_data.get(key, {}))
+                for sub_key in sub_keys:
+                    value[sub_key] = self.__get_sliced_value__(
+                        f'{key}.{sub_key}')
+                yield key, value
+
+    def __init_buffer__(self, name: str, value: Any) -> None:
+        """Create the buffer of a sliced value."""
+        if isinstance(value, (list, tuple)):
+            path = os.path.join(self.buffer_dir, f'{name}.pkl')
+            self.lists[name] = dict(path=path, file=open(path, 'ab'))
+            return
+        array = np.asarray(value)
+        shape = array.shape[1:]
+        if self.compress_keypoints and 'keypoints' in name and \
+                '_mask' not in name:
+            mask_key = f'{name}_mask'
+            if mask_key not in self.non_sliced_data:
+                raise ValueError(f'Set {mask_key} before appending {name} '
+                                 'in compress_keypoints mode.')
+            mask = np.asarray(self.non_sliced_data[mask_key])
+            self.keypoints_index[name] = np.where(mask == 1)[0]
+            shape = (len(self.keypoints_index[name]), *shape[1:])
+        path = os.path.join(self.buffer_dir, f'{name}.bin')
+        self.buffers[name] = dict(
+            path=path, dtype=array.dtype, shape=shape, file=open(path, 'ab'))
+
+    def __close_buffers__(self) -> None:
+        """Flush and close the buffer files."""
+        for buffer in itertools.chain(self.buffers.values(),
+                                      self.lists.values()):
+            if not buffer['file'].closed:
+                buffer['file'].close()
+
+    def __get_sliced_value__(self, name: str) -> Any:
+        """Map the buffer of a sliced value, rows are read when written to
+        the output."""
+        if name in self.lists:
+            values = []
+            with open(self.lists[name]['path'], 'rb') as f:
+                # one pickled list per appended chunk
+                while True:
+                    try:
+                        values.extend(pickle.load(f))
+                    except EOFError:
+                        break
+            return values
+        buffer = self.buffers[name]
+        shape = (self.data_len, *buffer['shape'])
+        if self.data_len == 0 or 0 in buffer['shape']:
+            return np.zeros(shape, dtype=buffer['dtype'])
+        return np.memmap(
+            buffer['path'], dtype=buffer['dtype'], mode='r', shape=shape)
+
+    @classmethod
+    def __add_temporal_dim__(cls, frame: dict) -> dict:
+        """Convert values of a single frame to a chunk of length 1."""
+        supported_keys = HumanData.SUPPORTED_KEYS
+        chunk = {}
+        for key, value in frame.items():
+            if isinstance(value, dict):
+                chunk[key] = {
+                    sub_key: np.asarray(sub_value)[None]
+                    for sub_key, sub_value in value.items()
+                }
+            elif key in supported_keys and \
+                    supported_keys[key]['type'] == list:
+                chunk[key] = [value]
+            else:
+                chunk[key] = np.asarray(value)[None]
+        return chunk
@@ -5,7 +5,12 @@ from typing import Any, Union
 import numpy as np
 from mmcv.utils import print_log
 
-from mmhuman3d.data.data_structures.human_data import HumanData, _HumanData
+from mmhuman3d.data.data_structures.human_data import (
+    HumanData,
+    _dump_items_by_mmap,
+    _HumanData,
+    _prepare_mmap_dir,
+)
 from mmhuman3d.utils.path_utils import (
     Existence,
     check_path_existence,
@@ -164,6 +169,33 @@ class MultiHumanData(HumanData):
             self.update(tmp_data_dict)
             self.__set_default_values__()
 
+    def dump_by_mmap(self, dir_path: str, overwrite: bool = True) -> None:
+        """Dump keys and items to a directory of uncompressed .npy files,
+        which can be memory-mapped by load_by_mmap().
+
+        Args:
+            dir_path (str):
+                Path to the dumped directory.
+            overwrite (bool, optional):
+                Whether to overwrite if there is already a dumped directory.
+                Defaults to True.
+
+        Raises:
+            ValueError:
+                dir_path is an existing file.
+            FileExistsError:
+                When overwrite is False and the directory is not empty.
+        """
+        _prepare_mmap_dir(dir_path, overwrite)
+        dict_to_dump = {
+            '__key_strict__': self.__key_strict__,
+            '__data_len__': self.__data_len__,
+            '__instance_num__': self.__instance_num__,
+            '__keypoints_compressed__': self.__keypoints_compressed__,
+        }
+        dict_to_dump.update(self)
+        _dump_items_by_mmap(dict_to_dump.items(), dir_path)
+
     @property
     def instance_num(self) -> int:
         """Get how many human are there in this MultiHumanData instance. In
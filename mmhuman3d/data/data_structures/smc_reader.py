@@ -1,4 +1,6 @@
 import json
+import os
+from collections import OrderedDict
 
 import cv2
 import h5py
@@ -420,6 +422,55 @@ class SMCReader:
         return cv2.cvtColor(
             cv2.imdecode(color_array, cv2.IMREAD_COLOR), cv2.COLOR_BGR2RGB)
 
+    def get_color_frame(self,
+                        device,
+                        device_id,
+                        frame_id,
+                        vertical=True,
+                        to_rgb=True):
+        """Decode one frame from Kinect RGB or iPhone RGB camera.
+
+        Unlike :meth:`get_color`, only the encoded bytes of the frame are
+        read, and the frame is neither stacked nor checked against the
+        number of frames.
+
+        Args:
+            device (str):
+                Device name, should be Kinect or iPhone.
+            device_id (int):
+                Device ID, starts from 0.
+            frame_id (int):
+                Frame ID, starts from 0.
+            vertical (bool, optional):
+                Only applicable to iPhone as device
+                iPhone assumes horizontal orientation
+                if True, convert data to vertical orientation
+                Defaults to True.
+            to_rgb (bool, optional):
+                Whether to return an RGB image, otherwise the BGR image
+                decoded by OpenCV is returned without conversion.
+                Defaults to True.
+
+        Returns:
+            img (ndarray):
+                An ndarray in shape [height, width, channels].
+        """
+        assert device in {
+            'Kinect', 'iPhone'
+        }, f'Undefined device: {device}, should be "Kinect" or "iPhone"'
+        color_array = self.smc[device][str(device_id)]['Color'][str(
+            frame_id)][()]
+        img = cv2.imdecode(color_array, cv2.IMREAD_COLOR)
+        if to_rgb:
+            img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        if device == 'iPhone' and vertical:
+            img = cv2.rotate(img, cv2.ROTATE_90_CLOCKWISE)
+        return img
+
+    def close(self):
+        """Close the SMC file."""
+        self.smc.close()
+
     def get_num_kinect(self):
         """Get the number of Kinect devices.
 
@@ -1018,3 +1069,70 @@ class SMCReader:
                 betas=betas)
 
             return smpl_dict
+
+
+class SMCReaderPool:
+    """A least recently used pool of opened SMC files.
+
+    Opening an SMC file reads its attributes, which costs more than decoding
+    a frame. Readers are kept open and shared by the samples from the same
+    file, the least recently used one is closed when the pool is full.
+
+    HDF5 handles must not be shared by processes. The pool is emptied when
+    it is pickled, e.g. by spawned DataLoader workers, and when it is used
+    by a process other than the one opening the files, e.g. by forked
+    DataLoader workers, so that each worker opens its own files.
+
+    Args:
+        capacity (int, optional):
+            Max number of opened files. Defaults to 8.
+    """
+
+    def __init__(self, capacity=8):
+        assert capacity > 0, 'capacity should be positive.'
+        self.capacity = capacity
+        self.readers = OrderedDict()
+        self.pid = os.getpid()
+
+    def get(self, file_path):
+        """Get the reader of an SMC file, open the file if not in the pool.
+
+        Args:
+            file_path (str):
+                Path to an SMC file.
+
+        Returns:
+            SMCReader:
+                The reader of the file, which should not be closed by the
+                caller.
+        """
+        if self.pid != os.getpid():
+            # the handles are copied from the parent process by fork,
+            # drop them and open the files again in this process
+            self.readers = OrderedDict()
+            self.pid = os.getpid()
+        reader = self.readers.get(file_path, None)
+        if reader is not None:
+            self.readers.move_to_end(file_path)
+            return reader
+        while len(self.readers) >= self.capacity:
+            _, expired = self.readers.popitem(last=False)
+            expired.close()
+        reader = SMCReader(file_path)
+        self.readers[file_path] = reader
+        return reader
+
+    def clear(self):
+        """Close all the files in the pool."""
+        if self.pid == os.getpid():
+            for reader in self.readers.values():
+                reader.close()
+        self.readers = OrderedDict()
+
+    def __len__(self):
+        return len(self.readers)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['readers'] = OrderedDict()
+        return state
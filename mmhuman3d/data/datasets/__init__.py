@@ -10,12 +10,12 @@ from .human_video_dataset import HumanVideoDataset
 from .mesh_dataset import MeshDataset
 from .mixed_dataset import MixedDataset
 from .pipelines import Compose
-from .samplers import DistributedSampler
+from .samplers import BlockShuffleSampler, DistributedSampler
 
 __all__ = [
     'BaseDataset', 'HumanImageDataset', 'HumanImageSMPLXDataset',
     'build_dataloader', 'build_dataset', 'Compose', 'DistributedSampler',
     'ConcatDataset', 'RepeatDataset', 'DATASETS', 'PIPELINES', 'MixedDataset',
     'AdversarialDataset', 'MeshDataset', 'HumanVideoDataset',
-    'HybrIKHumanImageDataset', 'PyMAFXHumanImageDataset'
+    'HybrIKHumanImageDataset', 'PyMAFXHumanImageDataset', 'BlockShuffleSampler'
 ]
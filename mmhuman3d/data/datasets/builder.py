@@ -10,7 +10,7 @@ from mmcv.utils import Registry, build_from_cfg
 from torch.utils.data import DataLoader
 from torch.utils.data.dataset import Dataset
 
-from .samplers import DistributedSampler
+from .samplers import DistributedSampler, build_sampler
 
 if platform.system() != 'Windows':
     # https://github.com/pytorch/pytorch/issues/973
@@ -52,6 +52,7 @@ def build_dataloader(dataset: Dataset,
                      round_up: Optional[bool] = True,
                      seed: Optional[Union[int, None]] = None,
                      persistent_workers: Optional[bool] = True,
+                     sampler_cfg: Optional[Union[dict, None]] = None,
                      **kwargs):
     """Build PyTorch DataLoader.
 
@@ -76,13 +77,29 @@ def build_dataloader(dataset: Dataset,
             This allows to maintain the workers Dataset instances alive.
             The argument also has effect in PyTorch>=1.7.0.
             Default: True
+        sampler_cfg (dict | None, optional): Config of the sampler, e.g.,
+            dict(type='BlockShuffleSampler'). If None, DistributedSampler
+            is used in distributed training and no sampler otherwise.
+            Default: None.
         kwargs: any keyword argument to be used to initialize DataLoader
 
     Returns:
         DataLoader: A PyTorch dataloader.
     """
     rank, world_size = get_dist_info()
-    if dist:
+    if sampler_cfg is not None:
+        sampler = build_sampler(
+            sampler_cfg,
+            default_args=dict(
+                dataset=dataset,
+                num_replicas=world_size if dist else 1,
+                rank=rank if dist else 0,
+                shuffle=shuffle,
+                round_up=round_up))
+        shuffle = False
+        batch_size = samples_per_gpu if dist else num_gpus * samples_per_gpu
+        num_workers = workers_per_gpu if dist else num_gpus * workers_per_gpu
+    elif dist:
         sampler = DistributedSampler(
             dataset, world_size, rank, shuffle=shuffle, round_up=round_up)
         shuffle = False
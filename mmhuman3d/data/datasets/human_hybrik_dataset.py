@@ -93,8 +93,7 @@ class HybrIKHumanImageDataset(BaseDataset, metaclass=ABCMeta):
     def load_annotations(self):
         """Load annotations."""
         self.get_annotation_file()
-        data = HumanData()
-        data.load(self.ann_file)
+        data = HumanData.fromfile(self.ann_file)
 
         self.image_path = data['image_path']
         self.num_data = len(self.image_path)
@@ -156,57 +155,70 @@ class HybrIKHumanImageDataset(BaseDataset, metaclass=ABCMeta):
         except KeyError:
             self.root_cam = np.zeros((self.num_data, 3))
 
-        self.data_infos = []
-
-        for idx in range(self.num_data):
-            info = {}
-            info['ann_info'] = {}
-            info['img_prefix'] = None
-            info['image_path'] = os.path.join(self.data_prefix, 'datasets',
-                                              self.dataset_name,
-                                              self.image_path[idx])
-            bbox_xyxy = self.bbox_xyxy[idx]
-            info['bbox'] = bbox_xyxy[:4]
-            bbox_xywh = xyxy2xywh(bbox_xyxy)
-            center, scale = box2cs(
-                bbox_xywh, aspect_ratio=1.0, bbox_scale_factor=1.25)
-
-            info['center'] = center
-            info['scale'] = scale
-            info['rotation'] = 0
-            info['ann_info']['dataset_name'] = self.dataset_name
-            info['ann_info']['height'] = self.height[idx]
-            info['ann_info']['width'] = self.width[idx]
-            info['depth_factor'] = float(self.depth_factor[idx])
-            info['has_smpl'] = int(self.has_smpl[idx])
-            info['joint_root'] = self.root_cam[idx].astype(np.float32)
-            info['intrinsic_param'] = self.intrinsic[idx].astype(np.float32)
-            info['target_twist'] = self.target_twist[idx].astype(
-                np.float32)  # twist_phi
-            info['target_twist_weight'] = self.target_twist_weight[idx].astype(
-                np.float32)
-            info['keypoints3d'] = self.keypoints3d[idx]
-            info['keypoints3d_vis'] = self.keypoints3d_vis[idx]
-
-            if info['has_smpl']:
-                info['pose'] = self.thetas[idx]
-                info['beta'] = self.betas[idx].astype(np.float32)
-                info['keypoints3d_relative'] = self.keypoints3d_relative[idx]
-                info['keypoints3d17'] = self.keypoints3d17[idx]
-                info['keypoints3d17_vis'] = self.keypoints3d17_vis[idx]
-                info['keypoints3d17_relative'] = self.keypoints3d17_relative[
-                    idx]
-
-                if self.test_mode:
-                    info['joint_relative_17'] = self.keypoints3d17_relative[
-                        idx].astype(np.float32)
+        # per-sample fields are kept as arrays and gathered into a dict in
+        # prepare_raw_data(), instead of one dict per sample
+        self.bbox_xyxy = np.asarray(self.bbox_xyxy)
+        self.center, self.scale = box2cs(
+            xyxy2xywh(self.bbox_xyxy),
+            aspect_ratio=1.0,
+            bbox_scale_factor=1.25)
+        self.root_cam = np.asarray(self.root_cam).astype(np.float32)
+        self.intrinsic = np.asarray(self.intrinsic).astype(np.float32)
+        self.target_twist = np.asarray(self.target_twist).astype(np.float32)
+        self.target_twist_weight = np.asarray(self.target_twist_weight).astype(
+            np.float32)
+
+    def prepare_raw_data(self, idx: int):
+        """Get item from the loaded annotations."""
+        info = {}
+        info['ann_info'] = {}
+        info['img_prefix'] = None
+        info['image_path'] = os.path.join(self.data_prefix, 'datasets',
+                                          self.dataset_name,
+                                          self.image_path[idx])
+        info['bbox'] = self.bbox_xyxy[idx, :4].copy()
+        info['center'] = self.center[idx].copy()
+        info['scale'] = self.scale[idx].copy()
+        info['rotation'] = 0
+        info['ann_info']['dataset_name'] = self.dataset_name
+        info['ann_info']['height'] = self.height[idx]
+        info['ann_info']['width'] = self.width[idx]
+        info['depth_factor'] = float(self.depth_factor[idx])
+        info['has_smpl'] = int(self.has_smpl[idx])
+        info['joint_root'] = self.root_cam[idx].copy()
+        info['intrinsic_param'] = self.intrinsic[idx].copy()
+        info['target_twist'] = self.target_twist[idx].copy()  # twist_phi
+        info['target_twist_weight'] = self.target_twist_weight[idx].copy()
+        info['keypoints3d'] = self.keypoints3d[idx].copy()
+        info['keypoints3d_vis'] = self.keypoints3d_vis[idx].copy()
+
+        if info['has_smpl']:
+            info['pose'] = self.thetas[idx].copy()
+            info['beta'] = self.betas[idx].copy()
+            info['keypoints3d_relative'] = \
+                self.keypoints3d_relative[idx].copy()
+            info['keypoints3d17'] = self.keypoints3d17[idx].copy()
+            info['keypoints3d17_vis'] = self.keypoints3d17_vis[idx].copy()
+            info['keypoints3d17_relative'] = \
+                self.keypoints3d17_relative[idx].copy()
 
-            else:
-                if self.test_mode:
-                    info['joint_relative_17'] = self.keypoints3d_cam[
-                        idx].astype(np.float32)
+            if self.test_mode:
+                info['joint_relative_17'] = self.keypoints3d17_relative[
+                    idx].astype(np.float32)
+
+        else:
+            if self.test_mode:
+                info['joint_relative_17'] = self.keypoints3d_cam[idx].astype(
+                    np.float32)
+
+        info['dataset_name'] = self.dataset_name
+        info['sample_idx'] = idx
+        return info
 
-            self.data_infos.append(info)
+    def prepare_data(self, idx: int):
+        """Generate and transform data."""
+        info = self.prepare_raw_data(idx)
+        return self.pipeline(info)
 
     def evaluate(self,
                  outputs: list,
@@ -281,9 +293,22 @@ class HybrIKHumanImageDataset(BaseDataset, metaclass=ABCMeta):
         with open(res_file, 'w') as f:
             json.dump(keypoints, f, sort_keys=True, indent=4)
 
+    def _get_joint_relative_17(self):
+        """Get the 17 ground-truth keypoints used in evaluation, which
+        prepare_raw_data() returns as 'joint_relative_17' in test mode."""
+        has_smpl = self.has_smpl.astype(bool)
+        if has_smpl.all():
+            joints = self.keypoints3d17_relative
+        elif not has_smpl.any():
+            joints = self.keypoints3d_cam
+        else:
+            joints = np.where(has_smpl[:, None,
+                                       None], self.keypoints3d17_relative,
+                              self.keypoints3d_cam)
+        return joints.astype(np.float32)
+
     def _parse_result(self, res, mode='keypoint'):
         """Parse results."""
-        gts = self.data_infos
         if mode == 'vertice':
             pred_pose = torch.FloatTensor(res['poses'])
             pred_beta = torch.FloatTensor(res['betas'])
@@ -294,9 +319,8 @@ class HybrIKHumanImageDataset(BaseDataset, metaclass=ABCMeta):
                 pose2rot=False)
             pred_vertices = pred_output['vertices'].detach().cpu().numpy()
 
-            gt_pose = torch.FloatTensor([gt['pose']
-                                         for gt in gts]).view(-1, 72)
-            gt_beta = torch.FloatTensor([gt['beta'] for gt in gts])
+            gt_pose = torch.FloatTensor(self.thetas).view(-1, 72)
+            gt_beta = torch.FloatTensor(self.betas)
             gt_output = self.body_model(
                 betas=gt_beta,
                 body_pose=gt_pose[:, 3:],
@@ -316,8 +340,7 @@ class HybrIKHumanImageDataset(BaseDataset, metaclass=ABCMeta):
             if self.dataset_name == 'mpi_inf_3dhp':
                 _, hp3d_idxs, _ = get_mapping('human_data',
                                               'mpi_inf_3dhp_test')
-                gt_keypoints3d = np.array(
-                    [gt['joint_relative_17'][hp3d_idxs] for gt in gts])
+                gt_keypoints3d = self._get_joint_relative_17()[:, hp3d_idxs]
                 joint_mapper = [
                     14, 11, 12, 13, 8, 9, 10, 15, 1, 16, 0, 5, 6, 7, 2, 3, 4
                 ]
@@ -325,8 +348,7 @@ class HybrIKHumanImageDataset(BaseDataset, metaclass=ABCMeta):
                     (len(gt_keypoints3d), len(joint_mapper)))
             else:
                 _, h36m_idxs, _ = get_mapping('human_data', 'h36m')
-                gt_keypoints3d = np.array(
-                    [gt['joint_relative_17'][h36m_idxs] for gt in gts])
+                gt_keypoints3d = self._get_joint_relative_17()[:, h36m_idxs]
                 joint_mapper = [
                     6, 5, 4, 1, 2, 3, 16, 15, 14, 11, 12, 13, 8, 10
                 ]
@@ -17,6 +17,9 @@ from mmhuman3d.core.conventions.keypoints_mapping import (
     get_mapping,
 )
 from mmhuman3d.core.evaluation import (
+    align_points,
+    build_metric_accumulator,
+    ihmr_binned_error,
     keypoint_3d_auc,
     keypoint_3d_pck,
     keypoint_mpjpe,
@@ -32,6 +35,22 @@ from .base_dataset import BaseDataset
 from .builder import DATASETS
 
 
+def _as_float32(value: Any) -> np.ndarray:
+    """Convert value to a contiguous float32 array, without a copy if it is
+    one already."""
+    return np.ascontiguousarray(value, dtype=np.float32)
+
+
+def _get_values(human_data: dict) -> list:
+    """Get the values of human_data and of its dict values."""
+    values = []
+    for value in dict.values(human_data):
+        values.append(value)
+        if isinstance(value, dict):
+            values.extend(value.values())
+    return values
+
+
 @DATASETS.register_module()
 class HumanImageDataset(BaseDataset, metaclass=ABCMeta):
     """Human Image Dataset.
@@ -58,7 +77,9 @@ class HumanImageDataset(BaseDataset, metaclass=ABCMeta):
             create one cache file and then use a cache reader to reduce memory
             cost and initialization time. The cache file will be generated
             only once if they are not found at the the path. Otherwise, only
-            cache readers will be established.
+            cache readers will be established. A path ending with ".npz"
+            stores compressed slices, any other path is a directory of
+            uncompressed slices, which is faster for random access.
         test_mode (bool, optional): in train mode or test mode.
             Default: False.
     """
@@ -87,6 +108,7 @@ class HumanImageDataset(BaseDataset, metaclass=ABCMeta):
             self.body_model = build_body_model(body_model)
         else:
             self.body_model = None
+        self.eval_cfg = dict(batch_size=1024, device=None, with_vertices=True)
 
     def get_annotation_file(self):
         """Get path of the annotation file."""
@@ -149,7 +171,11 @@ class HumanImageDataset(BaseDataset, metaclass=ABCMeta):
                 writer_kwargs, sliced_data = self.human_data.get_sliced_cache()
                 writer = HumanDataCacheWriter(**writer_kwargs)
                 writer.update_sliced_dict(sliced_data)
-                writer.dump(self.cache_data_path)
+                if self.cache_data_path.endswith('.npz'):
+                    writer.dump(self.cache_data_path)
+                else:
+                    # uncompressed slices for random access
+                    writer.dump_by_mmap(self.cache_data_path)
             if world_size > 1:
                 dist.barrier()
             self.cache_reader = HumanDataCacheReader(
@@ -159,9 +185,153 @@ class HumanImageDataset(BaseDataset, metaclass=ABCMeta):
         else:
             self.cache_reader = None
             self.num_data = self.human_data.data_len
+        self._columns = None
+        self._columns_values = None
+        self._columns_value_ids = None
+
+    @property
+    def columns(self) -> Optional[dict]:
+        """The columns of self.human_data from :meth:`build_columns`, None
+        with a cache reader.
+
+        The columns are built on first access and rebuilt after a value of
+        self.human_data, or self.human_data itself, is replaced or removed.
+        Arrays edited in place are not tracked.
+        """
+        if self.cache_reader is not None or self.human_data is None:
+            return None
+        # the values are kept alive by self._columns_values, so that their
+        # ids are not reused while the columns are valid
+        values = _get_values(self.human_data)
+        value_ids = list(map(id, values))
+        if value_ids != self._columns_value_ids:
+            self._columns = self.build_columns()
+            self._columns_values = values
+            self._columns_value_ids = value_ids
+        return self._columns
+
+    def build_columns(self) -> dict:
+        """Gather per-sample fields of self.human_data into flat arrays.
+
+        Indexing a compressed keypoints array through HumanData pads the
+        whole array on every access, and branching on the keys costs a
+        dict lookup per field. The columns are resolved once here so that
+        preparing one sample only copies rows.
+
+        Returns:
+            dict:
+                Contiguous float32 arrays with the number of samples as the
+                first dimension, and the valid keypoint indices for
+                compressed keypoints.
+        """
+        human_data = self.human_data
+        columns = {}
+        columns['image_path'] = human_data['image_path']
+        if 'image_id' in human_data:
+            columns['image_id'] = human_data['image_id']
+        if 'bbox_xywh' in human_data:
+            bbox_xywh = _as_float32(human_data['bbox_xywh'])
+            x, y, w, h = bbox_xywh[:, 0], bbox_xywh[:, 1], \
+                bbox_xywh[:, 2], bbox_xywh[:, 3]
+            size = np.maximum(w, h)
+            columns['bbox_xywh'] = bbox_xywh
+            columns['center'] = np.stack([x + w / 2, y + h / 2], axis=1)
+            columns['scale'] = np.stack([size, size], axis=1)
+        for key in ('keypoints2d', 'keypoints3d'):
+            if key not in human_data:
+                continue
+            if human_data.check_keypoints_compressed():
+                mask = np.asarray(human_data.get_raw_value(f'{key}_mask'))
+                columns[key] = _as_float32(human_data.get_raw_value(key))
+                columns[f'{key}_index'] = np.where(mask == 1)[0]
+                columns[f'{key}_num'] = len(mask)
+            else:
+                columns[key] = _as_float32(human_data[key])
+        if 'smpl' in human_data:
+            smpl_dict = human_data['smpl']
+            if 'has_smpl' in human_data:
+                columns['has_smpl'] = np.asarray(
+                    human_data['has_smpl']).astype(int)
+            else:
+                columns['has_smpl'] = np.ones(human_data.data_len, dtype=int)
+            for key in ('body_pose', 'global_orient', 'betas', 'transl'):
+                if key in smpl_dict:
+                    columns[f'smpl_{key}'] = _as_float32(smpl_dict[key])
+        return columns
+
+    @staticmethod
+    def _get_keypoints_row(columns: dict, key: str, idx: int) -> np.ndarray:
+        """Get zero-padded keypoints of one sample from the columns."""
+        value = columns[key]
+        index_key = f'{key}_index'
+        if index_key not in columns:
+            return value[idx].copy()
+        row = np.zeros((columns[f'{key}_num'], value.shape[-1]),
+                       dtype=value.dtype)
+        row[columns[index_key]] = value[idx]
+        return row
+
+    def _prepare_raw_data_from_columns(self, columns: dict, idx: int) -> dict:
+        """Get item from the columns of self.human_data.
+
+        Returns the same dict as prepare_raw_data() does for
+        self.human_data. Rows are copied as pipelines modify them in place.
+        """
+        info = {}
+        info['img_prefix'] = None
+        image_path = columns['image_path'][idx]
+        info['image_path'] = os.path.join(self.data_prefix, 'datasets',
+                                          self.dataset_name, image_path)
+        if image_path.endswith('smc'):
+            device, device_id, frame_id = columns['image_id'][idx]
+            info['image_id'] = (device, int(device_id), int(frame_id))
+
+        info['dataset_name'] = self.dataset_name
+        info['sample_idx'] = idx
+        if 'bbox_xywh' in columns:
+            info['bbox_xywh'] = columns['bbox_xywh'][idx].copy()
+            info['center'] = columns['center'][idx].copy()
+            info['scale'] = columns['scale'][idx].copy()
+        else:
+            info['bbox_xywh'] = np.zeros((5))
+            info['center'] = np.zeros((2))
+            info['scale'] = np.zeros((2))
+
+        if 'keypoints2d' in columns:
+            info['keypoints2d'] = self._get_keypoints_row(
+                columns, 'keypoints2d', idx)
+            info['has_keypoints2d'] = 1
+        else:
+            info['keypoints2d'] = np.zeros((self.num_keypoints, 3))
+            info['has_keypoints2d'] = 0
+        if 'keypoints3d' in columns:
+            info['keypoints3d'] = self._get_keypoints_row(
+                columns, 'keypoints3d', idx)
+            info['has_keypoints3d'] = 1
+        else:
+            info['keypoints3d'] = np.zeros((self.num_keypoints, 4))
+            info['has_keypoints3d'] = 0
+
+        if 'has_smpl' in columns:
+            info['has_smpl'] = int(columns['has_smpl'][idx])
+        else:
+            info['has_smpl'] = 0
+        default_shapes = dict(
+            body_pose=(23, 3), global_orient=(3), betas=(10), transl=(3))
+        for key, shape in default_shapes.items():
+            key = f'smpl_{key}'
+            if key in columns:
+                info[key] = columns[key][idx].copy()
+            else:
+                info[key] = np.zeros(shape)
+
+        return info
 
     def prepare_raw_data(self, idx: int):
         """Get item from self.human_data."""
+        columns = self.columns
+        if columns is not None:
+            return self._prepare_raw_data_from_columns(columns, idx)
         sample_idx = idx
         if self.cache_reader is not None:
             self.human_data = self.cache_reader.get_item(idx)
@@ -249,14 +419,24 @@ class HumanImageDataset(BaseDataset, metaclass=ABCMeta):
                  outputs: list,
                  res_folder: str,
                  metric: Optional[Union[str, List[str]]] = 'pa-mpjpe',
+                 batch_size: int = 1024,
+                 device: Optional[str] = None,
                  **kwargs: dict):
         """Evaluate 3D keypoint results.
 
+        The keypoints and vertices of the predictions and the GT are
+        computed once and shared by all the metrics of the evaluation.
+
         Args:
             outputs (list): results from model inference.
             res_folder (str): path to store results.
             metric (Optional[Union[str, List(str)]]):
                 the type of metric. Default: 'pa-mpjpe'
+            batch_size (int): max number of samples in one forward of the
+                body model. Default: 1024.
+            device (Optional[str]): device of the body model forwards and
+                the procrustes alignment, e.g. 'cuda'. Default: None, on
+                CPU.
             kwargs (dict): other arguments.
         Returns:
             dict:
@@ -266,6 +446,10 @@ class HumanImageDataset(BaseDataset, metaclass=ABCMeta):
         for metric in metrics:
             if metric not in self.ALLOWED_METRICS:
                 raise KeyError(f'metric {metric} is not supported')
+        self.eval_cfg = dict(
+            batch_size=batch_size,
+            device=device,
+            with_vertices=bool({'pve', 'ihmr'} & set(metrics)))
 
         res_file = os.path.join(res_folder, 'result_keypoints.json')
         # for keeping correctness during multi-gpu test, we sort all results
@@ -315,6 +499,56 @@ class HumanImageDataset(BaseDataset, metaclass=ABCMeta):
         name_value = OrderedDict(name_value_tuples)
         return name_value
 
+    def get_metric_accumulators(self,
+                                metric: Optional[Union[
+                                    str, List[str]]] = 'pa-mpjpe',
+                                batch_size: int = 1024,
+                                device: Optional[str] = None) -> dict:
+        """Build the accumulators to evaluate the results batch by batch,
+        see :func:`mmhuman3d.apis.streaming_test`.
+
+        Args:
+            metric (Optional[Union[str, List(str)]]):
+                the type of metric. 'ihmr' needs all the results at once
+                and is not supported. Default: 'pa-mpjpe'
+            batch_size (int): max number of samples in one forward of the
+                body model. Default: 1024.
+            device (Optional[str]): device of the body model forwards and
+                the procrustes alignment. Default: None, on CPU.
+
+        Returns:
+            dict: the accumulators keyed by the names of the metrics.
+        """
+        metrics = metric if isinstance(metric, list) else [metric]
+        for metric in metrics:
+            if metric not in self.ALLOWED_METRICS or metric == 'ihmr':
+                raise KeyError(f'metric {metric} is not supported')
+        self.eval_cfg = dict(
+            batch_size=batch_size,
+            device=device,
+            with_vertices='pve' in metrics)
+        return OrderedDict(
+            (metric.upper(), build_metric_accumulator(metric, device))
+            for metric in metrics)
+
+    def update_metric_accumulators(self, accumulators: dict,
+                                   result: dict) -> None:
+        """Update the accumulators with the results of a batch.
+
+        Args:
+            accumulators (dict): from :meth:`get_metric_accumulators`.
+            result (dict): results of a batch from model inference.
+        """
+        idx = np.asarray(result['image_idx']).astype(np.int64).reshape(-1)
+        res = dict(
+            keypoints=result['keypoints_3d'],
+            poses=result['smpl_pose'],
+            betas=result['smpl_beta'])
+        for accumulator in accumulators.values():
+            pred, gt, mask = self._parse_result(
+                res, mode=accumulator.mode, idx=idx)
+            accumulator.update(pred, gt, mask)
+
     @staticmethod
     def _write_keypoint_results(keypoints: Any, res_file: str):
         """Write results into a json file."""
@@ -322,159 +556,215 @@ class HumanImageDataset(BaseDataset, metaclass=ABCMeta):
         with open(res_file, 'w') as f:
             json.dump(keypoints, f, sort_keys=True, indent=4)
 
-    def _parse_result(self, res, mode='keypoint', body_part=None):
-        """Parse results."""
-
-        if mode == 'vertice':
-            # gt
-            gt_beta, gt_pose, gt_global_orient, gender = [], [], [], []
-            gt_smpl_dict = self.human_data['smpl']
-            for idx in range(self.num_data):
-                gt_beta.append(gt_smpl_dict['betas'][idx])
-                gt_pose.append(gt_smpl_dict['body_pose'][idx])
-                gt_global_orient.append(gt_smpl_dict['global_orient'][idx])
-                if self.human_data['meta']['gender'][idx] == 'm':
-                    gender.append(0)
-                else:
-                    gender.append(1)
-            gt_beta = torch.FloatTensor(gt_beta)
-            gt_pose = torch.FloatTensor(gt_pose).view(-1, 69)
-            gt_global_orient = torch.FloatTensor(gt_global_orient)
-            gender = torch.Tensor(gender)
-            gt_output = self.body_model(
-                betas=gt_beta,
-                body_pose=gt_pose,
-                global_orient=gt_global_orient,
-                gender=gender)
-            gt_vertices = gt_output['vertices'].detach().cpu().numpy() * 1000.
-            gt_mask = np.ones(gt_vertices.shape[:-1])
-            # pred
-            pred_pose = torch.FloatTensor(res['poses'])
-            pred_beta = torch.FloatTensor(res['betas'])
-            pred_output = self.body_model(
-                betas=pred_beta,
-                body_pose=pred_pose[:, 1:],
-                global_orient=pred_pose[:, 0].unsqueeze(1),
-                pose2rot=False,
-                gender=gender)
-            pred_vertices = pred_output['vertices'].detach().cpu().numpy(
-            ) * 1000.
-
-            assert len(pred_vertices) == self.num_data
-
-            return pred_vertices, gt_vertices, gt_mask
-        elif mode == 'keypoint':
-            pred_keypoints3d = res['keypoints']
-            assert len(pred_keypoints3d) == self.num_data
-            # (B, 17, 3)
-            pred_keypoints3d = np.array(pred_keypoints3d)
-
-            if self.dataset_name == 'pw3d':
-                betas = []
-                body_pose = []
-                global_orient = []
-                gender = []
-                smpl_dict = self.human_data['smpl']
-                for idx in range(self.num_data):
-                    betas.append(smpl_dict['betas'][idx])
-                    body_pose.append(smpl_dict['body_pose'][idx])
-                    global_orient.append(smpl_dict['global_orient'][idx])
-                    if self.human_data['meta']['gender'][idx] == 'm':
-                        gender.append(0)
-                    else:
-                        gender.append(1)
-                betas = torch.FloatTensor(betas)
-                body_pose = torch.FloatTensor(body_pose).view(-1, 69)
-                global_orient = torch.FloatTensor(global_orient)
-                gender = torch.Tensor(gender)
-                gt_output = self.body_model(
-                    betas=betas,
-                    body_pose=body_pose,
-                    global_orient=global_orient,
-                    gender=gender)
-                gt_keypoints3d = gt_output['joints'].detach().cpu().numpy()
-                gt_keypoints3d_mask = np.ones((len(pred_keypoints3d), 24))
-            elif self.dataset_name == 'h36m':
-                _, h36m_idxs, _ = get_mapping('human_data', 'h36m')
-                gt_keypoints3d = \
-                    self.human_data['keypoints3d'][:, h36m_idxs, :3]
-                gt_keypoints3d_mask = np.ones((len(pred_keypoints3d), 17))
-            elif self.dataset_name == 'humman':
-                betas = []
-                body_pose = []
-                global_orient = []
-                smpl_dict = self.human_data['smpl']
-                for idx in range(self.num_data):
-                    betas.append(smpl_dict['betas'][idx])
-                    body_pose.append(smpl_dict['body_pose'][idx])
-                    global_orient.append(smpl_dict['global_orient'][idx])
-                betas = torch.FloatTensor(betas)
-                body_pose = torch.FloatTensor(body_pose).view(-1, 69)
-                global_orient = torch.FloatTensor(global_orient)
-                gt_output = self.body_model(
-                    betas=betas,
-                    body_pose=body_pose,
-                    global_orient=global_orient)
-                gt_keypoints3d = gt_output['joints'].detach().cpu().numpy()
-                gt_keypoints3d_mask = np.ones((len(pred_keypoints3d), 24))
+    def _parse_result(self, res, mode='keypoint', body_part=None, idx=None):
+        """Parse results.
+
+        The parsed results are kept in ``res``, so that all the metrics of
+        one evaluation share the body model forwards. ``idx`` is the index
+        of the results in the dataset, all the samples if None.
+        """
+        parsed = res.setdefault('parsed', {})
+        if mode not in parsed:
+            if mode == 'vertice':
+                parsed[mode] = self._parse_vertice_result(res, idx)
+            elif mode == 'keypoint':
+                parsed[mode] = self._parse_keypoint_result(res, idx)
             else:
-                raise NotImplementedError()
+                raise ValueError(f'Invalid mode: {mode}')
+        return parsed[mode]
+
+    def _parse_vertice_result(self, res, idx=None):
+        """Get the predicted and GT vertices in millimeters."""
+        # gt
+        gender = self._get_gender(idx)
+        gt_vertices = self._get_gt_body_model_output(
+            res, with_gender=True, idx=idx)['vertices'] * 1000.
+        gt_mask = np.ones(gt_vertices.shape[:-1])
+        # pred
+        pred_pose = torch.FloatTensor(np.asarray(res['poses']))
+        pred_beta = torch.FloatTensor(np.asarray(res['betas']))
+        pred_output = self._forward_body_model(
+            ['vertices'],
+            betas=pred_beta,
+            body_pose=pred_pose[:, 1:],
+            global_orient=pred_pose[:, 0].unsqueeze(1),
+            pose2rot=False,
+            gender=gender)
+        pred_vertices = pred_output['vertices'] * 1000.
+
+        assert len(pred_vertices) == len(gt_vertices)
+
+        return pred_vertices, gt_vertices, gt_mask
+
+    def _parse_keypoint_result(self, res, idx=None):
+        """Get the predicted and GT keypoints in millimeters, relative to
+        the pelvis."""
+        if idx is None:
+            idx = np.arange(self.num_data)
+        pred_keypoints3d = res['keypoints']
+        assert len(pred_keypoints3d) == len(idx)
+        # (B, 17, 3)
+        pred_keypoints3d = np.array(pred_keypoints3d)
+
+        if self.dataset_name == 'pw3d':
+            gt_keypoints3d = self._get_gt_body_model_output(
+                res, with_gender=True, idx=idx)['joints']
+            gt_keypoints3d_mask = np.ones((len(pred_keypoints3d), 24))
+        elif self.dataset_name == 'h36m':
+            _, h36m_idxs, _ = get_mapping('human_data', 'h36m')
+            gt_keypoints3d = \
+                self.human_data['keypoints3d'][idx][:, h36m_idxs, :3]
+            gt_keypoints3d_mask = np.ones((len(pred_keypoints3d), 17))
+        elif self.dataset_name == 'humman':
+            gt_keypoints3d = self._get_gt_body_model_output(
+                res, with_gender=False, idx=idx)['joints']
+            gt_keypoints3d_mask = np.ones((len(pred_keypoints3d), 24))
+        else:
+            raise NotImplementedError()
 
-            # SMPL_49 only!
-            if gt_keypoints3d.shape[1] == 49:
-                assert pred_keypoints3d.shape[1] == 49
+        # SMPL_49 only!
+        if gt_keypoints3d.shape[1] == 49:
+            assert pred_keypoints3d.shape[1] == 49
 
-                gt_keypoints3d = gt_keypoints3d[:, 25:, :]
-                pred_keypoints3d = pred_keypoints3d[:, 25:, :]
+            gt_keypoints3d = gt_keypoints3d[:, 25:, :]
+            pred_keypoints3d = pred_keypoints3d[:, 25:, :]
 
-                joint_mapper = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 18]
-                gt_keypoints3d = gt_keypoints3d[:, joint_mapper, :]
-                pred_keypoints3d = pred_keypoints3d[:, joint_mapper, :]
+            joint_mapper = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 18]
+            gt_keypoints3d = gt_keypoints3d[:, joint_mapper, :]
+            pred_keypoints3d = pred_keypoints3d[:, joint_mapper, :]
 
-                # we only evaluate on 14 lsp joints
-                pred_pelvis = (pred_keypoints3d[:, 2] +
-                               pred_keypoints3d[:, 3]) / 2
-                gt_pelvis = (gt_keypoints3d[:, 2] + gt_keypoints3d[:, 3]) / 2
+            # we only evaluate on 14 lsp joints
+            pred_pelvis = (pred_keypoints3d[:, 2] + pred_keypoints3d[:, 3]) / 2
+            gt_pelvis = (gt_keypoints3d[:, 2] + gt_keypoints3d[:, 3]) / 2
 
-            # H36M for testing!
-            elif gt_keypoints3d.shape[1] == 17:
-                assert pred_keypoints3d.shape[1] == 17
+        # H36M for testing!
+        elif gt_keypoints3d.shape[1] == 17:
+            assert pred_keypoints3d.shape[1] == 17
 
-                H36M_TO_J17 = [
-                    6, 5, 4, 1, 2, 3, 16, 15, 14, 11, 12, 13, 8, 10, 0, 7, 9
-                ]
-                H36M_TO_J14 = H36M_TO_J17[:14]
-                joint_mapper = H36M_TO_J14
+            H36M_TO_J17 = [
+                6, 5, 4, 1, 2, 3, 16, 15, 14, 11, 12, 13, 8, 10, 0, 7, 9
+            ]
+            H36M_TO_J14 = H36M_TO_J17[:14]
+            joint_mapper = H36M_TO_J14
 
-                pred_pelvis = pred_keypoints3d[:, 0]
-                gt_pelvis = gt_keypoints3d[:, 0]
+            pred_pelvis = pred_keypoints3d[:, 0]
+            gt_pelvis = gt_keypoints3d[:, 0]
 
-                gt_keypoints3d = gt_keypoints3d[:, joint_mapper, :]
-                pred_keypoints3d = pred_keypoints3d[:, joint_mapper, :]
+            gt_keypoints3d = gt_keypoints3d[:, joint_mapper, :]
+            pred_keypoints3d = pred_keypoints3d[:, joint_mapper, :]
 
-            # keypoint 24
-            elif gt_keypoints3d.shape[1] == 24:
-                assert pred_keypoints3d.shape[1] == 24
+        # keypoint 24
+        elif gt_keypoints3d.shape[1] == 24:
+            assert pred_keypoints3d.shape[1] == 24
 
-                joint_mapper = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 18]
-                gt_keypoints3d = gt_keypoints3d[:, joint_mapper, :]
-                pred_keypoints3d = pred_keypoints3d[:, joint_mapper, :]
+            joint_mapper = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 18]
+            gt_keypoints3d = gt_keypoints3d[:, joint_mapper, :]
+            pred_keypoints3d = pred_keypoints3d[:, joint_mapper, :]
 
-                # we only evaluate on 14 lsp joints
-                pred_pelvis = (pred_keypoints3d[:, 2] +
-                               pred_keypoints3d[:, 3]) / 2
-                gt_pelvis = (gt_keypoints3d[:, 2] + gt_keypoints3d[:, 3]) / 2
+            # we only evaluate on 14 lsp joints
+            pred_pelvis = (pred_keypoints3d[:, 2] + pred_keypoints3d[:, 3]) / 2
+            gt_pelvis = (gt_keypoints3d[:, 2] + gt_keypoints3d[:, 3]) / 2
 
-            else:
-                pass
+        else:
+            pass
+
+        pred_keypoints3d = (pred_keypoints3d - pred_pelvis[:, None, :]) * 1000
+        gt_keypoints3d = (gt_keypoints3d - gt_pelvis[:, None, :]) * 1000
 
-            pred_keypoints3d = (pred_keypoints3d -
-                                pred_pelvis[:, None, :]) * 1000
-            gt_keypoints3d = (gt_keypoints3d - gt_pelvis[:, None, :]) * 1000
+        gt_keypoints3d_mask = gt_keypoints3d_mask[:, joint_mapper] > 0
 
-            gt_keypoints3d_mask = gt_keypoints3d_mask[:, joint_mapper] > 0
+        return pred_keypoints3d, gt_keypoints3d, gt_keypoints3d_mask
 
-            return pred_keypoints3d, gt_keypoints3d, gt_keypoints3d_mask
+    def _get_gender(self, idx=None):
+        """Get the GT genders of the samples of idx, all the samples if
+        None, 0 for male and 1 for the others."""
+        gender = np.asarray(self.human_data['meta']['gender'][:self.num_data])
+        if idx is not None:
+            gender = gender[idx]
+        return torch.Tensor((gender != 'm').astype(np.float32))
+
+    def _get_gt_body_model_output(self, res, with_gender=True, idx=None):
+        """Forward the body model with the GT SMPL parameters of the samples
+        of idx, all the samples if None.
+
+        The outputs are kept in ``res`` like the parsed results, so that
+        they are shared by the metrics of one evaluation and released with
+        it. Vertices are only computed when a metric needs them.
+        """
+        gt_outputs = res.setdefault('gt_body_model', {})
+        if with_gender not in gt_outputs:
+            keys = ['joints']
+            if self.eval_cfg['with_vertices']:
+                keys.append('vertices')
+            gt_outputs[with_gender] = self._forward_body_model(
+                keys, **self._get_gt_body_model_params(with_gender, idx))
+        return gt_outputs[with_gender]
+
+    def _get_gt_body_model_params(self, with_gender=True, idx=None):
+        """Get the GT SMPL parameters of the samples of idx, all the samples
+        if None."""
+        if idx is None:
+            idx = slice(self.num_data)
+        smpl_dict = self.human_data['smpl']
+        params = dict(
+            betas=torch.FloatTensor(np.asarray(smpl_dict['betas'])[idx]),
+            body_pose=torch.FloatTensor(
+                np.asarray(smpl_dict['body_pose'])[idx]).view(-1, 69),
+            global_orient=torch.FloatTensor(
+                np.asarray(smpl_dict['global_orient'])[idx]))
+        if with_gender:
+            params['gender'] = self._get_gender(idx)
+        return params
+
+    def _forward_body_model(self, keys, **kwargs):
+        """Forward self.body_model in batches of eval_cfg['batch_size'] on
+        eval_cfg['device'].
+
+        Args:
+            keys (list): keys of the outputs to keep, e.g. 'joints'. The
+                mesh is only skinned if 'vertices' is in keys.
+            kwargs (dict): arguments of the body model, tensors are split
+                into batches.
+
+        Returns:
+            dict: the outputs in np.ndarray.
+        """
+        batch_size = self.eval_cfg['batch_size']
+        device = self.eval_cfg['device'] or 'cpu'
+        num_data = len(kwargs['betas'])
+        outputs = {key: [] for key in keys}
+        self.body_model.to(device)
+        with torch.no_grad():
+            for start in range(0, num_data, batch_size):
+                batch = {
+                    name:
+                    value[start:start + batch_size].to(device) if isinstance(
+                        value, torch.Tensor) else value
+                    for name, value in kwargs.items()
+                }
+                output = self.body_model(
+                    **batch, return_verts='vertices' in keys)
+                for key in keys:
+                    outputs[key].append(output[key].cpu().numpy())
+        self.body_model.to('cpu')
+        return {key: np.concatenate(value) for key, value in outputs.items()}
+
+    def _align_result(self, res, pred, gt, alignment, key):
+        """Align the prediction with the GT once in an evaluation, the
+        aligned results are shared by the metrics.
+
+        ``key`` is a tuple of the mode and the body part of the results,
+        a body part of None is the same as '', the whole body.
+        """
+        if alignment == 'none':
+            return pred
+        mode, body_part = key
+        key = (mode, body_part or '')
+        aligned = res.setdefault('aligned', {})
+        if (key, alignment) not in aligned:
+            aligned[(key, alignment)] = align_points(
+                pred, gt, alignment, device=self.eval_cfg['device'])
+        return aligned[(key, alignment)]
 
     def _report_mpjpe(self, res_file, metric='mpjpe', body_part=''):
         """Cauculate mean per joint position error (MPJPE) or its variants PA-
@@ -497,8 +787,11 @@ class HumanImageDataset(BaseDataset, metaclass=ABCMeta):
         else:
             raise ValueError(f'Invalid metric: {metric}')
 
+        pred_keypoints3d = self._align_result(res_file, pred_keypoints3d,
+                                              gt_keypoints3d, alignment,
+                                              ('keypoint', body_part))
         error = keypoint_mpjpe(pred_keypoints3d, gt_keypoints3d,
-                               gt_keypoints3d_mask, alignment)
+                               gt_keypoints3d_mask)
         info_str = [(err_name, error)]
 
         return info_str
@@ -528,8 +821,11 @@ class HumanImageDataset(BaseDataset, metaclass=ABCMeta):
         else:
             raise ValueError(f'Invalid metric: {metric}')
 
+        pred_keypoints3d = self._align_result(res_file, pred_keypoints3d,
+                                              gt_keypoints3d, alignment,
+                                              ('keypoint', ''))
         error = keypoint_3d_pck(pred_keypoints3d, gt_keypoints3d,
-                                gt_keypoints3d_mask, alignment)
+                                gt_keypoints3d_mask)
         name_value_tuples = [(err_name, error)]
 
         return name_value_tuples
@@ -558,8 +854,11 @@ class HumanImageDataset(BaseDataset, metaclass=ABCMeta):
         else:
             raise ValueError(f'Invalid metric: {metric}')
 
+        pred_keypoints3d = self._align_result(res_file, pred_keypoints3d,
+                                              gt_keypoints3d, alignment,
+                                              ('keypoint', ''))
         error = keypoint_3d_auc(pred_keypoints3d, gt_keypoints3d,
-                                gt_keypoints3d_mask, alignment)
+                                gt_keypoints3d_mask)
         name_value_tuples = [(err_name, error)]
 
         return name_value_tuples
@@ -578,7 +877,9 @@ class HumanImageDataset(BaseDataset, metaclass=ABCMeta):
             alignment = 'procrustes'
         else:
             raise ValueError(f'Invalid metric: {metric}')
-        error = vertice_pve(pred_verts, gt_verts, alignment)
+        pred_verts = self._align_result(res_file, pred_verts, gt_verts,
+                                        alignment, ('vertice', body_part))
+        error = vertice_pve(pred_verts, gt_verts)
         return [(err_name, error)]
 
     def _report_ihmr(self, res_file):
@@ -605,62 +906,29 @@ class HumanImageDataset(BaseDataset, metaclass=ABCMeta):
             global_orient=mean_pose[:, :1],
             pose2rot=False)
         mean_verts = mean_output['vertices'].detach().cpu().numpy() * 1000.
-        dis = (gt_verts - mean_verts) * (gt_verts - mean_verts)
-        dis = np.sqrt(dis.sum(axis=-1)).mean(axis=-1)
-        # from the most remote one to the nearest one
-        idx_order = np.argsort(dis)[::-1]
-        num_data = idx_order.shape[0]
-
-        def report_ihmr_idx(idx):
-            mpvpe = vertice_pve(pred_verts[idx], gt_verts[idx])
-            mpjpe = keypoint_mpjpe(pred_keypoints3d[idx], gt_keypoints3d[idx],
-                                   gt_keypoints3d_mask[idx], 'none')
-            pampjpe = keypoint_mpjpe(pred_keypoints3d[idx],
-                                     gt_keypoints3d[idx],
-                                     gt_keypoints3d_mask[idx], 'procrustes')
-            return (mpvpe, mpjpe, pampjpe)
-
-        def report_ihmr_tail(percentage):
-            cur_data = int(num_data * percentage / 100.0)
-            idx = idx_order[:cur_data]
-            mpvpe, mpjpe, pampjpe = report_ihmr_idx(idx)
-            res_mpvpe = ('bMPVPE Tail ' + str(percentage) + '%', mpvpe)
-            res_mpjpe = ('bMPJPE Tail ' + str(percentage) + '%', mpjpe)
-            res_pampjpe = ('bPA-MPJPE Tail ' + str(percentage) + '%', pampjpe)
-            return [res_mpvpe, res_mpjpe, res_pampjpe]
-
-        def report_ihmr_all(num_bin):
-            num_per_bin = np.array([0 for _ in range(num_bin)
-                                    ]).astype(np.float32)
-            sum_mpvpe = np.array([0
-                                  for _ in range(num_bin)]).astype(np.float32)
-            sum_mpjpe = np.array([0
-                                  for _ in range(num_bin)]).astype(np.float32)
-            sum_pampjpe = np.array([0 for _ in range(num_bin)
-                                    ]).astype(np.float32)
-            max_dis = dis[idx_order[0]]
-            min_dis = dis[idx_order[-1]]
-            delta = (max_dis - min_dis) / num_bin
-            for i in range(num_data):
-                idx = int((dis[i] - min_dis) / delta - 0.001)
-                res_mpvpe, res_mpjpe, res_pampjpe = report_ihmr_idx([i])
-                num_per_bin[idx] += 1
-                sum_mpvpe[idx] += res_mpvpe
-                sum_mpjpe[idx] += res_mpjpe
-                sum_pampjpe[idx] += res_pampjpe
-            for i in range(num_bin):
-                if num_per_bin[i] > 0:
-                    sum_mpvpe[i] = sum_mpvpe[i] / num_per_bin[i]
-                    sum_mpjpe[i] = sum_mpjpe[i] / num_per_bin[i]
-                    sum_pampjpe[i] = sum_pampjpe[i] / num_per_bin[i]
-            valid_idx = np.where(num_per_bin > 0)
-            res_mpvpe = ('bMPVPE All', sum_mpvpe[valid_idx].mean())
-            res_mpjpe = ('bMPJPE All', sum_mpjpe[valid_idx].mean())
-            res_pampjpe = ('bPA-MPJPE All', sum_pampjpe[valid_idx].mean())
-            return [res_mpvpe, res_mpjpe, res_pampjpe]
-
-        metrics = []
-        metrics.extend(report_ihmr_all(num_bin=100))
-        metrics.extend(report_ihmr_tail(percentage=10))
-        metrics.extend(report_ihmr_tail(percentage=5))
+        dis = np.linalg.norm(gt_verts - mean_verts, axis=-1).mean(axis=-1)
+
+        # per-sample errors, the aligned keypoints are shared with pa-mpjpe
+        pa_pred_keypoints3d = self._align_result(res_file, pred_keypoints3d,
+                                                 gt_keypoints3d, 'procrustes',
+                                                 ('keypoint', ''))
+        mask = gt_keypoints3d_mask.astype(np.float64)
+        mpvpe = np.linalg.norm(pred_verts - gt_verts, axis=-1).mean(axis=-1)
+        mpjpe = (np.linalg.norm(pred_keypoints3d - gt_keypoints3d, axis=-1) *
+                 mask).sum(axis=-1) / mask.sum(axis=-1)
+        pampjpe = (
+            np.linalg.norm(pa_pred_keypoints3d - gt_keypoints3d, axis=-1) *
+            mask).sum(axis=-1) / mask.sum(axis=-1)
+        binned_error, tail_errors = ihmr_binned_error(
+            np.stack([mpvpe, mpjpe, pampjpe], axis=-1),
+            dis,
+            num_bins=100,
+            tail_percentages=(10, 5))
+
+        names = ('bMPVPE', 'bMPJPE', 'bPA-MPJPE')
+        metrics = [(f'{name} All', error)
+                   for name, error in zip(names, binned_error)]
+        for percentage, errors in tail_errors.items():
+            metrics.extend((f'{name} Tail {percentage}%', error)
+                           for name, error in zip(names, errors))
         return metrics
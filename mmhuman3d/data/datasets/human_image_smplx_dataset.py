@@ -56,15 +56,31 @@ class HumanImageSMPLXDataset(HumanImageDataset):
                 self.left_hand_vertex_ids = vertex_idxs_data['left_hand']
                 self.right_hand_vertex_ids = vertex_idxs_data['right_hand']
 
+    def build_columns(self) -> dict:
+        """Gather per-sample fields of self.human_data into flat arrays,
+        including the SMPL-X parameters."""
+        columns = super().build_columns()
+        if 'smplx' in self.human_data:
+            columns['smplx'] = {
+                key: np.ascontiguousarray(value, dtype=np.float32)
+                for key, value in self.human_data['smplx'].items()
+            }
+        return columns
+
     def prepare_raw_data(self, idx: int):
         """Get item from self.human_data."""
         info = super().prepare_raw_data(idx)
-        if self.cache_reader is not None:
-            self.human_data = self.cache_reader.get_item(idx)
-            idx = idx % self.cache_reader.slice_size
+        columns = self.columns
+        if columns is not None:
+            data = columns
+        else:
+            if self.cache_reader is not None:
+                self.human_data = self.cache_reader.get_item(idx)
+                idx = idx % self.cache_reader.slice_size
+            data = self.human_data
 
-        if 'smplx' in self.human_data:
-            smplx_dict = self.human_data['smplx']
+        if 'smplx' in data:
+            smplx_dict = data['smplx']
             info['has_smplx'] = 1
         else:
             smplx_dict = {}
@@ -304,6 +320,13 @@ class HumanImageSMPLXDataset(HumanImageDataset):
         name_value_tuples = [('3DRMSE', error)]
         return name_value_tuples
 
+    def get_metric_accumulators(self, *args, **kwargs):
+        """Streaming evaluation is not supported for SMPL-X results, whose
+        metrics are evaluated on the whole results."""
+        raise NotImplementedError(
+            f'{self.__class__.__name__} does not support streaming '
+            'evaluation, use evaluate() instead.')
+
     def evaluate(self,
                  outputs: list,
                  res_folder: str,
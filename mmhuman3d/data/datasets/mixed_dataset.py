@@ -1,7 +1,8 @@
 from typing import Optional, Union
 
 import numpy as np
-from torch.utils.data import ConcatDataset, Dataset, WeightedRandomSampler
+import torch
+from torch.utils.data import ConcatDataset, Dataset
 
 from .builder import DATASETS, build_dataset
 
@@ -17,26 +18,42 @@ class MixedDataset(Dataset):
             of iterations is set to this fixed value. Otherwise, the number of
             iterations is set to the maximum size of each single dataset.
             Default: None.
+        num_predraw (int, optional): number of indices drawn at once when
+            indices are not drawn by a sampler. Default: 65536.
+
+    Attributes:
+        index_by_sampler (bool): whether indices of the concatenated
+            datasets are drawn by a sampler aware of the partition, e.g.,
+            BlockShuffleSampler or DistributedSampler. If False, indices are
+            ignored and samples are drawn randomly. Default: False.
     """
 
     def __init__(self,
                  configs: list,
                  partition: list,
-                 num_data: Optional[Union[int, None]] = None):
+                 num_data: Optional[Union[int, None]] = None,
+                 num_predraw: int = 65536):
         """Load data from multiple datasets."""
         assert min(partition) >= 0
         datasets = [build_dataset(cfg) for cfg in configs]
         self.dataset = ConcatDataset(datasets)
+        self.partition = partition
+        self.index_by_sampler = False
         if num_data is not None:
             self.length = num_data
         else:
             self.length = max(len(ds) for ds in datasets)
-        weights = [
-            np.ones(len(ds)) * p / len(ds)
-            for (p, ds) in zip(partition, datasets)
-        ]
-        weights = np.concatenate(weights, axis=0)
-        self.sampler = WeightedRandomSampler(weights, 1)
+        self.dataset_lengths = np.array([len(ds) for ds in datasets],
+                                        dtype=np.int64)
+        self.dataset_offsets = \
+            np.cumsum(self.dataset_lengths) - self.dataset_lengths
+        probs = np.asarray(partition, dtype=np.float64)
+        self.dataset_probs = probs / probs.sum()
+        self.num_predraw = num_predraw
+        self.predrawn_indices = np.zeros(0, dtype=np.int64)
+        self.predrawn_pos = 0
+        self.rng = None
+        self.rng_seed = None
 
     def __len__(self):
         """Get the size of the dataset."""
@@ -45,5 +62,53 @@ class MixedDataset(Dataset):
     def __getitem__(self, idx):
         """Given index, sample the data from multiple datasets with the given
         proportion."""
-        idx_new = list(self.sampler)[0]
+        if self.index_by_sampler:
+            return self.dataset[idx]
+        seed = torch.initial_seed()
+        if seed != self.rng_seed:
+            # the DataLoader seeds torch differently in each worker and
+            # epoch, while worker_init_fn reseeds np.random the same way
+            self.rng = np.random.default_rng(seed)
+            self.rng_seed = seed
+            self.predrawn_pos = len(self.predrawn_indices)
+        if self.predrawn_pos >= len(self.predrawn_indices):
+            self.predrawn_indices = self.sample_indices(
+                self.num_predraw, self.rng)
+            self.predrawn_pos = 0
+        idx_new = self.predrawn_indices[self.predrawn_pos]
+        self.predrawn_pos += 1
         return self.dataset[idx_new]
+
+    def sample_indices(
+            self, num: int, rng: Union[np.random.Generator,
+                                       np.random.RandomState]) -> np.ndarray:
+        """Draw indices of the concatenated datasets. A dataset is picked by
+        the partition, then an index is picked uniformly inside it.
+
+        Args:
+            num (int): number of indices.
+            rng (np.random.Generator | np.random.RandomState): random
+                generator, np.random for the global one.
+
+        Returns:
+            np.ndarray: indices in shape (num, ).
+        """
+        dataset_ids = rng.choice(
+            len(self.dataset_lengths), size=num, p=self.dataset_probs)
+        inner_indices = (rng.random(num) *
+                         self.dataset_lengths[dataset_ids]).astype(np.int64)
+        return self.dataset_offsets[dataset_ids] + inner_indices
+
+    def get_indices(self, epoch: int, seed: int = 0) -> np.ndarray:
+        """Get the deterministic index stream of an epoch.
+
+        Args:
+            epoch (int): index of the epoch.
+            seed (int, optional): random seed. Default: 0.
+
+        Returns:
+            np.ndarray: indices of the concatenated datasets,
+                in shape (len(self), ).
+        """
+        rng = np.random.default_rng([seed, epoch])
+        return self.sample_indices(self.length, rng)
@@ -1,10 +1,9 @@
 import os.path as osp
 
-import cv2
 import mmcv
 import numpy as np
 
-from mmhuman3d.data.data_structures.smc_reader import SMCReader
+from mmhuman3d.data.data_structures.smc_reader import SMCReader, SMCReaderPool
 from ..builder import PIPELINES
 
 
@@ -26,16 +25,23 @@ class LoadImageFromFile(object):
         file_client_args (dict): Arguments to instantiate a FileClient.
             See :class:`mmcv.fileio.FileClient` for details.
             Defaults to ``dict(backend='disk')``.
+        smc_pool_capacity (int): Max number of .smc files kept open by each
+            process, see :class:`SMCReaderPool`. If set to 0, a file is
+            opened and closed for every image. Defaults to 8.
     """
 
     def __init__(self,
                  to_float32=False,
                  color_type='color',
-                 file_client_args=dict(backend='disk')):
+                 file_client_args=dict(backend='disk'),
+                 smc_pool_capacity=8):
         self.to_float32 = to_float32
         self.color_type = color_type
         self.file_client_args = file_client_args.copy()
         self.file_client = None
+        self.smc_pool_capacity = smc_pool_capacity
+        self.smc_pool = SMCReaderPool(smc_pool_capacity) \
+            if smc_pool_capacity > 0 else None
 
     def __call__(self, results):
         if self.file_client is None:
@@ -50,12 +56,15 @@ class LoadImageFromFile(object):
             assert 'image_id' in results, 'Load image from .smc, ' \
                                           'but image_id is not provided.'
             device, device_id, frame_id = results['image_id']
-            smc_reader = SMCReader(filename)
-            img = smc_reader.get_color(
-                device, device_id, frame_id, disable_tqdm=True)
-            img = img.squeeze()  # (1, H, W, 3) -> (H, W, 3)
-            img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)  # BGR is used
-            del smc_reader
+            if self.smc_pool is not None:
+                smc_reader = self.smc_pool.get(filename)
+            else:
+                smc_reader = SMCReader(filename)
+            # BGR is used
+            img = smc_reader.get_color_frame(
+                device, device_id, frame_id, to_rgb=False)
+            if self.smc_pool is None:
+                smc_reader.close()
         else:
             img_bytes = self.file_client.get(filename)
             img = mmcv.imfrombytes(img_bytes, flag=self.color_type)
@@ -79,5 +88,6 @@ class LoadImageFromFile(object):
         repr_str = (f'{self.__class__.__name__}('
                     f'to_float32={self.to_float32}, '
                     f"color_type='{self.color_type}', "
-                    f'file_client_args={self.file_client_args})')
+                    f'file_client_args={self.file_client_args}, '
+                    f'smc_pool_capacity={self.smc_pool_capacity})')
         return repr_str
@@ -1,3 +1,7 @@
+from .block_shuffle_sampler import BlockShuffleSampler
+from .builder import SAMPLERS, build_sampler
 from .distributed_sampler import DistributedSampler
 
-__all__ = ['DistributedSampler']
+__all__ = [
+    'DistributedSampler', 'BlockShuffleSampler', 'SAMPLERS', 'build_sampler'
+]
@@ -0,0 +1,173 @@
+from typing import List, Optional
+
+import numpy as np
+from torch.utils.data import ConcatDataset
+
+from .distributed_sampler import DistributedSampler, get_mixed_dataset
+
+
+class BlockShuffleSampler(DistributedSampler):
+    """Sampler that shuffles at block granularity to keep locality of I/O.
+
+    Indices of each dataset are grouped into blocks of consecutive
+    samples. In every epoch, the order of all blocks is shuffled, then
+    samples are shuffled within a window of several blocks. When a dataset
+    reads through a HumanDataCacheReader, a block is a cache slice, so
+    samples of one slice are read close in time and the slice is decoded
+    once instead of once per sample. Each rank takes a contiguous part of
+    the shuffled indices, therefore different ranks read different blocks.
+
+    If the dataset is a MixedDataset, the number of samples drawn from
+    each sub-dataset follows its partition, and the sampler draws indices
+    of the concatenated datasets instead of the MixedDataset.
+
+    Args:
+        dataset (Dataset): Dataset used for sampling.
+        num_replicas (int, optional): Number of processes participating in
+            distributed training. Defaults to None, the world size.
+        rank (int, optional): Rank of the current process.
+            Defaults to None, the current rank.
+        shuffle (bool, optional): Whether to shuffle blocks and samples.
+            Defaults to True.
+        round_up (bool, optional): Whether to add extra samples to make
+            the indices evenly divisible among ranks. Defaults to True.
+        block_size (int, optional): Number of consecutive samples in a
+            block. Defaults to None, the slice_size of the cache reader of
+            each dataset, or 1 for datasets without cache.
+        window_size (int, optional): Number of consecutive blocks, in
+            which samples are shuffled together. A larger window gives
+            more randomness and less locality. Defaults to 8.
+        seed (int, optional): Random seed, combined with the epoch.
+            Defaults to 0.
+    """
+
+    def __init__(self,
+                 dataset,
+                 num_replicas: Optional[int] = None,
+                 rank: Optional[int] = None,
+                 shuffle: bool = True,
+                 round_up: bool = True,
+                 block_size: Optional[int] = None,
+                 window_size: int = 8,
+                 seed: int = 0):
+        super().__init__(
+            dataset,
+            num_replicas=num_replicas,
+            rank=rank,
+            shuffle=shuffle,
+            round_up=round_up)
+        assert window_size > 0
+        self.window_size = window_size
+        self.seed = seed
+
+        mixed_dataset = get_mixed_dataset(dataset)
+        if mixed_dataset is not None:
+            # MixedDataset indexes the concatenated datasets directly
+            mixed_dataset.index_by_sampler = True
+            sub_datasets = mixed_dataset.dataset.datasets
+            self.partition = mixed_dataset.dataset_probs
+        else:
+            if isinstance(dataset, ConcatDataset):
+                sub_datasets = dataset.datasets
+            else:
+                sub_datasets = [dataset]
+            self.partition = None
+        self.sub_lengths = np.array([len(ds) for ds in sub_datasets],
+                                    dtype=np.int64)
+        self.sub_offsets = np.cumsum(self.sub_lengths) - self.sub_lengths
+        self.sub_block_sizes = [
+            self.__get_block_size__(ds, block_size) for ds in sub_datasets
+        ]
+
+    def __iter__(self):
+        # deterministically shuffle based on seed and epoch
+        rng = np.random.default_rng([self.seed, self.epoch])
+        if self.partition is None:
+            sub_counts = self.sub_lengths
+        else:
+            sub_counts = rng.multinomial(len(self.dataset), self.partition)
+        block_starts = []
+        block_lens = []
+        for sub_index, count in enumerate(sub_counts):
+            starts, lens = self.__draw_blocks__(rng, sub_index, int(count))
+            block_starts.append(starts)
+            block_lens.append(lens)
+        block_starts = np.concatenate(block_starts)
+        block_lens = np.concatenate(block_lens)
+        if self.shuffle:
+            block_order = rng.permutation(len(block_starts))
+            block_starts = block_starts[block_order]
+            block_lens = block_lens[block_order]
+        indices = self.__expand_blocks__(block_starts, block_lens)
+        if self.shuffle:
+            # shuffle samples inside each window of blocks
+            window_ids = np.repeat(
+                np.arange(len(block_lens)) // self.window_size, block_lens)
+            indices = indices[np.lexsort(
+                (rng.random(len(indices)), window_ids))]
+
+        # add extra samples to make it evenly divisible
+        if self.round_up:
+            indices = np.resize(indices, self.total_size)
+            assert len(indices) == self.total_size
+            # a contiguous part keeps locality in each rank
+            indices = indices[self.rank * self.num_samples:(self.rank + 1) *
+                              self.num_samples]
+            assert len(indices) == self.num_samples
+        else:
+            indices = np.array_split(indices, self.num_replicas)[self.rank]
+        return iter(indices.tolist())
+
+    def __draw_blocks__(self, rng: np.random.Generator, sub_index: int,
+                        count: int) -> List[np.ndarray]:
+        """Draw blocks from a sub-dataset until there are count samples.
+        Blocks are drawn without replacement, and all blocks are drawn
+        before any block is drawn again.
+
+        Args:
+            rng (np.random.Generator): Random generator of this epoch.
+            sub_index (int): Index of the sub-dataset.
+            count (int): Number of samples to draw.
+
+        Returns:
+            List[np.ndarray]:
+                Start indices and lengths of the drawn blocks,
+                in the index space of the whole dataset.
+        """
+        sub_len = int(self.sub_lengths[sub_index])
+        block_size = self.sub_block_sizes[sub_index]
+        num_blocks = -(-sub_len // block_size)
+        if count == 0 or num_blocks == 0:
+            return [np.zeros(0, dtype=np.int64)] * 2
+        num_rounds = -(-count // sub_len)
+        if self.shuffle:
+            block_ids = np.concatenate(
+                [rng.permutation(num_blocks) for _ in range(num_rounds)])
+        else:
+            block_ids = np.tile(np.arange(num_blocks), num_rounds)
+        starts = block_ids * block_size
+        lens = np.minimum(block_size, sub_len - starts)
+        # drop blocks after count and trim the last one
+        keep = np.searchsorted(np.cumsum(lens), count) + 1
+        starts, lens = starts[:keep], lens[:keep]
+        lens[-1] -= lens.sum() - count
+        return [starts + self.sub_offsets[sub_index], lens]
+
+    @staticmethod
+    def __expand_blocks__(block_starts: np.ndarray,
+                          block_lens: np.ndarray) -> np.ndarray:
+        """Expand blocks into indices of samples, in the order of blocks."""
+        total_len = int(block_lens.sum())
+        lens_before = np.repeat(np.cumsum(block_lens) - block_lens, block_lens)
+        return np.repeat(block_starts, block_lens) + \
+            np.arange(total_len) - lens_before
+
+    @staticmethod
+    def __get_block_size__(dataset, block_size: Optional[int]) -> int:
+        """Get block size of a dataset, from its cache reader if not set."""
+        if block_size is not None:
+            return block_size
+        cache_reader = getattr(dataset, 'cache_reader', None)
+        if cache_reader is not None:
+            return cache_reader.slice_size
+        return 1
@@ -0,0 +1,15 @@
+from mmcv.utils import Registry, build_from_cfg
+
+from .block_shuffle_sampler import BlockShuffleSampler
+from .distributed_sampler import DistributedSampler
+
+SAMPLERS = Registry('samplers')
+
+SAMPLERS.register_module(name='DistributedSampler', module=DistributedSampler)
+SAMPLERS.register_module(
+    name='BlockShuffleSampler', module=BlockShuffleSampler)
+
+
+def build_sampler(cfg, default_args=None):
+    """Build sampler."""
+    return build_from_cfg(cfg, SAMPLERS, default_args)
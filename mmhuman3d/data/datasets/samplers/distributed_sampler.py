@@ -2,6 +2,22 @@ import torch
 from torch.utils.data import DistributedSampler as _DistributedSampler
 
 
+def get_mixed_dataset(dataset):
+    """Get the MixedDataset which indices of dataset are passed to.
+
+    Args:
+        dataset (Dataset): dataset used for sampling.
+
+    Returns:
+        MixedDataset | None: the MixedDataset, None if not found.
+    """
+    from ..adversarial_dataset import AdversarialDataset
+    from ..mixed_dataset import MixedDataset
+    if isinstance(dataset, AdversarialDataset):
+        dataset = dataset.train_dataset
+    return dataset if isinstance(dataset, MixedDataset) else None
+
+
 class DistributedSampler(_DistributedSampler):
 
     def __init__(self,
@@ -17,10 +33,18 @@ class DistributedSampler(_DistributedSampler):
             self.total_size = self.num_samples * self.num_replicas
         else:
             self.total_size = len(self.dataset)
+        # a MixedDataset is sampled by its index stream of each epoch,
+        # ranks take disjoint parts of the same stream
+        self.mixed_dataset = get_mixed_dataset(dataset)
+        if self.mixed_dataset is not None:
+            self.mixed_dataset.index_by_sampler = True
 
     def __iter__(self):
         # deterministically shuffle based on epoch
-        if self.shuffle:
+        if self.mixed_dataset is not None:
+            indices = self.mixed_dataset.get_indices(self.epoch,
+                                                     self.seed).tolist()
+        elif self.shuffle:
             g = torch.Generator()
             g.manual_seed(self.epoch)
             indices = torch.randperm(len(self.dataset), generator=g).tolist()
@@ -0,0 +1,176 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import hashlib
+import os
+import os.path as osp
+import pickle
+import shutil
+import tempfile
+from typing import Iterable, Optional
+
+import numpy as np
+import torch
+
+# model data loaded from the model files, keyed by file and version
+__BODY_MODEL_DATA_CACHE__ = dict()
+# buffers shared by the body models, keyed by model file and buffer name
+__BODY_MODEL_BUFFER_CACHE__ = dict()
+
+
+def get_model_file(model_path: str,
+                   model_type: str,
+                   gender: str = 'neutral',
+                   ext: str = 'pkl') -> str:
+    """Get the model file in the same way as smplx.
+
+    Args:
+        model_path (str): directory of the model files, or the model file.
+        model_type (str): 'SMPL', 'SMPLX', etc.
+        gender (str, optional): gender of the model. Defaults to 'neutral'.
+        ext (str, optional): extension of the model file. Defaults to 'pkl'.
+
+    Returns:
+        str: path to the model file.
+    """
+    if osp.isdir(model_path):
+        model_fn = f'{model_type.upper()}_{gender.upper()}.{ext}'
+        return osp.join(model_path, model_fn)
+    return model_path
+
+
+def load_model_data(model_file: str, cache_dir: Optional[str] = None) -> dict:
+    """Load the data of a body model file once per process.
+
+    The arrays are shared by all the callers, hence read-only. If cache_dir
+    is given, the arrays are converted to .npy files in cache_dir at the
+    first load, and memory-mapped afterwards, so that processes do not
+    unpickle the model file again and share the pages of the arrays.
+
+    Args:
+        model_file (str): path to a .pkl or .npz model file.
+        cache_dir (str, optional): directory of the converted model files.
+            Defaults to None, the model file is read directly.
+
+    Returns:
+        dict: the model data, same keys as in the model file.
+    """
+    model_file = osp.realpath(model_file)
+    stat = os.stat(model_file)
+    key = (model_file, stat.st_mtime_ns, stat.st_size)
+    data = __BODY_MODEL_DATA_CACHE__.get(key)
+    if data is None:
+        if cache_dir is None:
+            data = _read_model_file(model_file)
+        else:
+            digest = hashlib.md5(repr(key).encode()).hexdigest()[:16]
+            data_dir = osp.join(cache_dir,
+                                f'{osp.basename(model_file)}.{digest}')
+            if not osp.isdir(data_dir):
+                _dump_model_data(_read_model_file(model_file), data_dir)
+            data = _load_model_data_dir(data_dir)
+        for value in data.values():
+            if isinstance(value, np.ndarray):
+                value.setflags(write=False)
+        __BODY_MODEL_DATA_CACHE__[key] = data
+    return data
+
+
+def _read_model_file(model_file: str) -> dict:
+    """Read a .pkl or .npz model file."""
+    if model_file.endswith('.npz'):
+        with np.load(model_file, allow_pickle=True) as npz_file:
+            return dict(npz_file)
+    with open(model_file, 'rb') as f:
+        return dict(pickle.load(f, encoding='latin1'))
+
+
+def _dump_model_data(data: dict, data_dir: str) -> None:
+    """Save the numeric arrays as .npy files and the rest as a pickle."""
+    parent_dir = osp.dirname(osp.abspath(data_dir))
+    os.makedirs(parent_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=parent_dir)
+    others = dict()
+    for name, value in data.items():
+        if 'scipy.sparse' in str(type(value)):
+            value = value.toarray()
+        try:
+            array = np.asarray(value)
+        except Exception:
+            array = None
+        if array is not None and array.dtype.kind in 'biuf':
+            np.save(osp.join(tmp_dir, f'{name}.npy'), array)
+        else:
+            others[name] = value
+    with open(osp.join(tmp_dir, 'others.pkl'), 'wb') as f:
+        pickle.dump(others, f)
+    try:
+        os.rename(tmp_dir, data_dir)
+    except OSError:
+        # dumped by another process
+        shutil.rmtree(tmp_dir)
+
+
+def _load_model_data_dir(data_dir: str) -> dict:
+    """Load the model data saved by :func:`_dump_model_data`."""
+    with open(osp.join(data_dir, 'others.pkl'), 'rb') as f:
+        data = pickle.load(f)
+    for fn in os.listdir(data_dir):
+        if fn.endswith('.npy'):
+            data[fn[:-len('.npy')]] = np.load(
+                osp.join(data_dir, fn), mmap_mode='r')
+    return data
+
+
+def share_buffers(module: torch.nn.Module, model_file: str,
+                  names: Iterable[str]) -> None:
+    """Replace the buffers of a body model by the equal buffers of the
+    models built earlier from the same model file.
+
+    The shared buffers must not be modified in place, except by
+    load_state_dict, see :func:`unshare_buffers`.
+
+    Args:
+        module (torch.nn.Module): the body model.
+        model_file (str): the model file, which the buffers are loaded from.
+        names (Iterable[str]): names of the buffers to share.
+    """
+    model_file = osp.realpath(model_file)
+    shared_names = module.__dict__.setdefault('_shared_buffers', set())
+    for name in names:
+        buffer = module._buffers.get(name)
+        if buffer is None:
+            continue
+        key = (model_file, name)
+        shared = __BODY_MODEL_BUFFER_CACHE__.get(key)
+        if shared is not None and shared.dtype == buffer.dtype and \
+                shared.device == buffer.device and \
+                shared.shape == buffer.shape and torch.equal(shared, buffer):
+            module._buffers[name] = shared
+        else:
+            __BODY_MODEL_BUFFER_CACHE__[key] = buffer
+        shared_names.add(name)
+
+
+def unshare_buffers(module: torch.nn.Module, state_dict: dict,
+                    prefix: str) -> None:
+    """Copy the shared buffers to be loaded with different values, to be
+    called in ``_load_from_state_dict`` before loading.
+
+    Args:
+        module (torch.nn.Module): the body model.
+        state_dict (dict): the state dict to load.
+        prefix (str): prefix of the module in state_dict.
+    """
+    for name in module.__dict__.get('_shared_buffers', ()):
+        buffer = module._buffers.get(name)
+        value = state_dict.get(prefix + name)
+        if buffer is None or not isinstance(value, torch.Tensor):
+            continue
+        if value.shape != buffer.shape or not torch.equal(
+                value.to(buffer), buffer):
+            module._buffers[name] = buffer.clone()
+
+
+def clear_body_model_cache() -> None:
+    """Release the model data and buffers kept for the later models."""
+    __BODY_MODEL_DATA_CACHE__.clear()
+    __BODY_MODEL_BUFFER_CACHE__.clear()
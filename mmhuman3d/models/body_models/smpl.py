@@ -1,22 +1,37 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 
+import os.path as osp
 from typing import Optional
 
 import numpy as np
 import torch
+import torch.nn.functional as F
 from smplx import SMPL as _SMPL
 from smplx.lbs import (
     batch_rigid_transform,
+    batch_rodrigues,
     blend_shapes,
     transform_mat,
     vertices2joints,
 )
+from smplx.utils import SMPLOutput, Struct
 
 from mmhuman3d.core.conventions.keypoints_mapping import (
     convert_kps,
     get_keypoint_num,
 )
 from mmhuman3d.core.conventions.segmentation import body_segmentation
+from mmhuman3d.models.body_models.assets import (
+    get_model_file,
+    load_model_data,
+    share_buffers,
+    unshare_buffers,
+)
+from mmhuman3d.models.body_models.utils import (
+    get_joint_lbs_buffers,
+    joint_lbs,
+    skin_vertices,
+)
 from mmhuman3d.models.utils import batch_inverse_kinematics_transform
 from mmhuman3d.utils.transforms import quat_to_rotmat
 
@@ -34,6 +49,11 @@ class SMPL(_SMPL):
     }
     NUM_VERTS = 6890
     NUM_FACES = 13776
+    # buffers loaded from the model file, shared by the models built from it
+    shared_buffer_names = [
+        'shapedirs', 'posedirs', 'v_template', 'J_regressor', 'lbs_weights',
+        'faces_tensor', 'parents', 'tpose_joints'
+    ]
 
     def __init__(self,
                  *args,
@@ -42,6 +62,7 @@ class SMPL(_SMPL):
                  keypoint_approximate: bool = False,
                  joints_regressor: str = None,
                  extra_joints_regressor: str = None,
+                 asset_cache_dir: Optional[str] = None,
                  **kwargs) -> None:
         """
         Args:
@@ -60,11 +81,20 @@ class SMPL(_SMPL):
                 a .npy file. If provided, extra joints are regressed and
                 concatenated after the joints regressed with the official
                 J_regressor or joints_regressor.
+            asset_cache_dir: directory to convert the model file to
+                memory-mapped arrays, see :func:`load_model_data`. The model
+                file is loaded once per process in any case.
             **kwargs: extra keyword arguments for SMPL initialization.
 
         Returns:
             None
         """
+        model_path = args[0] if args else kwargs.get('model_path', '')
+        model_file = get_model_file(model_path, 'SMPL',
+                                    kwargs.get('gender', 'neutral'))
+        if kwargs.get('data_struct') is None and osp.isfile(model_file):
+            kwargs['data_struct'] = Struct(
+                **load_model_data(model_file, asset_cache_dir))
         super(SMPL, self).__init__(*args, **kwargs)
         # joints = [JOINT_MAP[i] for i in JOINT_NAMES]
         self.keypoint_src = keypoint_src
@@ -85,10 +115,51 @@ class SMPL(_SMPL):
 
         self.num_verts = self.get_num_verts()
         self.num_joints = get_keypoint_num(convention=self.keypoint_dst)
-        self.body_part_segmentation = body_segmentation('smpl')
         tpose_joints = vertices2joints(self.J_regressor,
                                        self.v_template.unsqueeze(0))
         self.register_buffer('tpose_joints', tpose_joints)
+        share_buffers(self, model_file, self.shared_buffer_names)
+
+    @property
+    def body_part_segmentation(self) -> body_segmentation:
+        """Vertex segmentation of the body parts."""
+        return body_segmentation('smpl')
+
+    def _load_from_state_dict(self, state_dict, prefix, *args, **kwargs):
+        unshare_buffers(self, state_dict, prefix)
+        super(SMPL, self)._load_from_state_dict(state_dict, prefix, *args,
+                                                **kwargs)
+
+    def _init_joint_lbs(self) -> None:
+        """Precompute the buffers to get the joints without the mesh, at the
+        first forward without vertices.
+
+        The rest joints are regressed from the shape blend shapes once here.
+        Only the vertices picked as extra joints or used by joints_regressor
+        and joints_regressor_extra are skinned in the forward. The buffers
+        are derived from the model, hence not saved in the state dict.
+        """
+        if hasattr(self, 'joint_vertex_ids'):
+            return
+        extra_joints_idxs = self.vertex_joint_selector.extra_joints_idxs
+        vertex_ids = [extra_joints_idxs]
+        for name in ['joints_regressor', 'joints_regressor_extra']:
+            if hasattr(self, name):
+                regressor = getattr(self, name)
+                vertex_ids.append(
+                    torch.nonzero(regressor.abs().sum(dim=0))[:, 0])
+        vertex_ids, inverse = torch.unique(
+            torch.cat(vertex_ids), return_inverse=True)
+        self.register_buffer('joint_vertex_ids', vertex_ids, persistent=False)
+        self.register_buffer(
+            'joint_extra_idxs',
+            inverse[:len(extra_joints_idxs)],
+            persistent=False)
+        buffers = get_joint_lbs_buffers(self.J_regressor, self.v_template,
+                                        self.shapedirs, self.posedirs,
+                                        self.lbs_weights, vertex_ids)
+        for name, buffer in buffers.items():
+            self.register_buffer(name, buffer, persistent=False)
 
     def forward(self,
                 *args,
@@ -99,25 +170,127 @@ class SMPL(_SMPL):
 
         Args:
             *args: extra arguments for SMPL
-            return_verts: whether to return vertices
+            return_verts: whether to return vertices. If False, only the
+                vertices needed by the joints are skinned.
             return_full_pose: whether to return full pose parameters
             **kwargs: extra arguments for SMPL
 
         Returns:
             output: contains output parameters and attributes
         """
+        if not return_verts:
+            self._init_joint_lbs()
+            smpl_output = self._forward_joints(*args, **kwargs)
+            return self._format_output(smpl_output, return_verts,
+                                       return_full_pose, self.joint_vertex_ids)
 
         kwargs['get_skin'] = True
         smpl_output = super(SMPL, self).forward(*args, **kwargs)
+        return self._format_output(smpl_output, return_verts, return_full_pose)
+
+    def _forward_joints(self,
+                        betas: Optional[torch.Tensor] = None,
+                        body_pose: Optional[torch.Tensor] = None,
+                        global_orient: Optional[torch.Tensor] = None,
+                        transl: Optional[torch.Tensor] = None,
+                        pose2rot: bool = True,
+                        **kwargs) -> SMPLOutput:
+        """Same as the official SMPL forward, except that only the vertices
+        in joint_vertex_ids are skinned and returned."""
+        global_orient = (
+            global_orient if global_orient is not None else self.global_orient)
+        body_pose = body_pose if body_pose is not None else self.body_pose
+        betas = betas if betas is not None else self.betas
+
+        apply_trans = transl is not None or hasattr(self, 'transl')
+        if transl is None and hasattr(self, 'transl'):
+            transl = self.transl
+
+        full_pose = torch.cat([global_orient, body_pose], dim=1)
 
+        batch_size = max(betas.shape[0], global_orient.shape[0],
+                         body_pose.shape[0])
+        if betas.shape[0] != batch_size:
+            num_repeats = int(batch_size / betas.shape[0])
+            betas = betas.expand(num_repeats, -1)
+
+        vertices, joints = joint_lbs(
+            betas,
+            full_pose,
+            self.parents,
+            self.joint_shape_basis,
+            self.joint_posedirs,
+            self.joint_lbs_weights,
+            pose2rot=pose2rot)
+        joints = self._select_joints(vertices, joints, self.joint_vertex_ids)
+
+        if apply_trans:
+            joints = joints + transl.unsqueeze(dim=1)
+            vertices = vertices + transl.unsqueeze(dim=1)
+
+        return SMPLOutput(
+            vertices=vertices,
+            joints=joints,
+            betas=betas,
+            global_orient=global_orient,
+            body_pose=body_pose,
+            full_pose=full_pose)
+
+    def _select_joints(
+            self,
+            vertices: torch.Tensor,
+            joints: torch.Tensor,
+            vertex_ids: Optional[torch.Tensor] = None) -> torch.Tensor:
+        """Append the extra joints picked from the vertices and map the
+        joints, as in the official SMPL.
+
+        Args:
+            vertices: Tensor([B, V, 3]), the posed vertices.
+            joints: Tensor([B, J, 3]), the posed joints.
+            vertex_ids: indices of the vertices in the mesh, None if
+                vertices are the whole mesh.
+
+        Returns:
+            joints: Tensor([B, J + E, 3]), the joints with the extra ones.
+        """
+        if vertex_ids is None:
+            joints = self.vertex_joint_selector(vertices, joints)
+        else:
+            joints = torch.cat([joints, vertices[:, self.joint_extra_idxs]],
+                               dim=1)
+        if self.joint_mapper is not None:
+            joints = self.joint_mapper(joints)
+        return joints
+
+    def _format_output(self,
+                       smpl_output: SMPLOutput,
+                       return_verts: bool = True,
+                       return_full_pose: bool = False,
+                       vertex_ids: Optional[torch.Tensor] = None) -> dict:
+        """Regress the keypoints and convert them to keypoint_dst.
+
+        Args:
+            smpl_output: output of the official SMPL forward.
+            return_verts: whether to return vertices
+            return_full_pose: whether to return full pose parameters
+            vertex_ids: indices of smpl_output.vertices in the mesh, None if
+                they are the whole mesh.
+
+        Returns:
+            output: contains output parameters and attributes
+        """
         if not hasattr(self, 'joints_regressor'):
             joints = smpl_output.joints
         else:
-            joints = vertices2joints(self.joints_regressor,
-                                     smpl_output.vertices)
+            joints_regressor = self.joints_regressor if vertex_ids is None \
+                else self.joints_regressor[:, vertex_ids]
+            joints = vertices2joints(joints_regressor, smpl_output.vertices)
 
         if hasattr(self, 'joints_regressor_extra'):
-            extra_joints = vertices2joints(self.joints_regressor_extra,
+            joints_regressor_extra = self.joints_regressor_extra \
+                if vertex_ids is None \
+                else self.joints_regressor_extra[:, vertex_ids]
+            extra_joints = vertices2joints(joints_regressor_extra,
                                            smpl_output.vertices)
             joints = torch.cat([joints, extra_joints], dim=1)
 
@@ -363,6 +536,47 @@ class GenderedSMPL(torch.nn.Module):
         self.num_joints = self.smpl_neutral.num_joints
         self.faces = self.smpl_neutral.faces
 
+        # Stack the shape spaces in the order of gender + 1, so that the rest
+        # poses of mixed genders are blended at once. They are derived from
+        # the gendered SMPL, hence not saved in the state dict.
+        body_models = self._gendered_models()
+        num_genders = len(body_models)
+        v_templates = torch.stack([m.v_template for m in body_models])
+        shapedirs = torch.stack([m.shapedirs for m in body_models])
+        J_regressors = torch.stack([m.J_regressor for m in body_models])
+        # The rest pose is linear in [one-hot gender, betas of each gender],
+        # and so are the rest joints regressed from it.
+        shape_basis = torch.cat([
+            v_templates.reshape(num_genders, -1),
+            shapedirs.permute(0, 3, 1, 2).reshape(-1, self.num_verts * 3)
+        ])
+        joint_basis = torch.cat([
+            torch.einsum('gjv,gvk->gjk', J_regressors,
+                         v_templates).reshape(num_genders, -1),
+            torch.einsum('gjv,gvkl->gljk', J_regressors,
+                         shapedirs).reshape(-1, J_regressors.shape[1] * 3)
+        ])
+        self.register_buffer('shape_basis', shape_basis, persistent=False)
+        self.register_buffer('joint_basis', joint_basis, persistent=False)
+
+    def _init_joint_lbs(self) -> None:
+        """Precompute the buffers to get the joints without the mesh, at the
+        first forward without vertices, see :meth:`SMPL._init_joint_lbs`.
+
+        The gendered SMPL share the vertices skinned for joints only.
+        """
+        if hasattr(self, 'joint_shape_basis'):
+            return
+        for body_model in self._gendered_models():
+            body_model._init_joint_lbs()
+        num_coeffs = self.shape_basis.shape[0]
+        joint_shape_basis = self.shape_basis.view(
+            num_coeffs, -1, 3)[:, self.smpl_neutral.joint_vertex_ids]
+        self.register_buffer(
+            'joint_shape_basis',
+            joint_shape_basis.reshape(num_coeffs, -1),
+            persistent=False)
+
     def forward(self,
                 *args,
                 betas: torch.Tensor = None,
@@ -373,6 +587,7 @@ class GenderedSMPL(torch.nn.Module):
                 return_full_pose: bool = False,
                 gender: torch.Tensor = None,
                 device=None,
+                pose2rot: bool = True,
                 **kwargs):
         """Forward function.
         Note:
@@ -391,7 +606,9 @@ class GenderedSMPL(torch.nn.Module):
             transl: Tensor([B, 3]), global translation of human body.
             gender: Tensor([B]), gender parameters of human body. -1 for
                 neutral, 0 for male , 1 for female.
-            device: the device of the output
+            device: unused, the outputs are on the device of the body model.
+            pose2rot: whether the poses are axis-angle vectors, otherwise
+                rotation matrices.
             **kwargs: extra keyword arguments
         Returns:
             outputs (dict): Dict with mesh vertices and joints.
@@ -399,69 +616,134 @@ class GenderedSMPL(torch.nn.Module):
                 - joints: Tensor([B, K, 3]), 3d keypoints regressed from
                     mesh vertices.
         """
+        if gender is None:
+            return self.smpl_neutral(
+                betas=betas,
+                body_pose=body_pose,
+                global_orient=global_orient,
+                transl=transl,
+                return_verts=return_verts,
+                return_full_pose=return_full_pose,
+                pose2rot=pose2rot,
+                **kwargs)
 
+        smpl = self.smpl_neutral
         batch_size = None
         for attr in [betas, body_pose, global_orient, transl]:
             if attr is not None:
-                if device is None:
-                    device = attr.device
                 if batch_size is None:
                     batch_size = attr.shape[0]
                 else:
                     assert batch_size == attr.shape[0]
+        if batch_size is None:
+            batch_size = len(gender)
+        if betas is None:
+            betas = smpl.betas.expand(batch_size, -1)
+        if body_pose is None:
+            body_pose = smpl.body_pose.expand(batch_size, -1)
+        if global_orient is None:
+            global_orient = smpl.global_orient.expand(batch_size, -1)
+        full_pose = torch.cat([global_orient, body_pose], dim=1)
 
-        if gender is not None:
-            output = {
-                'vertices':
-                torch.zeros([batch_size, self.num_verts, 3], device=device),
-                'joints':
-                torch.zeros([batch_size, self.num_joints, 3], device=device),
-                'joint_mask':
-                torch.zeros([batch_size, self.num_joints],
-                            dtype=torch.uint8,
-                            device=device)
-            }
-
-            for body_model, gender_label in \
-                    [(self.smpl_neutral, -1),
-                     (self.smpl_male, 0),
-                     (self.smpl_female, 1)]:
-                gender_idxs = gender == gender_label
-
-                # skip if no such gender is present
-                if gender_idxs.sum() == 0:
-                    continue
-
-                output_model = body_model(
-                    betas=betas[gender_idxs] if betas is not None else None,
-                    body_pose=body_pose[gender_idxs]
-                    if body_pose is not None else None,
-                    global_orient=global_orient[gender_idxs]
-                    if global_orient is not None else None,
-                    transl=transl[gender_idxs] if transl is not None else None,
-                    **kwargs)
-
-                output['joints'][gender_idxs] = output_model['joints']
-
-                # TODO: quick fix
-                if 'joint_mask' in output_model:
-                    output['joint_mask'][gender_idxs] = output_model[
-                        'joint_mask']
-
-                if return_verts:
-                    output['vertices'][gender_idxs] = output_model['vertices']
-                if return_full_pose:
-                    output['full_pose'][gender_idxs] = output_model[
-                        'full_pose']
+        gender_idxs = gender.to(self.shape_basis.device).long() + 1
+        if not return_verts:
+            self._init_joint_lbs()
+        vertex_ids = None if return_verts else smpl.joint_vertex_ids
+        vertices, joints = self._lbs(betas, full_pose, gender_idxs, pose2rot,
+                                     vertex_ids)
+        joints = smpl._select_joints(vertices, joints, vertex_ids)
+        if transl is not None:
+            joints = joints + transl.unsqueeze(dim=1)
+            vertices = vertices + transl.unsqueeze(dim=1)
+
+        smpl_output = SMPLOutput(
+            vertices=vertices,
+            joints=joints,
+            betas=betas,
+            global_orient=global_orient,
+            body_pose=body_pose,
+            full_pose=full_pose)
+        return smpl._format_output(smpl_output, return_verts, return_full_pose,
+                                   vertex_ids)
+
+    def _lbs(self,
+             betas: torch.Tensor,
+             full_pose: torch.Tensor,
+             gender_idxs: torch.Tensor,
+             pose2rot: bool = True,
+             vertex_ids: Optional[torch.Tensor] = None):
+        """Linear blend skinning with the model of each sample's gender.
+
+        Same as :func:`smplx.lbs.lbs`, except that the rest pose and joints
+        of all the samples are blended from the stacked bases at once. The
+        pose blend shapes and the skinning are applied by gender, since
+        gathering posedirs and lbs_weights per sample costs more memory
+        than the skinning itself.
+
+        Args:
+            betas: Tensor([B, 10]), human body shape parameters.
+            full_pose: Tensor([B, (J+1)*3] or [B, J+1, 3, 3]), poses of
+                the root and the body joints.
+            gender_idxs: Tensor([B]), 0 for neutral, 1 for male and 2 for
+                female.
+            pose2rot: whether the poses are axis-angle vectors.
+            vertex_ids: if given, only the joint_vertex_ids of the SMPL are
+                skinned, see :meth:`SMPL._init_joint_lbs`.
+
+        Returns:
+            vertices (Tensor([B, V, 3])) and joints (Tensor([B, J+1, 3])).
+        """
+        batch_size = full_pose.shape[0]
+        body_models = self._gendered_models()
+        num_genders = len(body_models)
+        dtype = self.shape_basis.dtype
+        betas = betas.expand(batch_size, -1)
+
+        one_hot = F.one_hot(gender_idxs, num_genders).to(dtype)
+        coeffs = torch.cat([
+            one_hot,
+            (one_hot[:, :, None] * betas[:, None, :]).reshape(batch_size, -1)
+        ],
+                           dim=1)
+        shape_basis = self.shape_basis if vertex_ids is None \
+            else self.joint_shape_basis
+        v_shaped = torch.matmul(coeffs, shape_basis).view(batch_size, -1, 3)
+        J = torch.matmul(coeffs, self.joint_basis).view(batch_size, -1, 3)
+
+        ident = torch.eye(3, dtype=dtype, device=full_pose.device)
+        if pose2rot:
+            rot_mats = batch_rodrigues(full_pose.view(-1, 3)).view(
+                [batch_size, -1, 3, 3])
         else:
-            output = self.smpl_neutral(
-                betas=betas,
-                body_pose=body_pose,
-                global_orient=global_orient,
-                transl=transl,
-                **kwargs)
+            rot_mats = full_pose.view(batch_size, -1, 3, 3)
+        pose_feature = (rot_mats[:, 1:] - ident).view([batch_size, -1])
 
-        return output
+        J_transformed, A = batch_rigid_transform(
+            rot_mats, J, self.smpl_neutral.parents, dtype=dtype)
+
+        if vertex_ids is None:
+            skinning_buffers = [(m.posedirs, m.lbs_weights)
+                                for m in body_models]
+        else:
+            skinning_buffers = [(m.joint_posedirs, m.joint_lbs_weights)
+                                for m in body_models]
+        genders = torch.unique(gender_idxs).tolist()
+        if len(genders) == 1:
+            vertices = skin_vertices(v_shaped, pose_feature, A,
+                                     *skinning_buffers[genders[0]])
+        else:
+            vertices = torch.empty_like(v_shaped)
+            for gender_idx in genders:
+                idxs = torch.nonzero(gender_idxs == gender_idx)[:, 0]
+                vertices.index_copy_(
+                    0, idxs,
+                    skin_vertices(v_shaped[idxs], pose_feature[idxs], A[idxs],
+                                  *skinning_buffers[gender_idx]))
+        return vertices, J_transformed
+
+    def _gendered_models(self) -> list:
+        """SMPL of each gender, indexed by gender + 1."""
+        return [self.smpl_neutral, self.smpl_male, self.smpl_female]
 
 
 def to_tensor(array, dtype=torch.float32):
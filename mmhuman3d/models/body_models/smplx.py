@@ -6,7 +6,13 @@ import torch
 import torch.nn as nn
 from smplx import SMPLX as _SMPLX
 from smplx import SMPLXLayer as _SMPLXLayer
-from smplx.lbs import blend_shapes, vertices2joints
+from smplx.lbs import (
+    blend_shapes,
+    find_dynamic_lmk_idx_and_bcoords,
+    vertices2joints,
+    vertices2landmarks,
+)
+from smplx.utils import SMPLXOutput
 
 from mmhuman3d.core.conventions.keypoints_mapping import (
     convert_kps,
@@ -18,6 +24,12 @@ from mmhuman3d.core.conventions.keypoints_mapping.mano import (
 )
 from mmhuman3d.core.conventions.keypoints_mapping.smplx import SMPLX_KEYPOINTS
 from mmhuman3d.core.conventions.segmentation import body_segmentation
+from mmhuman3d.models.body_models.assets import (
+    get_model_file,
+    share_buffers,
+    unshare_buffers,
+)
+from mmhuman3d.models.body_models.utils import get_joint_lbs_buffers, joint_lbs
 from mmhuman3d.models.utils.SMPLX import get_partial_smpl
 
 # yapf: enable
@@ -33,6 +45,11 @@ class SMPLX(_SMPLX):
     }
     NUM_VERTS = 10475
     NUM_FACES = 20908
+    # buffers loaded from the model file, shared by the models built from it
+    shared_buffer_names = [
+        'shapedirs', 'expr_dirs', 'posedirs', 'v_template', 'J_regressor',
+        'lbs_weights', 'faces_tensor', 'parents'
+    ]
 
     def __init__(self,
                  *args,
@@ -85,7 +102,57 @@ class SMPLX(_SMPLX):
 
         self.num_verts = self.get_num_verts()
         self.num_joints = get_keypoint_num(convention=self.keypoint_dst)
-        self.body_part_segmentation = body_segmentation('smplx')
+        share_buffers(self, _get_model_file(args, kwargs),
+                      self.shared_buffer_names)
+
+    @property
+    def body_part_segmentation(self) -> body_segmentation:
+        """Vertex segmentation of the body parts."""
+        return body_segmentation('smplx')
+
+    def _load_from_state_dict(self, state_dict, prefix, *args, **kwargs):
+        unshare_buffers(self, state_dict, prefix)
+        super(SMPLX, self)._load_from_state_dict(state_dict, prefix, *args,
+                                                 **kwargs)
+
+    def _init_joint_lbs(self) -> None:
+        """Precompute the buffers to get the joints without the mesh, at the
+        first forward without vertices.
+
+        Same as :meth:`SMPL._init_joint_lbs`, in addition, the vertices of
+        the faces interpolated as the landmarks are skinned. joint_faces are
+        the faces indexing the skinned vertices, only valid for these faces.
+        """
+        if hasattr(self, 'joint_vertex_ids'):
+            return
+        extra_joints_idxs = self.vertex_joint_selector.extra_joints_idxs
+        lmk_faces_idx = [self.lmk_faces_idx.reshape(-1)]
+        if self.use_face_contour:
+            lmk_faces_idx.append(self.dynamic_lmk_faces_idx.reshape(-1))
+        lmk_faces = self.faces_tensor[torch.cat(lmk_faces_idx)]
+        vertex_ids = [extra_joints_idxs, lmk_faces.reshape(-1)]
+        for name in ['joints_regressor', 'joints_regressor_extra']:
+            if hasattr(self, name):
+                regressor = getattr(self, name)
+                vertex_ids.append(
+                    torch.nonzero(regressor.abs().sum(dim=0))[:, 0])
+        vertex_ids, inverse = torch.unique(
+            torch.cat(vertex_ids), return_inverse=True)
+        self.register_buffer('joint_vertex_ids', vertex_ids, persistent=False)
+        self.register_buffer(
+            'joint_extra_idxs',
+            inverse[:len(extra_joints_idxs)],
+            persistent=False)
+        vertex_map = self.faces_tensor.new_zeros(self.get_num_verts())
+        vertex_map[vertex_ids] = torch.arange(len(vertex_ids))
+        self.register_buffer(
+            'joint_faces', vertex_map[self.faces_tensor], persistent=False)
+        buffers = get_joint_lbs_buffers(
+            self.J_regressor, self.v_template,
+            torch.cat([self.shapedirs, self.expr_dirs], dim=-1), self.posedirs,
+            self.lbs_weights, vertex_ids)
+        for name, buffer in buffers.items():
+            self.register_buffer(name, buffer, persistent=False)
 
     def forward(self,
                 *args,
@@ -96,25 +163,163 @@ class SMPLX(_SMPLX):
 
         Args:
             *args: extra arguments for SMPLX
-            return_verts: whether to return vertices
+            return_verts: whether to return vertices. If False, only the
+                vertices needed by the joints are skinned.
             return_full_pose: whether to return full pose parameters
             **kwargs: extra arguments for SMPLX
 
         Returns:
             output: contains output parameters and attributes
         """
+        # a joint mapper may use any vertex
+        if not return_verts and self.joint_mapper is None:
+            self._init_joint_lbs()
+            smplx_output = self._forward_joints(*args, **kwargs)
+            return self._format_output(smplx_output, return_verts,
+                                       return_full_pose, self.joint_vertex_ids)
 
         kwargs['get_skin'] = True
         smplx_output = super(SMPLX, self).forward(*args, **kwargs)
+        return self._format_output(smplx_output, return_verts,
+                                   return_full_pose)
+
+    def _forward_joints(self,
+                        betas: Optional[torch.Tensor] = None,
+                        global_orient: Optional[torch.Tensor] = None,
+                        body_pose: Optional[torch.Tensor] = None,
+                        left_hand_pose: Optional[torch.Tensor] = None,
+                        right_hand_pose: Optional[torch.Tensor] = None,
+                        transl: Optional[torch.Tensor] = None,
+                        expression: Optional[torch.Tensor] = None,
+                        jaw_pose: Optional[torch.Tensor] = None,
+                        leye_pose: Optional[torch.Tensor] = None,
+                        reye_pose: Optional[torch.Tensor] = None,
+                        pose2rot: bool = True,
+                        **kwargs) -> SMPLXOutput:
+        """Same as the official SMPL-X forward, except that only the vertices
+        in joint_vertex_ids are skinned and returned."""
+        global_orient = (
+            global_orient if global_orient is not None else self.global_orient)
+        body_pose = body_pose if body_pose is not None else self.body_pose
+        betas = betas if betas is not None else self.betas
+
+        left_hand_pose = (
+            left_hand_pose
+            if left_hand_pose is not None else self.left_hand_pose)
+        right_hand_pose = (
+            right_hand_pose
+            if right_hand_pose is not None else self.right_hand_pose)
+        jaw_pose = jaw_pose if jaw_pose is not None else self.jaw_pose
+        leye_pose = leye_pose if leye_pose is not None else self.leye_pose
+        reye_pose = reye_pose if reye_pose is not None else self.reye_pose
+        expression = expression if expression is not None else self.expression
+
+        apply_trans = transl is not None or hasattr(self, 'transl')
+        if transl is None and hasattr(self, 'transl'):
+            transl = self.transl
+
+        if self.use_pca:
+            left_hand_pose = torch.einsum(
+                'bi,ij->bj', [left_hand_pose, self.left_hand_components])
+            right_hand_pose = torch.einsum(
+                'bi,ij->bj', [right_hand_pose, self.right_hand_components])
+
+        full_pose = torch.cat([
+            global_orient.reshape(-1, 1, 3),
+            body_pose.reshape(-1, self.NUM_BODY_JOINTS, 3),
+            jaw_pose.reshape(-1, 1, 3),
+            leye_pose.reshape(-1, 1, 3),
+            reye_pose.reshape(-1, 1, 3),
+            left_hand_pose.reshape(-1, 15, 3),
+            right_hand_pose.reshape(-1, 15, 3)
+        ],
+                              dim=1).reshape(-1, 165)
+        full_pose += self.pose_mean
+
+        batch_size = max(betas.shape[0], global_orient.shape[0],
+                         body_pose.shape[0])
+        scale = int(batch_size / betas.shape[0])
+        if scale > 1:
+            betas = betas.expand(scale, -1)
+        shape_components = torch.cat([betas, expression], dim=-1)
+
+        vertices, joints = joint_lbs(
+            shape_components,
+            full_pose,
+            self.parents,
+            self.joint_shape_basis,
+            self.joint_posedirs,
+            self.joint_lbs_weights,
+            pose2rot=pose2rot)
+
+        lmk_faces_idx = self.lmk_faces_idx.unsqueeze(dim=0).expand(
+            batch_size, -1).contiguous()
+        lmk_bary_coords = self.lmk_bary_coords.unsqueeze(dim=0).repeat(
+            self.batch_size, 1, 1)
+        if self.use_face_contour:
+            dyn_lmk_faces_idx, dyn_lmk_bary_coords = \
+                find_dynamic_lmk_idx_and_bcoords(
+                    vertices,
+                    full_pose,
+                    self.dynamic_lmk_faces_idx,
+                    self.dynamic_lmk_bary_coords,
+                    self.neck_kin_chain,
+                    pose2rot=True)
+            lmk_faces_idx = torch.cat([lmk_faces_idx, dyn_lmk_faces_idx], 1)
+            lmk_bary_coords = torch.cat([
+                lmk_bary_coords.expand(batch_size, -1, -1), dyn_lmk_bary_coords
+            ], 1)
+        landmarks = vertices2landmarks(vertices, self.joint_faces,
+                                       lmk_faces_idx, lmk_bary_coords)
+
+        joints = torch.cat([joints, vertices[:, self.joint_extra_idxs]], dim=1)
+        joints = torch.cat([joints, landmarks], dim=1)
+
+        if apply_trans:
+            joints = joints + transl.unsqueeze(dim=1)
+            vertices = vertices + transl.unsqueeze(dim=1)
+
+        return SMPLXOutput(
+            vertices=vertices,
+            joints=joints,
+            betas=betas,
+            expression=expression,
+            global_orient=global_orient,
+            body_pose=body_pose,
+            left_hand_pose=left_hand_pose,
+            right_hand_pose=right_hand_pose,
+            jaw_pose=jaw_pose,
+            full_pose=full_pose)
+
+    def _format_output(self,
+                       smplx_output: SMPLXOutput,
+                       return_verts: bool = True,
+                       return_full_pose: bool = False,
+                       vertex_ids: Optional[torch.Tensor] = None) -> dict:
+        """Regress the keypoints and convert them to keypoint_dst.
 
+        Args:
+            smplx_output: output of the official SMPL-X forward.
+            return_verts: whether to return vertices
+            return_full_pose: whether to return full pose parameters
+            vertex_ids: indices of smplx_output.vertices in the mesh, None
+                if they are the whole mesh.
+
+        Returns:
+            output: contains output parameters and attributes
+        """
         if not hasattr(self, 'joints_regressor'):
             joints = smplx_output.joints
         else:
-            joints = vertices2joints(self.joints_regressor,
-                                     smplx_output.vertices)
+            joints_regressor = self.joints_regressor if vertex_ids is None \
+                else self.joints_regressor[:, vertex_ids]
+            joints = vertices2joints(joints_regressor, smplx_output.vertices)
 
         if hasattr(self, 'joints_regressor_extra'):
-            extra_joints = vertices2joints(self.joints_regressor_extra,
+            joints_regressor_extra = self.joints_regressor_extra \
+                if vertex_ids is None \
+                else self.joints_regressor_extra[:, vertex_ids]
+            extra_joints = vertices2joints(joints_regressor_extra,
                                            smplx_output.vertices)
             joints = torch.cat([joints, extra_joints], dim=1)
 
@@ -272,6 +477,11 @@ class SMPLXLayer(_SMPLXLayer):
     }
     NUM_VERTS = 10475
     NUM_FACES = 20908
+    # buffers loaded from the model file, shared by the models built from it
+    shared_buffer_names = [
+        'shapedirs', 'expr_dirs', 'posedirs', 'v_template', 'J_regressor',
+        'lbs_weights', 'faces_tensor', 'parents'
+    ]
 
     def __init__(self,
                  *args,
@@ -324,7 +534,18 @@ class SMPLXLayer(_SMPLXLayer):
 
         self.num_verts = self.get_num_verts()
         self.num_joints = get_keypoint_num(convention=self.keypoint_dst)
-        self.body_part_segmentation = body_segmentation('smplx')
+        share_buffers(self, _get_model_file(args, kwargs),
+                      self.shared_buffer_names)
+
+    @property
+    def body_part_segmentation(self) -> body_segmentation:
+        """Vertex segmentation of the body parts."""
+        return body_segmentation('smplx')
+
+    def _load_from_state_dict(self, state_dict, prefix, *args, **kwargs):
+        unshare_buffers(self, state_dict, prefix)
+        super(SMPLXLayer, self)._load_from_state_dict(state_dict, prefix,
+                                                      *args, **kwargs)
 
     def forward(self,
                 *args,
@@ -439,7 +660,8 @@ class GenderedSMPLX(nn.Module):
             self.genders = [gender]
 
         self.model_dict = nn.ModuleDict({
-            gender: SMPLXLayer(
+            gender:
+            SMPLXLayer(
                 smplx_model_dir,
                 gender=gender,
                 ext='npz',
@@ -673,3 +895,10 @@ class GenderedSMPLX(nn.Module):
 
         smplx_joints = torch.cat(smplx_joints)[idx_rearrange]
         return smplx_joints
+
+
+def _get_model_file(args: tuple, kwargs: dict) -> str:
+    """The SMPL-X model file of the arguments of smplx.SMPLX."""
+    model_path = args[0] if args else kwargs.get('model_path', '')
+    return get_model_file(model_path, 'SMPLX', kwargs.get('gender', 'neutral'),
+                          kwargs.get('ext', 'npz'))
@@ -1,4 +1,6 @@
 import numpy as np
+import torch
+from smplx.lbs import batch_rigid_transform, batch_rodrigues
 
 from mmhuman3d.utils.transforms import aa_to_rotmat, rotmat_to_aa
 
@@ -114,3 +116,117 @@ def batch_transform_to_camera_frame(global_orient, transl, pelvis, extrinsic):
     assert new_transl.shape == (N, 3)
 
     return new_global_orient, new_transl
+
+
+def skin_vertices(v_shaped, pose_feature, transforms, posedirs, lbs_weights):
+    """Add the pose blend shapes and skin the vertices, as in
+    :func:`smplx.lbs.lbs`.
+
+    Args:
+        v_shaped (torch.Tensor): shape (B, V, 3). Vertices in the rest pose.
+        pose_feature (torch.Tensor): shape (B, P). Rotation matrices of the
+            joints except the root, minus identity.
+        transforms (torch.Tensor): shape (B, J, 4, 4). Rigid transformations
+            of the joints from the rest pose.
+        posedirs (torch.Tensor): shape (P, V * 3). Pose blend shapes.
+        lbs_weights (torch.Tensor): shape (V, J). Skinning weights.
+
+    Returns:
+        torch.Tensor: shape (B, V, 3). Posed vertices.
+    """
+    batch_size, num_joints = transforms.shape[:2]
+    v_posed = v_shaped + torch.matmul(pose_feature, posedirs).view(
+        batch_size, -1, 3)
+    W = lbs_weights.expand(batch_size, -1, -1)
+    T = torch.matmul(W, transforms.view(batch_size, num_joints,
+                                        16)).view(batch_size, -1, 4, 4)
+    homogen_coord = torch.ones([batch_size, v_posed.shape[1], 1],
+                               dtype=v_posed.dtype,
+                               device=v_posed.device)
+    v_posed_homo = torch.cat([v_posed, homogen_coord], dim=2)
+    v_homo = torch.matmul(T, torch.unsqueeze(v_posed_homo, dim=-1))
+    return v_homo[:, :, :3, 0]
+
+
+def get_joint_lbs_buffers(J_regressor, v_template, shapedirs, posedirs,
+                          lbs_weights, vertex_ids):
+    """Precompute the buffers of :func:`joint_lbs`.
+
+    Args:
+        J_regressor (torch.Tensor): shape (J, V). Regressor of the joints.
+        v_template (torch.Tensor): shape (V, 3). Template mesh.
+        shapedirs (torch.Tensor): shape (V, 3, L). Shape blend shapes.
+        posedirs (torch.Tensor): shape (P, V * 3). Pose blend shapes.
+        lbs_weights (torch.Tensor): shape (V, J). Skinning weights.
+        vertex_ids (torch.Tensor): shape (S, ). Vertices to skin.
+
+    Returns:
+        dict: buffers of the joint-level model.
+            - joint_shape_basis: shape (1 + L, (J + S) * 3). The rest joints
+                and the rest vertices are linear in [1, shape components].
+            - joint_posedirs: shape (P, S * 3).
+            - joint_lbs_weights: shape (S, J).
+    """
+    num_coeffs = shapedirs.shape[-1]
+    rest_joints = torch.einsum('jv,vk->jk', J_regressor, v_template)
+    joint_shapedirs = torch.einsum('jv,vkl->jkl', J_regressor, shapedirs)
+    shape_basis = torch.cat([
+        torch.cat([rest_joints, v_template[vertex_ids]])[None],
+        torch.cat([joint_shapedirs, shapedirs[vertex_ids]]).permute(2, 0, 1)
+    ]).reshape(1 + num_coeffs, -1)
+    posedirs = posedirs.view(posedirs.shape[0], -1, 3)[:, vertex_ids]
+    return dict(
+        joint_shape_basis=shape_basis,
+        joint_posedirs=posedirs.reshape(posedirs.shape[0], -1),
+        joint_lbs_weights=lbs_weights[vertex_ids])
+
+
+def joint_lbs(shape_components,
+              pose,
+              parents,
+              joint_shape_basis,
+              joint_posedirs,
+              joint_lbs_weights,
+              pose2rot=True):
+    """Linear blend skinning of the joints and a few vertices, the other
+    vertices of the mesh are skipped.
+
+    Args:
+        shape_components (torch.Tensor): shape (B, L). Betas, and
+            expressions if any.
+        pose (torch.Tensor): shape (B, J * 3) or (B, J, 3, 3). Poses of all
+            the joints.
+        parents (torch.Tensor): shape (J, ). Kinematic tree of the model.
+        joint_shape_basis (torch.Tensor): see :func:`get_joint_lbs_buffers`.
+        joint_posedirs (torch.Tensor): see :func:`get_joint_lbs_buffers`.
+        joint_lbs_weights (torch.Tensor): see :func:`get_joint_lbs_buffers`.
+        pose2rot (bool, optional): whether the poses are axis-angle
+            vectors, otherwise rotation matrices. Defaults to True.
+
+    Returns:
+        tuple: the posed vertices in shape (B, S, 3), and the posed joints
+            in shape (B, J, 3).
+    """
+    batch_size = pose.shape[0]
+    num_joints = joint_lbs_weights.shape[1]
+    dtype = joint_shape_basis.dtype
+    coeffs = torch.cat([
+        shape_components.new_ones(batch_size, 1),
+        shape_components.expand(batch_size, -1)
+    ],
+                       dim=1)
+    rest = torch.matmul(coeffs, joint_shape_basis).view(batch_size, -1, 3)
+    J, v_shaped = rest[:, :num_joints], rest[:, num_joints:]
+
+    ident = torch.eye(3, dtype=dtype, device=pose.device)
+    if pose2rot:
+        rot_mats = batch_rodrigues(pose.view(-1,
+                                             3)).view([batch_size, -1, 3, 3])
+    else:
+        rot_mats = pose.view(batch_size, -1, 3, 3)
+    pose_feature = (rot_mats[:, 1:] - ident).view([batch_size, -1])
+
+    J_transformed, A = batch_rigid_transform(rot_mats, J, parents, dtype=dtype)
+    vertices = skin_vertices(v_shaped, pose_feature, A, joint_posedirs,
+                             joint_lbs_weights)
+    return vertices, J_transformed
@@ -0,0 +1,180 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import csv
+import os
+import os.path as osp
+from typing import List
+
+import mmcv
+from mmcv.utils import Registry
+
+REGISTRANT_HOOKS = Registry('registrant_hooks')
+
+
+class RegistrantHook(object):
+    """Base class of the hooks called by SMPLify and SMPLifyX during
+    registration.
+
+    The iteration records passed to :meth:`after_iter` include:
+
+    - epoch, stage, iter: position of the iteration
+    - num_sequences: number of sequences optimized in the iteration,
+      1 unless the registrant is called with sequence_idxs
+    - num_closures: number of loss evaluations by the optimizer
+    - time_body_model, time_loss, time_backward: wall time in seconds of
+      the body model forward, the loss computation and the backward pass
+    - time_optimizer: the rest of the wall time of the optimizer step
+    - time_iter: wall time of the iteration
+    - the losses before the step, e.g. total_loss, keypoint3d_loss
+    """
+
+    def before_run(self, registrant) -> None:
+        """Called before the first epoch of a registration."""
+
+    def before_stage(self, registrant, epoch: int, stage: int,
+                     config: dict) -> None:
+        """Called before a stage is optimized.
+
+        Args:
+            registrant: the registrant.
+            epoch (int): index of the epoch.
+            stage (int): index of the stage.
+            config (dict): config of the stage.
+        """
+
+    def after_iter(self, registrant, record: dict) -> None:
+        """Called after each optimizer step.
+
+        Args:
+            registrant: the registrant.
+            record (dict): the record of the iteration.
+        """
+
+    def after_stage(self, registrant, epoch: int, stage: int,
+                    time: float) -> None:
+        """Called after a stage is optimized.
+
+        Args:
+            registrant: the registrant.
+            epoch (int): index of the epoch.
+            stage (int): index of the stage.
+            time (float): wall time of the stage in seconds.
+        """
+
+    def after_run(self, registrant) -> None:
+        """Called after the last epoch of a registration."""
+
+
+@REGISTRANT_HOOKS.register_module()
+class TelemetryHook(RegistrantHook):
+    """Record the iterations and summarize the stages of the registrations,
+    to tune num_iter, ftol and the stages.
+
+    The summary of a stage includes the number of iterations run against
+    num_iter of the stage, the time spent in each step, the total loss at
+    the first and the last iteration and the convergence rate, the mean
+    relative decrease of the total loss per iteration.
+
+    Args:
+        out_file (str, optional): path to write the records to after each
+            registration. A .json file holds both the stages and the
+            iterations, a .csv file holds the iterations only.
+            Defaults to None, the records are kept in memory only.
+        verbose (bool, optional): whether to print the summary of each
+            stage. Defaults to False.
+    """
+
+    time_keys = ('time_body_model', 'time_loss', 'time_backward',
+                 'time_optimizer', 'time_iter')
+
+    def __init__(self, out_file: str = None, verbose: bool = False) -> None:
+        if out_file is not None:
+            assert out_file.endswith(('.json', '.csv')), \
+                f'Unsupported trace file: {out_file}'
+        self.out_file = out_file
+        self.verbose = verbose
+        self.iters = []
+        self.stages = []
+        self.num_runs = 0
+        self._stage_iters = []
+        self._stage_config = None
+
+    def before_stage(self, registrant, epoch: int, stage: int,
+                     config: dict) -> None:
+        self._stage_iters = []
+        self._stage_config = config
+
+    def after_iter(self, registrant, record: dict) -> None:
+        record = dict(run=self.num_runs, **record)
+        self._stage_iters.append(record)
+        self.iters.append(record)
+
+    def after_stage(self, registrant, epoch: int, stage: int,
+                    time: float) -> None:
+        records = self._stage_iters
+        num_iter = self._stage_config.get('num_iter', 1)
+        summary = dict(
+            run=self.num_runs,
+            epoch=epoch,
+            stage=stage,
+            num_iter=num_iter,
+            ftol=self._stage_config.get('ftol', 1e-4),
+            iters=len(records),
+            early_stop=len(records) < num_iter,
+            time=time)
+        for key in self.time_keys:
+            summary[key] = sum(record[key] for record in records)
+        if records:
+            loss_start = records[0]['total_loss']
+            loss_end = records[-1]['total_loss']
+            summary.update(
+                loss_start=loss_start,
+                loss_end=loss_end,
+                convergence_rate=(loss_start - loss_end) /
+                max(abs(loss_start), 1e-12) / len(records))
+        self.stages.append(summary)
+        if self.verbose:
+            print(f'epoch {epoch}, stage {stage}: '
+                  f'{len(records)}/{num_iter} iters, {time:.3f}s '
+                  f'(body model {summary["time_body_model"]:.3f}s, '
+                  f'loss {summary["time_loss"]:.3f}s, '
+                  f'backward {summary["time_backward"]:.3f}s, '
+                  f'optimizer {summary["time_optimizer"]:.3f}s), '
+                  f'total_loss {summary.get("loss_start", 0):.4g} -> '
+                  f'{summary.get("loss_end", 0):.4g}')
+
+    def after_run(self, registrant) -> None:
+        self.num_runs += 1
+        if self.out_file is not None:
+            self.dump(self.out_file)
+
+    def dump(self, out_file: str) -> None:
+        """Write the records to a .json or .csv file.
+
+        Args:
+            out_file (str): path to the file.
+        """
+        out_dir = osp.dirname(osp.abspath(out_file))
+        os.makedirs(out_dir, exist_ok=True)
+        if out_file.endswith('.json'):
+            mmcv.dump(dict(stages=self.stages, iters=self.iters), out_file)
+        else:
+            fieldnames = _get_fieldnames(self.iters)
+            with open(out_file, 'w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=fieldnames)
+                writer.writeheader()
+                writer.writerows(self.iters)
+
+
+def _get_fieldnames(records: List[dict]) -> List[str]:
+    """Get the keys of the records in the order of appearance."""
+    fieldnames = dict()
+    for record in records:
+        fieldnames.update(dict.fromkeys(record))
+    return list(fieldnames)
+
+
+def build_registrant_hook(cfg):
+    """Build registrant hook."""
+    if cfg is None:
+        return None
+    return REGISTRANT_HOOKS.build(cfg)
@@ -1,3 +1,5 @@
+import time
+from contextlib import contextmanager
 from typing import List, Tuple, Union
 
 import numpy as np
@@ -11,6 +13,7 @@ from mmhuman3d.core.conventions.keypoints_mapping import (
 )
 from ..body_models.builder import build_body_model
 from ..losses.builder import build_loss
+from .hooks import RegistrantHook, build_registrant_hook
 
 
 class OptimizableParameters():
@@ -70,7 +73,8 @@ class SMPLify(object):
                  ignore_keypoints: List[int] = None,
                  device=torch.device(
                      'cuda' if torch.cuda.is_available() else 'cpu'),
-                 verbose: bool = False) -> None:
+                 verbose: bool = False,
+                 hooks: List[Union[dict, RegistrantHook]] = None) -> None:
         """
         Args:
             body_model: config or an object of body model.
@@ -99,6 +103,9 @@ class SMPLify(object):
                 loss computation
             device: torch device
             verbose: whether to print information during registration
+            hooks: configs or objects of hooks, called by the stages and
+                iterations of registration, e.g. TelemetryHook to record
+                the losses and the time of each step
 
         Returns:
             None
@@ -152,6 +159,14 @@ class SMPLify(object):
         self.ignore_keypoints = ignore_keypoints
         self.verbose = verbose
 
+        self.hooks = [
+            build_registrant_hook(hook) if isinstance(hook, dict) else hook
+            for hook in (hooks or [])
+        ]
+        # records of the current stage and iteration, kept for the hooks
+        self._stage_record = None
+        self._iter_record = None
+
         self._set_keypoint_idxs()
 
     def __call__(self,
@@ -163,6 +178,7 @@ class SMPLify(object):
                  init_transl: torch.Tensor = None,
                  init_body_pose: torch.Tensor = None,
                  init_betas: torch.Tensor = None,
+                 sequence_idxs: torch.Tensor = None,
                  return_verts: bool = False,
                  return_joints: bool = False,
                  return_full_pose: bool = False,
@@ -173,6 +189,7 @@ class SMPLify(object):
             B: batch size
             K: number of keypoints
             D: shape dimension
+            S: number of sequences
             Provide only keypoints2d or keypoints3d, not both.
 
         Args:
@@ -183,7 +200,13 @@ class SMPLify(object):
             init_global_orient: initial global_orient of shape (B, 3)
             init_transl: initial transl of shape (B, 3)
             init_body_pose: initial body_pose of shape (B, 69)
-            init_betas: initial betas of shape (B, D)
+            init_betas: initial betas of shape (B, D), or (S, D) if
+                use_one_betas_per_video with sequence_idxs
+            sequence_idxs: sequence index of each sample of shape (B, ).
+                Consecutive samples of the same index form a sequence, e.g.
+                the frames of a video or a person. The sequences are fitted
+                independently in one batch, see :meth:`_optimize_sequences`.
+                Defaults to None, the batch is a single sequence.
             return_verts: whether to return vertices
             return_joints: whether to return joints
             return_full_pose: whether to return full pose
@@ -199,6 +222,11 @@ class SMPLify(object):
             'Do not provide both 2D and 3D keypoints.'
         batch_size = keypoints2d.shape[0] if keypoints2d is not None \
             else keypoints3d.shape[0]
+        num_videos = 1
+        if sequence_idxs is not None:
+            sequence_idxs = self._get_sequence_idxs(
+                sequence_idxs.to(self.device))
+            num_videos = int(sequence_idxs[-1]) + 1
 
         global_orient = self._match_init_batch_size(
             init_global_orient, self.body_model.global_orient, batch_size)
@@ -209,28 +237,27 @@ class SMPLify(object):
                                                 self.body_model.body_pose,
                                                 batch_size)
         if init_betas is None and self.use_one_betas_per_video:
-            betas = torch.zeros(1, self.body_model.betas.shape[-1]).to(
-                self.device)
+            betas = torch.zeros(
+                num_videos, self.body_model.betas.shape[-1]).to(self.device)
+        elif sequence_idxs is not None and self.use_one_betas_per_video:
+            betas = self._match_init_batch_size(init_betas,
+                                                self.body_model.betas,
+                                                num_videos)
         else:
             betas = self._match_init_batch_size(init_betas,
                                                 self.body_model.betas,
                                                 batch_size)
 
-        for i in range(self.num_epochs):
-            for stage_idx, stage_config in enumerate(self.stage_config):
-                if self.verbose:
-                    print(f'epoch {i}, stage {stage_idx}')
-                self._optimize_stage(
-                    global_orient=global_orient,
-                    transl=transl,
-                    body_pose=body_pose,
-                    betas=betas,
-                    keypoints2d=keypoints2d,
-                    keypoints2d_conf=keypoints2d_conf,
-                    keypoints3d=keypoints3d,
-                    keypoints3d_conf=keypoints3d_conf,
-                    **stage_config,
-                )
+        self._optimize_stages(
+            global_orient=global_orient,
+            transl=transl,
+            body_pose=body_pose,
+            betas=betas,
+            keypoints2d=keypoints2d,
+            keypoints2d_conf=keypoints2d_conf,
+            keypoints3d=keypoints3d,
+            keypoints3d_conf=keypoints3d_conf,
+            sequence_idxs=sequence_idxs)
 
         # collate results
         ret = {
@@ -245,12 +272,13 @@ class SMPLify(object):
             eval_ret = self.evaluate(
                 global_orient=global_orient,
                 body_pose=body_pose,
-                betas=betas,
+                betas=self._expand_betas(batch_size, betas, sequence_idxs),
                 transl=transl,
                 keypoints2d=keypoints2d,
                 keypoints2d_conf=keypoints2d_conf,
                 keypoints3d=keypoints3d,
                 keypoints3d_conf=keypoints3d_conf,
+                sequence_idxs=sequence_idxs,
                 return_verts=return_verts,
                 return_full_pose=return_full_pose,
                 return_joints=return_joints,
@@ -274,6 +302,37 @@ class SMPLify(object):
 
         return ret
 
+    def _optimize_stages(self, **kwargs) -> None:
+        """Optimize the stages in each epoch and call the hooks.
+
+        Args:
+            **kwargs: body model parameters and keypoints, passed to
+                :meth:`_optimize_stage` with the config of each stage
+
+        Returns:
+            None
+        """
+        self._call_hooks('before_run')
+        for i in range(self.num_epochs):
+            for stage_idx, stage_config in enumerate(self.stage_config):
+                if self.verbose:
+                    print(f'epoch {i}, stage {stage_idx}')
+                self._call_hooks(
+                    'before_stage',
+                    epoch=i,
+                    stage=stage_idx,
+                    config=stage_config)
+                self._stage_record = dict(epoch=i, stage=stage_idx)
+                start = self._get_time() if self.hooks else None
+                self._optimize_stage(**kwargs, **stage_config)
+                if self.hooks:
+                    self._call_hooks(
+                        'after_stage',
+                        epoch=i,
+                        stage=stage_idx,
+                        time=self._get_time() - start)
+        self._call_hooks('after_run')
+
     def _optimize_stage(self,
                         betas: torch.Tensor,
                         body_pose: torch.Tensor,
@@ -298,6 +357,7 @@ class SMPLify(object):
                         joint_weights: dict = {},
                         num_iter: int = 1,
                         ftol: float = 1e-4,
+                        sequence_idxs: torch.Tensor = None,
                         **kwargs) -> None:
         """Optimize a stage of body model parameters according to
         configuration.
@@ -331,10 +391,41 @@ class SMPLify(object):
             joint_weights: per joint weight of shape (K, )
             num_iter: number of iterations
             ftol: early stop tolerance for relative change in loss
+            sequence_idxs: sequence index of each sample of shape (B, ).
+                If given, each sequence stops early by its own loss.
 
         Returns:
             None
         """
+        if sequence_idxs is not None:
+            self._optimize_sequences(
+                params=dict(
+                    global_orient=global_orient,
+                    transl=transl,
+                    body_pose=body_pose,
+                    betas=betas),
+                fit_params=dict(
+                    global_orient=fit_global_orient,
+                    transl=fit_transl,
+                    body_pose=fit_body_pose,
+                    betas=fit_betas),
+                sequence_idxs=sequence_idxs,
+                num_iter=num_iter,
+                ftol=ftol,
+                keypoints2d=keypoints2d,
+                keypoints2d_conf=keypoints2d_conf,
+                keypoints2d_weight=keypoints2d_weight,
+                keypoints3d=keypoints3d,
+                keypoints3d_conf=keypoints3d_conf,
+                keypoints3d_weight=keypoints3d_weight,
+                joint_prior_weight=joint_prior_weight,
+                shape_prior_weight=shape_prior_weight,
+                smooth_loss_weight=smooth_loss_weight,
+                pose_prior_weight=pose_prior_weight,
+                pose_reg_weight=pose_reg_weight,
+                limb_length_weight=limb_length_weight,
+                joint_weights=joint_weights)
+            return
 
         parameters = OptimizableParameters()
         parameters.set_param(fit_global_orient, global_orient)
@@ -371,10 +462,13 @@ class SMPLify(object):
                     joint_weights=joint_weights)
 
                 loss = loss_dict['total_loss']
-                loss.backward()
+                with self._record_time('backward'):
+                    loss.backward()
                 return loss
 
+            self._begin_iter()
             loss = optimizer.step(closure)
+            self._end_iter(iter_idx)
             if iter_idx > 0 and pre_loss is not None and ftol > 0:
                 loss_rel_change = self._compute_relative_change(
                     pre_loss, loss.item())
@@ -384,6 +478,174 @@ class SMPLify(object):
                     break
             pre_loss = loss.item()
 
+    def _optimize_sequences(self,
+                            params: dict,
+                            fit_params: dict,
+                            sequence_idxs: torch.Tensor,
+                            num_iter: int = 1,
+                            ftol: float = 1e-4,
+                            **kwargs) -> None:
+        """Optimize a stage of independent sequences in one batch.
+
+        Each loss is reduced within each sequence by its own reduction, see
+        :meth:`_reduce_sequence_losses`, so that a sequence is fitted to
+        the same objective whatever else is in the batch. Once the relative
+        change of the loss of a sequence drops below ftol, its parameters
+        are frozen and its samples are dropped from the batch, and the
+        optimizer is rebuilt for the rest.
+
+        Notes:
+            B: batch size
+            S: number of sequences
+
+        Args:
+            params: body model parameters of shape (B, ...), or (S, D) for
+                betas shared in a sequence. They are updated in place.
+            fit_params: whether to optimize each parameter
+            sequence_idxs: sequence index of each sample of shape (B, ),
+                see :meth:`_get_sequence_idxs`
+            num_iter: number of iterations
+            ftol: early stop tolerance for relative change in loss
+            **kwargs: arguments of :meth:`evaluate`. Tensors are
+                keypoints of the samples in shape (B, ...).
+
+        Returns:
+            None
+        """
+        batch_size = sequence_idxs.shape[0]
+        num_sequences = int(sequence_idxs[-1]) + 1
+        active = torch.ones(
+            num_sequences, dtype=torch.bool, device=sequence_idxs.device)
+
+        optimizer = None
+        pre_loss = None
+        for iter_idx in range(num_iter):
+            if optimizer is None:
+                # samples and parameters of the sequences to optimize
+                active_sample_idxs = torch.nonzero(active[sequence_idxs])[:, 0]
+                active_sequence_idxs = torch.nonzero(active)[:, 0]
+                active_idxs = dict()
+                active_params = dict()
+                parameters = OptimizableParameters()
+                for name, param in params.items():
+                    idxs = active_sample_idxs \
+                        if param.shape[0] == batch_size \
+                        else active_sequence_idxs
+                    active_param = param.detach()[idxs].clone()
+                    parameters.set_param(fit_params[name], active_param)
+                    active_idxs[name] = idxs
+                    active_params[name] = active_param
+                optimizer = build_optimizer(parameters, self.optimizer)
+                # renumber the sequences from 0
+                sample_sequence_idxs = self._get_sequence_idxs(
+                    sequence_idxs[active_sample_idxs])
+                sample_kwargs = {
+                    k:
+                    v[active_sample_idxs] if isinstance(v, torch.Tensor) else v
+                    for k, v in kwargs.items()
+                }
+            sequence_losses = []
+
+            def closure():
+                optimizer.zero_grad()
+                model_params = dict(active_params)
+                model_params['betas'] = self._expand_betas(
+                    len(active_sample_idxs), model_params['betas'],
+                    sample_sequence_idxs)
+                loss_dict = self.evaluate(
+                    **model_params,
+                    sequence_idxs=sample_sequence_idxs,
+                    reduction_override='none',
+                    **sample_kwargs)
+                loss_dict.update(
+                    self._reduce_sequence_losses(loss_dict,
+                                                 sample_sequence_idxs))
+                loss = loss_dict['total_loss']
+                # the loss before the step, as the loss of optimizer.step
+                if not sequence_losses:
+                    sequence_losses.append(
+                        torch.zeros(
+                            len(active_sequence_idxs),
+                            dtype=loss.dtype,
+                            device=loss.device).index_add_(
+                                0, sample_sequence_idxs, loss.detach()))
+                loss = loss.sum()
+                with self._record_time('backward'):
+                    loss.backward()
+                return loss
+
+            self._begin_iter()
+            optimizer.step(closure)
+            with torch.no_grad():
+                for name, param in params.items():
+                    param[active_idxs[name]] = active_params[name]
+            self._end_iter(iter_idx, num_sequences=len(active_sequence_idxs))
+
+            loss = sequence_losses[0]
+            if pre_loss is not None and ftol > 0:
+                loss_rel_change = (pre_loss - loss).abs() / torch.clamp(
+                    torch.max(pre_loss.abs(), loss.abs()), min=1)
+                converged = loss_rel_change < ftol
+                if converged.any():
+                    active[active_sequence_idxs[converged]] = False
+                    if self.verbose:
+                        print(f'[ftol={ftol}] Early stop '
+                              f'{int(converged.sum())} sequences '
+                              f'at {iter_idx} iter!')
+                    if not active.any():
+                        break
+                    loss = loss[~converged]
+                    optimizer = None
+            pre_loss = loss
+
+    def _reduce_sequence_losses(self, losses: dict,
+                                sequence_idxs: torch.Tensor) -> dict:
+        """Reduce sample-wise losses within each sequence by the reduction
+        of each loss, e.g. a 'mean' loss is averaged over the samples of a
+        sequence rather than the batch.
+
+        Notes:
+            B: batch size
+
+        Args:
+            losses: losses computed with reduction_override 'none'
+            sequence_idxs: sequence index of each sample of shape (B, ),
+                see :meth:`_get_sequence_idxs`
+
+        Returns:
+            dict: the reduced loss of each sample of shape (B, ), and the
+                total loss. The sum of a loss over the samples of a sequence
+                equals the loss of the sequence when fitted alone.
+        """
+        loss_modules = dict(
+            keypoint2d_loss=self.keypoints2d_mse_loss,
+            keypoints3d_loss=self.keypoints3d_mse_loss,
+            shape_prior_loss=self.shape_prior_loss,
+            joint_prior_loss=self.joint_prior_loss,
+            smooth_loss=self.smooth_loss,
+            pose_prior_loss=self.pose_prior_loss,
+            pose_reg_loss=self.pose_reg_loss,
+            limb_length_loss=self.limb_length_loss)
+        batch_size = sequence_idxs.shape[0]
+        num_samples = torch.bincount(sequence_idxs)[sequence_idxs]
+        reduced_losses = {}
+        total_loss = 0
+        for loss_name, loss_module in loss_modules.items():
+            if loss_name not in losses:
+                continue
+            loss = losses[loss_name]
+            assert loss.shape[0] == batch_size
+            loss = loss.reshape(batch_size, -1)
+            if loss_module.reduction == 'mean':
+                # the mean over the elements of the samples of a sequence
+                loss = loss.sum(dim=-1) / (num_samples * loss.shape[-1])
+            else:
+                loss = loss.sum(dim=-1)
+            reduced_losses[loss_name] = loss
+            total_loss = total_loss + loss
+        reduced_losses['total_loss'] = total_loss
+        return reduced_losses
+
     def evaluate(
         self,
         betas: torch.Tensor = None,
@@ -403,6 +665,7 @@ class SMPLify(object):
         pose_reg_weight: float = None,
         limb_length_weight: float = None,
         joint_weights: dict = {},
+        sequence_idxs: torch.Tensor = None,
         return_verts: bool = False,
         return_full_pose: bool = False,
         return_joints: bool = False,
@@ -435,6 +698,8 @@ class SMPLify(object):
             pose_reg_weight: weight of pose regularization loss
             limb_length_weight: weight of limb length loss
             joint_weights: per joint weight of shape (K, )
+            sequence_idxs: sequence index of each sample of shape (B, ),
+                only used with reduction_override 'none'
             return_verts: whether to return vertices
             return_joints: whether to return joints
             return_full_pose: whether to return full pose
@@ -447,38 +712,42 @@ class SMPLify(object):
 
         ret = {}
 
-        body_model_output = self.body_model(
-            global_orient=global_orient,
-            body_pose=body_pose,
-            betas=betas,
-            transl=transl,
-            return_verts=return_verts,
-            return_full_pose=return_full_pose)
+        with self._record_time('body_model'):
+            body_model_output = self.body_model(
+                global_orient=global_orient,
+                body_pose=body_pose,
+                betas=betas,
+                transl=transl,
+                return_verts=return_verts,
+                return_full_pose=return_full_pose)
 
         model_joints = body_model_output['joints']
         model_joint_mask = body_model_output['joint_mask']
 
-        loss_dict = self._compute_loss(
-            model_joints,
-            model_joint_mask,
-            keypoints2d=keypoints2d,
-            keypoints2d_conf=keypoints2d_conf,
-            keypoints2d_weight=keypoints2d_weight,
-            keypoints3d=keypoints3d,
-            keypoints3d_conf=keypoints3d_conf,
-            keypoints3d_weight=keypoints3d_weight,
-            joint_prior_weight=joint_prior_weight,
-            shape_prior_weight=shape_prior_weight,
-            smooth_loss_weight=smooth_loss_weight,
-            pose_prior_weight=pose_prior_weight,
-            pose_reg_weight=pose_reg_weight,
-            limb_length_weight=limb_length_weight,
-            joint_weights=joint_weights,
-            reduction_override=reduction_override,
-            global_orient=global_orient,
-            body_pose=body_pose,
-            betas=betas)
+        with self._record_time('loss'):
+            loss_dict = self._compute_loss(
+                model_joints,
+                model_joint_mask,
+                keypoints2d=keypoints2d,
+                keypoints2d_conf=keypoints2d_conf,
+                keypoints2d_weight=keypoints2d_weight,
+                keypoints3d=keypoints3d,
+                keypoints3d_conf=keypoints3d_conf,
+                keypoints3d_weight=keypoints3d_weight,
+                joint_prior_weight=joint_prior_weight,
+                shape_prior_weight=shape_prior_weight,
+                smooth_loss_weight=smooth_loss_weight,
+                pose_prior_weight=pose_prior_weight,
+                pose_reg_weight=pose_reg_weight,
+                limb_length_weight=limb_length_weight,
+                joint_weights=joint_weights,
+                reduction_override=reduction_override,
+                global_orient=global_orient,
+                body_pose=body_pose,
+                betas=betas,
+                sequence_idxs=sequence_idxs)
         ret.update(loss_dict)
+        self._record_losses(ret)
 
         if return_verts:
             ret['vertices'] = body_model_output['vertices']
@@ -508,7 +777,8 @@ class SMPLify(object):
                       reduction_override: str = None,
                       global_orient: torch.Tensor = None,
                       body_pose: torch.Tensor = None,
-                      betas: torch.Tensor = None):
+                      betas: torch.Tensor = None,
+                      sequence_idxs: torch.Tensor = None):
         """Loss computation.
 
         Notes:
@@ -535,6 +805,9 @@ class SMPLify(object):
             reduction_override: reduction method, e.g., 'none', 'sum', 'mean'
             body_pose: shape (B, 69), for loss computation
             betas: shape (B, D), for loss computation
+            sequence_idxs: shape (B, ), the samples are not smoothed with
+                the ones of the other sequences. Only used with
+                reduction_override 'none'.
 
         Returns:
             losses: a dict that contains all losses
@@ -606,6 +879,10 @@ class SMPLify(object):
                 body_pose=body_pose,
                 loss_weight_override=smooth_loss_weight,
                 reduction_override=reduction_override)
+            if sequence_idxs is not None and reduction_override == 'none':
+                # the loss of a sample is its change from the previous one
+                smooth_loss[1:] = smooth_loss[1:] * (
+                    sequence_idxs[1:] == sequence_idxs[:-1])
             losses['smooth_loss'] = smooth_loss
 
         # pose prior loss
@@ -752,7 +1029,7 @@ class SMPLify(object):
 
         return weight
 
-    def _expand_betas(self, batch_size, betas):
+    def _expand_betas(self, batch_size, betas, sequence_idxs=None):
         """A helper function to expand the betas's first dim to match batch
         size such that the same beta parameters can be used for all frames in a
         video sequence.
@@ -761,10 +1038,12 @@ class SMPLify(object):
             B: batch size
             K: number of keypoints
             D: shape dimension
+            S: number of sequences
 
         Args:
             batch_size: batch size
-            betas: shape (B, D)
+            betas: shape (B, D), (1, D), or (S, D) with sequence_idxs
+            sequence_idxs: sequence index of each sample of shape (B, )
 
         Returns:
             betas_video: expanded betas
@@ -773,6 +1052,10 @@ class SMPLify(object):
         if batch_size == betas.shape[0]:
             return betas
 
+        # one betas per sequence
+        elif sequence_idxs is not None:
+            betas_video = betas[sequence_idxs]
+
         # first dim is 1
         else:
             feat_dim = betas.shape[-1]
@@ -780,6 +1063,21 @@ class SMPLify(object):
 
         return betas_video
 
+    @staticmethod
+    def _get_sequence_idxs(sequence_idxs):
+        """Renumber the sequences of the samples in order from 0.
+
+        Args:
+            sequence_idxs: sequence index of each sample of shape (B, ).
+                Consecutive samples of the same index form a sequence.
+
+        Returns:
+            torch.Tensor: sequence index from 0 of each sample of shape (B, )
+        """
+        _, sequence_idxs = torch.unique_consecutive(
+            sequence_idxs, return_inverse=True)
+        return sequence_idxs
+
     @staticmethod
     def _compute_relative_change(pre_v, cur_v):
         """Compute relative loss change. If relative change is small enough, we
@@ -823,7 +1121,101 @@ class SMPLify(object):
         Returns:
             bool: True means skipping loss computation, and vice versa
         """
-        if (loss is None) or (loss.loss_weight == 0 and loss_weight_override is
-                              None) or (loss_weight_override == 0):
+        if (loss is None) or (loss.loss_weight == 0 and loss_weight_override
+                              is None) or (loss_weight_override == 0):
             return True
         return False
+
+    def _call_hooks(self, fn_name: str, **kwargs) -> None:
+        """Call a method of the hooks.
+
+        Args:
+            fn_name: name of the method, e.g. 'after_iter'
+            **kwargs: arguments of the method
+
+        Returns:
+            None
+        """
+        for hook in self.hooks:
+            getattr(hook, fn_name)(self, **kwargs)
+
+    def _get_time(self) -> float:
+        """Get the time after the queued CUDA kernels are done."""
+        device = torch.device(self.device)
+        if device.type == 'cuda':
+            torch.cuda.synchronize(device)
+        return time.perf_counter()
+
+    def _begin_iter(self) -> None:
+        """Start recording an iteration if there are hooks."""
+        if self.hooks:
+            self._iter_record = dict(
+                num_closures=0,
+                time_body_model=0.,
+                time_loss=0.,
+                time_backward=0.,
+                start=self._get_time())
+
+    def _end_iter(self, iter_idx: int, num_sequences: int = 1) -> None:
+        """Pass the record of an iteration to the hooks.
+
+        Args:
+            iter_idx: index of the iteration in the stage
+            num_sequences: number of sequences optimized in the iteration
+
+        Returns:
+            None
+        """
+        record = self._iter_record
+        if record is None:
+            return
+        self._iter_record = None
+        time_iter = self._get_time() - record.pop('start')
+        losses = {
+            k: v.detach().sum().item()
+            for k, v in record.pop('losses', {}).items()
+            if 'loss' in k and isinstance(v, torch.Tensor)
+        }
+        time_optimizer = time_iter - record['time_body_model'] - \
+            record['time_loss'] - record['time_backward']
+        record = dict(
+            self._stage_record,
+            iter=iter_idx,
+            num_sequences=num_sequences,
+            **record,
+            time_optimizer=time_optimizer,
+            time_iter=time_iter,
+            **losses)
+        self._call_hooks('after_iter', record=record)
+
+    @contextmanager
+    def _record_time(self, name: str):
+        """Add the time of a step to the record of the iteration.
+
+        Args:
+            name: name of the step, e.g. 'body_model', 'loss', 'backward'
+        """
+        if self._iter_record is None:
+            yield
+            return
+        start = self._get_time()
+        yield
+        self._iter_record[f'time_{name}'] += self._get_time() - start
+
+    def _record_losses(self, loss_dict: dict) -> None:
+        """Record the losses of the first evaluation of an iteration, i.e.
+        the losses before the optimizer step.
+
+        Args:
+            loss_dict: output of :meth:`evaluate`, read at the end of the
+                iteration, after the closure may have reduced the losses
+
+        Returns:
+            None
+        """
+        record = self._iter_record
+        if record is None:
+            return
+        record['num_closures'] += 1
+        if 'losses' not in record:
+            record['losses'] = loss_dict
@@ -30,6 +30,7 @@ class SMPLifyX(SMPLify):
                  init_jaw_pose: torch.Tensor = None,
                  init_leye_pose: torch.Tensor = None,
                  init_reye_pose: torch.Tensor = None,
+                 sequence_idxs: torch.Tensor = None,
                  return_verts: bool = False,
                  return_joints: bool = False,
                  return_full_pose: bool = False,
@@ -42,6 +43,7 @@ class SMPLifyX(SMPLify):
             D: body shape dimension
             D_H: hand pose dimension
             D_E: expression dimension
+            S: number of sequences
             Provide only keypoints2d or keypoints3d, not both.
 
         Args:
@@ -52,13 +54,17 @@ class SMPLifyX(SMPLify):
             init_global_orient: initial global_orient of shape (B, 3)
             init_transl: initial transl of shape (B, 3)
             init_body_pose: initial body_pose of shape (B, 69)
-            init_betas: initial betas of shape (B, D)
+            init_betas: initial betas of shape (B, D), or (S, D) if
+                use_one_betas_per_video with sequence_idxs
             init_left_hand_pose: initial left hand pose of shape (B, D_H)
             init_right_hand_pose: initial right hand pose of shape (B, D_H)
             init_expression: initial left hand pose of shape (B, D_E)
             init_jaw_pose: initial jaw pose of shape (B, 3)
             init_leye_pose: initial left eye pose of shape (B, 3)
             init_reye_pose: initial right eye pose of shape (B, 3)
+            sequence_idxs: sequence index of each sample of shape (B, ),
+                see :meth:`SMPLify.__call__`. Defaults to None, the batch
+                is a single sequence.
             return_verts: whether to return vertices
             return_joints: whether to return joints
             return_full_pose: whether to return full pose
@@ -75,6 +81,11 @@ class SMPLifyX(SMPLify):
             'Do not provide both 2D and 3D keypoints.'
         batch_size = keypoints2d.shape[0] if keypoints2d is not None \
             else keypoints3d.shape[0]
+        num_videos = 1
+        if sequence_idxs is not None:
+            sequence_idxs = self._get_sequence_idxs(
+                sequence_idxs.to(self.device))
+            num_videos = int(sequence_idxs[-1]) + 1
 
         global_orient = self._match_init_batch_size(
             init_global_orient, self.body_model.global_orient, batch_size)
@@ -101,33 +112,33 @@ class SMPLifyX(SMPLify):
                                                 self.body_model.reye_pose,
                                                 batch_size)
         if init_betas is None and self.use_one_betas_per_video:
-            betas = torch.zeros(1, self.body_model.betas.shape[-1]).to(
-                self.device)
+            betas = torch.zeros(
+                num_videos, self.body_model.betas.shape[-1]).to(self.device)
+        elif sequence_idxs is not None and self.use_one_betas_per_video:
+            betas = self._match_init_batch_size(init_betas,
+                                                self.body_model.betas,
+                                                num_videos)
         else:
             betas = self._match_init_batch_size(init_betas,
                                                 self.body_model.betas,
                                                 batch_size)
 
-        for i in range(self.num_epochs):
-            for stage_idx, stage_config in enumerate(self.stage_config):
-                # print(stage_name)
-                self._optimize_stage(
-                    global_orient=global_orient,
-                    transl=transl,
-                    body_pose=body_pose,
-                    betas=betas,
-                    left_hand_pose=left_hand_pose,
-                    right_hand_pose=right_hand_pose,
-                    expression=expression,
-                    jaw_pose=jaw_pose,
-                    leye_pose=leye_pose,
-                    reye_pose=reye_pose,
-                    keypoints2d=keypoints2d,
-                    keypoints2d_conf=keypoints2d_conf,
-                    keypoints3d=keypoints3d,
-                    keypoints3d_conf=keypoints3d_conf,
-                    **stage_config,
-                )
+        self._optimize_stages(
+            global_orient=global_orient,
+            transl=transl,
+            body_pose=body_pose,
+            betas=betas,
+            left_hand_pose=left_hand_pose,
+            right_hand_pose=right_hand_pose,
+            expression=expression,
+            jaw_pose=jaw_pose,
+            leye_pose=leye_pose,
+            reye_pose=reye_pose,
+            keypoints2d=keypoints2d,
+            keypoints2d_conf=keypoints2d_conf,
+            keypoints3d=keypoints3d,
+            keypoints3d_conf=keypoints3d_conf,
+            sequence_idxs=sequence_idxs)
 
         return {
             'global_orient': global_orient,
@@ -177,7 +188,8 @@ class SMPLifyX(SMPLify):
                         limb_length_weight: float = None,
                         joint_weights: dict = {},
                         ftol: float = 1e-4,
-                        num_iter: int = 1) -> None:
+                        num_iter: int = 1,
+                        sequence_idxs: torch.Tensor = None) -> None:
         """Optimize a stage of body model parameters according to
         configuration.
 
@@ -216,10 +228,53 @@ class SMPLifyX(SMPLify):
             joint_weights: per joint weight of shape (K, )
             num_iter: number of iterations
             ftol: early stop tolerance for relative change in loss
+            sequence_idxs: sequence index of each sample of shape (B, ).
+                If given, each sequence stops early by its own loss.
 
         Returns:
             None
         """
+        if sequence_idxs is not None:
+            self._optimize_sequences(
+                params=dict(
+                    global_orient=global_orient,
+                    transl=transl,
+                    body_pose=body_pose,
+                    betas=betas,
+                    left_hand_pose=left_hand_pose,
+                    right_hand_pose=right_hand_pose,
+                    expression=expression,
+                    jaw_pose=jaw_pose,
+                    leye_pose=leye_pose,
+                    reye_pose=reye_pose),
+                fit_params=dict(
+                    global_orient=fit_global_orient,
+                    transl=fit_transl,
+                    body_pose=fit_body_pose,
+                    betas=fit_betas,
+                    left_hand_pose=fit_left_hand_pose,
+                    right_hand_pose=fit_right_hand_pose,
+                    expression=fit_expression,
+                    jaw_pose=fit_jaw_pose,
+                    leye_pose=fit_leye_pose,
+                    reye_pose=fit_reye_pose),
+                sequence_idxs=sequence_idxs,
+                num_iter=num_iter,
+                ftol=ftol,
+                keypoints2d=keypoints2d,
+                keypoints2d_conf=keypoints2d_conf,
+                keypoints2d_weight=keypoints2d_weight,
+                keypoints3d=keypoints3d,
+                keypoints3d_conf=keypoints3d_conf,
+                keypoints3d_weight=keypoints3d_weight,
+                joint_prior_weight=joint_prior_weight,
+                shape_prior_weight=shape_prior_weight,
+                smooth_loss_weight=smooth_loss_weight,
+                pose_prior_weight=pose_prior_weight,
+                pose_reg_weight=pose_reg_weight,
+                limb_length_weight=limb_length_weight,
+                joint_weights=joint_weights)
+            return
 
         parameters = OptimizableParameters()
         parameters.set_param(fit_global_orient, global_orient)
@@ -271,10 +326,13 @@ class SMPLifyX(SMPLify):
                     joint_weights=joint_weights)
 
                 loss = loss_dict['total_loss']
-                loss.backward()
+                with self._record_time('backward'):
+                    loss.backward()
                 return loss
 
+            self._begin_iter()
             loss = optimizer.step(closure)
+            self._end_iter(iter_idx)
             if iter_idx > 0 and pre_loss is not None and ftol > 0:
                 loss_rel_change = self._compute_relative_change(
                     pre_loss, loss.item())
@@ -308,6 +366,7 @@ class SMPLifyX(SMPLify):
         pose_reg_weight: float = None,
         limb_length_weight: float = None,
         joint_weights: dict = {},
+        sequence_idxs: torch.Tensor = None,
         return_verts: bool = False,
         return_full_pose: bool = False,
         return_joints: bool = False,
@@ -348,6 +407,8 @@ class SMPLifyX(SMPLify):
             pose_reg_weight: weight of pose regularization loss
             limb_length_weight: weight of limb length loss
             joint_weights: per joint weight of shape (K, )
+            sequence_idxs: sequence index of each sample of shape (B, ),
+                only used with reduction_override 'none'
             return_verts: whether to return vertices
             return_joints: whether to return joints
             return_full_pose: whether to return full pose
@@ -360,43 +421,47 @@ class SMPLifyX(SMPLify):
 
         ret = {}
 
-        body_model_output = self.body_model(
-            global_orient=global_orient,
-            body_pose=body_pose,
-            betas=betas,
-            transl=transl,
-            left_hand_pose=left_hand_pose,
-            right_hand_pose=right_hand_pose,
-            expression=expression,
-            jaw_pose=jaw_pose,
-            leye_pose=leye_pose,
-            reye_pose=reye_pose,
-            return_verts=return_verts,
-            return_full_pose=return_full_pose)
+        with self._record_time('body_model'):
+            body_model_output = self.body_model(
+                global_orient=global_orient,
+                body_pose=body_pose,
+                betas=betas,
+                transl=transl,
+                left_hand_pose=left_hand_pose,
+                right_hand_pose=right_hand_pose,
+                expression=expression,
+                jaw_pose=jaw_pose,
+                leye_pose=leye_pose,
+                reye_pose=reye_pose,
+                return_verts=return_verts,
+                return_full_pose=return_full_pose)
 
         model_joints = body_model_output['joints']
         model_joint_mask = body_model_output['joint_mask']
 
-        loss_dict = self._compute_loss(
-            model_joints,
-            model_joint_mask,
-            keypoints2d=keypoints2d,
-            keypoints2d_conf=keypoints2d_conf,
-            keypoints2d_weight=keypoints2d_weight,
-            keypoints3d=keypoints3d,
-            keypoints3d_conf=keypoints3d_conf,
-            keypoints3d_weight=keypoints3d_weight,
-            joint_prior_weight=joint_prior_weight,
-            shape_prior_weight=shape_prior_weight,
-            smooth_loss_weight=smooth_loss_weight,
-            pose_prior_weight=pose_prior_weight,
-            pose_reg_weight=pose_reg_weight,
-            limb_length_weight=limb_length_weight,
-            joint_weights=joint_weights,
-            reduction_override=reduction_override,
-            body_pose=body_pose,
-            betas=betas)
+        with self._record_time('loss'):
+            loss_dict = self._compute_loss(
+                model_joints,
+                model_joint_mask,
+                keypoints2d=keypoints2d,
+                keypoints2d_conf=keypoints2d_conf,
+                keypoints2d_weight=keypoints2d_weight,
+                keypoints3d=keypoints3d,
+                keypoints3d_conf=keypoints3d_conf,
+                keypoints3d_weight=keypoints3d_weight,
+                joint_prior_weight=joint_prior_weight,
+                shape_prior_weight=shape_prior_weight,
+                smooth_loss_weight=smooth_loss_weight,
+                pose_prior_weight=pose_prior_weight,
+                pose_reg_weight=pose_reg_weight,
+                limb_length_weight=limb_length_weight,
+                joint_weights=joint_weights,
+                reduction_override=reduction_override,
+                body_pose=body_pose,
+                betas=betas,
+                sequence_idxs=sequence_idxs)
         ret.update(loss_dict)
+        self._record_losses(ret)
 
         if return_verts:
             ret['vertices'] = body_model_output['vertices']
@@ -2,7 +2,7 @@ import colorsys
 import os
 from collections import defaultdict
 from contextlib import contextmanager
-from functools import partial
+from functools import lru_cache, partial
 from pathlib import Path
 
 import mmcv
@@ -10,7 +10,11 @@ import numpy as np
 from mmcv import Timer
 from scipy import interpolate
 
-from mmhuman3d.core.post_processing import build_post_processing
+from mmhuman3d.core.post_processing import (
+    OneEuroFilter,
+    SmoothNetFilter,
+    build_post_processing,
+)
 
 try:
     from typing import Literal
@@ -315,7 +319,8 @@ def convert_verts_to_cam_coord(verts,
 
 def smooth_process(x,
                    smooth_type='savgol',
-                   cfg_base_dir='configs/_base_/post_processing/'):
+                   cfg_base_dir='configs/_base_/post_processing/',
+                   mask=None):
     """Smooth the array with the specified smoothing type.
 
     Args:
@@ -328,6 +333,10 @@ def smooth_process(x,
             Defaults to 'savgol'. 'smoothnet' is default with windowsize=8.
         cfg_base_dir (str, optional): Config base dir,
                             default configs/_base_/post_processing/
+        mask (np.ndarray, optional): Whether each person is visible in
+            each frame, in shape (frame,num_person) or (frame,).
+            Only used by 'oneeuro', which skips the invisible frames
+            instead of smoothing over them. Defaults to None.
     Raises:
         ValueError: check the input smoothing type.
 
@@ -335,6 +344,64 @@ def smooth_process(x,
         np.ndarray: Smoothed data. The shape should be
             (frame,num_person,K,C) or (frame,K,C).
     """
+    smooth_func = _build_smooth_func(smooth_type, cfg_base_dir)
+
+    x = x.copy()
+
+    assert x.ndim == 3 or x.ndim == 4
+
+    if isinstance(smooth_func, OneEuroFilter):
+        # all the persons are smoothed at once
+        x = smooth_func(x, mask=mask)
+    elif isinstance(smooth_func, SmoothNetFilter) and x.ndim == 4:
+        # persons are the batch of the same forwards
+        x = smooth_func.smooth_batch(x.transpose(1, 0, 2,
+                                                 3)).transpose(1, 0, 2, 3)
+    elif x.ndim == 4:
+        for i in range(x.shape[1]):
+            x[:, i] = smooth_func(x[:, i])
+    elif x.ndim == 3:
+        x = smooth_func(x)
+
+    return x
+
+
+def build_online_smoother(smooth_type='oneeuro',
+                          lookahead=0,
+                          cfg_base_dir='configs/_base_/post_processing/'):
+    """Build a filter to smooth frames one by one as they are estimated, see
+    :class:`mmhuman3d.core.post_processing.OnlineFilter`.
+
+    Args:
+        smooth_type (str, optional): Smooth type, the same as
+            ``smooth_process``. Defaults to 'oneeuro'.
+        lookahead (int, optional): Number of following frames to wait for
+            before returning a frame. Ignored by 'oneeuro'. Defaults to 0.
+        cfg_base_dir (str, optional): Config base dir,
+                            default configs/_base_/post_processing/
+
+    Returns:
+        OnlineFilter: call ``push(x, track_id)`` with x in shape (K, C)
+            to smooth a frame of a track.
+    """
+    cfg = _load_smooth_cfg(smooth_type, cfg_base_dir)
+    return build_post_processing(
+        dict(
+            type='OnlineFilter',
+            filter_cfg=cfg['smooth_cfg'],
+            lookahead=lookahead))
+
+
+@lru_cache(maxsize=None)
+def _build_smooth_func(smooth_type, cfg_base_dir):
+    """Build the filter of a smooth type once, the filters keep no state
+    between calls."""
+    cfg = _load_smooth_cfg(smooth_type, cfg_base_dir)
+    return build_post_processing(dict(cfg['smooth_cfg']))
+
+
+def _load_smooth_cfg(smooth_type, cfg_base_dir):
+    """Load the config of a smooth type from cfg_base_dir."""
     if smooth_type == 'smoothnet':
         smooth_type = 'smoothnet_windowsize8'
 
@@ -350,20 +417,7 @@ def smooth_process(x,
     elif not isinstance(cfg, mmcv.Config):
         raise TypeError('config must be a filename or Config object, '
                         f'but got {type(cfg)}')
-
-    x = x.copy()
-
-    assert x.ndim == 3 or x.ndim == 4
-
-    smooth_func = build_post_processing(dict(cfg['smooth_cfg']))
-
-    if x.ndim == 4:
-        for i in range(x.shape[1]):
-            x[:, i] = smooth_func(x[:, i])
-    elif x.ndim == 3:
-        x = smooth_func(x)
-
-    return x
+    return cfg
 
 
 def speed_up_process(x,
@@ -427,11 +481,8 @@ def speed_up_process(x,
 
     speed_up_func = build_post_processing(cfg_dict)
 
-    if x.ndim == 5:
-        for i in range(x.shape[1]):
-            x[:, i] = speed_up_func(x[:, i])
-    elif x.ndim == 4:
-        x = speed_up_func(x)
+    # all the persons are recovered in the same forwards
+    x = speed_up_func(x)
 
     return np.array(x.cpu())
 
@@ -601,6 +652,9 @@ def process_mmdet_results(mmdet_results, cat_id=1, bbox_thr=None):
 def prepare_frames(input_path=None):
     """Prepare frames from input_path.
 
+    Frames are read into one preallocated array, instead of a list of
+    frames which has to be copied again to index frames by a list.
+
     Args:
         input_path (str, optional): Defaults to None.
 
@@ -608,14 +662,15 @@ def prepare_frames(input_path=None):
         ValueError: check the input path.
 
     Returns:
-        List[np.ndarray]: prepared frames
+        np.ndarray: prepared frames in shape (f, h, w, 3)
     """
     if Path(input_path).is_file():
-        img_list = [mmcv.imread(input_path)]
-        if img_list[0] is None:
-            video = mmcv.VideoReader(input_path)
-            assert video.opened, f'Failed to load file {input_path}'
-            img_list = list(video)
+        img = mmcv.imread(input_path)
+        if img is not None:
+            return img[None]
+        video = mmcv.VideoReader(input_path)
+        assert video.opened, f'Failed to load file {input_path}'
+        frames = _stack_frames(video, len(video))
     elif Path(input_path).is_dir():
         # input_type = 'folder'
         file_list = [
@@ -623,12 +678,38 @@ def prepare_frames(input_path=None):
             if fn.lower().endswith(('.png', '.jpg'))
         ]
         file_list.sort()
-        img_list = [mmcv.imread(img_path) for img_path in file_list]
-        assert len(img_list), f'Failed to load image from {input_path}'
+        frames = _stack_frames(
+            (mmcv.imread(img_path) for img_path in file_list), len(file_list))
+        assert len(frames), f'Failed to load image from {input_path}'
     else:
         raise ValueError('Input path should be an file or folder.'
                          f' Got invalid input path: {input_path}')
-    return img_list
+    return frames
+
+
+def _stack_frames(frames, num_frames):
+    """Stack frames into an array preallocated by the expected number of
+    frames.
+
+    Args:
+        frames (Iterable[np.ndarray]): frames in the same shape.
+        num_frames (int): expected number of frames, the array is trimmed or
+            grown if the actual number differs.
+
+    Returns:
+        np.ndarray: frames in shape (f, h, w, 3)
+    """
+    array = None
+    index = 0
+    for index, frame in enumerate(frames):
+        if array is None:
+            array = np.empty((max(num_frames, 1), *frame.shape), frame.dtype)
+        elif index == len(array):
+            array = np.concatenate([array, np.empty_like(array)])
+        array[index] = frame
+    if array is None:
+        return np.empty((0, ), np.uint8)
+    return array[:index + 1]
 
 
 def extract_feature_sequence(extracted_results,
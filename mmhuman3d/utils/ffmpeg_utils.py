@@ -6,7 +6,7 @@ import string
 import subprocess
 import sys
 from pathlib import Path
-from typing import Iterable, List, Optional, Tuple, Union
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
 
 import numpy as np
 
@@ -254,6 +254,205 @@ def array_to_images(
     process.wait()
 
 
+class VideoFrameStream:
+
+    def __init__(
+        self,
+        input_path: str,
+        resolution: Optional[Union[Tuple[int, int], Tuple[float,
+                                                          float]]] = None,
+        start: int = 0,
+        end: Optional[int] = None,
+        step: int = 1,
+        disable_log: bool = False,
+    ) -> None:
+        """Decode a video/gif by ffmpeg and read frames from the pipe one by
+        one or chunk by chunk, without holding the whole video in memory.
+
+        Args:
+            input_path (str): input path.
+            resolution (Optional[Union[Tuple[int, int], Tuple[float, float]]],
+                optional): resolution(height, width) of output.
+                Defaults to None.
+            start (int, optional): start frame index. Inclusive.
+                If < 0, will be converted to frame_index range in
+                [0, frame_num]. Defaults to 0.
+            end (int, optional): end frame index. Exclusive.
+                Could be positive int or negative int or None.
+                If None, all frames from start till the last frame are
+                included. Defaults to None.
+            step (int, optional): read one frame every step frames,
+                frames in between are dropped by ffmpeg.
+                Defaults to 1.
+            disable_log (bool, optional): whether close the ffmepg command
+                info. Defaults to False.
+
+        Raises:
+            FileNotFoundError: check the input path.
+            ValueError: step is not a positive int.
+        """
+        check_input_path(
+            input_path,
+            allowed_suffix=['.mp4', 'mkv', 'avi', '.gif'],
+            tag='input video',
+            path_type='file')
+        if step < 1:
+            raise ValueError(f'step should be positive, got {step}.')
+        info = vid_info_reader(input_path)
+        if resolution:
+            height, width = resolution
+        else:
+            width, height = int(info['width']), int(info['height'])
+        num_frames = int(info['nb_frames'])
+        self.input_path = input_path
+        self.height, self.width = int(height), int(width)
+        self.start = (min(start, num_frames - 1) + num_frames) % num_frames
+        self.end = (min(end, num_frames - 1) +
+                    num_frames) % num_frames if end is not None else num_frames
+        self.step = step
+        self.disable_log = disable_log
+
+    @property
+    def frame_shape(self) -> Tuple[int, int, int]:
+        """Shape of a frame, (h, w, 3)."""
+        return (self.height, self.width, 3)
+
+    def __len__(self) -> int:
+        """Number of frames to read, computed from the video info."""
+        return len(range(self.start, self.end, self.step))
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        """Yield frames in shape (h, w, 3)."""
+        for chunk in self.iter_chunks(1):
+            yield chunk[0]
+
+    def iter_chunks(self, chunk_size: int) -> Iterator[np.ndarray]:
+        """Yield chunks of frames in shape (chunk_size, h, w, 3), the last
+        chunk may be shorter.
+
+        Args:
+            chunk_size (int): number of frames in a chunk.
+        """
+        process = self._open()
+        try:
+            while True:
+                chunk = np.empty((chunk_size, *self.frame_shape), np.uint8)
+                num_read = self._read_frames(process, chunk)
+                if num_read > 0:
+                    yield chunk[:num_read]
+                if num_read < chunk_size:
+                    break
+        finally:
+            self._close(process)
+
+    def read(self, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Read all the frames into one array.
+
+        Args:
+            out (Optional[np.ndarray], optional): preallocated contiguous
+                uint8 array in shape (len(self), h, w, 3) or longer. If None,
+                it is allocated by the number of frames in the video info,
+                and grown if the info underestimates it.
+                Defaults to None.
+
+        Raises:
+            ValueError: out is not a contiguous uint8 array of frames, or
+                the video has more frames than out holds.
+
+        Returns:
+            np.ndarray: shape will be (f * h * w * 3), a view of out if out
+                is given.
+        """
+        allocated = out is None
+        if allocated:
+            out = np.empty((len(self), *self.frame_shape), np.uint8)
+        elif out.dtype != np.uint8 or out.shape[1:] != self.frame_shape or \
+                not out.flags['C_CONTIGUOUS']:
+            raise ValueError(f'out should be contiguous uint8 in shape (f, '
+                             f'{", ".join(map(str, self.frame_shape))}), '
+                             f'got {out.dtype} in shape {out.shape}.')
+        process = self._open()
+        try:
+            num_read = self._read_frames(process, out)
+            if num_read == len(out):
+                # info may underestimate the number of frames
+                if allocated:
+                    extra = [frame[None] for frame in self._iter_rest(process)]
+                    if extra:
+                        return np.concatenate([out] + extra)
+                elif next(self._iter_rest(process), None) is not None:
+                    raise ValueError(f'out of {len(out)} frames is too '
+                                     'short for the video.')
+        finally:
+            self._close(process)
+        return out[:num_read]
+
+    def _open(self) -> subprocess.Popen:
+        """Start the ffmpeg process writing raw frames to stdout."""
+        filters = f'trim=start_frame={self.start}:end_frame={self.end}'
+        if self.step > 1:
+            filters += f',select=not(mod(n\\,{self.step}))'
+        command = [
+            'ffmpeg',
+            '-i',
+            self.input_path,
+            '-filter_complex',
+            f'[0]{filters}[v0]',
+            '-map',
+            '[v0]',
+            '-pix_fmt',
+            'bgr24',  # bgr24 for matching OpenCV
+            '-s',
+            f'{self.width}x{self.height}',
+            '-f',
+            'image2pipe',
+            '-vcodec',
+            'rawvideo',
+            # do not duplicate frames to fill the trimmed or dropped ones
+            '-vsync',
+            '0',
+            '-loglevel',
+            'error',
+            'pipe:'
+        ]
+        if not self.disable_log:
+            print(f'Running \"{" ".join(command)}\"')
+        # Execute FFmpeg as sub-process with stdout as a pipe
+        process = subprocess.Popen(
+            command, stdout=subprocess.PIPE, bufsize=10**8)
+        if process.stdout is None:
+            raise BrokenPipeError('No buffer received.')
+        return process
+
+    def _read_frames(self, process: subprocess.Popen, out: np.ndarray) -> int:
+        """Read decoded frames from the pipe into out, return the number of
+        complete frames read."""
+        frame_size = self.height * self.width * 3
+        buffer = memoryview(out.reshape(-1))
+        num_bytes = 0
+        while num_bytes < len(buffer):
+            num_read = process.stdout.readinto(buffer[num_bytes:])
+            # FFmpeg streaming ends
+            if not num_read:
+                break
+            num_bytes += num_read
+        return num_bytes // frame_size
+
+    def _iter_rest(self, process: subprocess.Popen) -> Iterator[np.ndarray]:
+        """Yield the frames left in the pipe."""
+        frame = np.empty(self.frame_shape, np.uint8)
+        while self._read_frames(process, frame[None]) == 1:
+            yield frame.copy()
+
+    @staticmethod
+    def _close(process: subprocess.Popen) -> None:
+        """Stop the ffmpeg process, even if frames are left in the pipe."""
+        if process.poll() is None:
+            process.kill()
+        process.stdout.close()
+        process.wait()
+
+
 def video_to_array(
     input_path: str,
     resolution: Optional[Union[Tuple[int, int], Tuple[float, float]]] = None,
@@ -264,6 +463,9 @@ def video_to_array(
     """
     Read a video/gif as an array of (f * h * w * 3).
 
+    Frames are read into one preallocated array. Use VideoFrameStream to
+    read a long video frame by frame or chunk by chunk.
+
     Args:
         input_path (str): input path.
         resolution (Optional[Union[Tuple[int, int], Tuple[float, float]]],
@@ -285,62 +487,12 @@ def video_to_array(
     Returns:
         np.ndarray: shape will be (f * h * w * 3).
     """
-    check_input_path(
-        input_path,
-        allowed_suffix=['.mp4', 'mkv', 'avi', '.gif'],
-        tag='input video',
-        path_type='file')
-
-    info = vid_info_reader(input_path)
-    if resolution:
-        height, width = resolution
-    else:
-        width, height = int(info['width']), int(info['height'])
-    num_frames = int(info['nb_frames'])
-    start = (min(start, num_frames - 1) + num_frames) % num_frames
-    end = (min(end, num_frames - 1) +
-           num_frames) % num_frames if end is not None else num_frames
-    command = [
-        'ffmpeg',
-        '-i',
+    return VideoFrameStream(
         input_path,
-        '-filter_complex',
-        f'[0]trim=start_frame={start}:end_frame={end}[v0]',
-        '-map',
-        '[v0]',
-        '-pix_fmt',
-        'bgr24',  # bgr24 for matching OpenCV
-        '-s',
-        f'{int(width)}x{int(height)}',
-        '-f',
-        'image2pipe',
-        '-vcodec',
-        'rawvideo',
-        '-loglevel',
-        'error',
-        'pipe:'
-    ]
-    if not disable_log:
-        print(f'Running \"{" ".join(command)}\"')
-    # Execute FFmpeg as sub-process with stdout as a pipe
-    process = subprocess.Popen(command, stdout=subprocess.PIPE, bufsize=10**8)
-    if process.stdout is None:
-        raise BrokenPipeError('No buffer received.')
-    # Read decoded video frames from the PIPE until no more frames to read
-    array = []
-    while True:
-        # Read decoded video frame (in raw video format) from stdout process.
-        buffer = process.stdout.read(int(width * height * 3))
-        # Break the loop if buffer length is not W*H*3\
-        # (when FFmpeg streaming ends).
-        if len(buffer) != width * height * 3:
-            break
-        img = np.frombuffer(buffer, np.uint8).reshape(height, width, 3)
-        array.append(img[np.newaxis])
-    process.stdout.flush()
-    process.stdout.close()
-    process.wait()
-    return np.concatenate(array)
+        resolution=resolution,
+        start=start,
+        end=end,
+        disable_log=disable_log).read()
 
 
 def images_to_sorted_images(input_folder, output_folder, img_format='%06d'):
@@ -6,6 +6,7 @@ import torch
 from mmhuman3d.apis import (
     feature_extract,
     inference_image_based_model,
+    inference_image_based_model_batch,
     inference_video_based_model,
     init_model,
 )
@@ -41,6 +42,38 @@ def test_inference_image_based_model():
     _, _ = convert_verts_to_cam_coord(verts, pred_cams, bboxes_xy)
 
 
+def test_inference_image_based_model_batch():
+    device_name = 'cpu'
+    config = mmcv.Config.fromfile('configs/spin/resnet50_spin_pw3d.py')
+    config.model.backbone.norm_cfg = dict(type='BN', requires_grad=True)
+    mesh_model, _ = init_model(config, None, device=device_name)
+
+    frames = [np.ones([224, 224, 3]) * i for i in range(3)]
+    person_results = [{
+        'track_id': 0,
+        'bbox': [0, 0, 224, 224, 1]
+    }, {
+        'track_id': 1,
+        'bbox': [0, 0, 112, 112, 0.1]
+    }]
+    person_results_list = [person_results, [], person_results]
+    mesh_results_list = inference_image_based_model_batch(
+        mesh_model,
+        frames,
+        person_results_list,
+        bbox_thr=0.5,
+        format='xyxy',
+        batch_size=1,
+        num_workers=2)
+    assert [len(mesh_results) for mesh_results in mesh_results_list] == \
+        [1, 0, 1]
+    mesh_results = inference_image_based_model(
+        mesh_model, frames[2], person_results, bbox_thr=0.5, format='xyxy')
+    assert np.allclose(mesh_results_list[2][0]['camera'],
+                       mesh_results[0]['camera'])
+    assert mesh_results_list[2][0]['track_id'] == 0
+
+
 def test_inference_video_based_model():
     device_name = 'cpu'
     config = mmcv.Config.fromfile('configs/vibe/resnet50_vibe_pw3d.py')
@@ -8,11 +8,13 @@ import torch
 from mmhuman3d.core.conventions.keypoints_mapping import (
     KEYPOINTS_FACTORY,
     convert_kps,
+    get_conversion_plan,
     get_flip_pairs,
     get_keypoint_idx,
     get_keypoint_idxs_by_part,
     get_keypoint_num,
     get_mapping,
+    prewarm_conversion_plans,
 )
 
 
@@ -187,6 +189,52 @@ def test_cache():
             'if convert_kps has not been modified.', UserWarning)
 
 
+def test_conversion_plan():
+    prewarm_conversion_plans(conventions=['smpl_54', 'h36m', 'smpl_45'])
+    # every h36m keypoint has a source, converted by a gather
+    plan = get_conversion_plan('smpl_54', 'h36m')
+    assert plan is get_conversion_plan('smpl_54', 'h36m')
+    assert plan.complete
+    keypoints = np.random.rand(2, 3, 54, 3).astype(np.float32)
+    keypoints_dst, mask = plan.convert(keypoints)
+    assert keypoints_dst.dtype == np.float64
+    assert keypoints_dst.shape == (2, 3, 17, 3)
+    assert mask.dtype == np.uint8 and mask.all()
+    out = np.empty((2, 3, 17, 3))
+    plan.convert(keypoints, out=out)
+    assert np.all(out == keypoints_dst)
+
+    # unmapped keypoints are zero
+    plan = get_conversion_plan('smpl_45', 'smpl_54')
+    assert not plan.complete
+    keypoints = torch.rand(4, 45, 3)
+    keypoints_dst, mask = convert_kps(keypoints, 'smpl_45', 'smpl_54')
+    out = torch.full((4, 54, 3), 1.)
+    plan.convert(keypoints, return_mask=False, out=out)
+    assert torch.equal(out, keypoints_dst)
+    assert (keypoints_dst[:, mask == 0] == 0).all()
+    # the cached mask is not shared with the output
+    mask[:] = 0
+    assert convert_kps(keypoints, 'smpl_45', 'smpl_54')[1].any()
+
+    # mappings are cached per keypoints_factory
+    keypoints_factory = dict(a=['x', 'y', 'z'], b=['z', 'x'])
+    keypoints_dst, mask = convert_kps(
+        np.arange(6).reshape(1, 3, 2),
+        'a',
+        'b',
+        keypoints_factory=keypoints_factory)
+    assert keypoints_dst.tolist() == [[[4, 5], [0, 1]]]
+    keypoints_factory = dict(a=['x', 'y', 'z'], b=['y', 'w'])
+    keypoints_dst, mask = convert_kps(
+        np.arange(6).reshape(1, 3, 2),
+        'a',
+        'b',
+        keypoints_factory=keypoints_factory)
+    assert keypoints_dst.tolist() == [[[2, 3], [0, 0]]]
+    assert mask.tolist() == [1, 0]
+
+
 def test_get_flip_pairs():
     stable_conventions = [
         'coco', 'smpl', 'smplx', 'mpi_inf_3dhp', 'openpose_25'
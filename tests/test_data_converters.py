@@ -1,9 +1,13 @@
 import os
 import os.path as osp
+import tempfile
 
 import numpy as np
 
 from mmhuman3d.data.data_converters import build_data_converter
+from mmhuman3d.data.data_converters.base_converter import BaseShardedConverter
+from mmhuman3d.data.data_structures.human_data import HumanData
+from mmhuman3d.data.data_structures.multi_human_data import MultiHumanData
 
 
 def test_human_data_preprocess():
@@ -492,3 +496,80 @@ def test_preprocessed_npz():
 
             elif k == 'features':
                 assert npfile[k].shape == (N, 2048)
+
+
+class _ShardedConverter(BaseShardedConverter):
+    ACCEPTED_MODES = ['train']
+
+    def get_shards(self, dataset_path, mode):
+        return [3, 1, 2]
+
+    def convert_shard(self, dataset_path, mode, shard):
+        human_data = HumanData()
+        human_data['image_path'] = [f'{shard}_{i}.jpg' for i in range(shard)]
+        human_data['bbox_xywh'] = np.full((shard, 5), shard, dtype=np.float32)
+        human_data['keypoints2d'] = np.ones((shard, 190, 3))
+        human_data['keypoints2d_mask'] = np.ones(190)
+        human_data['smpl'] = dict(
+            betas=np.full((shard, 10), shard), gender='neutral')
+        human_data['config'] = 'sharded'
+        human_data.compress_keypoints_by_mask()
+        return {f'sharded_{mode}.npz': human_data}
+
+
+def test_sharded_converter():
+    for num_workers in [0, 2]:
+        with tempfile.TemporaryDirectory() as output_path:
+            converter = _ShardedConverter(
+                modes=['train'], num_workers=num_workers)
+            converter.convert('', output_path)
+            assert os.listdir(output_path) == ['sharded_train.npz']
+            human_data = HumanData.fromfile(
+                osp.join(output_path, 'sharded_train.npz'))
+        assert human_data.data_len == 6
+        assert human_data['config'] == 'sharded'
+        assert human_data['image_path'][:4] == [
+            '3_0.jpg', '3_1.jpg', '3_2.jpg', '1_0.jpg'
+        ]
+        assert human_data['bbox_xywh'][:, 0].tolist() == [3, 3, 3, 1, 2, 2]
+        assert human_data['keypoints2d'].shape == (6, 190, 3)
+        assert human_data['smpl']['betas'][:, 0].tolist() == [3, 3, 3, 1, 2, 2]
+        assert human_data['smpl']['gender'] == 'neutral'
+
+
+def test_merge_human_data():
+    shards = []
+    for data_len in [2, 3]:
+        human_data = HumanData()
+        human_data['image_path'] = ['a.jpg'] * data_len
+        human_data['keypoints3d'] = np.ones((data_len, 190, 4))
+        mask = np.zeros(190)
+        mask[:data_len * 10] = 1
+        human_data['keypoints3d_mask'] = mask
+        human_data['smpl'] = dict(betas=np.zeros((data_len, 10)))
+        human_data['config'] = 'shard'
+        human_data.compress_keypoints_by_mask()
+        shards.append(human_data)
+    # different masks are multiplied
+    human_data = BaseShardedConverter.merge_human_data(shards)
+    assert human_data.data_len == 5
+    assert human_data.check_keypoints_compressed()
+    assert human_data['keypoints3d_mask'].sum() == 20
+    assert human_data.get_raw_value('keypoints3d').shape == (5, 20, 4)
+    assert human_data['smpl']['betas'].shape == (5, 10)
+    assert human_data['config'] == 'shard'
+
+    # frame_range is offset by the instances of previous shards
+    shards = []
+    for instance_num in [3, 2]:
+        human_data = MultiHumanData()
+        human_data['frame_range'] = np.array([[0, 1], [1, instance_num]])
+        human_data['bbox_xywh'] = np.zeros((instance_num, 5))
+        shards.append(human_data)
+    human_data = BaseShardedConverter.merge_human_data(shards)
+    assert isinstance(human_data, MultiHumanData)
+    assert human_data.data_len == 4
+    assert human_data.instance_num == 5
+    assert human_data['frame_range'].tolist() == [[0, 1], [1, 3], [3, 4],
+                                                  [4, 5]]
+    assert human_data['bbox_xywh'].shape == (5, 5)
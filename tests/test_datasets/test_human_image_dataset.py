@@ -1,8 +1,9 @@
 import copy
 
 import numpy as np
+import pytest
 
-from mmhuman3d.data.datasets import HumanImageDataset
+from mmhuman3d.data.datasets import HumanImageDataset, human_image_dataset
 from mmhuman3d.data.datasets.pipelines import (
     LoadImageFromFile,
     MeshAffine,
@@ -68,6 +69,34 @@ def test_human_image_dataset():
     assert 'PVE' in res
     assert res['PVE'] > 0
 
+    # metrics share the body model outputs of an evaluation
+    forward_keys = []
+    _forward_body_model = test_dataset._forward_body_model
+
+    def forward_body_model(keys, **kwargs):
+        forward_keys.append(keys)
+        return _forward_body_model(keys, **kwargs)
+
+    test_dataset._forward_body_model = forward_body_model
+    res_all = test_dataset.evaluate(
+        outputs,
+        res_folder='tests/data',
+        metric=['pa-mpjpe', 'mpjpe', 'pve'],
+        batch_size=1)
+    # one forward of the GT and one of the predictions
+    assert forward_keys == [['joints', 'vertices'], ['vertices']]
+    del test_dataset._forward_body_model
+    assert np.isclose(res_all['PVE'], res['PVE'])
+
+    # streaming evaluation gives the same metrics
+    accumulators = test_dataset.get_metric_accumulators(
+        metric=['pa-mpjpe', 'mpjpe', 'pve'])
+    test_dataset.update_metric_accumulators(accumulators, outputs[0])
+    for name, accumulator in accumulators.items():
+        assert np.isclose(accumulator.compute(), res_all[name])
+    with pytest.raises(KeyError):
+        test_dataset.get_metric_accumulators(metric='ihmr')
+
     res = test_dataset.evaluate(
         outputs, res_folder='tests/data', metric='pa-3dpck')
     assert 'PA-3DPCK' in res
@@ -131,6 +160,49 @@ def test_human_image_dataset():
     assert res['PA-MPJPE'] > 0
 
 
+def test_human_image_dataset_alignment(monkeypatch):
+    # the aligned keypoints are shared by the metrics of an evaluation
+    num_solves = 0
+    _align_points = human_image_dataset.align_points
+
+    def align_points(*args, **kwargs):
+        nonlocal num_solves
+        num_solves += 1
+        return _align_points(*args, **kwargs)
+
+    monkeypatch.setattr(human_image_dataset, 'align_points', align_points)
+
+    num_data = 1
+    test_dataset = HumanImageDataset(
+        data_prefix='tests/data',
+        pipeline=[],
+        dataset_name='pw3d',
+        body_model=dict(
+            type='SMPL',
+            keypoint_src='smpl_45',
+            keypoint_dst='h36m',
+            model_path='data/body_models/smpl'),
+        ann_file='sample_3dpw_test.npz')
+    test_dataset.num_data = num_data
+    outputs = [{
+        'keypoints_3d': np.random.rand(num_data, 17, 3),
+        'smpl_pose': np.random.rand(num_data, 24, 3, 3),
+        'smpl_beta': np.random.rand(num_data, 10),
+        'image_idx': np.arange(num_data)
+    }]
+    res = test_dataset.evaluate(
+        outputs,
+        res_folder='tests/data',
+        metric=['pa-mpjpe', 'pa-3dpck', 'pa-3dauc', 'mpjpe'])
+    assert num_solves == 1
+    assert set(res.keys()) == {'PA-MPJPE', 'PA-3DPCK', 'PA-3DAUC', 'MPJPE'}
+
+    # each evaluation solves again
+    test_dataset.evaluate(
+        outputs, res_folder='tests/data', metric=['pa-3dpck', 'pa-3dauc'])
+    assert num_solves == 2
+
+
 def test_cached_dataset():
     # dump cache files
     train_dataset = HumanImageDataset(
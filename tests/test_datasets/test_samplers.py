@@ -0,0 +1,136 @@
+from functools import partial
+
+import numpy as np
+from torch.utils.data import ConcatDataset, DataLoader, Dataset
+
+from mmhuman3d.data.datasets import (
+    BlockShuffleSampler,
+    DistributedSampler,
+    MixedDataset,
+)
+from mmhuman3d.data.datasets.builder import DATASETS, worker_init_fn
+
+
+class _CacheReader():
+
+    def __init__(self, slice_size):
+        self.slice_size = slice_size
+
+
+@DATASETS.register_module(force=True)
+class _RangeDataset(Dataset):
+
+    def __init__(self, length, slice_size=None):
+        self.length = length
+        self.cache_reader = None if slice_size is None \
+            else _CacheReader(slice_size)
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, idx):
+        return idx
+
+
+def test_block_shuffle_sampler():
+    dataset = _RangeDataset(100, slice_size=10)
+    sampler = BlockShuffleSampler(
+        dataset, num_replicas=1, rank=0, window_size=2)
+    indices = list(sampler)
+    # every sample once per epoch
+    assert sorted(indices) == list(range(100))
+    # samples of a window come from 2 slices
+    for window_start in range(0, 100, 20):
+        window = indices[window_start:window_start + 20]
+        assert len(set(idx // 10 for idx in window)) <= 2
+    # deterministic in an epoch, different between epochs
+    assert list(sampler) == indices
+    sampler.set_epoch(1)
+    assert list(sampler) != indices
+    # no shuffle
+    dataset = _RangeDataset(95, slice_size=10)
+    sampler = BlockShuffleSampler(
+        dataset, num_replicas=1, rank=0, shuffle=False)
+    assert list(sampler) == list(range(95))
+
+
+def test_block_shuffle_sampler_distributed():
+    dataset = ConcatDataset(
+        [_RangeDataset(50, slice_size=10),
+         _RangeDataset(33)])
+    rank_indices = []
+    for rank in range(4):
+        sampler = BlockShuffleSampler(
+            dataset, num_replicas=4, rank=rank, block_size=5)
+        indices = list(sampler)
+        assert len(indices) == len(sampler) == 21
+        rank_indices += indices
+    assert sorted(set(rank_indices)) == list(range(83))
+    sampler = BlockShuffleSampler(
+        dataset, num_replicas=4, rank=3, round_up=False)
+    assert len(list(sampler)) == 20
+
+
+def test_block_shuffle_sampler_mixed_dataset():
+    dataset = MixedDataset(
+        configs=[
+            dict(type='_RangeDataset', length=1000, slice_size=10),
+            dict(type='_RangeDataset', length=30, slice_size=10)
+        ],
+        partition=[0.4, 0.6],
+        num_data=2000)
+    sampler = BlockShuffleSampler(dataset, num_replicas=1, rank=0)
+    assert dataset.index_by_sampler
+    indices = np.array(list(sampler))
+    assert len(indices) == 2000
+    ratio = (indices >= 1000).mean()
+    assert 0.5 < ratio < 0.7
+    # indices of the concatenated datasets
+    assert dataset[1009] == 9
+
+
+def test_mixed_dataset_index_stream():
+    dataset = MixedDataset(
+        configs=[
+            dict(type='_RangeDataset', length=1000),
+            dict(type='_RangeDataset', length=30)
+        ],
+        partition=[0.4, 0.6],
+        num_data=2000,
+        num_predraw=16)
+    # random draws without a sampler
+    samples = [dataset[0] for _ in range(100)]
+    assert min(samples) >= 0 and max(samples) < 1000
+    indices = dataset.get_indices(epoch=0)
+    assert len(indices) == 2000
+    assert 0.5 < (indices >= 1000).mean() < 0.7
+    assert np.all(indices == dataset.get_indices(epoch=0))
+    assert np.any(indices != dataset.get_indices(epoch=1))
+    # ranks take disjoint draws of the same stream
+    rank_indices = []
+    for rank in range(2):
+        sampler = DistributedSampler(dataset, num_replicas=2, rank=rank)
+        rank_indices.append(list(sampler))
+    assert dataset.index_by_sampler
+    assert rank_indices[0] == indices[0::2].tolist()
+    assert rank_indices[1] == indices[1::2].tolist()
+
+
+def test_mixed_dataset_random_draws():
+    dataset = MixedDataset(
+        configs=[
+            dict(type='_RangeDataset', length=1000),
+            dict(type='_RangeDataset', length=30)
+        ],
+        partition=[0.4, 0.6],
+        num_predraw=16)
+    # worker_init_fn reseeds np.random the same way in every epoch,
+    # the draws still differ between epochs
+    data_loader = DataLoader(
+        dataset,
+        batch_size=50,
+        num_workers=1,
+        worker_init_fn=partial(worker_init_fn, num_workers=1, rank=0, seed=0))
+    epochs = [np.concatenate(list(data_loader)) for _ in range(2)]
+    assert len(epochs[0]) == len(dataset)
+    assert np.any(epochs[0] != epochs[1])
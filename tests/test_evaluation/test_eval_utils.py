@@ -1,8 +1,15 @@
 import numpy as np
 import pytest
+import torch
 
 from mmhuman3d.core.evaluation import (
+    align_points,
+    batch_compute_similarity_transform,
+    batch_compute_similarity_transform_torch,
+    build_metric_accumulator,
+    compute_similarity_transform,
     fg_vertices_to_mesh_distance,
+    ihmr_binned_error,
     keypoint_3d_auc,
     keypoint_3d_pck,
     keypoint_accel_error,
@@ -119,6 +126,90 @@ def test_keypoint_3d_auc():
     np.testing.assert_almost_equal(auc, 30 / 31 * 100)
 
 
+def test_ihmr_binned_error():
+    distances = np.array([0., 0.1, 0.2, 0.9, 1.])
+    errors = np.array([1., 3., 5., 7., 9.])
+    # bins [0, 0.5) and [0.5, 1]
+    binned_error, tail_errors = ihmr_binned_error(
+        errors, distances, num_bins=2, tail_percentages=(40, 20))
+    np.testing.assert_almost_equal(binned_error, (3 + 8) / 2)
+    np.testing.assert_almost_equal(tail_errors[40], 8)
+    np.testing.assert_almost_equal(tail_errors[20], 9)
+
+    # several errors at once, empty bins are skipped and the largest
+    # distance falls in the last bin
+    binned_error, tail_errors = ihmr_binned_error(
+        np.stack([errors, errors * 2], axis=-1),
+        distances,
+        num_bins=10,
+        tail_percentages=(20, ))
+    assert binned_error.shape == (2, )
+    np.testing.assert_almost_equal(binned_error, [17 / 4, 17 / 2])
+    np.testing.assert_almost_equal(tail_errors[20], [9, 18])
+
+
+def test_batch_compute_similarity_transform():
+    source = np.random.rand(10, 14, 3)
+    target = np.random.rand(10, 14, 3)
+    expected = np.stack([
+        compute_similarity_transform(source_i, target_i)
+        for source_i, target_i in zip(source, target)
+    ])
+
+    aligned, tform = batch_compute_similarity_transform(
+        source, target, return_tform=True)
+    np.testing.assert_allclose(aligned, expected, atol=1e-10)
+    _, tform_0 = compute_similarity_transform(
+        source[0], target[0], return_tform=True)
+    for key in ('rotation', 'scale', 'translation'):
+        np.testing.assert_allclose(tform[key][0], tform_0[key], atol=1e-10)
+
+    aligned = batch_compute_similarity_transform_torch(
+        torch.from_numpy(source), torch.from_numpy(target))
+    np.testing.assert_allclose(aligned.numpy(), expected, atol=1e-10)
+
+    np.testing.assert_allclose(
+        align_points(source, target, 'procrustes', device='cpu'),
+        expected,
+        atol=1e-10)
+    with pytest.raises(ValueError):
+        _ = align_points(source, target, alignment='norm')
+
+
+def test_metric_accumulators():
+    output = np.random.rand(20, 14, 3) * 200
+    target = np.random.rand(20, 14, 3) * 200
+    mask = np.random.rand(20, 14) > 0.2
+    expected = {
+        'mpjpe': keypoint_mpjpe(output, target, mask),
+        'pa-mpjpe': keypoint_mpjpe(output, target, mask, 'procrustes'),
+        'pve': vertice_pve(output, target),
+        '3dpck': keypoint_3d_pck(output, target, mask),
+        'pa-3dpck': keypoint_3d_pck(output, target, mask, 'procrustes'),
+        '3dauc': keypoint_3d_auc(output, target, mask),
+        'pa-3dauc': keypoint_3d_auc(output, target, mask, 'procrustes'),
+        'accel': keypoint_accel_error(output, target).mean(),
+    }
+    for metric, value in expected.items():
+        accumulator = build_metric_accumulator(metric)
+        if metric == 'accel':
+            accumulator.update(output, target)
+        else:
+            # uneven batches, as on different ranks
+            for start, stop in ((0, 7), (7, 8), (8, 20)):
+                accumulator.update(output[start:stop], target[start:stop],
+                                   mask[start:stop])
+        accumulator.reduce()
+        np.testing.assert_allclose(accumulator.compute(), value, rtol=1e-5)
+        accumulator.reset()
+        assert accumulator.stats.sum() == 0
+
+    with pytest.raises(ValueError):
+        _ = build_metric_accumulator('pa-accel')
+    with pytest.raises(ValueError):
+        _ = build_metric_accumulator('ihmr')
+
+
 def test_fg_vertices_to_mesh_distance():
     target = np.random.rand(10, 3) * 1000
     output = np.copy(target)
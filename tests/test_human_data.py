@@ -465,6 +465,86 @@ def test_dump_by_pickle(HumanDataCls):
         human_data.dump_by_pickle(human_data_dump_path, overwrite=False)
 
 
+@pytest.mark.parametrize('HumanDataCls', (HumanData, MultiHumanData))
+def test_dump_by_mmap(HumanDataCls):
+    # set item with mask
+    human_data = HumanDataCls()
+    sample_keypoints2d = np.ones(shape=[3, 144, 3])
+    sample_keypoints2d_mask = np.zeros(shape=[144])
+    sample_keypoints2d_mask[:4] = 1
+    human_data['keypoints2d_mask'] = sample_keypoints2d_mask
+    human_data['keypoints2d'] = sample_keypoints2d
+    human_data['image_path'] = ['a.jpg', 'b.jpg', 'c.jpg']
+    human_data['smpl'] = {
+        'betas': np.zeros(shape=(3, 10)),
+        'global_orient': np.zeros(shape=(3, 3)),
+        'gender': 'neutral'
+    }
+    human_data.compress_keypoints_by_mask()
+    # 3 frames before dump
+    assert human_data.data_len == 3
+
+    human_data_dump_path = 'tests/data/human_data/human_data_00_dump_mmap'
+    human_data.dump_by_mmap(human_data_dump_path, overwrite=True)
+    human_data_load = HumanDataCls()
+    human_data_load.load_by_mmap(human_data_dump_path)
+    # 3 frames after load
+    assert human_data_load.data_len == 3
+    assert human_data_load.check_keypoints_compressed()
+    assert human_data_load['image_path'] == ['a.jpg', 'b.jpg', 'c.jpg']
+    assert human_data_load['smpl']['gender'] == 'neutral'
+    assert type(human_data_load['smpl']['betas']) is np.ndarray
+    assert human_data_load.get_raw_value('keypoints2d').shape == (3, 4, 3)
+    assert human_data_load['keypoints2d'].shape == (3, 144, 3)
+    # mapped values can be sliced and edited in memory
+    sliced_human_data = human_data_load.get_slice(1, 3)
+    assert sliced_human_data.data_len == 2
+    human_data_load['smpl']['betas'][0] = 1
+    human_data_load = HumanDataCls.fromfile(human_data_dump_path)
+    assert human_data_load['smpl']['betas'].sum() == 0
+
+    # compatibility for old bbox
+    old_version_dict = {
+        'bbox_xywh': np.zeros(shape=(3, 4)),
+        'image_path': None
+    }
+    human_data.update(old_version_dict)
+    human_data.dump_by_mmap(human_data_dump_path, overwrite=True)
+    human_data_load = HumanDataCls.fromfile(human_data_dump_path)
+    assert human_data_load['bbox_xywh'].shape[1] == 5
+    assert 'image_path' not in human_data_load
+
+    # path is a file
+    with pytest.raises(ValueError):
+        human_data.dump_by_mmap(__file__, overwrite=True)
+    # directory exists
+    with pytest.raises(FileExistsError):
+        human_data.dump_by_mmap(human_data_dump_path, overwrite=False)
+
+
+@pytest.mark.parametrize('HumanDataCls', (HumanData, MultiHumanData))
+def test_convert_npz_to_mmap(HumanDataCls):
+    human_data = HumanDataCls()
+    human_data['keypoints2d_mask'] = np.ones(shape=[144])
+    human_data['keypoints2d'] = np.ones(shape=[3, 144, 3])
+    human_data['image_path'] = ['a.jpg', 'b.jpg', 'c.jpg']
+    human_data['smpl'] = {'betas': np.ones(shape=(3, 10))}
+    npz_path = 'tests/data/human_data/human_data_00_convert.npz'
+    human_data.dump(npz_path, overwrite=True)
+    mmap_path = 'tests/data/human_data/human_data_00_convert_mmap'
+    HumanDataCls.convert_npz_to_mmap(npz_path, mmap_path, overwrite=True)
+    human_data_npz = HumanDataCls.fromfile(npz_path)
+    human_data_mmap = HumanDataCls.fromfile(mmap_path)
+    assert human_data_mmap.data_len == human_data_npz.data_len
+    assert set(human_data_mmap.keys()) == set(human_data_npz.keys())
+    assert human_data_mmap['image_path'] == human_data_npz['image_path']
+    assert np.all(
+        human_data_mmap['keypoints2d'] == human_data_npz['keypoints2d'])
+    assert np.all(human_data_mmap['smpl']['betas'] == 1)
+    with pytest.raises(FileExistsError):
+        HumanDataCls.convert_npz_to_mmap(npz_path, mmap_path, overwrite=False)
+
+
 @pytest.mark.parametrize('HumanDataCls', (HumanData, MultiHumanData))
 def test_log(HumanDataCls):
     HumanDataCls.set_logger('silent')
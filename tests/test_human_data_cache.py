@@ -63,3 +63,57 @@ def test_read():
     slice_with_smpl = reader.get_item(53, ['smpl'])
     assert slice_with_smpl['smpl']['global_orient'].shape[1] == 3
     assert slice_with_smpl['smpl']['expression'][0] == 0
+
+
+human_data_cache_dir = 'tests/data/human_data/human_data_cache_mmap'
+
+
+def test_write_mmap():
+    human_data = HumanData.new(key_strict=False)
+    keypoint_num_hd = get_keypoint_num(convention='human_data')
+    human_data['keypoints2d'] = np.ones(shape=(95, keypoint_num_hd, 3))
+    human_data['keypoints2d_mask'] = np.ones(shape=(keypoint_num_hd, ))
+    human_data['keypoints2d_convention'] = 'human_data'
+    human_data['keypoints2d'][50, 50, :] *= 3
+    human_data['config'] = 'config/example'
+    human_data['image_path'] = [str(x) for x in range(95)]
+    human_data['smpl'] = {
+        'betas': np.ones(shape=(95, 10)),
+        'body_pose': np.ones(shape=(95, 21, 3)),
+        'expression': [
+            0,
+        ],
+    }
+    human_data.compress_keypoints_by_mask()
+
+    writer_kwargs, sliced_data = human_data.get_sliced_cache()
+    writer = HumanDataCacheWriter(**writer_kwargs)
+    writer.update_sliced_dict(sliced_data)
+    writer.dump_by_mmap(human_data_cache_dir, overwrite=True)
+    with pytest.raises(FileExistsError):
+        writer.dump_by_mmap(human_data_cache_dir, overwrite=False)
+
+
+def test_read_mmap():
+    reader = HumanDataCacheReader(
+        npz_path=human_data_cache_dir, max_cached_slices=2)
+    assert reader.data_len == 95
+    assert reader.get_non_sliced_data('config') == 'config/example'
+    slice_with_50 = reader.get_item(50)
+    assert isinstance(slice_with_50, HumanData)
+    assert slice_with_50['image_path'][0] == '50'
+    assert slice_with_50['keypoints2d'][0, 50, 1] == 3
+    assert 'config' not in slice_with_50.keys()
+    # frames in the same slice share the decoded slice
+    assert reader.get_item(55) is slice_with_50
+    slice_with_smpl = reader.get_item(53, ['smpl'])
+    assert slice_with_smpl['smpl']['body_pose'].shape == (10, 21, 3)
+    assert slice_with_smpl['smpl']['expression'][0] == 0
+    assert 'expression' not in slice_with_50['smpl']
+    # the last slice is shorter
+    slice_with_94 = reader.get_item(94)
+    assert slice_with_94['image_path'] == ['90', '91', '92', '93', '94']
+    assert slice_with_94.data_len == 5
+    # least recently used slice is dropped
+    assert len(reader.cached_slices) == 2
+    assert reader.get_item(50) is not slice_with_50
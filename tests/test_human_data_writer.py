@@ -0,0 +1,95 @@
+import os
+
+import numpy as np
+import pytest
+
+from mmhuman3d.core.conventions.keypoints_mapping import get_keypoint_num
+from mmhuman3d.data.data_structures.human_data import HumanData
+from mmhuman3d.data.data_structures.human_data_writer import HumanDataWriter
+
+
+@pytest.mark.parametrize('file_name', ['human_data.npz', 'human_data_mmap'])
+def test_append(tmpdir, file_name):
+    out_path = os.path.join(tmpdir, file_name)
+    keypoint_num = get_keypoint_num(convention='human_data')
+    mask = np.zeros(shape=(keypoint_num, ))
+    mask[:10] = 1
+    with HumanDataWriter(out_path, compress_keypoints=True) as writer:
+        writer.set_value('config', 'config/example')
+        writer.set_value('keypoints2d_mask', mask)
+        for start in range(0, 100, 30):
+            stop = min(start + 30, 100)
+            writer.append({
+                'image_path': [str(x) for x in range(start, stop)],
+                'keypoints2d':
+                np.ones(shape=(stop - start, keypoint_num, 3)) * start,
+                'smpl': {
+                    'betas': np.ones(shape=(stop - start, 10)),
+                    'body_pose': np.ones(shape=(stop - start, 23, 3)),
+                },
+            })
+        writer.append_frame({
+            'image_path': '100',
+            'keypoints2d': np.ones(shape=(keypoint_num, 3)),
+            'smpl': {
+                'betas': np.zeros(10),
+                'body_pose': np.zeros((23, 3)),
+            },
+        })
+        # lists are buffered on disk as well
+        assert writer.lists['image_path']['file'].tell() > 0
+    assert not [name for name in os.listdir(tmpdir) if name.startswith('.')]
+
+    human_data = HumanData.fromfile(out_path)
+    assert human_data.data_len == 101
+    assert human_data.check_keypoints_compressed()
+    assert human_data['config'] == 'config/example'
+    assert list(human_data['image_path']) == [str(x) for x in range(101)]
+    assert human_data.get_raw_value('keypoints2d').shape == (101, 10, 3)
+    assert human_data['keypoints2d'].shape == (101, keypoint_num, 3)
+    assert human_data['keypoints2d'][61, 0, 0] == 60
+    assert human_data['keypoints2d'][61, 10, 0] == 0
+    assert human_data['smpl']['body_pose'].shape == (101, 23, 3)
+    assert human_data['smpl']['betas'][100].sum() == 0
+
+
+def test_invalid_append(tmpdir):
+    out_path = os.path.join(tmpdir, 'human_data.npz')
+    writer = HumanDataWriter(out_path)
+    # not sliced by frames
+    with pytest.raises(ValueError):
+        writer.append({'config': 'config/example'})
+    # shape not supported
+    with pytest.raises(ValueError):
+        writer.append({'bbox_xywh': np.zeros((2, 4))})
+    writer.append({
+        'bbox_xywh': np.zeros((2, 5)),
+        'image_path': ['0', '1'],
+    })
+    # different keys
+    with pytest.raises(ValueError):
+        writer.append({'bbox_xywh': np.zeros((2, 5))})
+    # different shapes
+    with pytest.raises(ValueError):
+        writer.append({
+            'bbox_xywh': np.zeros((2, 6)),
+            'image_path': ['2', '3'],
+        })
+    # different temporal lengths
+    with pytest.raises(ValueError):
+        writer.append({
+            'bbox_xywh': np.zeros((3, 5)),
+            'image_path': ['2', '3'],
+        })
+    writer.finalize()
+    human_data = HumanData.fromfile(out_path)
+    assert human_data.data_len == 2
+    assert human_data['bbox_xywh'].shape == (2, 5)
+
+    # masks are required before compressing keypoints
+    writer = HumanDataWriter(out_path, compress_keypoints=True)
+    with pytest.raises(ValueError):
+        writer.append({'keypoints2d': np.zeros((2, 10, 3))})
+    writer.close()
+    with pytest.raises(FileExistsError):
+        HumanDataWriter(out_path, overwrite=False)
@@ -1,6 +1,14 @@
+import os
+import pickle
+
+import numpy as np
 import torch
+from smplx.lbs import batch_rodrigues
 
+from mmhuman3d.models.body_models.assets import clear_body_model_cache
 from mmhuman3d.models.body_models.builder import build_body_model
+from mmhuman3d.models.body_models.smpl import SMPL
+from mmhuman3d.models.body_models.smplx import SMPLX
 
 body_model_load_dir = 'data/body_models/smpl'
 extra_joints_regressor = 'data/body_models/J_regressor_extra.npy'
@@ -43,57 +51,215 @@ def test_smpl():
     assert torch.allclose(smpl_54_joints[:, joint_mapping, :], smpl_49_joints)
 
 
-# def test_gendered_smpl():
-#     random_betas_neutral = torch.rand((1, 10))
-#     random_betas_male = torch.rand((1, 10))
-#     random_betas_female = torch.rand((1, 10))
-#     gender = torch.Tensor([-1, 0, 1])
-#
-#     smpl_neutral = build_body_model(
-#         dict(
-#             type='SMPL',
-#             gender='neutral',
-#             keypoint_src='smpl_45',
-#             keypoint_dst='smpl_45',
-#             model_path=body_model_load_dir,
-#         ))
-#
-#     smpl_male = build_body_model(
-#         dict(
-#             type='SMPL',
-#             gender='male',
-#             keypoint_src='smpl_45',
-#             keypoint_dst='smpl_45',
-#             model_path=body_model_load_dir,
-#         ))
-#
-#     smpl_female = build_body_model(
-#         dict(
-#             type='SMPL',
-#             gender='female',
-#             keypoint_src='smpl_45',
-#             keypoint_dst='smpl_45',
-#             model_path=body_model_load_dir,
-#         ))
-#
-#     gendered_smpl = build_body_model(
-#         dict(
-#             type='GenderedSMPL',
-#             keypoint_src='smpl_45',
-#             keypoint_dst='smpl_45',
-#             model_path=body_model_load_dir))
-#
-#     smpl_neutral_output = smpl_neutral(betas=random_betas_neutral)
-#     smpl_male_output = smpl_male(betas=random_betas_male)
-#     smpl_female_output = smpl_female(betas=random_betas_female)
-#
-#     betas_concat = torch.cat(
-#         [random_betas_neutral, random_betas_male, random_betas_female])
-#     joint_concat = torch.cat([
-#         smpl_neutral_output['joints'], smpl_male_output['joints'],
-#         smpl_female_output['joints']
-#     ])
-#
-#     gendered_smpl_output = gendered_smpl(betas=betas_concat, gender=gender)
-#
-#     assert torch.allclose(joint_concat, gendered_smpl_output['joints'])
+def _dump_gendered_smpl(model_dir):
+    """Dump random SMPL models of all genders."""
+    num_verts = SMPL.NUM_VERTS
+    parents = [-1, 0, 0, 0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 9, 9, 12, 13, 14, 16]
+    parents += [17, 18, 19, 20, 21]
+    for seed, gender in enumerate(['NEUTRAL', 'MALE', 'FEMALE']):
+        rng = np.random.RandomState(seed)
+        weights = rng.rand(num_verts, 24)**8
+        J_regressor = rng.rand(24, num_verts) * (rng.rand(24, num_verts) > .99)
+        model = dict(
+            v_template=rng.randn(num_verts, 3) * 0.3,
+            shapedirs=rng.randn(num_verts, 3, 10) * 0.01,
+            posedirs=rng.randn(num_verts, 3, 207).astype(np.float32) * 0.01,
+            J_regressor=J_regressor / J_regressor.sum(1, keepdims=True),
+            kintree_table=np.array([parents, list(range(24))]),
+            weights=weights / weights.sum(1, keepdims=True),
+            f=rng.randint(0, num_verts, (SMPL.NUM_FACES, 3)))
+        with open(os.path.join(model_dir, f'SMPL_{gender}.pkl'), 'wb') as f:
+            pickle.dump(model, f)
+
+
+def test_gendered_smpl(tmp_path):
+    _dump_gendered_smpl(tmp_path)
+    body_models = [
+        build_body_model(
+            dict(
+                type='SMPL',
+                gender=gender,
+                keypoint_src='smpl_45',
+                keypoint_dst='smpl_45',
+                model_path=str(tmp_path)))
+        for gender in ['neutral', 'male', 'female']
+    ]
+    gendered_smpl = build_body_model(
+        dict(
+            type='GenderedSMPL',
+            keypoint_src='smpl_45',
+            keypoint_dst='smpl_45',
+            model_path=str(tmp_path)))
+
+    gender = torch.Tensor([1, -1, 0, 1, 0])
+    betas = torch.rand((5, 10))
+    body_pose = torch.rand((5, 69))
+    global_orient = torch.rand((5, 3))
+    transl = torch.rand((5, 3))
+    gendered_output = gendered_smpl(
+        betas=betas,
+        body_pose=body_pose,
+        global_orient=global_orient,
+        transl=transl,
+        gender=gender,
+        return_full_pose=True)
+    assert gendered_output['full_pose'].shape == (5, 72)
+
+    for i, gender_label in enumerate(gender.long().tolist()):
+        output = body_models[gender_label + 1](
+            betas=betas[i:i + 1],
+            body_pose=body_pose[i:i + 1],
+            global_orient=global_orient[i:i + 1],
+            transl=transl[i:i + 1])
+        for key in ['vertices', 'joints']:
+            assert torch.allclose(
+                gendered_output[key][i:i + 1], output[key], atol=1e-5)
+
+    # a single gender, poses in rotation matrices
+    rotmat = batch_rodrigues(body_pose.view(-1, 3)).view(5, 23, 3, 3)
+    global_rotmat = torch.eye(3).expand(5, 1, 3, 3)
+    gendered_output = gendered_smpl(
+        body_pose=rotmat,
+        global_orient=global_rotmat,
+        gender=torch.zeros(5),
+        pose2rot=False)
+    output = body_models[1](
+        body_pose=rotmat, global_orient=global_rotmat, pose2rot=False)
+    assert torch.allclose(
+        gendered_output['vertices'], output['vertices'], atol=1e-5)
+
+
+def test_smpl_joints_only(tmp_path):
+    _dump_gendered_smpl(tmp_path)
+    body_model = build_body_model(
+        dict(
+            type='SMPL',
+            keypoint_src='smpl_45',
+            keypoint_dst='smpl_45',
+            model_path=str(tmp_path)))
+    gendered_smpl = build_body_model(
+        dict(
+            type='GenderedSMPL',
+            keypoint_src='smpl_45',
+            keypoint_dst='smpl_45',
+            model_path=str(tmp_path)))
+    params = dict(
+        betas=torch.rand((3, 10)),
+        body_pose=torch.rand((3, 69), requires_grad=True),
+        global_orient=torch.rand((3, 3)),
+        transl=torch.rand((3, 3)))
+    output = body_model(**params)
+    joints_output = body_model(**params, return_verts=False)
+    assert 'vertices' not in joints_output
+    # only the vertices of the extra joints are skinned
+    assert len(body_model.joint_vertex_ids) < body_model.NUM_VERTS
+    assert torch.allclose(joints_output['joints'], output['joints'], atol=1e-5)
+    grad = torch.autograd.grad(output['joints'].sum(), params['body_pose'])[0]
+    joints_grad = torch.autograd.grad(joints_output['joints'].sum(),
+                                      params['body_pose'])[0]
+    assert torch.allclose(joints_grad, grad, atol=1e-4)
+
+    gender = torch.Tensor([1, -1, 0])
+    output = gendered_smpl(**params, gender=gender)
+    joints_output = gendered_smpl(**params, gender=gender, return_verts=False)
+    assert torch.allclose(joints_output['joints'], output['joints'], atol=1e-5)
+
+
+def _dump_smplx(model_dir):
+    """Dump a random neutral SMPL-X model."""
+    num_verts, num_faces = SMPLX.NUM_VERTS, SMPLX.NUM_FACES
+    parents = [-1, 0, 0, 0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 9, 9, 12, 13, 14, 16]
+    parents += [17, 18, 19, 15, 15, 15]
+    # 15 hand joints of each wrist
+    for wrist in (20, 21):
+        for start in range(len(parents), len(parents) + 15, 3):
+            parents += [wrist, start, start + 1]
+    rng = np.random.RandomState(0)
+    weights = rng.rand(num_verts, 55)**8
+    J_regressor = rng.rand(55, num_verts) * (rng.rand(55, num_verts) > .99)
+    np.savez(
+        os.path.join(model_dir, 'SMPLX_NEUTRAL.npz'),
+        v_template=rng.randn(num_verts, 3) * 0.3,
+        shapedirs=rng.randn(num_verts, 3, 20) * 0.01,
+        posedirs=rng.randn(num_verts, 3, 486).astype(np.float32) * 0.01,
+        J_regressor=J_regressor / J_regressor.sum(1, keepdims=True),
+        kintree_table=np.array([parents, list(range(55))]).astype(np.uint32),
+        weights=weights / weights.sum(1, keepdims=True),
+        f=rng.randint(0, num_verts, (num_faces, 3)),
+        hands_componentsl=rng.randn(45, 45),
+        hands_componentsr=rng.randn(45, 45),
+        hands_meanl=rng.randn(45) * 0.1,
+        hands_meanr=rng.randn(45) * 0.1,
+        lmk_faces_idx=rng.randint(0, num_faces, 51),
+        lmk_bary_coords=rng.dirichlet(np.ones(3), 51),
+        dynamic_lmk_faces_idx=rng.randint(0, num_faces, (79, 17)),
+        dynamic_lmk_bary_coords=rng.dirichlet(np.ones(3), (79, 17)))
+
+
+def test_smplx_joints_only(tmp_path):
+    _dump_smplx(tmp_path)
+    body_model = build_body_model(
+        dict(
+            type='SMPLX',
+            keypoint_src='smplx',
+            keypoint_dst='smplx',
+            use_face_contour=True,
+            model_path=str(tmp_path)))
+    params = dict(
+        betas=torch.rand((3, 10)),
+        body_pose=torch.rand((3, 63), requires_grad=True),
+        global_orient=torch.rand((3, 3)),
+        transl=torch.rand((3, 3)),
+        left_hand_pose=torch.rand((3, 6)),
+        right_hand_pose=torch.rand((3, 6)),
+        jaw_pose=torch.rand((3, 3)),
+        leye_pose=torch.rand((3, 3)),
+        reye_pose=torch.rand((3, 3)),
+        expression=torch.rand((3, 10)))
+    output = body_model(**params)
+    joints_output = body_model(**params, return_verts=False)
+    assert 'vertices' not in joints_output
+    # only the vertices of the extra joints and landmarks are skinned
+    assert len(body_model.joint_vertex_ids) < body_model.NUM_VERTS
+    assert torch.allclose(joints_output['joints'], output['joints'], atol=1e-5)
+    assert torch.equal(joints_output['joint_mask'], output['joint_mask'])
+    grad = torch.autograd.grad(output['joints'].sum(), params['body_pose'])[0]
+    joints_grad = torch.autograd.grad(joints_output['joints'].sum(),
+                                      params['body_pose'])[0]
+    assert torch.allclose(joints_grad, grad, atol=1e-4)
+
+
+def test_smpl_shared_assets(tmp_path):
+    model_dir = tmp_path / 'smpl'
+    model_dir.mkdir()
+    _dump_gendered_smpl(model_dir)
+    cfg = dict(
+        type='SMPL',
+        keypoint_src='smpl_45',
+        keypoint_dst='smpl_45',
+        model_path=str(model_dir))
+    body_model = build_body_model(cfg)
+    other = build_body_model(dict(cfg, batch_size=2, keypoint_dst='h36m'))
+    for name in SMPL.shared_buffer_names:
+        assert getattr(body_model, name) is getattr(other, name)
+    # the joints only buffers are built at first use
+    assert not hasattr(other, 'joint_vertex_ids')
+    other(return_verts=False)
+    assert hasattr(other, 'joint_vertex_ids')
+
+    # loading different buffers does not modify the other models
+    state_dict = body_model.state_dict()
+    state_dict['v_template'] = state_dict['v_template'] + 1
+    body_model.load_state_dict(state_dict)
+    assert torch.allclose(body_model.v_template, other.v_template + 1)
+
+    # memory-mapped model files
+    clear_body_model_cache()
+    cache_dir = str(tmp_path / 'cache')
+    body_model = build_body_model(dict(cfg, asset_cache_dir=cache_dir))
+    assert len(os.listdir(cache_dir)) == 1
+    clear_body_model_cache()
+    cached = build_body_model(dict(cfg, asset_cache_dir=cache_dir))
+    for name in SMPL.shared_buffer_names:
+        assert torch.equal(getattr(body_model, name), getattr(cached, name))
+    clear_body_model_cache()
@@ -474,3 +474,117 @@ def test_data_type_np():
     out_s_64 = smoothenet_64(noisy_input)
     assert out_g.shape == noisy_input.shape == out_s.shape == out_o.shape \
         == out_s_8.shape == out_s_16.shape == out_s_32.shape == out_s_64.shape
+
+
+def test_online_filter():
+    noisy_input = np.random.randn(30, 24, 3).astype(np.float32)
+
+    # recursive filters give the same results as the offline ones
+    cfg = dict(type='OneEuroFilter', min_cutoff=0.004, beta=0.7)
+    online = build_post_processing(dict(type='online', filter_cfg=cfg))
+    out = np.stack([online.push(x, track_id=1) for x in noisy_input])
+    assert np.allclose(out, build_post_processing(cfg)(noisy_input), atol=1e-5)
+    assert online.flush(track_id=1) == []
+    cfg = dict(type='OneEuroFilter', min_cutoff=0.004, beta=0.7, d_cutoff=3.)
+    online = build_post_processing(dict(type='online', filter_cfg=cfg))
+    out = np.stack([online.push(x) for x in noisy_input])
+    assert np.allclose(out, build_post_processing(cfg)(noisy_input), atol=1e-5)
+    out = online.push(torch.from_numpy(noisy_input[0]))
+    assert isinstance(out, torch.Tensor)
+
+    # window based filters wait for lookahead frames
+    for cfg in [
+            dict(type='Gaus1dFilter', window_size=11, sigma=4),
+            dict(type='SGFilter', window_size=11, polyorder=2),
+            dict(type='smoothnet', window_size=8, output_size=8)
+    ]:
+        online = build_post_processing(
+            dict(type='OnlineFilter', filter_cfg=cfg, lookahead=3))
+        outs = {0: [], 1: []}
+        for x in noisy_input:
+            for track_id in outs:
+                out = online.push(x, track_id=track_id)
+                if out is not None:
+                    outs[track_id].append(out)
+        assert len(outs[0]) == len(noisy_input) - 3
+        outs[0] += online.flush(track_id=0)
+        assert len(outs[0]) == len(noisy_input)
+        assert np.allclose(outs[0][0], noisy_input[0])
+        window_size = online.window_size
+        last = build_post_processing(cfg)(noisy_input[-window_size:])
+        assert np.allclose(outs[0][-1], last[-1], atol=1e-5)
+        assert list(online.states.keys()) == [1]
+        online.reset()
+        assert online.states == {}
+
+
+def test_oneeuro_multi_person():
+    noisy_input = np.random.randn(30, 3, 24, 3).astype(np.float32)
+    cfg = dict(type='OneEuroFilter', min_cutoff=0.004, beta=0.7)
+    oneeuro = build_post_processing(cfg)
+
+    # all the persons at once equal to one by one
+    out = oneeuro(noisy_input)
+    assert out.shape == noisy_input.shape
+    for i in range(noisy_input.shape[1]):
+        assert np.allclose(out[:, i], oneeuro(noisy_input[:, i]), atol=1e-6)
+    out_mask = oneeuro(noisy_input, mask=np.ones((30, 3), dtype=bool))
+    assert np.allclose(out_mask, out, atol=1e-6)
+    out_torch = oneeuro(torch.from_numpy(noisy_input), mask=torch.ones(30, 3))
+    assert isinstance(out_torch, torch.Tensor)
+    assert np.allclose(out_torch.numpy(), out, atol=1e-6)
+
+    # invalid frames are kept and skipped
+    mask = np.ones((30, 3), dtype=bool)
+    mask[:5, 1] = False
+    mask[10:20, 2] = False
+    out_mask = oneeuro(noisy_input, mask=mask)
+    assert np.allclose(out_mask[:, 0], out[:, 0], atol=1e-6)
+    assert np.allclose(out_mask[~mask], noisy_input[~mask])
+    assert np.allclose(out_mask[5:, 1], oneeuro(noisy_input[5:, 1]), atol=1e-6)
+    assert not np.allclose(out_mask[20:, 2], out[20:, 2])
+
+
+def test_deciwatch_batch():
+    noisy_input = torch.randn((100, 2, 24, 6)).reshape(100, 2, 144)
+    cfg = dict(
+        type='deciwatch',
+        interval=5,
+        slide_window_q=1,
+        checkpoint='https://openmmlab-share.oss-cn-hangzhou.aliyuncs.com/'
+        'mmhuman3d/models/deciwatch/deciwatch_interval5_q1.pth.tar?versionId='
+        'CAEQOhiBgIDfocS9gxgiIDkxN2Y3OWQzZmJiMTQyMTM5NWZhZTYxYmI0MDlmMDBh',
+        device='cpu',
+        batch_size=4)
+    deciwatch = build_post_processing(cfg)
+    out = deciwatch(noisy_input)
+    assert out.shape == noisy_input.shape
+    # persons in one forward equal to one by one
+    for i in range(noisy_input.shape[1]):
+        assert torch.allclose(
+            out[:, i], deciwatch(noisy_input[:, i]), atol=1e-5)
+    # chunked windows equal to all the windows in one forward
+    deciwatch.batch_size = None
+    assert torch.allclose(out, deciwatch(noisy_input), atol=1e-5)
+
+
+def test_smoothnet_batch():
+    noisy_input = np.random.randn(3, 40, 24, 6).astype(np.float32)
+    lengths = [40, 20, 5]
+    smoothnet = build_post_processing(
+        dict(type='smoothnet', window_size=8, output_size=8, chunk_size=4))
+    out = smoothnet.smooth_batch(noisy_input, lengths)
+    assert out.shape == noisy_input.shape
+    # tracks in one forward equal to one by one
+    assert np.allclose(out[0], smoothnet(noisy_input[0]), atol=1e-5)
+    assert np.allclose(out[1, :20], smoothnet(noisy_input[1, :20]), atol=1e-5)
+    # frames after the lengths are kept
+    assert np.allclose(out[1, 20:], noisy_input[1, 20:])
+    # short tracks are padded instead of skipped
+    padded = np.concatenate(
+        [noisy_input[2, :5], noisy_input[2, 4:5].repeat(3, 0)])
+    assert np.allclose(out[2, :5], smoothnet(padded)[:5], atol=1e-5)
+    assert not np.allclose(smoothnet(noisy_input[2, :5]), noisy_input[2, :5])
+    out_tensor = smoothnet.smooth_batch(torch.from_numpy(noisy_input))
+    assert isinstance(out_tensor, torch.Tensor)
+    assert np.allclose(out_tensor[0].numpy(), out[0], atol=1e-5)
@@ -1,7 +1,9 @@
+import pickle
+
 import numpy as np
 import pytest
 
-from mmhuman3d.data.data_structures.smc_reader import SMCReader
+from mmhuman3d.data.data_structures.smc_reader import SMCReader, SMCReaderPool
 
 TEST_SMC_PATH = 'tests/data/dataset_sample/humman/p000003_a000014_tiny.smc'
 
@@ -499,3 +501,40 @@ def test_iphone_rotation():
     keypoints2d_horizontal = keypoints2d_horizontal.squeeze()[..., :2]
     keypoints2d[conf == 0.0] = 0.0
     assert np.allclose(keypoints2d, keypoints2d_horizontal)
+
+
+def test_get_color_frame():
+    smc = SMCReader(TEST_SMC_PATH)
+
+    for device in ['Kinect', 'iPhone']:
+        img = smc.get_color(device, 0, 0)[0]
+        assert np.array_equal(smc.get_color_frame(device, 0, 0), img)
+        img_bgr = smc.get_color_frame(device, 0, 0, to_rgb=False)
+        assert np.array_equal(img_bgr, img[..., ::-1])
+
+    img = smc.get_color('iPhone', 0, 0, vertical=False)[0]
+    assert np.array_equal(
+        smc.get_color_frame('iPhone', 0, 0, vertical=False), img)
+
+
+def test_smc_reader_pool():
+    pool = SMCReaderPool(capacity=1)
+    smc = pool.get(TEST_SMC_PATH)
+    assert pool.get(TEST_SMC_PATH) is smc
+    assert len(pool) == 1
+
+    # the pickled pool opens the files again
+    pool_copy = pickle.loads(pickle.dumps(pool))
+    assert len(pool_copy) == 0
+    assert pool_copy.get(TEST_SMC_PATH) is not smc
+
+    # files used by another process are opened again
+    pool.pid = -1
+    assert pool.get(TEST_SMC_PATH) is not smc
+    assert len(pool) == 1
+
+    pool.clear()
+    assert len(pool) == 0
+
+    with pytest.raises(AssertionError):
+        SMCReaderPool(capacity=0)
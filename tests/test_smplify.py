@@ -1,9 +1,12 @@
+import csv
+
 import mmcv
 import numpy as np
 import torch
 
 from mmhuman3d.models.body_models.builder import build_body_model
 from mmhuman3d.models.registrants.builder import build_registrant
+from mmhuman3d.models.registrants.hooks import TelemetryHook
 
 body_model_load_dir = 'data/body_models'
 batch_size = 2
@@ -70,6 +73,197 @@ def test_smplify():
                 v.detach().cpu().numpy())), f'{k} fails.'
 
 
+def test_smplify_sequences():
+    """Test fitting independent sequences in one batch."""
+
+    smplify_config = dict(mmcv.Config.fromfile('configs/smplify/smplify.py'))
+
+    device = torch.device(
+        'cuda') if torch.cuda.is_available() else torch.device('cpu')
+
+    smplify_config['body_model'] = dict(
+        type='SMPL',
+        gender='neutral',
+        num_betas=10,
+        keypoint_src='smpl_45',
+        keypoint_dst='smpl_45',
+        model_path='data/body_models/smpl',
+        batch_size=1)
+    smplify_config['num_epochs'] = 1
+    smplify_config['use_one_betas_per_video'] = True
+
+    smplify = build_registrant(smplify_config)
+
+    # Generate keypoints of 3 sequences
+    smpl = build_body_model(
+        dict(
+            type='SMPL',
+            gender='neutral',
+            num_betas=10,
+            keypoint_src='smpl_45',
+            keypoint_dst='smpl_45',
+            model_path='data/body_models/smpl',
+            batch_size=6))
+    keypoints3d = smpl(
+        betas=torch.rand(3, 10).repeat_interleave(2, dim=0),
+        body_pose=torch.rand(6, 69) * 0.2)['joints'].detach().to(device)
+    keypoints3d_conf = torch.ones(*keypoints3d.shape[:2], device=device)
+    sequence_idxs = torch.tensor([4, 4, 0, 0, 2, 2])
+
+    # Run SMPLify
+    smplify_output = smplify(
+        keypoints3d=keypoints3d,
+        keypoints3d_conf=keypoints3d_conf,
+        sequence_idxs=sequence_idxs,
+        return_losses=True)
+
+    # one betas per sequence, one loss per frame
+    assert smplify_output['betas'].shape == (3, 10)
+    assert smplify_output['body_pose'].shape == (6, 69)
+    assert smplify_output['total_loss'].shape == (6, )
+    for k, v in smplify_output.items():
+        if isinstance(v, torch.Tensor):
+            assert not np.any(np.isnan(
+                v.detach().cpu().numpy())), f'{k} fails.'
+
+
+def test_smplify_sequence_losses():
+    """Test each sequence of a batch has the loss of fitting it alone."""
+
+    smplify_config = dict(mmcv.Config.fromfile('configs/smplify/smplify3d.py'))
+
+    device = torch.device(
+        'cuda') if torch.cuda.is_available() else torch.device('cpu')
+
+    smplify_config['verbose'] = False
+    smplify_config['use_one_betas_per_video'] = True
+    smplify_config['device'] = device
+    smplify = build_registrant(smplify_config)
+
+    # 'mean' losses are averaged over each sequence, not the batch
+    sequence_idxs = torch.tensor([0, 0, 0, 1, 1, 1, 1, 1], device=device)
+    batch_size = len(sequence_idxs)
+    params = dict(
+        global_orient=torch.rand(batch_size, 3, device=device),
+        transl=torch.rand(batch_size, 3, device=device),
+        body_pose=torch.rand(batch_size, 69, device=device) * 0.2,
+        betas=torch.rand(2, 10, device=device)[sequence_idxs])
+    keypoints3d = smplify.body_model(**params)['joints'].detach()
+    keypoints3d = keypoints3d + torch.rand_like(keypoints3d) * 0.1
+    keypoints3d_conf = torch.ones(*keypoints3d.shape[:2], device=device)
+
+    losses = smplify.evaluate(
+        **params,
+        keypoints3d=keypoints3d,
+        keypoints3d_conf=keypoints3d_conf,
+        sequence_idxs=sequence_idxs,
+        reduction_override='none')
+    losses = smplify._reduce_sequence_losses(losses, sequence_idxs)
+    for sequence_idx in range(2):
+        mask = sequence_idxs == sequence_idx
+        sequence_losses = smplify.evaluate(
+            **{
+                k: v[mask]
+                for k, v in params.items()
+            },
+            keypoints3d=keypoints3d[mask],
+            keypoints3d_conf=keypoints3d_conf[mask])
+        for k, v in sequence_losses.items():
+            assert torch.allclose(losses[k][mask].sum(), v), k
+
+    # a single sequence is fitted the same way through both paths
+    smplify_config['optimizer']['max_iter'] = 1
+    for stage in smplify_config['stages']:
+        stage['num_iter'] = 2
+    smplify = build_registrant(smplify_config)
+    mask = sequence_idxs == 0
+    output = smplify(
+        keypoints3d=keypoints3d[mask],
+        keypoints3d_conf=keypoints3d_conf[mask],
+        return_losses=True)
+    sequence_output = smplify(
+        keypoints3d=keypoints3d[mask],
+        keypoints3d_conf=keypoints3d_conf[mask],
+        sequence_idxs=sequence_idxs[mask],
+        return_losses=True)
+    for k in ['global_orient', 'transl', 'body_pose', 'betas']:
+        assert torch.allclose(output[k], sequence_output[k], atol=1e-5), k
+    assert torch.allclose(output['total_loss'].sum(),
+                          sequence_output['total_loss'].sum())
+
+
+def test_smplify_hooks(tmp_path):
+    """Test recording the stages and iterations."""
+
+    smplify_config = dict(mmcv.Config.fromfile('configs/smplify/smplify.py'))
+
+    device = torch.device(
+        'cuda') if torch.cuda.is_available() else torch.device('cpu')
+
+    smplify_config['body_model'] = dict(
+        type='SMPL',
+        gender='neutral',
+        num_betas=10,
+        keypoint_src='smpl_45',
+        keypoint_dst='smpl_45',
+        model_path='data/body_models/smpl',
+        batch_size=1)
+    smplify_config['num_epochs'] = 1
+    smplify_config['use_one_betas_per_video'] = True
+    json_file = str(tmp_path / 'trace.json')
+    csv_file = str(tmp_path / 'trace.csv')
+    hook = TelemetryHook(out_file=csv_file)
+    smplify_config['hooks'] = [
+        dict(type='TelemetryHook', out_file=json_file), hook
+    ]
+
+    smplify = build_registrant(smplify_config)
+
+    smpl = build_body_model(
+        dict(
+            type='SMPL',
+            gender='neutral',
+            num_betas=10,
+            keypoint_src='smpl_45',
+            keypoint_dst='smpl_45',
+            model_path='data/body_models/smpl',
+            batch_size=batch_size))
+    keypoints3d = smpl()['joints'].detach().to(device=device)
+    keypoints3d_conf = torch.ones(*keypoints3d.shape[:2], device=device)
+
+    smplify(keypoints3d=keypoints3d, keypoints3d_conf=keypoints3d_conf)
+    smplify(
+        keypoints3d=keypoints3d,
+        keypoints3d_conf=keypoints3d_conf,
+        sequence_idxs=torch.arange(batch_size))
+
+    # one summary per stage and run
+    num_stages = len(smplify_config['stages'])
+    assert len(hook.stages) == 2 * num_stages
+    for summary in hook.stages:
+        assert 0 < summary['iters'] <= summary['num_iter']
+        assert summary['time_iter'] <= summary['time']
+    assert sum(summary['iters'] for summary in hook.stages) == \
+        len(hook.iters)
+    for record in hook.iters:
+        assert record['num_closures'] > 0
+        assert record['time_optimizer'] >= 0
+        assert 'total_loss' in record
+    assert {
+        record['num_sequences']
+        for record in hook.iters if record['run'] == 0
+    } == {1}
+    assert max(record['num_sequences'] for record in hook.iters) == batch_size
+
+    # written after each run
+    trace = mmcv.load(json_file)
+    assert trace['stages'] == hook.stages
+    with open(csv_file, newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == len(hook.iters)
+    assert float(rows[-1]['total_loss']) == hook.iters[-1]['total_loss']
+
+
 def test_smplifyx():
     smplifyx_config = dict(mmcv.Config.fromfile('configs/smplify/smplifyx.py'))
 
@@ -5,6 +5,7 @@ import numpy as np
 import pytest
 
 from mmhuman3d.utils.ffmpeg_utils import (
+    VideoFrameStream,
     array_to_images,
     array_to_video,
     compress_video,
@@ -133,6 +134,31 @@ def test_image_reader():
         assert k in vid.video_stream
 
 
+def test_video_frame_stream():
+    input_path = osp.join(root, 'input_video.mp4')
+    v = video_to_array(input_path)
+
+    stream = VideoFrameStream(input_path, step=3)
+    frames = list(stream)
+    assert len(frames) == len(stream) == 10
+    assert (frames[1] == v[3]).all()
+
+    chunks = list(VideoFrameStream(input_path, start=5, end=25).iter_chunks(8))
+    assert [len(chunk) for chunk in chunks] == [8, 8, 4]
+    assert (chunks[1][0] == v[13]).all()
+
+    out = np.zeros((40, *v.shape[1:]), dtype=np.uint8)
+    frames = VideoFrameStream(input_path).read(out)
+    assert len(frames) == len(v)
+    assert (out[:len(v)] == v).all()
+    with pytest.raises(ValueError):
+        VideoFrameStream(input_path).read(out[:, :10])
+    with pytest.raises(ValueError):
+        VideoFrameStream(input_path).read(out[:len(v) - 1])
+    with pytest.raises(ValueError):
+        VideoFrameStream(input_path, step=0)
+
+
 def test_temporal_concat_video():
     # temporal_concat_video
     # wrong input/output
@@ -2,6 +2,8 @@ import argparse
 import os
 
 from mmhuman3d.data.data_converters import build_data_converter
+from mmhuman3d.data.data_converters.base_converter import BaseShardedConverter
+from mmhuman3d.data.data_converters.builder import DATA_CONVERTERS
 
 DATASET_CONFIGS = dict(
     agora=dict(
@@ -89,6 +91,13 @@ def parse_args():
         default=False,
         help='Whether to generate a multi-human data')
 
+    parser.add_argument(
+        '--num_workers',
+        type=int,
+        default=0,
+        help='the number of processes to convert shards of a dataset, '
+        'for datasets that support it. 0 converts in the main process')
+
     args = parser.parse_args()
 
     return args
@@ -104,6 +113,8 @@ def main():
         cfg = DATASET_CONFIGS[dataset]
         prefix = cfg.pop('prefix', dataset)
         input_path = os.path.join(args.root_path, prefix)
+        if issubclass(DATA_CONVERTERS.get(cfg['type']), BaseShardedConverter):
+            cfg['num_workers'] = args.num_workers
         data_converter = build_data_converter(cfg)
         data_converter.convert(
             input_path,
@@ -0,0 +1,90 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import argparse
+import time
+
+import torch
+
+from mmhuman3d.models.body_models.builder import build_body_model
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Compare the joints/sec of a body model forward with '
+        'and without skinning the whole mesh.')
+    parser.add_argument(
+        '--type',
+        default='SMPL',
+        choices=['SMPL', 'SMPLX'],
+        help='type of the body model')
+    parser.add_argument(
+        '--model-path',
+        default='data/body_models/smpl',
+        help='directory of the body model files')
+    parser.add_argument(
+        '--keypoint-dst',
+        default='smpl_45',
+        help='keypoint convention of the outputs')
+    parser.add_argument(
+        '--joints-regressor',
+        default=None,
+        help='path to a joints regressor, e.g. J_regressor_h36m.npy')
+    parser.add_argument(
+        '--batch-sizes',
+        type=int,
+        nargs='+',
+        default=[1, 64, 512],
+        help='number of bodies in a forward')
+    parser.add_argument(
+        '--num-iters', type=int, default=20, help='forwards per setting')
+    parser.add_argument('--device', default='cpu', help='device to run on')
+    args = parser.parse_args()
+    return args
+
+
+def benchmark(body_model, params, return_verts, num_iters):
+    """Return the joints per second."""
+    with torch.no_grad():
+        body_model(**params, return_verts=return_verts)
+        if params['body_pose'].is_cuda:
+            torch.cuda.synchronize()
+        start = time.perf_counter()
+        for _ in range(num_iters):
+            body_model(**params, return_verts=return_verts)
+        if params['body_pose'].is_cuda:
+            torch.cuda.synchronize()
+    batch_size = params['body_pose'].shape[0]
+    return batch_size * num_iters / (time.perf_counter() - start)
+
+
+def main():
+    args = parse_args()
+    keypoint_src = 'smplx' if args.type == 'SMPLX' else 'smpl_45'
+    config = dict(
+        type=args.type,
+        keypoint_src=keypoint_src,
+        keypoint_dst=args.keypoint_dst,
+        model_path=args.model_path,
+        joints_regressor=args.joints_regressor)
+    if args.type == 'SMPLX':
+        config.update(use_face_contour=True, use_pca=False)
+    for batch_size in args.batch_sizes:
+        body_model = build_body_model(dict(config, batch_size=batch_size)).to(
+            args.device)
+        num_body_joints = body_model.NUM_BODY_JOINTS
+        params = dict(
+            betas=torch.randn(batch_size, 10),
+            body_pose=torch.randn(batch_size, num_body_joints * 3) * 0.2,
+            global_orient=torch.randn(batch_size, 3),
+            transl=torch.randn(batch_size, 3))
+        params = {k: v.to(args.device) for k, v in params.items()}
+        full = benchmark(body_model, params, True, args.num_iters)
+        joints_only = benchmark(body_model, params, False, args.num_iters)
+        print(f'{args.type}, batch {batch_size}, '
+              f'{len(body_model.joint_vertex_ids)}/{body_model.num_verts} '
+              f'vertices skinned for joints: mesh {full:.0f} joints/s, '
+              f'joints only {joints_only:.0f} joints/s, '
+              f'x{joints_only / full:.1f}')
+
+
+if __name__ == '__main__':
+    main()
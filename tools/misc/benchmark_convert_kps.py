@@ -0,0 +1,124 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import argparse
+import time
+
+import numpy as np
+import torch
+
+from mmhuman3d.core.conventions.keypoints_mapping import (
+    KEYPOINTS_FACTORY,
+    convert_kps,
+    get_conversion_plan,
+    get_mapping,
+    prewarm_conversion_plans,
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Compare convert_kps by conversion plans with the '
+        'previous implementation, which allocated and scattered the output '
+        'and the mask on every call.')
+    parser.add_argument(
+        '--pairs',
+        nargs='+',
+        default=['smpl_54:h36m', 'smpl_45:smpl_54', 'smplx:human_data'],
+        help='src:dst conventions to convert')
+    parser.add_argument(
+        '--batch-sizes',
+        type=int,
+        nargs='+',
+        default=[1, 64, 1024],
+        help='number of frames in a call')
+    parser.add_argument(
+        '--num-iters', type=int, default=1000, help='calls per setting')
+    parser.add_argument(
+        '--devices',
+        nargs='+',
+        default=['numpy', 'cpu', 'cuda'],
+        help='numpy, or the device of torch tensors')
+    args = parser.parse_args()
+    return args
+
+
+def legacy_convert_kps(keypoints, src, dst, approximate=False):
+    """convert_kps before conversion plans, kept as the baseline."""
+    if isinstance(keypoints, torch.Tensor):
+        mask = torch.ones(
+            keypoints.shape[-2], dtype=torch.uint8, device=keypoints.device)
+        zeros = torch.zeros
+        new_kwargs = dict(device=keypoints.device)
+    else:
+        mask = np.ones(shape=(keypoints.shape[-2], ))
+        zeros = np.zeros
+        new_kwargs = dict()
+    src_names = KEYPOINTS_FACTORY[src]
+    dst_names = KEYPOINTS_FACTORY[dst]
+    extra_dims = keypoints.shape[:-2]
+    keypoints = keypoints.reshape(-1, len(src_names), keypoints.shape[-1])
+    out_keypoints = zeros(
+        (keypoints.shape[0], len(dst_names), keypoints.shape[-1]),
+        **new_kwargs)
+    original_mask = mask.reshape(-1)
+    if isinstance(keypoints, torch.Tensor):
+        mask = torch.zeros(
+            len(dst_names), dtype=torch.uint8, device=keypoints.device)
+    else:
+        mask = np.zeros(len(dst_names), dtype=np.uint8)
+    dst_idxs, src_idxs, _ = get_mapping(src, dst, approximate)
+    out_keypoints[:, dst_idxs] = keypoints[:, src_idxs]
+    out_keypoints = out_keypoints.reshape(extra_dims + (len(dst_names),
+                                                        keypoints.shape[-1]))
+    if isinstance(keypoints, torch.Tensor):
+        mask[dst_idxs] = original_mask[src_idxs].to(dtype=torch.uint8)
+    else:
+        mask[dst_idxs] = original_mask[src_idxs].astype(np.uint8)
+    return out_keypoints, mask
+
+
+def benchmark(func, keypoints, num_iters):
+    """Return the microseconds per call."""
+    func(keypoints)
+    if isinstance(keypoints, torch.Tensor) and keypoints.is_cuda:
+        torch.cuda.synchronize()
+    start = time.perf_counter()
+    for _ in range(num_iters):
+        func(keypoints)
+    if isinstance(keypoints, torch.Tensor) and keypoints.is_cuda:
+        torch.cuda.synchronize()
+    return (time.perf_counter() - start) / num_iters * 1e6
+
+
+def main():
+    args = parse_args()
+    devices = [
+        device for device in args.devices
+        if device != 'cuda' or torch.cuda.is_available()
+    ]
+    start = time.perf_counter()
+    prewarm_conversion_plans(devices=[d for d in devices if d != 'numpy'])
+    print(f'prewarm {len(KEYPOINTS_FACTORY)} conventions: '
+          f'{time.perf_counter() - start:.3f}s')
+    for pair in args.pairs:
+        src, dst = pair.split(':')
+        num_src = len(KEYPOINTS_FACTORY[src])
+        mode = 'gather' if get_conversion_plan(src, dst).complete \
+            else 'scatter'
+        for device in devices:
+            for batch_size in args.batch_sizes:
+                keypoints = np.random.rand(batch_size, num_src,
+                                           3).astype(np.float32)
+                if device != 'numpy':
+                    keypoints = torch.from_numpy(keypoints).to(device)
+                legacy = benchmark(lambda x: legacy_convert_kps(x, src, dst),
+                                   keypoints, args.num_iters)
+                planned = benchmark(lambda x: convert_kps(x, src, dst),
+                                    keypoints, args.num_iters)
+                print(f'{src} -> {dst} ({mode}), {device}, '
+                      f'batch {batch_size}: '
+                      f'legacy {legacy:.1f}us, plan {planned:.1f}us, '
+                      f'x{legacy / planned:.2f}')
+
+
+if __name__ == '__main__':
+    main()
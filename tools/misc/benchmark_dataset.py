@@ -0,0 +1,173 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+from mmcv import Config
+
+from mmhuman3d.data.data_structures.human_data import HumanData
+from mmhuman3d.data.datasets import build_dataset
+
+SYNTHETIC_DATASETS = (
+    'HumanImageDataset',
+    'HumanImageSMPLXDataset',
+    'HybrIKHumanImageDataset',
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Measure how many raw samples per second a dataset '
+        'prepares in a single worker, without the transform pipeline.')
+    parser.add_argument(
+        '--config',
+        default=None,
+        help='config file. If not set, synthetic annotations are used.')
+    parser.add_argument(
+        '--split',
+        default='train',
+        help='which split of cfg.data to build when --config is set')
+    parser.add_argument(
+        '--datasets',
+        nargs='+',
+        default=list(SYNTHETIC_DATASETS),
+        choices=SYNTHETIC_DATASETS,
+        help='synthetic datasets to benchmark')
+    parser.add_argument(
+        '--num-data',
+        type=int,
+        default=100000,
+        help='number of frames in the synthetic annotation file')
+    parser.add_argument(
+        '--num-iters',
+        type=int,
+        default=2000,
+        help='number of random samples to fetch')
+    parser.add_argument('--seed', type=int, default=0, help='random seed')
+    args = parser.parse_args()
+    return args
+
+
+def make_human_data(num_data, smplx=False):
+    """Synthetic annotations with the layout of the converted datasets."""
+    human_data = HumanData()
+    human_data['image_path'] = [f'{i:08d}.jpg' for i in range(num_data)]
+    bbox_xywh = np.random.rand(num_data, 5).astype(np.float32) * 200
+    bbox_xywh[:, 4] = 1
+    human_data['bbox_xywh'] = bbox_xywh
+    for key, dim in (('keypoints2d', 3), ('keypoints3d', 4)):
+        # 24 valid keypoints out of 190, as in most datasets
+        mask = np.zeros(190, dtype=np.uint8)
+        mask[:24] = 1
+        human_data[f'{key}_mask'] = mask
+        keypoints = np.zeros((num_data, 190, dim), dtype=np.float32)
+        keypoints[:, :24] = np.random.rand(num_data, 24, dim)
+        human_data[key] = keypoints
+    human_data['smpl'] = dict(
+        body_pose=np.random.rand(num_data, 23, 3).astype(np.float32),
+        global_orient=np.random.rand(num_data, 3).astype(np.float32),
+        betas=np.random.rand(num_data, 10).astype(np.float32),
+        transl=np.random.rand(num_data, 3).astype(np.float32))
+    if smplx:
+        human_data['smplx'] = dict(
+            global_orient=np.random.rand(num_data, 3).astype(np.float32),
+            body_pose=np.random.rand(num_data, 21, 3).astype(np.float32),
+            left_hand_pose=np.random.rand(num_data, 15, 3).astype(np.float32),
+            right_hand_pose=np.random.rand(num_data, 15, 3).astype(np.float32),
+            jaw_pose=np.random.rand(num_data, 3).astype(np.float32),
+            betas=np.random.rand(num_data, 10).astype(np.float32),
+            expression=np.random.rand(num_data, 10).astype(np.float32))
+    human_data.compress_keypoints_by_mask()
+    return human_data
+
+
+def make_hybrik_human_data(num_data):
+    """Synthetic annotations with the layout of the HybrIK converters."""
+    human_data = HumanData()
+    human_data['image_path'] = [f'{i:08d}.jpg' for i in range(num_data)]
+    bbox_xyxy = np.random.rand(num_data, 5).astype(np.float32) * 100
+    bbox_xyxy[:, 2:4] += 100
+    bbox_xyxy[:, 4] = 1
+    human_data['bbox_xywh'] = bbox_xyxy
+    human_data['image_width'] = np.full(num_data, 1000)
+    human_data['image_height'] = np.full(num_data, 1000)
+    human_data['depth_factor'] = np.full(num_data, 2000.)
+    human_data['keypoints3d'] = np.random.rand(num_data, 29,
+                                               4).astype(np.float32)
+    human_data['keypoints3d_mask'] = np.ones(29, dtype=np.uint8)
+    human_data['smpl'] = dict(
+        thetas=np.random.rand(num_data, 24, 3).astype(np.float32),
+        betas=np.random.rand(num_data, 10).astype(np.float32))
+    human_data['keypoints3d_relative'] = np.random.rand(num_data, 29,
+                                                        4).astype(np.float32)
+    human_data['keypoints3d17'] = np.random.rand(num_data, 17,
+                                                 4).astype(np.float32)
+    human_data['keypoints3d17_relative'] = np.random.rand(num_data, 17,
+                                                          4).astype(np.float32)
+    human_data['cam_param'] = dict(
+        intrinsic=np.random.rand(num_data, 3, 3).astype(np.float32))
+    human_data['phi'] = np.random.rand(num_data, 23, 2).astype(np.float32)
+    human_data['phi_weight'] = np.ones((num_data, 23, 2), dtype=np.float32)
+    human_data['root_cam'] = np.random.rand(num_data, 3).astype(np.float32)
+    return human_data
+
+
+def build_synthetic_dataset(dataset_type, data_prefix, num_data):
+    ann_file = f'{dataset_type}.npz'
+    ann_prefix = os.path.join(data_prefix, 'preprocessed_datasets')
+    os.makedirs(ann_prefix, exist_ok=True)
+    if dataset_type == 'HybrIKHumanImageDataset':
+        human_data = make_hybrik_human_data(num_data)
+    else:
+        human_data = make_human_data(
+            num_data, smplx=dataset_type == 'HumanImageSMPLXDataset')
+    human_data.dump(os.path.join(ann_prefix, ann_file))
+    cfg = dict(
+        type=dataset_type,
+        data_prefix=data_prefix,
+        pipeline=[],
+        dataset_name='h36m',
+        ann_file=ann_file)
+    if dataset_type != 'HybrIKHumanImageDataset':
+        cfg['convention'] = 'smpl_54'
+    return build_dataset(cfg)
+
+
+def benchmark(dataset, num_iters, seed):
+    """Return the samples/sec of fetching random indices."""
+    indices = np.random.default_rng(seed).integers(
+        len(dataset), size=num_iters)
+    # warm up lazily initialized members
+    dataset[int(indices[0])]
+    start = time.perf_counter()
+    for idx in indices:
+        dataset[int(idx)]
+    return num_iters / (time.perf_counter() - start)
+
+
+def main():
+    args = parse_args()
+    np.random.seed(args.seed)
+    if args.config is not None:
+        cfg = Config.fromfile(args.config)
+        data_cfg = cfg.data[args.split]
+        data_cfg.pipeline = []
+        dataset = build_dataset(data_cfg)
+        speed = benchmark(dataset, args.num_iters, args.seed)
+        print(f'{type(dataset).__name__}: {speed:.1f} samples/sec')
+        return
+    with tempfile.TemporaryDirectory() as data_prefix:
+        for dataset_type in args.datasets:
+            start = time.perf_counter()
+            dataset = build_synthetic_dataset(dataset_type, data_prefix,
+                                              args.num_data)
+            init_time = time.perf_counter() - start
+            speed = benchmark(dataset, args.num_iters, args.seed)
+            print(f'{dataset_type}: {speed:.1f} samples/sec '
+                  f'(init {init_time:.2f}s, {args.num_data} frames)')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,9 @@
 import argparse
+import glob
+import multiprocessing
 import os
 import time
+import zipfile
 
 import mmcv
 import numpy as np
@@ -17,7 +20,7 @@ def parse_args():
     parser = argparse.ArgumentParser(description='mmhuman3d smplify tool')
     parser.add_argument(
         '--input',
-        help=('input file path.'
+        help=('input file path, or a directory of input files. '
               'Input shape should be [N, J, D] or [N, M, J, D],'
               ' where N is the sequence length, M is the number of persons,'
               ' J is the number of joints and D is the dimension.'))
@@ -37,7 +40,14 @@ def parse_args():
         help='the source type of input keypoints')
     parser.add_argument('--config', help='smplify config file path')
     parser.add_argument('--body_model_dir', help='body models file path')
-    parser.add_argument('--batch_size', type=int, default=None)
+    parser.add_argument(
+        '--batch_size',
+        type=int,
+        default=None,
+        help='batch size of the default parameters of the body model. '
+        'It does not limit the number of frames fitted at once, the '
+        'parameters are expanded to the frames of each batch, see '
+        '--max_batch_frames. Defaults to None, a batch size of 1.')
     parser.add_argument('--num_betas', type=int, default=10)
     parser.add_argument('--num_epochs', type=int, default=1)
     parser.add_argument(
@@ -54,30 +64,47 @@ def parse_args():
         choices=['neutral', 'male', 'female'],
         default='neutral',
         help='gender of SMPL model')
-    parser.add_argument('--output', help='output result file')
+    parser.add_argument(
+        '--output',
+        help='output result file, or a directory for an input directory')
     parser.add_argument(
         '--show_path', help='directory to save rendered images or video')
     parser.add_argument(
         '--overwrite',
         action='store_true',
         help='Whether to overwrite if there is already a result file.')
+    parser.add_argument(
+        '--max_batch_frames',
+        type=int,
+        default=0,
+        help='fit the sequences of several input files in one batch, up to '
+        'this number of frames. The persons of an input file are always '
+        'fitted in one batch. Defaults to 0, one input file per batch.')
+    parser.add_argument(
+        '--num_processes',
+        type=int,
+        default=0,
+        help='number of processes to fit the batches of an input directory, '
+        'spread over the visible GPUs. Defaults to 0, in this process.')
+    parser.add_argument(
+        '--trace',
+        default=None,
+        help='.json or .csv file to record the losses and the time of each '
+        'stage and iteration, suffixed by the process id with '
+        '--num_processes. Defaults to None, not recorded.')
     args = parser.parse_args()
     return args
 
 
-def main():
-    args = parse_args()
-    smplify_config = mmcv.Config.fromfile(args.config)
-    assert smplify_config.body_model.type.lower() in ['smpl', 'smplx']
-    assert smplify_config.type.lower() in ['smplify', 'smplifyx']
-
-    # set cudnn_benchmark
-    if smplify_config.get('cudnn_benchmark', False):
-        torch.backends.cudnn.benchmark = True
-
-    device = torch.device(args.device)
+def load_keypoints(args, input_file, keypoint_dst):
+    """Load the keypoints of an input file, in the frames of each person.
 
-    human_data = HumanData.fromfile(args.input)
+    Returns:
+        tuple: keypoints in shape [M * N, J, D], their confidence in shape
+            [M * N, J], the mask of the keypoint convention and the number of
+            persons M.
+    """
+    human_data = HumanData.fromfile(input_file)
     keypoints_src = human_data[args.input_type]
     keypoints_src_mask = human_data[args.input_type + '_mask']
     if args.input_type == 'keypoints2d':
@@ -92,31 +119,38 @@ def main():
         keypoints_src,
         mask=keypoints_src_mask,
         src=args.keypoint_type,
-        dst=smplify_config.body_model['keypoint_dst'])
+        dst=keypoint_dst)
+    num_persons = 1
+    if keypoints.ndim == 4:
+        num_persons = keypoints.shape[1]
+        keypoints = keypoints.transpose(1, 0, 2,
+                                        3).reshape(-1, *keypoints.shape[2:])
     keypoints_conf = np.repeat(mask[None], keypoints.shape[0], axis=0)
+    return keypoints, keypoints_conf, mask, num_persons
 
-    batch_size = args.batch_size if args.batch_size else keypoints.shape[0]
 
-    keypoints = torch.tensor(keypoints, dtype=torch.float32, device=device)
-    keypoints_conf = torch.tensor(
-        keypoints_conf, dtype=torch.float32, device=device)
+def build_smplify(args, smplify_config, device, trace=None):
+    """Build SMPLify(X) by the arguments.
 
-    if args.input_type == 'keypoints3d':
-        human_data = dict(
-            keypoints3d=keypoints, keypoints3d_conf=keypoints_conf)
-    elif args.input_type == 'keypoints2d':
-        human_data = dict(
-            keypoints2d=keypoints, keypoints2d_conf=keypoints_conf)
-    else:
-        raise TypeError(f'Unsupported input type: {args.input_type}')
+    Args:
+        args: the arguments.
+        smplify_config: the config of SMPLify(X).
+        device: the device of SMPLify(X).
+        trace (str, optional): the file to record the iterations to.
+            Defaults to None.
 
+    Returns:
+        tuple: the registrant and the config of its body model.
+    """
     # create body model
     body_model_config = dict(
         type=smplify_config.body_model.type.lower(),
         gender=args.gender,
         num_betas=args.num_betas,
         model_path=args.body_model_dir,
-        batch_size=batch_size,
+        # the registrant is shared by the batches and expands the
+        # parameters to the frames of each batch
+        batch_size=args.batch_size if args.batch_size else 1,
     )
 
     if args.J_regressor is not None:
@@ -129,47 +163,231 @@ def main():
                 use_pca=False,  # current vis do not supports use_pca
             ))
 
+    smplify_config = smplify_config.copy()
     smplify_config.update(
         dict(
             body_model=body_model_config,
             use_one_betas_per_video=args.use_one_betas_per_video,
-            num_epochs=args.num_epochs))
+            num_epochs=args.num_epochs,
+            device=device))
+    if trace is not None:
+        smplify_config.hooks = smplify_config.get(
+            'hooks', []) + [dict(type='TelemetryHook', out_file=trace)]
 
-    smplify = build_registrant(dict(smplify_config))
+    return build_registrant(dict(smplify_config)), body_model_config
+
+
+def fit_batch(smplify, args, tasks):
+    """Fit the sequences of the input files in one batch and dump the
+    results.
+
+    Args:
+        smplify: the registrant.
+        args: the arguments.
+        tasks (list): tuples of the input file and the output file.
+
+    Returns:
+        list: the results of each input file.
+    """
+    device = smplify.device
+    keypoint_dst = smplify.body_model.keypoint_dst
+    inputs = [
+        load_keypoints(args, input_file, keypoint_dst)
+        for input_file, _ in tasks
+    ]
+    # the persons of each file are independent sequences
+    sequence_idxs = []
+    for keypoints, _, _, num_persons in inputs:
+        num_frames = keypoints.shape[0] // num_persons
+        start = len(sequence_idxs) and sequence_idxs[-1][-1] + 1
+        sequence_idxs.append(
+            np.repeat(np.arange(start, start + num_persons), num_frames))
+    sequence_idxs = np.concatenate(sequence_idxs)
+    num_sequences = sequence_idxs[-1] + 1
+
+    keypoints = torch.tensor(
+        np.concatenate([item[0] for item in inputs]),
+        dtype=torch.float32,
+        device=device)
+    keypoints_conf = torch.tensor(
+        np.concatenate([item[1] for item in inputs]),
+        dtype=torch.float32,
+        device=device)
+    if args.input_type == 'keypoints3d':
+        human_data = dict(
+            keypoints3d=keypoints, keypoints3d_conf=keypoints_conf)
+    elif args.input_type == 'keypoints2d':
+        human_data = dict(
+            keypoints2d=keypoints, keypoints2d_conf=keypoints_conf)
+    else:
+        raise TypeError(f'Unsupported input type: {args.input_type}')
 
     # run SMPLify(X)
     t0 = time.time()
-    smplify_output = smplify(**human_data, return_joints=True)
+    smplify_output = smplify(
+        **human_data,
+        sequence_idxs=torch.from_numpy(sequence_idxs)
+        if num_sequences > 1 else None,
+        return_joints=True)
     t1 = time.time()
-    print(f'Time:  {t1 - t0:.2f} s')
-
-    # test MPJPE
-    pred = smplify_output['joints'].cpu().numpy()
-    gt = keypoints.cpu().numpy()
-    mask = mask.reshape(1, -1).repeat(gt.shape[0], axis=0).astype(bool)
-    mpjpe = keypoint_mpjpe(pred=pred, gt=gt, mask=mask)
-    print(f'SMPLify MPJPE: {mpjpe * 1000:.2f} mm')
-
-    # get smpl parameters directly from smplify output
-    poses = {k: v.detach().cpu() for k, v in smplify_output.items()}
-    smplify_results = HumanData(dict(smpl=poses))
-
-    if args.output is not None:
-        print(f'Dump results to {args.output}')
-        smplify_results.dump(args.output, overwrite=args.overwrite)
-
-    if args.show_path is not None:
-        # visualize smpl pose
-        body_model_dir = os.path.dirname(args.body_model_dir.rstrip('/'))
-        body_model_config.update(
-            model_path=body_model_dir,
-            model_type=smplify_config.body_model.type.lower())
-        visualize_smpl_pose(
-            poses=poses,
-            body_model_config=body_model_config,
-            output_path=args.show_path,
-            orbit_speed=1,
-            overwrite=True)
+    print(f'Time:  {t1 - t0:.2f} s, {len(tasks)} files, '
+          f'{num_sequences} sequences, {len(sequence_idxs)} frames')
+
+    # split the results by input file
+    results = []
+    frame_start = 0
+    sequence_start = 0
+    for (input_file, output_file), (keypoints, _, mask,
+                                    num_persons) in zip(tasks, inputs):
+        frame_end = frame_start + keypoints.shape[0]
+        sequence_end = sequence_start + num_persons
+        output = dict()
+        for k, v in smplify_output.items():
+            if v.shape[0] == len(sequence_idxs):
+                # frames of each person to [N, M, ...]
+                v = v[frame_start:frame_end]
+                if num_persons > 1:
+                    v = v.reshape(num_persons, -1,
+                                  *v.shape[1:]).transpose(0, 1)
+            elif v.shape[0] == num_sequences:
+                # betas of each person
+                v = v[sequence_start:sequence_end]
+            output[k] = v
+
+        # test MPJPE
+        pred = output.pop('joints').cpu().numpy()
+        pred = pred.reshape(-1, *pred.shape[-2:])
+        gt = keypoints.reshape(num_persons, -1, *keypoints.shape[1:])
+        gt = gt.transpose(1, 0, 2, 3).reshape(-1, *keypoints.shape[1:])
+        mpjpe_mask = mask.reshape(1, -1).repeat(
+            gt.shape[0], axis=0).astype(bool)
+        mpjpe = keypoint_mpjpe(pred=pred, gt=gt, mask=mpjpe_mask)
+        print(f'{input_file}: SMPLify MPJPE: {mpjpe * 1000:.2f} mm')
+
+        # get smpl parameters directly from smplify output
+        poses = {k: v.detach().cpu() for k, v in output.items()}
+        if output_file is not None:
+            print(f'Dump results to {output_file}')
+            HumanData(dict(smpl=poses)).dump(
+                output_file, overwrite=args.overwrite)
+        results.append(poses)
+        frame_start = frame_end
+        sequence_start = sequence_end
+    return results
+
+
+def _init_worker(args, smplify_config, devices):
+    """Build the registrant of a worker process on the next device."""
+    global _smplify
+    trace = None
+    if args.trace is not None:
+        root, ext = os.path.splitext(args.trace)
+        trace = f'{root}.{os.getpid()}{ext}'
+    _smplify, _ = build_smplify(args, smplify_config,
+                                torch.device(devices.get()), trace)
+
+
+def _fit_batch_in_worker(task):
+    """Fit a batch with the registrant of this worker process."""
+    args, batch = task
+    fit_batch(_smplify, args, batch)
+    return len(batch)
+
+
+def get_num_frames(args, input_file):
+    """Get the number of frames of all the persons of an input file from
+    the header of its keypoints, without reading the file."""
+    with zipfile.ZipFile(input_file) as zip_file:
+        with zip_file.open(f'{args.input_type}.npy') as f:
+            major, _ = np.lib.format.read_magic(f)
+            if major == 1:
+                shape, _, _ = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, _, _ = np.lib.format.read_array_header_2_0(f)
+    return int(np.prod(shape[:-2]))
+
+
+def get_batches(args, tasks):
+    """Group the input files into batches of up to max_batch_frames."""
+    batches = []
+    num_frames = 0
+    for task in tasks:
+        frames = get_num_frames(args, task[0])
+        if not batches or num_frames + frames > args.max_batch_frames:
+            batches.append([])
+            num_frames = 0
+        batches[-1].append(task)
+        num_frames += frames
+    return batches
+
+
+def main():
+    args = parse_args()
+    smplify_config = mmcv.Config.fromfile(args.config)
+    assert smplify_config.body_model.type.lower() in ['smpl', 'smplx']
+    assert smplify_config.type.lower() in ['smplify', 'smplifyx']
+
+    # set cudnn_benchmark
+    if smplify_config.get('cudnn_benchmark', False):
+        torch.backends.cudnn.benchmark = True
+
+    if not os.path.isdir(args.input):
+        device = torch.device(args.device)
+        smplify, body_model_config = build_smplify(args, smplify_config,
+                                                   device, args.trace)
+        poses = fit_batch(smplify, args, [(args.input, args.output)])[0]
+
+        if args.show_path is not None:
+            # visualize smpl pose
+            body_model_dir = os.path.dirname(args.body_model_dir.rstrip('/'))
+            body_model_config.update(
+                model_path=body_model_dir,
+                model_type=smplify_config.body_model.type.lower())
+            visualize_smpl_pose(
+                poses=poses,
+                body_model_config=body_model_config,
+                output_path=args.show_path,
+                orbit_speed=1,
+                overwrite=True)
+        return
+
+    # fit the files of a directory, skip the ones fitted already
+    assert args.output is not None, 'Output directory is required.'
+    os.makedirs(args.output, exist_ok=True)
+    tasks = []
+    for input_file in sorted(glob.glob(os.path.join(args.input, '*.npz'))):
+        output_file = os.path.join(args.output, os.path.basename(input_file))
+        if args.overwrite or not os.path.exists(output_file):
+            tasks.append((input_file, output_file))
+    batches = get_batches(args, tasks)
+    print(f'{len(tasks)} files to fit in {len(batches)} batches')
+
+    if args.num_processes > 0:
+        if args.device == 'cuda' and torch.cuda.device_count() > 1:
+            devices = [
+                f'cuda:{i % torch.cuda.device_count()}'
+                for i in range(args.num_processes)
+            ]
+        else:
+            devices = [args.device] * args.num_processes
+        # CUDA cannot be re-initialized in forked processes
+        context = multiprocessing.get_context('spawn' if args.device ==
+                                              'cuda' else None)
+        device_queue = context.Queue()
+        for device in devices:
+            device_queue.put(device)
+        with context.Pool(
+                args.num_processes,
+                initializer=_init_worker,
+                initargs=(args, smplify_config, device_queue)) as pool:
+            for _ in pool.imap_unordered(_fit_batch_in_worker,
+                                         [(args, batch) for batch in batches]):
+                pass
+    else:
+        smplify, _ = build_smplify(args, smplify_config,
+                                   torch.device(args.device), args.trace)
+        for batch in batches:
+            fit_batch(smplify, args, batch)
 
 
 if __name__ == '__main__':
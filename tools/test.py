@@ -1,6 +1,7 @@
 import argparse
 import os
 import os.path as osp
+from functools import partial
 
 import mmcv
 import torch
@@ -13,7 +14,7 @@ from mmcv.runner import (
     wrap_fp16_model,
 )
 
-from mmhuman3d.apis import multi_gpu_test, single_gpu_test
+from mmhuman3d.apis import multi_gpu_test, single_gpu_test, streaming_test
 from mmhuman3d.data.datasets import build_dataloader, build_dataset
 from mmhuman3d.models.architectures.builder import build_architecture
 
@@ -37,6 +38,14 @@ def parse_args():
         action='store_true',
         help='whether to use gpu to collect results')
     parser.add_argument('--tmpdir', help='tmp dir for writing some results')
+    parser.add_argument(
+        '--streaming',
+        action='store_true',
+        help='whether to evaluate the results batch by batch on each rank '
+        'instead of collecting them')
+    parser.add_argument(
+        '--dump-dir',
+        help='dir to save the predictions of each rank in streaming mode')
     parser.add_argument(
         '--cfg-options',
         nargs='+',
@@ -103,26 +112,32 @@ def main():
         wrap_fp16_model(model)
     load_checkpoint(model, args.checkpoint, map_location='cpu')
 
+    eval_cfg = cfg.get('evaluation', args.eval_options)
+    eval_cfg.update(dict(metric=args.metrics))
     if not distributed:
         if args.device == 'cpu':
             model = model.cpu()
         else:
             model = MMDataParallel(model, device_ids=[0])
-        outputs = single_gpu_test(model, data_loader)
+        test_fn = single_gpu_test
     else:
         model = MMDistributedDataParallel(
             model.cuda(),
             device_ids=[torch.cuda.current_device()],
             broadcast_buffers=False)
-        outputs = multi_gpu_test(model, data_loader, args.tmpdir,
-                                 args.gpu_collect)
+        test_fn = partial(
+            multi_gpu_test, tmpdir=args.tmpdir, gpu_collect=args.gpu_collect)
+    if args.streaming:
+        test_fn = partial(streaming_test, dump_dir=args.dump_dir, **eval_cfg)
+    outputs = test_fn(model, data_loader)
 
     rank, _ = get_dist_info()
-    eval_cfg = cfg.get('evaluation', args.eval_options)
-    eval_cfg.update(dict(metric=args.metrics))
     if rank == 0:
         mmcv.mkdir_or_exist(osp.abspath(args.work_dir))
-        results = dataset.evaluate(outputs, args.work_dir, **eval_cfg)
+        if args.streaming:
+            results = outputs
+        else:
+            results = dataset.evaluate(outputs, args.work_dir, **eval_cfg)
         for k, v in results.items():
             print(f'\n{k} : {v:.2f}')
 